@@ -0,0 +1,36 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Tuple
+
+
+def measure(f: Callable[[], Any], repeat: int = 3, number: int = 1) -> Tuple[float, int]:
+    """
+    Return (best wall time in seconds, peak traced memory in bytes) for calling f.
+
+    Each of the repeat timings calls f number times and is divided by number, so very fast
+    calls can be timed above the clock's resolution.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            f()
+        best = min(best, (time.perf_counter() - start) / number)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        f()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def report(name: str, seconds: float, peak: int) -> None:
+    """Print one result line."""
+    print('%-40s %10.4fs %12.1f KiB' % (name, seconds, peak / 1024))
@@ -0,0 +1,43 @@
+"""
+Five aggregations over a one-shot stream: materialize into a clist and call each method vs
+one .aggregate() pass, and vs .fanout() with sub-chains.
+
+    python -m benchmarks.bench_aggregate [n]
+"""
+import random
+import sys
+
+from chaincollections import cgenerator, clist
+from chaincollections.chaincollections import CBase
+
+from ._util import measure, report
+
+
+def main(n: int = 1000000) -> None:
+    def stream():
+        rng = random.Random(0)
+        return cgenerator(rng.randrange(1000) for _ in range(n))
+
+    def materialized():
+        data = clist(stream())
+        return {'count': len(data), 'total': sum(data), 'freq': data.frequencies,
+                'top': data.top_k(10), 'distinct': data.is_distinct}
+
+    def aggregated():
+        return stream().aggregate(count=len, total=sum, freq=CBase.frequencies,
+                                  top=('top_k', 10), distinct=CBase.is_distinct)
+
+    def sub_chains():
+        return stream().fanout(len, sum, lambda s: s.frequencies, lambda s: s.top_k(10).to_list(),
+                               CBase.is_distinct)
+
+    expected = materialized()
+    assert aggregated() == expected
+    assert sub_chains() == list(expected.values())
+    report('materialize + 5 methods, %d' % n, *measure(materialized))
+    report('aggregate(), %d' % n, *measure(aggregated))
+    report('fanout() with 2 sub-chains, %d' % n, *measure(sub_chains))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,26 @@
+"""
+clist vs carray on a numeric map / filter / reduce chain.
+
+    python -m benchmarks.bench_carray [n]
+"""
+import operator
+import sys
+
+from chaincollections import carange, crange
+
+from ._util import measure, report
+
+
+def pipeline(c):
+    return c.map(lambda x: x * 3).filter(lambda x: x % 2 == 0).reduce(operator.add)
+
+
+def main(n: int = 1000000) -> None:
+    lst, arr = crange(n), carange(n)
+    assert pipeline(lst) == pipeline(arr)
+    report('clist, n=%d' % n, *measure(lambda: pipeline(lst)))
+    report('carray, n=%d' % n, *measure(lambda: pipeline(arr)))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,44 @@
+"""
+Checkpoints: recomputing an expensive stage vs writing it once and reading the file back.
+
+    python -m benchmarks.bench_checkpoint [n]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+
+from chaincollections import clist
+
+from ._util import measure, report
+
+
+def enrich(line):
+    record = json.loads(line)
+    record['score'] = sum(ord(c) for c in record['name']) / len(record['name'])
+    return record
+
+
+def main(n: int = 200000) -> None:
+    rng = random.Random(0)
+    lines = clist(json.dumps({'id': i, 'name': 'user%d' % rng.getrandbits(40)}) for i in range(n))
+    fd, path = tempfile.mkstemp(suffix='.ckpt')
+    os.close(fd)
+    try:
+        report('recompute, n=%d' % n, *measure(lambda: lines.lazy().map(enrich).to_list()))
+        report('first checkpoint (write), n=%d' % n, *measure(
+            lambda: lines.lazy().map(enrich).checkpoint(path, force=True).close()))
+        report('re-run, fingerprint matches', *measure(
+            lambda: lines.lazy().map(enrich).checkpoint(path).close()))
+        with lines.lazy().map(enrich).checkpoint(path) as cp:
+            report('read back sequentially', *measure(cp.to_list))
+            picks = [rng.randrange(n) for _ in range(10000)]
+            report('10000 random cp[i]', *measure(lambda: [cp[i] for i in picks]))
+        print('%-40s %10.1f MiB' % ('file size', os.path.getsize(path) / 2 ** 20))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,42 @@
+"""
+Functional accumulation: clist.append vs cvector.append vs a cvector transient.
+
+    python -m benchmarks.bench_cvector [n]
+"""
+import sys
+
+from chaincollections import clist, cvector
+
+from ._util import measure, report
+
+
+def build_clist(n):
+    c = clist()
+    for i in range(n):
+        c = c.append(i)
+    return c
+
+
+def build_cvector(n):
+    v = cvector()
+    for i in range(n):
+        v = v.append(i)
+    return v
+
+
+def build_transient(n):
+    t = cvector().transient()
+    for i in range(n):
+        t.append(i)
+    return t.persistent()
+
+
+def main(n: int = 20000) -> None:
+    assert list(build_clist(100)) == list(build_cvector(100)) == list(build_transient(100))
+    report('clist.append loop, n=%d' % n, *measure(lambda: build_clist(n), repeat=1))
+    report('cvector.append loop, n=%d' % n, *measure(lambda: build_cvector(n)))
+    report('cvector transient, n=%d' % n, *measure(lambda: build_transient(n)))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,40 @@
+"""
+X expressions vs the equivalent lambdas: eager clist, a fused lazy plan (where the expression
+is inlined into the loop) and ctable (where it runs on whole columns).
+
+    python -m benchmarks.bench_expr [n]
+"""
+import random
+import sys
+
+from chaincollections import X, clist, ctable
+
+from ._util import measure, report
+
+
+def main(n: int = 1000000) -> None:
+    rng = random.Random(0)
+    rows = clist({'price': rng.random() * 100, 'qty': rng.randrange(10)} for _ in range(n))
+    table = ctable(rows)
+    expr = X['price'] * X['qty'] > 100
+
+    def f(r):
+        return r['price'] * r['qty'] > 100
+
+    assert rows.filter(expr) == rows.filter(f)
+    assert rows.lazy().filter(expr).map(X['qty'] + 1).to_list() == \
+        rows.lazy().filter(f).map(lambda r: r['qty'] + 1).to_list()
+    assert table.filter(expr).to_list() == table.filter(f).to_list()
+
+    report('clist.filter(lambda), %d' % n, *measure(lambda: rows.filter(f)))
+    report('clist.filter(X), %d' % n, *measure(lambda: rows.filter(expr)))
+    report('lazy filter+map (lambda), %d' % n,
+           *measure(lambda: rows.lazy().filter(f).map(lambda r: r['qty'] + 1).to_list()))
+    report('lazy filter+map (X), %d' % n,
+           *measure(lambda: rows.lazy().filter(expr).map(X['qty'] + 1).to_list()))
+    report('ctable.filter(lambda), %d' % n, *measure(lambda: table.filter(f)))
+    report('ctable.filter(X), %d' % n, *measure(lambda: table.filter(expr)))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,32 @@
+"""
+Grace-hash join / groupby: in memory vs spilling past memory_limit (time and peak memory).
+
+    python -m benchmarks.bench_external [n] [memory_limit]
+"""
+import random
+import sys
+
+from chaincollections import clist
+
+from ._util import measure, report
+
+
+def key(record):
+    return record[0]
+
+
+def main(n: int = 200000, memory_limit: int = 20000) -> None:
+    rng = random.Random(0)
+    left = clist((rng.randrange(n // 4), 'payload %d' % i) for i in range(n))
+    right = clist((k, 'customer %d' % k) for k in range(n // 4))
+    count = lambda pairs: sum(1 for _ in pairs)  # noqa: E731
+    report('join, in memory', *measure(lambda: count(left.lazy().join(right, key, key))))
+    report('join, memory_limit=%d' % memory_limit,
+           *measure(lambda: count(left.lazy().join(right, key, key, memory_limit=memory_limit))))
+    report('groupby, in memory', *measure(lambda: len(left.groupby(key))))
+    report('groupby, memory_limit=%d' % memory_limit,
+           *measure(lambda: count(left.groupby(key, memory_limit=memory_limit))))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
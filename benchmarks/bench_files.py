@@ -0,0 +1,51 @@
+"""
+read_jsonl vs a naive `for line in open()` + json.loads loop.
+
+    python -m benchmarks.bench_files [n]
+"""
+import json
+import os
+import sys
+import tempfile
+
+from chaincollections import crange, read_jsonl, read_lines
+
+from ._util import measure, report
+
+
+def naive(path):
+    with open(path) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def naive_lines(path):
+    with open(path) as f:
+        for line in f:
+            yield line.rstrip('\n')
+
+
+def drain(it):
+    for _ in it:
+        pass
+
+
+def main(n: int = 200000) -> None:
+    fd, path = tempfile.mkstemp(suffix='.jsonl')
+    os.close(fd)
+    try:
+        rows = crange(n).map(lambda i: {'id': i, 'name': 'user%d' % i, 'tags': ['a', 'b']})
+        rows.write_jsonl(path)
+        assert list(naive(path)) == read_jsonl(path).to_list()
+        report('naive open() lines, n=%d' % n, *measure(lambda: drain(naive_lines(path))))
+        report('read_lines, n=%d' % n, *measure(lambda: drain(read_lines(path))))
+        report('naive open() + json.loads, n=%d' % n, *measure(lambda: drain(naive(path))))
+        report('read_jsonl, n=%d' % n, *measure(lambda: drain(read_jsonl(path))))
+        report('read_jsonl mmap, n=%d' % n,
+               *measure(lambda: drain(read_jsonl(path, use_mmap=True))))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,31 @@
+"""
+Eager clist chain vs lazy (fused) chain on a long pipeline.
+
+    python -m benchmarks.bench_lazy [n]
+"""
+import sys
+
+from chaincollections import crange
+
+from ._util import measure, report
+
+
+def pipeline(c):
+    return (c.map(lambda x: x * 3)
+            .filter(lambda x: x % 2 == 0)
+            .map(lambda x: x + 1)
+            .remove(lambda x: x % 5 == 0)
+            .map(lambda x: (x, x * x))
+            .pluck(1)
+            .reduce(lambda a, b: a + b))
+
+
+def main(n: int = 1000000) -> None:
+    data = crange(n)
+    assert pipeline(data) == pipeline(data.lazy())
+    report('eager clist, n=%d' % n, *measure(lambda: pipeline(data)))
+    report('lazy clazy, n=%d' % n, *measure(lambda: pipeline(data.lazy())))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
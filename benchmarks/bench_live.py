@@ -0,0 +1,49 @@
+"""
+Dashboard refresh over a growing event log: count_by / reduce_by / top_k recomputed from
+scratch vs live views that fold in only the events appended since the last refresh.
+
+    python -m benchmarks.bench_live [n] [batch]
+"""
+import operator
+import random
+import sys
+
+from chaincollections import X, clist
+
+from ._util import measure, report
+
+
+def biggest(a, e):
+    return a if a['amount'] >= e['amount'] else e
+
+
+def main(n: int = 1000000, batch: int = 1000) -> None:
+    rng = random.Random(0)
+
+    def new_events(count):
+        return [{'user': rng.randrange(1000), 'amount': rng.randrange(10000)}
+                for _ in range(count)]
+
+    log = clist(new_events(n))
+    user, amount = X['user'], operator.itemgetter('amount')
+    counts = log.live_count_by(user)
+    largest = log.live_reduce_by(user, biggest)
+    top = log.live_top_k(10, amount)
+
+    def recompute():
+        list.extend(log, new_events(batch))
+        return log.count_by(user), log.reduce_by(user, biggest), log.top_k(10, amount)
+
+    def refresh():
+        list.extend(log, new_events(batch))
+        return counts.snapshot(), largest.snapshot(), top.snapshot()
+
+    report('recompute from scratch, %d events' % n, *measure(recompute))
+    report('live refresh, +%d events' % batch, *measure(refresh))
+    assert counts.snapshot() == log.count_by(user)
+    assert largest.snapshot() == log.reduce_by(user, biggest)
+    assert top.snapshot().map(amount) == log.top_k(10, amount).map(amount)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
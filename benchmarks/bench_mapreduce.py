@@ -0,0 +1,31 @@
+"""
+Single-process count_by / groupby vs partitioned(n) map-reduce in a process pool.
+
+    python -m benchmarks.bench_mapreduce [n] [partitions]
+"""
+import hashlib
+import sys
+
+from chaincollections import crange
+
+from ._util import measure, report
+
+
+def bucket(x: int) -> int:
+    # a key function with real work in it, as in the nightly aggregations
+    return hashlib.sha256(str(x).encode()).digest()[0] % 64
+
+
+def main(n: int = 1000000, partitions: int = 4) -> None:
+    data = crange(n)
+    assert data.count_by(bucket) == data.partitioned(partitions).count_by(bucket)
+    report('count_by, n=%d' % n, *measure(lambda: data.count_by(bucket), repeat=1))
+    report('partitioned(%d).count_by, n=%d' % (partitions, n),
+           *measure(lambda: data.partitioned(partitions).count_by(bucket), repeat=1))
+    report('groupby, n=%d' % n, *measure(lambda: data.groupby(bucket), repeat=1))
+    report('partitioned(%d).groupby, n=%d' % (partitions, n),
+           *measure(lambda: data.partitioned(partitions).groupby(bucket), repeat=1))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
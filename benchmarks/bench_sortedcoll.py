@@ -0,0 +1,44 @@
+"""
+Keeping a collection ordered under inserts: clist re-sort per batch vs csortedlist.add.
+
+    python -m benchmarks.bench_sortedcoll [n] [batch]
+"""
+import random
+import sys
+
+from chaincollections import clist, csortedlist
+
+from ._util import measure, report
+
+
+def main(n: int = 100000, batch: int = 100) -> None:
+    rng = random.Random(0)
+    data = [rng.random() for _ in range(n)]
+
+    def resort():
+        c = clist()
+        for i in range(0, n, batch):
+            c = (c + data[i:i + batch])
+            c = clist(c).sort()
+        return c
+
+    def sortedlist():
+        s = csortedlist()
+        for x in data:
+            s.add(x)
+        return s
+
+    assert resort() == sortedlist().to_list()
+    report('clist re-sort every %d, n=%d' % (batch, n), *measure(resort, repeat=1))
+    report('csortedlist.add, n=%d' % n, *measure(sortedlist, repeat=1))
+    s, c = sortedlist(), clist(sorted(data))
+    report('clist filter range, n=%d' % n,
+           *measure(lambda: c.filter(lambda x: 0.25 <= x <= 0.26), number=10))
+    report('csortedlist.irange, n=%d' % n,
+           *measure(lambda: s.irange(0.25, 0.26).to_list(), number=10))
+    report('clist top_k(10), n=%d' % n, *measure(lambda: c.top_k(10), number=10))
+    report('csortedlist top_k(10), n=%d' % n, *measure(lambda: s.top_k(10), number=10))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
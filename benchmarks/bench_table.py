@@ -0,0 +1,50 @@
+"""
+clist of dicts vs ctable columns: build memory, filter, group-aggregate and sort.
+
+    python -m benchmarks.bench_table [n]
+"""
+import random
+import sys
+
+from chaincollections import clist, ctable
+
+from ._util import measure, report
+
+
+def records(n: int) -> list:
+    rng = random.Random(0)
+    return [{'id': i, 'category': 'c%d' % rng.randrange(50), 'price': rng.uniform(1, 100),
+             'qty': rng.randrange(1, 20)} for i in range(n)]
+
+
+def list_chain(rows: clist) -> list:
+    kept = rows.filter(lambda r: r['price'] > 50)
+    totals = kept.groupby(lambda r: r['category']).valmap(
+        lambda group: sum(r['qty'] for r in group))
+    return sorted(totals.items())
+
+
+def table_chain(table: ctable) -> list:
+    kept = table.filter(price=lambda p: p > 50)
+    totals = kept.groupby('category').agg(qty=('qty', 'sum'))
+    return sorted(zip(totals.pluck('category'), totals.pluck('qty')))
+
+
+def main(n: int = 200000) -> None:
+    raw = records(n)
+    rows, table = clist(raw), ctable(raw)
+    assert list_chain(rows) == table_chain(table)
+    # peak memory of building each representation (the ctable's from existing dicts)
+    report('rows as dicts, n=%d' % n, *measure(lambda: clist(records(n)), repeat=1))
+    report('columns of ctable, n=%d' % n, *measure(lambda: ctable(raw), repeat=1))
+    report('filter+group+sum clist, n=%d' % n, *measure(lambda: list_chain(rows)))
+    report('filter+group+sum ctable, n=%d' % n, *measure(lambda: table_chain(table)))
+    report('sort_by price clist, n=%d' % n,
+           *measure(lambda: rows.sort(key=lambda r: r['price'])))
+    report('sort price ctable, n=%d' % n, *measure(lambda: table.sort('price')))
+    report('map r[price] clist, n=%d' % n, *measure(lambda: rows.map(lambda r: r['price'])))
+    report('pluck price ctable, n=%d' % n, *measure(lambda: table.pluck('price')))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,78 @@
+"""
+Nested JSON: the README's hand-nested mapcat traversal and a recursive generator vs
+select() with a compiled, cached selector.
+
+    python -m benchmarks.bench_tree [width] [depth]
+"""
+import operator
+import random
+import sys
+
+from chaincollections import chain
+
+from ._util import measure, report
+
+EXECUTABLE = "results..[?type == 'file' && permissions[2] == 'execute']"
+
+
+def is_executable(node):
+    return node['type'] == 'file' and 'execute' in node.get('permissions', [])
+
+
+def make_node(rng, depth, width):
+    if depth == 0 or rng.random() < 0.5:
+        perms = ['read', 'write', 'execute'][:rng.randint(1, 3)]
+        return {'id': rng.getrandbits(32), 'type': 'file', 'permissions': perms,
+                'size': rng.randrange(1 << 16)}
+    return {'id': rng.getrandbits(32), 'type': 'folder',
+            'children': [make_node(rng, depth - 1, width) for _ in range(width)]}
+
+
+def readme_nest(results):
+    """The README traversal (flatmap written as map().concat()), fixed at four levels."""
+    return (chain(results)
+            .map(lambda node: [node] + chain(node.get('children', []))
+                 .map(lambda child: [child] + chain(child.get('children', []))
+                      .map(lambda c: [c] + c.get('children', []))
+                      .concat())
+                 .concat())
+            .concat()
+            .filter(is_executable))
+
+
+def recursive(node):
+    yield node
+    for child in node.get('children', ()):
+        yield from recursive(child)
+
+
+def main(width: int = 20000, depth: int = 3000) -> None:
+    rng = random.Random(0)
+    # wide: many small trees, no deeper than the README nest reaches
+    results = [make_node(rng, 3, 4) for _ in range(width)]
+    response = chain({'results': results})
+    by_id = operator.itemgetter('id')
+    # same nodes - select() lists each node's matching children before descending into them
+    assert sorted(response.select(EXECUTABLE), key=by_id) == sorted(readme_nest(results), key=by_id)
+    report('README mapcat nest, %d trees' % width, *measure(lambda: readme_nest(results)))
+    report('recursive generator, %d trees' % width,
+           *measure(lambda: chain(results).map(recursive).concat().filter(is_executable)))
+    report('select(), %d trees' % width,
+           *measure(lambda: response.select(EXECUTABLE).to_list()))
+
+    # deep: one chain of folders, beyond what the nest reaches or recursion allows
+    deep = {'type': 'file', 'permissions': ['read', 'write', 'execute']}
+    for _ in range(depth):
+        deep = {'type': 'folder', 'children': [deep, {'type': 'file', 'permissions': ['read']}]}
+    try:
+        list(recursive(deep))
+        report('recursive generator, depth %d' % depth, *measure(lambda: list(recursive(deep))))
+    except RecursionError:
+        print('%-40s %s' % ('recursive generator, depth %d' % depth, 'RecursionError'))
+    deep = chain({'results': [deep]})
+    report('select(), depth %d' % depth, *measure(lambda: deep.select(EXECUTABLE).to_list()))
+    report('walk(), depth %d' % depth, *measure(lambda: chain(deep).walk().to_list()))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
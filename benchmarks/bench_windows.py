@@ -0,0 +1,26 @@
+"""
+Rolling aggregates: materialized sliding_window(n).map(f) vs incremental rolling(n).f().
+
+    python -m benchmarks.bench_windows [n] [window]
+"""
+import random
+import sys
+
+from chaincollections import clist
+
+from ._util import measure, report
+
+
+def main(n: int = 200000, window: int = 100) -> None:
+    rng = random.Random(0)
+    data = clist(rng.random() for _ in range(n))
+    for name in ('sum', 'max'):
+        f = {'sum': sum, 'max': max}[name]
+        report('sliding_window(%d).map(%s), n=%d' % (window, name, n),
+               *measure(lambda: data.sliding_window(window).map(f).to_list()))
+        report('rolling(%d).%s(), n=%d' % (window, name, n),
+               *measure(lambda: getattr(data.rolling(window), name)().to_list()))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,331 @@
+"""
+Benchmark suite - every method of clist / cgenerator / cdict / cset against the equivalent
+plain-Python and direct-cytoolz code, across data sizes.
+
+    python -m benchmarks.suite                               # run, print a table
+    python -m benchmarks.suite --sizes 100,10000000 -k map   # pick sizes / cases
+    python -m benchmarks.suite --save baseline.json          # store results as a baseline
+    python -m benchmarks.suite --compare baseline.json       # exit 1 on regressions
+
+A case regresses when its wall time or peak memory grows by more than --threshold (default
+25%) over the baseline. Baselines are machine specific; with --normalize, wall time is compared
+as the ratio chaincollections / plain Python instead (where a case has a plain-Python
+reference), which cancels out most of the difference between machines at the cost of more
+noise.
+"""
+import argparse
+import json
+import operator
+import platform
+import sys
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import cytoolz
+
+from chaincollections import cdict, cgenerator, clist, cset
+
+from ._util import measure
+
+DEFAULT_SIZES = (100, 10000, 1000000)
+DEFAULT_THRESHOLD = 0.25
+# peak-memory growth below this many bytes is noise, whatever the ratio
+MEMORY_SLACK = 64 * 1024
+# small sizes are called in a loop until each timing covers about this many elements
+MIN_ELEMENTS = 100000
+
+
+class Case(NamedTuple):
+    name: str
+    data: Callable[[int], Any]
+    chained: Callable[[Any], Any]
+    python: Optional[Callable[[Any], Any]] = None
+    toolz: Optional[Callable[[Any], Any]] = None
+
+
+## --------------------------------------------------------------------------------
+## DATA
+## --------------------------------------------------------------------------------
+
+def ints(n):
+    return list(range(n))
+
+
+def pairs(n):
+    return [(i, i % 100) for i in range(n)]
+
+
+def nested(n):
+    return [[i, i + 1] for i in range(0, n, 2)]
+
+
+def dicts(n):
+    return {i: i for i in range(n)}
+
+
+def sets(n):
+    return set(range(n)), set(range(n // 2, n + n // 2))
+
+
+inc = (lambda x: x + 1)
+even = (lambda x: x % 2 == 0)
+mod100 = (lambda x: x % 100)
+fst = operator.itemgetter(0)
+snd = operator.itemgetter(1)
+
+
+def _frequencies(seq):
+    counts = {}
+    for x in seq:
+        counts[x] = counts.get(x, 0) + 1
+    return counts
+
+
+def _groupby(key, seq):
+    groups = {}
+    for x in seq:
+        groups.setdefault(key(x), []).append(x)
+    return groups
+
+
+## --------------------------------------------------------------------------------
+## CASES
+## --------------------------------------------------------------------------------
+
+CASES: List[Case] = [
+    # CBase, on a clist
+    Case('map', ints, lambda d: clist(d).map(inc),
+         lambda d: list(map(inc, d)), lambda d: list(cytoolz.map(inc, d))),
+    Case('filter', ints, lambda d: clist(d).filter(even),
+         lambda d: list(filter(even, d)), lambda d: list(cytoolz.filter(even, d))),
+    Case('remove', ints, lambda d: clist(d).remove(even),
+         lambda d: [x for x in d if not even(x)], lambda d: list(cytoolz.remove(even, d))),
+    Case('reduce', ints, lambda d: clist(d).reduce(operator.add),
+         lambda d: sum(d), lambda d: cytoolz.reduce(operator.add, d)),
+    Case('concat', nested, lambda d: clist(d).concat(),
+         lambda d: [x for sub in d for x in sub], lambda d: list(cytoolz.concat(d))),
+    Case('flatten', nested, lambda d: clist(d).flatten(),
+         lambda d: [x for sub in d for x in sub], lambda d: list(cytoolz.concat(d))),
+    Case('mapcat', lambda n: [clist(p) for p in nested(n)], lambda d: clist(d).mapcat(inc),
+         lambda d: [inc(x) for sub in d for x in sub],
+         lambda d: list(cytoolz.mapcat(lambda s: map(inc, s), d))),
+    Case('diff', ints, lambda d: clist(d).diff(d[::-1]),
+         lambda d: [(a, b) for a, b in zip(d, d[::-1]) if a != b],
+         lambda d: list(cytoolz.diff(d, d[::-1]))),
+    Case('drop', ints, lambda d: clist(d).drop(10), lambda d: d[10:],
+         lambda d: list(cytoolz.drop(10, d))),
+    Case('take', ints, lambda d: clist(d).take(10), lambda d: d[:10],
+         lambda d: list(cytoolz.take(10, d))),
+    Case('tail', ints, lambda d: clist(d).tail(10), lambda d: d[-10:],
+         lambda d: list(cytoolz.tail(10, d))),
+    Case('first', ints, lambda d: clist(d).first(), lambda d: d[0], cytoolz.first),
+    Case('second', ints, lambda d: clist(d).second(), lambda d: d[1], cytoolz.second),
+    Case('last', ints, lambda d: clist(d).last(), lambda d: d[-1], cytoolz.last),
+    Case('nth', ints, lambda d: clist(d).nth(len(d) // 2), lambda d: d[len(d) // 2],
+         lambda d: cytoolz.nth(len(d) // 2, d)),
+    Case('frequencies', lambda n: [x % 100 for x in range(n)], lambda d: clist(d).frequencies,
+         _frequencies, cytoolz.frequencies),
+    Case('groupby', ints, lambda d: clist(d).groupby(mod100),
+         lambda d: _groupby(mod100, d), lambda d: cytoolz.groupby(mod100, d)),
+    Case('count_by', ints, lambda d: clist(d).count_by(mod100),
+         lambda d: _frequencies(map(mod100, d)), lambda d: cytoolz.countby(mod100, d)),
+    Case('reduce_by', ints, lambda d: clist(d).reduce_by(mod100, operator.add),
+         None, lambda d: cytoolz.reduceby(mod100, operator.add, d)),
+    Case('interleave', ints, lambda d: clist(d).interleave(d),
+         lambda d: [x for p in zip(d, d) for x in p], lambda d: list(cytoolz.interleave((d, d)))),
+    Case('interpose', ints, lambda d: clist(d).interpose(0),
+         lambda d: [x for v in d for x in (0, v)][1:], lambda d: list(cytoolz.interpose(0, d))),
+    Case('is_distinct', ints, lambda d: clist(d).is_distinct,
+         lambda d: len(set(d)) == len(d), cytoolz.isdistinct),
+    Case('join', pairs, lambda d: clist(d).join(d[:100], snd, fst),
+         None, lambda d: list(cytoolz.join(snd, d, fst, d[:100]))),
+    Case('partition', ints, lambda d: clist(d).partition(3),
+         lambda d: [d[i:i + 3] for i in range(0, len(d) - len(d) % 3, 3)],
+         lambda d: list(cytoolz.partition(3, d))),
+    Case('partition_all', ints, lambda d: clist(d).partition_all(3),
+         lambda d: [d[i:i + 3] for i in range(0, len(d), 3)],
+         lambda d: list(cytoolz.partition_all(3, d))),
+    Case('chunk', ints, lambda d: clist(d).chunk(3),
+         lambda d: [d[i:i + 3] for i in range(0, len(d) - len(d) % 3, 3)],
+         lambda d: list(cytoolz.partition(3, d))),
+    Case('partition_by', ints, lambda d: clist(d).partition_by(lambda x: x // 10),
+         None, lambda d: list(cytoolz.partitionby(lambda x: x // 10, d))),
+    Case('pluck', pairs, lambda d: clist(d).pluck(1),
+         lambda d: [p[1] for p in d], lambda d: list(cytoolz.pluck(1, d))),
+    Case('sliding_window', ints, lambda d: clist(d).sliding_window(3).to_list(),
+         lambda d: [d[i:i + 3] for i in range(len(d) - 2)],
+         lambda d: list(cytoolz.sliding_window(3, d))),
+    Case('rolling_sum', ints, lambda d: clist(d).rolling(3).sum().to_list(),
+         lambda d: [sum(d[i:i + 3]) for i in range(len(d) - 2)],
+         lambda d: list(map(sum, cytoolz.sliding_window(3, d)))),
+    Case('rolling_max', ints, lambda d: clist(d).rolling(3).max().to_list(),
+         lambda d: [max(d[i:i + 3]) for i in range(len(d) - 2)],
+         lambda d: list(map(max, cytoolz.sliding_window(3, d)))),
+    Case('stride_by', ints, lambda d: clist(d).stride_by(3), lambda d: d[::3],
+         lambda d: list(cytoolz.take_nth(3, d))),
+    Case('top_k', ints, lambda d: clist(d).top_k(10),
+         lambda d: sorted(d, reverse=True)[:10], lambda d: cytoolz.topk(10, d)),
+    Case('unique', lambda n: [x % 1000 for x in range(n)], lambda d: clist(d).unique(),
+         lambda d: list(dict.fromkeys(d)), lambda d: list(cytoolz.unique(d))),
+    Case('pipe', ints, lambda d: clist(d).pipe(len, inc),
+         lambda d: inc(len(d)), lambda d: cytoolz.pipe(d, len, inc)),
+    Case('pipe_map', ints, lambda d: clist(d).pipe_map(inc, inc),
+         lambda d: [inc(inc(x)) for x in d], lambda d: [cytoolz.pipe(x, inc, inc) for x in d]),
+    Case('find', ints, lambda d: clist(d).find(lambda x: x == len(d) - 1),
+         lambda d: next((x for x in d if x == len(d) - 1), None)),
+    Case('zip_with', ints, lambda d: clist(d).zip_with(d, operator.add),
+         lambda d: list(map(operator.add, d, d))),
+    Case('any_match', ints, lambda d: clist(d).any_match(lambda x: x < 0),
+         lambda d: any(x < 0 for x in d)),
+    Case('all_match', ints, lambda d: clist(d).all_match(lambda x: x >= 0),
+         lambda d: all(x >= 0 for x in d)),
+    Case('enumerate', ints, lambda d: clist(d).enumerate(), lambda d: list(enumerate(d))),
+    Case('take_while', ints, lambda d: clist(d).take_while(lambda x: x < len(d) // 2),
+         lambda d: d[:len(d) // 2]),
+    Case('drop_while', ints, lambda d: clist(d).drop_while(lambda x: x < len(d) // 2),
+         lambda d: d[len(d) // 2:]),
+    # clist
+    Case('clist.__getitem__[slice]', ints, lambda d: clist(d)[1:-1], lambda d: d[1:-1]),
+    Case('clist.append', ints, lambda d: clist(d).append(0), lambda d: d + [0]),
+    Case('clist.sort', lambda n: ints(n)[::-1], lambda d: clist(d).sort(), sorted),
+    Case('clist.reverse', ints, lambda d: clist(d).reverse(), lambda d: d[::-1]),
+    Case('clist.to_set', ints, lambda d: clist(d).to_set(), set),
+    Case('clist.to_dict', pairs, lambda d: clist(d).to_dict(), dict),
+    # cgenerator
+    Case('cgenerator.map', ints, lambda d: cgenerator(d).map(inc).to_list(),
+         lambda d: list(map(inc, d))),
+    Case('cgenerator.filter', ints, lambda d: cgenerator(d).filter(even).to_list(),
+         lambda d: list(filter(even, d))),
+    Case('cgenerator.__getitem__', ints, lambda d: cgenerator(iter(d))[len(d) // 2],
+         lambda d: d[len(d) // 2]),
+    Case('cgenerator.to_set', ints, lambda d: cgenerator(d).to_set(), set),
+    # cdict
+    Case('cdict.keys', dicts, lambda d: cdict(d).keys(), lambda d: list(d.keys())),
+    Case('cdict.values', dicts, lambda d: cdict(d).values(), lambda d: list(d.values())),
+    Case('cdict.items', dicts, lambda d: cdict(d).items(), lambda d: list(d.items())),
+    Case('cdict.keymap', dicts, lambda d: cdict(d).keymap(inc),
+         lambda d: {inc(k): v for k, v in d.items()}, lambda d: cytoolz.keymap(inc, d)),
+    Case('cdict.valmap', dicts, lambda d: cdict(d).valmap(inc),
+         lambda d: {k: inc(v) for k, v in d.items()}, lambda d: cytoolz.valmap(inc, d)),
+    Case('cdict.itemmap', dicts, lambda d: cdict(d).itemmap(reversed).to_list(),
+         lambda d: list({v: k for k, v in d.items()}),
+         lambda d: list(cytoolz.itemmap(reversed, d))),
+    Case('cdict.keyfilter', dicts, lambda d: cdict(d).keyfilter(even),
+         lambda d: {k: v for k, v in d.items() if even(k)}, lambda d: cytoolz.keyfilter(even, d)),
+    Case('cdict.valfilter', dicts, lambda d: cdict(d).valfilter(even),
+         lambda d: {k: v for k, v in d.items() if even(v)}, lambda d: cytoolz.valfilter(even, d)),
+    Case('cdict.itemfilter', dicts, lambda d: cdict(d).itemfilter(lambda kv: even(kv[0])),
+         lambda d: {k: v for k, v in d.items() if even(k)},
+         lambda d: cytoolz.itemfilter(lambda kv: even(kv[0]), d)),
+    Case('cdict.merge', dicts, lambda d: cdict(d).merge(d), lambda d: {**d, **d},
+         lambda d: cytoolz.merge(d, d)),
+    # cset
+    Case('cset.union', sets, lambda d: cset(d[0]).union(d[1]), lambda d: d[0] | d[1]),
+    Case('cset.intersection', sets, lambda d: cset(d[0]).intersection(d[1]),
+         lambda d: d[0] & d[1]),
+    Case('cset.difference', sets, lambda d: cset(d[0]).difference(d[1]), lambda d: d[0] - d[1]),
+    Case('cset.symmetric_difference', sets, lambda d: cset(d[0]).symmetric_difference(d[1]),
+         lambda d: d[0] ^ d[1]),
+    Case('cset.to_list', sets, lambda d: cset(d[0]).to_list(), lambda d: list(d[0])),
+]
+
+
+## --------------------------------------------------------------------------------
+## RUNNING AND COMPARING
+## --------------------------------------------------------------------------------
+
+def run(cases: List[Case], sizes: List[int], repeat: int) -> Dict[str, Dict[str, Dict]]:
+    """Measure every implementation of every case at every size."""
+    results = {}
+    for case in cases:
+        for n in sizes:
+            data = case.data(n)
+            row = {}
+            for impl in ('chained', 'python', 'toolz'):
+                f = getattr(case, impl)
+                if f is None:
+                    continue
+                f(data)  # warm up
+                seconds, peak = measure(lambda: f(data), repeat=repeat if n < 10 ** 6 else 1,
+                                        number=max(1, MIN_ELEMENTS // max(n, 1)))
+                row[impl] = {'seconds': seconds, 'peak': peak}
+            results['%s[n=%d]' % (case.name, n)] = row
+    return results
+
+
+def compare(
+    baseline: Dict[str, Dict[str, Dict]],
+    current: Dict[str, Dict[str, Dict]],
+    threshold: float,
+    normalize: bool = False,
+) -> List[str]:
+    """Describe every case whose chained implementation regressed past threshold."""
+    regressions = []
+    for key, row in current.items():
+        old = baseline.get(key)
+        if old is None or 'chained' not in old:
+            continue
+        new_c, old_c = row['chained'], old['chained']
+        if normalize and 'python' in row and 'python' in old and old['python']['seconds'] > 0 \
+                and row['python']['seconds'] > 0:
+            new_t = new_c['seconds'] / row['python']['seconds']
+            old_t = old_c['seconds'] / old['python']['seconds']
+            what = 'time vs python'
+        else:
+            new_t, old_t, what = new_c['seconds'], old_c['seconds'], 'seconds'
+        if old_t > 0 and new_t > old_t * (1 + threshold):
+            regressions.append('%s: %s %.3g -> %.3g (+%.0f%%)'
+                               % (key, what, old_t, new_t, 100 * (new_t / old_t - 1)))
+        if new_c['peak'] > old_c['peak'] * (1 + threshold) + MEMORY_SLACK:
+            regressions.append('%s: peak memory %d -> %d bytes'
+                               % (key, old_c['peak'], new_c['peak']))
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Dict]]) -> None:
+    print('%-40s %12s %12s %12s %10s %14s' % ('case', 'chained', 'python', 'cytoolz', 'overhead',
+                                              'chained peak'))
+    for key, row in results.items():
+        cells = ['%11.6fs' % row[i]['seconds'] if i in row else '%12s' % '-'
+                 for i in ('chained', 'python', 'toolz')]
+        overhead = '-'
+        if 'python' in row and row['python']['seconds'] > 0:
+            overhead = '%.2fx' % (row['chained']['seconds'] / row['python']['seconds'])
+        print('%-40s %s %10s %11.1f KiB' % (key, ' '.join(cells), overhead,
+                                             row['chained']['peak'] / 1024))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated data sizes (default %(default)s)')
+    parser.add_argument('-k', dest='pattern', default='', help='only cases containing this')
+    parser.add_argument('--repeat', type=int, default=5, help='timing repeats (best is kept)')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to check for regressions')
+    parser.add_argument('--normalize', action='store_true',
+                        help='compare time relative to plain Python (for foreign baselines)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed relative slowdown / memory growth (default %(default)s)')
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(s)) for s in args.sizes.split(',')]
+    cases = [c for c in CASES if args.pattern in c.name]
+    results = run(cases, sizes, args.repeat)
+    print_table(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'results': results}, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(baseline, results, args.threshold, args.normalize)
+        for line in regressions:
+            print('REGRESSION ' + line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,27 @@
 from .chaincollections import clist, cdict, cgenerator, crange, cxrange, cset, chain
+from .lazy import clazy
+from .casync import casync
+from .carray import carray, carange
+from .cvector import cvector
+from .files import read_lines, read_jsonl, read_csv
+from .profiling import profile
+from .memo import MemoCache
+from .views import clist_view, cdict_keys, cdict_values, cdict_items
+from .sketches import HyperLogLog, CountMinSketch, SpaceSaving, KLLSketch, Reservoir
+from .windows import Rolling, Windows
+from .table import ctable
+from .sortedcoll import csortedlist, csorteddict
+from .checkpoint import Checkpoint, read_checkpoint
+from .expr import X
+from .live import LiveCountBy, LiveReduceBy, LiveTopK
+from .aggregate import Aggregator
 from typing import List, Dict, Generator, Any, Set, Tuple
 
 __all__ = [
-    'clist', 'cdict', 'cgenerator', 'crange', 'cxrange', 'cset', 'chain'
+    'clist', 'cdict', 'cgenerator', 'crange', 'cxrange', 'cset', 'chain',
+    'clazy', 'casync', 'carray', 'carange', 'cvector', 'read_lines', 'read_jsonl', 'read_csv',
+    'profile', 'MemoCache', 'clist_view', 'cdict_keys', 'cdict_values', 'cdict_items',
+    'HyperLogLog', 'CountMinSketch', 'SpaceSaving', 'KLLSketch', 'Reservoir',
+    'Rolling', 'Windows', 'ctable', 'csortedlist', 'csorteddict', 'Checkpoint', 'read_checkpoint',
+    'X', 'LiveCountBy', 'LiveReduceBy', 'LiveTopK', 'Aggregator',
 ]
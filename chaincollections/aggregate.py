@@ -0,0 +1,418 @@
+'''
+
+aggregate.py
+
+Several aggregations over one pass of a stream, behind .aggregate(**named) and .fanout(*specs).
+
+    chain.read_jsonl('events.jsonl').map(X['amount']).aggregate(
+        n=len, total=sum, freq=CBase.frequencies, top=('top_k', 10), hll=HyperLogLog())
+
+The source is read once, in chunks of chunk_size elements, and every chunk is handed to each
+aggregator in turn - so a one-shot cgenerator needn't be materialized or re-read, and memory is
+the aggregators' state plus one chunk. An aggregation is given as
+
+    a name                  'count' 'sum' 'min' 'max' 'mean' 'first' 'last' 'frequencies'
+                            'is_distinct' ... (see AGGREGATORS), or len / sum / min / max
+    the chain method        CBase.frequencies, CBase.is_distinct, CBase.top_k, ...
+    (either, *args)         ('top_k', 10), (CBase.count_by, key), ('reduce', operator.mul)
+    an Aggregator           any object with add(chunk) and result() - see Aggregator
+    a sketch                anything with .update(iterable) (HyperLogLog(), Reservoir(100),
+                            ...) - updated in place and returned as the result
+    a function              a sub-chain: called with a cgenerator over the same elements, e.g.
+                            lambda s: s.filter(X > 0).map(X * 2).reduce(operator.add)
+
+Sub-chains run in their own thread, fed through a queue of at most two chunks, and must end in
+a terminal (reduce, to_list, frequencies, ...) - a cgenerator returned unconsumed is an error.
+Everything else runs in the calling thread. When every aggregator has its answer (first, a
+failed is_distinct, a sub-chain that stopped reading) the source is not read any further.
+
+Results match the chain methods, with collections as clist / cdict.
+
+'''
+
+import functools
+import heapq
+import itertools
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import cytoolz
+
+from .chaincollections import CBase, cdict, cgenerator, clist
+from .expr import compiled
+
+DEFAULT_CHUNK_SIZE = 1024
+# chunks queued per sub-chain - bounds memory, and how far the driver can run ahead
+_QUEUE_DEPTH = 2
+
+
+class Aggregator:
+    """Incremental aggregation - add(chunk) for every chunk of the stream, then result()."""
+
+    # set once more input can't change the result
+    done = False
+
+    def add(self, chunk: Sequence) -> None:
+        raise NotImplementedError
+
+    def result(self) -> Any:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release resources - called after result(), or instead of it on errors."""
+
+
+class _Count(Aggregator):
+    def __init__(self):
+        self.n = 0
+
+    def add(self, chunk: Sequence) -> None:
+        self.n += len(chunk)
+
+    def result(self) -> int:
+        return self.n
+
+
+class _Sum(Aggregator):
+    def __init__(self, start: Any = 0):
+        self.total = start
+
+    def add(self, chunk: Sequence) -> None:
+        self.total += sum(chunk)
+
+    def result(self) -> Any:
+        return self.total
+
+
+class _Mean(Aggregator):
+    def __init__(self):
+        self.total, self.n = 0, 0
+
+    def add(self, chunk: Sequence) -> None:
+        self.total += sum(chunk)
+        self.n += len(chunk)
+
+    def result(self) -> float:
+        if not self.n:
+            raise ValueError('mean of an empty stream')
+        return self.total / self.n
+
+
+class _Extreme(Aggregator):
+    def __init__(self, pick: Callable, key: Optional[Callable] = None):
+        self.pick, self.key = pick, None if key is None else compiled(key)
+        self.best: List = []
+
+    def add(self, chunk: Sequence) -> None:
+        # the current best goes first, so ties keep the earliest element as min / max do
+        items = itertools.chain(self.best, chunk)
+        self.best = [self.pick(items) if self.key is None else self.pick(items, key=self.key)]
+
+    def result(self) -> Any:
+        if not self.best:
+            raise ValueError('%s of an empty stream' % self.pick.__name__)
+        return self.best[0]
+
+
+class _First(Aggregator):
+    def __init__(self):
+        self.value: List = []
+
+    def add(self, chunk: Sequence) -> None:
+        self.value = [chunk[0]]
+        self.done = True
+
+    def result(self) -> Any:
+        if not self.value:
+            raise ValueError('first of an empty stream')
+        return self.value[0]
+
+
+class _Last(Aggregator):
+    def __init__(self):
+        self.value: List = []
+
+    def add(self, chunk: Sequence) -> None:
+        self.value = [chunk[-1]]
+
+    def result(self) -> Any:
+        if not self.value:
+            raise ValueError('last of an empty stream')
+        return self.value[0]
+
+
+class _Reduce(Aggregator):
+    def __init__(self, f: Callable, initializer: Any = None):
+        self.f = f
+        self.acc: List = [] if initializer is None else [initializer]
+
+    def add(self, chunk: Sequence) -> None:
+        self.acc = [functools.reduce(self.f, chunk, *self.acc)]
+
+    def result(self) -> Any:
+        if not self.acc:
+            raise TypeError('reduce() of empty iterable with no initial value')
+        return self.acc[0]
+
+
+class _Frequencies(Aggregator):
+    def __init__(self, key: Optional[Callable] = None):
+        self.key = None if key is None else compiled(key)
+        self.counts = cdict()
+
+    def add(self, chunk: Sequence) -> None:
+        counts = self.counts
+        get = counts.get
+        values = chunk if self.key is None else map(self.key, chunk)
+        for k, n in cytoolz.frequencies(values).items():
+            counts[k] = get(k, 0) + n
+
+    def result(self) -> cdict:
+        return self.counts
+
+
+class _GroupBy(Aggregator):
+    def __init__(self, key: Callable):
+        self.key = compiled(key)
+        self.groups: Dict[Any, List] = {}
+
+    def add(self, chunk: Sequence) -> None:
+        groups, key = self.groups, self.key
+        for x in chunk:
+            k = key(x)
+            if k in groups:
+                groups[k].append(x)
+            else:
+                groups[k] = [x]
+
+    def result(self) -> cdict:
+        return cdict(self.groups).valmap(clist)
+
+
+class _ReduceBy(Aggregator):
+    def __init__(self, key: Callable, op: Callable):
+        self.key, self.op = compiled(key), op
+        self.values = cdict()
+
+    def add(self, chunk: Sequence) -> None:
+        values, key, op = self.values, self.key, self.op
+        for x in chunk:
+            k = key(x)
+            values[k] = op(values[k], x) if k in values else x
+
+    def result(self) -> cdict:
+        return self.values
+
+
+class _TopK(Aggregator):
+    def __init__(self, k: int, key: Callable = cytoolz.functoolz.identity):
+        self.k, self.key = k, compiled(key)
+        self.top: List = []
+
+    def add(self, chunk: Sequence) -> None:
+        # the current top goes first - nlargest is stable, so ties keep the earliest elements
+        self.top = heapq.nlargest(self.k, itertools.chain(self.top, chunk), key=self.key)
+
+    def result(self) -> clist:
+        return clist(self.top)
+
+
+class _IsDistinct(Aggregator):
+    def __init__(self):
+        self.seen: set = set()
+        self.n = 0
+
+    def add(self, chunk: Sequence) -> None:
+        self.seen.update(chunk)
+        self.n += len(chunk)
+        if len(self.seen) < self.n:
+            self.done = True
+            self.seen = set()
+
+    def result(self) -> bool:
+        return not self.done
+
+
+class _Sketch(Aggregator):
+    """A sketch (sketches.py) fed chunk by chunk, answering like the chain method."""
+
+    def __init__(self, sketch: Any, answer: Callable[[Any], Any] = cytoolz.functoolz.identity):
+        self.sketch, self.answer = sketch, answer
+
+    def add(self, chunk: Sequence) -> None:
+        self.sketch.update(chunk)
+
+    def result(self) -> Any:
+        return self.answer(self.sketch)
+
+
+def _approx_distinct_count(precision: int = 14) -> _Sketch:
+    from .sketches import HyperLogLog
+    return _Sketch(HyperLogLog(precision), lambda s: s.count())
+
+
+def _heavy_hitters(k: int, capacity: Optional[int] = None) -> _Sketch:
+    from .sketches import SpaceSaving
+    return _Sketch(SpaceSaving(capacity or 10 * k), lambda s: s.top(k))
+
+
+def _approx_quantiles(qs: Any, k: int = 200, seed: Optional[int] = None) -> _Sketch:
+    from .sketches import KLLSketch
+    if isinstance(qs, (int, float)):
+        return _Sketch(KLLSketch(k, seed), lambda s: s.quantile(qs))
+    qs = list(qs)
+    return _Sketch(KLLSketch(k, seed), lambda s: s.quantiles(qs))
+
+
+def _sample(n: int, seed: Optional[int] = None) -> _Sketch:
+    from .sketches import Reservoir
+    return _Sketch(Reservoir(n, seed), lambda s: s.to_list())
+
+
+AGGREGATORS: Dict[str, Callable[..., Aggregator]] = {
+    'count': _Count,
+    'sum': _Sum,
+    'mean': _Mean,
+    'min': functools.partial(_Extreme, min),
+    'max': functools.partial(_Extreme, max),
+    'first': _First,
+    'last': _Last,
+    'reduce': _Reduce,
+    'frequencies': _Frequencies,
+    'count_by': _Frequencies,
+    'groupby': _GroupBy,
+    'reduce_by': _ReduceBy,
+    'top_k': _TopK,
+    'is_distinct': _IsDistinct,
+    'approx_distinct_count': _approx_distinct_count,
+    'heavy_hitters': _heavy_hitters,
+    'approx_quantiles': _approx_quantiles,
+    'sample': _sample,
+}
+
+_BUILTINS = {len: 'count', sum: 'sum', min: 'min', max: 'max'}
+
+
+## --------------------------------------------------------------------------------
+## SUB-CHAINS
+## --------------------------------------------------------------------------------
+
+_END = object()
+
+
+class _SubChain(Aggregator):
+    """A function of a cgenerator, run in a thread fed with the chunks through a queue."""
+
+    def __init__(self, f: Callable[[cgenerator], Any]):
+        self.chunks = queue.Queue(_QUEUE_DEPTH)
+        self.finished = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._run, args=(f,), name='fanout-subchain',
+                                       daemon=True)
+        self.thread.start()
+
+    def _elements(self) -> Iterator:
+        while True:
+            chunk = self.chunks.get()
+            if chunk is _END:
+                return
+            yield from chunk
+
+    def _run(self, f: Callable[[cgenerator], Any]) -> None:
+        try:
+            self.value = f(cgenerator(self._elements()))
+            if isinstance(self.value, (cgenerator, Iterator)):
+                raise TypeError('a fanout sub-chain must end in a terminal such as .to_list() '
+                                '- it returned %s' % type(self.value).__name__)
+        except BaseException as error:  # re-raised in the driving thread
+            self.error = error
+        finally:
+            self.finished.set()
+
+    @property
+    def done(self) -> bool:
+        return self.finished.is_set()
+
+    def add(self, chunk: Any) -> None:
+        # gives up once the sub-chain has stopped reading, so an early exit can't block us
+        while not self.finished.is_set():
+            try:
+                self.chunks.put(chunk, timeout=0.05)
+                return
+            except queue.Full:
+                continue
+
+    def result(self) -> Any:
+        self.close()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def close(self) -> None:
+        if self.thread.is_alive():
+            self.add(_END)
+            self.thread.join()
+
+
+## --------------------------------------------------------------------------------
+## DRIVER
+## --------------------------------------------------------------------------------
+
+def aggregator(spec: Any) -> Aggregator:
+    """The Aggregator for one .aggregate() / .fanout() argument (see the module docstring)."""
+    args: tuple = ()
+    if isinstance(spec, tuple):
+        spec, args = spec[0], spec[1:]
+    if isinstance(spec, Aggregator):
+        return spec
+    name = _BUILTINS.get(spec) if _hashable(spec) else None
+    if isinstance(spec, str):
+        name = spec
+    elif isinstance(spec, property) or callable(spec):
+        method = getattr(spec, 'fget', spec)
+        candidate = getattr(method, '__name__', None)
+        if CBase.__dict__.get(candidate) is spec:
+            name = candidate
+    if name is not None:
+        if name not in AGGREGATORS:
+            raise ValueError('unknown aggregation %r - one of %s' % (name, ', '.join(AGGREGATORS)))
+        return AGGREGATORS[name](*args)
+    if args:
+        raise TypeError('arguments are only taken by named aggregations, not %r' % (spec,))
+    if callable(getattr(spec, 'update', None)) and not callable(spec):
+        return _Sketch(spec)
+    if callable(spec):
+        return _SubChain(spec)
+    raise TypeError('cannot aggregate with %r' % (spec,))
+
+
+def _hashable(x: Any) -> bool:
+    try:
+        hash(x)
+    except TypeError:
+        return False
+    return True
+
+
+def fanout(
+    iterable: Iterable, specs: Iterable, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> List:
+    """Drive iterable once through every aggregation in specs; their results, in order."""
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be positive')
+    aggregators: List[Aggregator] = []
+    try:
+        for spec in specs:
+            aggregators.append(aggregator(spec))
+        for chunk in cytoolz.partition_all(chunk_size, iterable):
+            pending = [a for a in aggregators if not a.done]
+            if not pending:
+                break
+            for a in pending:
+                a.add(chunk)
+        return [a.result() for a in aggregators]
+    finally:
+        for a in aggregators:
+            a.close()
@@ -0,0 +1,162 @@
+'''
+
+batches.py
+
+Batched map behind .map_batches(f, size=, max_latency=).
+
+f is called with a list of up to size consecutive elements (or a numpy array, as_array=True)
+and returns an iterable of results; the results are flattened back into the stream in order.
+f may return fewer or more results than it was given, or None to emit nothing - e.g. a sink
+calling cursor.executemany(sql, batch).
+
+max_latency (seconds) turns on adaptive sizing: the time of each f(batch) call is measured and
+the next batch is resized so a call takes about max_latency, within [min_size, max_size] and
+at most doubling or halving per step. size is then only the starting point.
+
+prefetch=True reads the next batch from the source in a background thread while f works on the
+current one, so a slow source (file, network, database cursor) overlaps with compute. The
+source is then iterated from that thread - don't share it with other consumers meanwhile.
+
+'''
+
+import itertools
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+
+class BatchSizer:
+    """Picks the next batch size from the observed latency of the previous batches."""
+
+    def __init__(
+        self,
+        size: int = 256,
+        max_latency: Optional[float] = None,
+        min_size: int = 1,
+        max_size: Optional[int] = None,
+    ):
+        if size < 1 or min_size < 1 or (max_size is not None and max_size < min_size):
+            raise ValueError('batch sizes must be positive, with min_size <= max_size')
+        if max_latency is not None and max_latency <= 0:
+            raise ValueError('max_latency must be positive')
+        self.max_latency = max_latency
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = self._clamp(size)
+        self.history: List[int] = []
+
+    def _clamp(self, size: int) -> int:
+        size = max(self.min_size, size)
+        return size if self.max_size is None else min(self.max_size, size)
+
+    def observe(self, n: int, seconds: float) -> None:
+        """Record that a batch of n elements took seconds, and resize."""
+        self.history.append(n)
+        if self.max_latency is None or n == 0:
+            return
+        if seconds <= 0:
+            target = 2 * self.size
+        else:
+            target = round(n * self.max_latency / seconds)
+        # move at most 2x per step, so one noisy measurement can't swing the size wildly
+        self.size = self._clamp(max(self.size // 2, min(2 * self.size, target)))
+
+
+def _batches(it: Iterator, sizer: BatchSizer) -> Iterator[List]:
+    while True:
+        batch = list(itertools.islice(it, sizer.size))
+        if not batch:
+            return
+        yield batch
+
+
+class _End:
+    def __init__(self, error: Optional[BaseException] = None):
+        self.error = error
+
+
+def _prefetched(batches: Iterator[List], depth: int = 1) -> Iterator[List]:
+    """Pull batches in a background thread, keeping up to depth of them ready."""
+    ready = queue.Queue(depth)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fill() -> None:
+        try:
+            for batch in batches:
+                if not put(batch):
+                    return
+        except BaseException as error:  # handed to the consumer thread
+            put(_End(error))
+        else:
+            put(_End())
+
+    thread = threading.Thread(target=fill, name='map_batches-prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = ready.get()
+            if isinstance(item, _End):
+                if item.error is not None:
+                    raise item.error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def map_batches(
+    f: Callable[[Any], Optional[Iterable]],
+    iterable: Iterable,
+    size: int = 256,
+    max_latency: Optional[float] = None,
+    min_size: int = 1,
+    max_size: Optional[int] = None,
+    prefetch: bool = False,
+    as_array: bool = False,
+    sizer: Optional[BatchSizer] = None,
+    clock: Callable[[], float] = time.perf_counter,
+) -> Iterator:
+    """Call f on batches of iterable and yield the flattened results in order."""
+    if as_array and np is None:
+        raise ImportError('as_array=True requires numpy - pip install numpy')
+    sizer = sizer or BatchSizer(size, max_latency, min_size, max_size)
+    return _map_batches(f, iter(iterable), sizer, prefetch, as_array, clock)
+
+
+def _map_batches(
+    f: Callable, it: Iterator, sizer: BatchSizer, prefetch: bool, as_array: bool, clock: Callable
+) -> Iterator:
+    batches = _batches(it, sizer)
+    if prefetch:
+        batches = _prefetched(batches)
+    try:
+        for batch in batches:
+            n = len(batch)
+            if as_array:
+                batch = np.asarray(batch)
+            start = clock()
+            results = f(batch)
+            sizer.observe(n, clock() - start)
+            if results is None:
+                continue
+            if np is not None and isinstance(results, np.ndarray):
+                results = results.tolist()
+            yield from results
+    finally:
+        # stops the prefetch thread if the consumer gives up early
+        batches.close()
@@ -0,0 +1,121 @@
+'''
+
+buffered.py
+
+Replay buffer behind cgenerator.buffered().
+
+A ReplayBuffer wraps a one-shot iterator and remembers every element it has pulled, so it can
+be iterated any number of times (concurrently, too) while the source is only read once, and
+only as far as anyone has asked for. Indexing and slicing read just the prefix they need.
+
+max_items caps how many elements are kept in memory. Past the cap, overflow='error' raises
+BufferError and overflow='spill' pickles further elements to an anonymous temp file and reads
+them back on demand.
+
+'''
+
+import pickle
+import tempfile
+from typing import Any, Iterable, Iterator, List, Optional, Union
+
+from .chaincollections import T
+
+OVERFLOW_POLICIES = ('error', 'spill')
+
+
+class ReplayBuffer:
+    """Re-iterable, prefix-indexable cache over a one-shot iterable."""
+
+    def __init__(
+        self, iterable: Iterable[T], max_items: Optional[int] = None, overflow: str = 'error'
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('overflow must be one of %r' % (OVERFLOW_POLICIES,))
+        if max_items is not None and max_items < 0:
+            raise ValueError('max_items must be non-negative')
+        self._source = iter(iterable)
+        self._max_items = max_items
+        self._overflow = overflow
+        self._items: List[Any] = []
+        self._spill = None
+        self._offsets: List[int] = []
+        self._exhausted = False
+
+    @property
+    def consumed(self) -> int:
+        """How many source elements have been read so far."""
+        return len(self._items) + len(self._offsets)
+
+    @property
+    def exhausted(self) -> bool:
+        """True once the source has been read to the end."""
+        return self._exhausted
+
+    def _store(self, item: Any) -> None:
+        if self._max_items is None or len(self._items) < self._max_items:
+            self._items.append(item)
+            return
+        if self._overflow == 'error':
+            raise BufferError('buffered cgenerator exceeded max_items=%d' % self._max_items)
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile()
+        self._spill.seek(0, 2)
+        self._offsets.append(self._spill.tell())
+        pickle.dump(item, self._spill, pickle.HIGHEST_PROTOCOL)
+
+    def _pull(self) -> bool:
+        """Read one more source element into the buffer - False when the source is done."""
+        if self._exhausted:
+            return False
+        try:
+            item = next(self._source)
+        except StopIteration:
+            self._exhausted = True
+            return False
+        self._store(item)
+        return True
+
+    def _fill(self, n: Optional[int]) -> None:
+        """Make sure at least n elements (all of them, for None) are buffered."""
+        while (n is None or self.consumed < n) and self._pull():
+            pass
+
+    def _get(self, i: int) -> Any:
+        if i < len(self._items):
+            return self._items[i]
+        self._spill.seek(self._offsets[i - len(self._items)])
+        return pickle.load(self._spill)
+
+    def __iter__(self) -> Iterator[T]:
+        i = 0
+        while i < self.consumed or self._pull():
+            yield self._get(i)
+            i += 1
+
+    def __len__(self) -> int:
+        self._fill(None)
+        return self.consumed
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[T, List[T]]:
+        """Index or slice, reading only as much of the source as needed."""
+        if isinstance(key, slice):
+            needs_all = any(i is not None and i < 0 for i in (key.start, key.stop))
+            if needs_all or key.stop is None or (key.step or 1) < 0:
+                self._fill(None)
+            else:
+                self._fill(max(key.start or 0, key.stop))
+            return [self._get(i) for i in range(*key.indices(self.consumed))]
+        if key < 0:
+            self._fill(None)
+            key += self.consumed
+        else:
+            self._fill(key + 1)
+        if not 0 <= key < self.consumed:
+            raise IndexError('cgenerator index out of range')
+        return self._get(key)
+
+    def close(self) -> None:
+        """Drop the spill file, if any."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
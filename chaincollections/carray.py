@@ -0,0 +1,342 @@
+'''
+
+carray.py
+
+NumPy-backed chainable collection for homogeneous numeric data.
+
+carray keeps its elements in a 1-D numpy array and runs map / filter / reduce / frequencies /
+unique / top_k / stride_by / sliding_window as vectorized kernels. A callable given to map or
+filter is first tried on the whole array; if it raises, or doesn't return an array of the same
+length, the call falls back to one Python call per element (pass vectorized=False to skip the
+attempt, e.g. for functions with side effects). An X expression (see expr.py) is run on the
+array with & | ~ as elementwise numpy operators.
+
+Whenever a result isn't 1-D numeric (strings, tuples, ragged data) carray(...) hands back a
+clist instead, so chains keep working past the numeric part.
+
+Note that numpy arithmetic uses fixed-width dtypes - int64 sums can overflow where Python ints
+would not.
+
+numpy is an optional dependency - pip install numpy.
+
+'''
+
+import operator
+from typing import Any, Callable, Iterable, Optional, Union
+
+import cytoolz
+
+from .chaincollections import CBase, T, cdict, cgenerator, clist, cset
+from .expr import vectorized as _vectorized
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+_NUMERIC_KINDS = 'biufc'
+
+# Python binary operators with a ufunc whose .reduce does the same thing in one call
+_REDUCERS = {}
+if np is not None:
+    _REDUCERS = {
+        operator.add: np.add,
+        operator.mul: np.multiply,
+        operator.and_: np.bitwise_and,
+        operator.or_: np.bitwise_or,
+        operator.xor: np.bitwise_xor,
+        max: np.maximum,
+        min: np.minimum,
+    }
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError('carray requires numpy - pip install numpy')
+
+
+def is_numeric_array(obj: Any) -> bool:
+    """True for 1-D numpy arrays of a numeric (or bool) dtype."""
+    return np is not None and isinstance(obj, np.ndarray) and obj.ndim == 1 \
+        and obj.dtype.kind in _NUMERIC_KINDS
+
+
+def _from_array(arr: 'np.ndarray') -> 'carray':
+    """Wrap an array without copying or re-checking it."""
+    result = object.__new__(carray)
+    result.array = arr
+    return result
+
+
+def _is_identity(key: Callable) -> bool:
+    return key is cytoolz.functoolz.identity or key is None
+
+
+class carray(CBase):
+    """Functional numeric array class with chainable, vectorized methods."""
+
+    def __new__(cls, data: Iterable = ()) -> Union['carray', clist]:
+        """Build from an ndarray or iterable - non-numeric data comes back as a clist."""
+        _require_numpy()
+        if isinstance(data, carray):
+            return _from_array(data.array)
+        if is_numeric_array(data):
+            return _from_array(data)
+        values = data if isinstance(data, (list, np.ndarray)) else list(data)
+        try:
+            arr = np.asarray(values)
+        except (ValueError, TypeError):
+            return clist(values)
+        if is_numeric_array(arr):
+            return _from_array(arr)
+        return clist(values)
+
+    ## container protocol
+
+    def __iter__(self):
+        """Iterate as Python scalars."""
+        return iter(self.array.tolist())
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __getitem__(self, key: Any) -> Union[T, 'carray']:
+        """Get item at index (as a Python scalar), or a carray view for slices and masks."""
+        result = self.array[key]
+        if isinstance(result, np.ndarray):
+            return _from_array(result)
+        return result.item()
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, carray):
+            other = other.array
+        try:
+            return bool(np.array_equal(self.array, np.asarray(other)))
+        except (ValueError, TypeError):
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return 'carray(%r)' % self.array.tolist()
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> 'np.ndarray':
+        return self.array if dtype is None else self.array.astype(dtype)
+
+    @property
+    def dtype(self) -> 'np.dtype':
+        return self.array.dtype
+
+    ## element-wise
+
+    def _try_vectorized(self, f: Callable) -> Optional['np.ndarray']:
+        """Call f on the whole array, returning None if it isn't array-in/array-out."""
+        try:
+            result = _vectorized(f)(self.array)
+        except Exception:
+            return None
+        if isinstance(result, np.ndarray) and result.shape == self.array.shape:
+            return result
+        return None
+
+    def map(
+        self, f: Callable[[T], Any], vectorized: Optional[bool] = None
+    ) -> Union['carray', clist]:
+        """Map a function over the elements, vectorized when f accepts the whole array."""
+        if vectorized is not False:
+            result = self._try_vectorized(f)
+            if result is not None:
+                return carray(result)
+            if vectorized:
+                raise TypeError('%r is not vectorizable' % (f,))
+        return carray([f(x) for x in self])
+
+    def _mask(self, predicate: Callable[[T], bool], vectorized: Optional[bool]) -> 'np.ndarray':
+        if predicate is None:
+            return self.array.astype(bool)
+        if vectorized is not False:
+            result = self._try_vectorized(predicate)
+            if result is not None:
+                return result.astype(bool)
+            if vectorized:
+                raise TypeError('%r is not vectorizable' % (predicate,))
+        return np.fromiter((bool(predicate(x)) for x in self), bool, len(self))
+
+    def filter(
+        self, predicate: Callable[[T], bool], vectorized: Optional[bool] = None
+    ) -> 'carray':
+        """Filter elements with a boolean mask."""
+        return _from_array(self.array[self._mask(predicate, vectorized)])
+
+    def remove(
+        self, predicate: Callable[[T], bool], vectorized: Optional[bool] = None
+    ) -> 'carray':
+        """Remove elements that satisfy the predicate."""
+        return _from_array(self.array[~self._mask(predicate, vectorized)])
+
+    ## reductions
+
+    def reduce(self, f: Callable[[T, T], T], initializer: Optional[T] = None) -> T:
+        """Reduce the elements - ufuncs and the common operators run as ufunc.reduce."""
+        ufunc = f if isinstance(f, np.ufunc) else _REDUCERS.get(f)
+        if ufunc is None:
+            return CBase.reduce(self, f, initializer)
+        if initializer is None:
+            if not len(self.array):
+                raise TypeError('reduce() of empty sequence with no initial value')
+            return ufunc.reduce(self.array).item()
+        return ufunc.reduce(np.append(np.asarray([initializer]), self.array)).item()
+
+    def sum(self) -> Any:
+        """Sum of the elements."""
+        return self.array.sum().item()
+
+    def mean(self) -> float:
+        """Mean of the elements."""
+        return self.array.mean().item()
+
+    def min(self) -> Any:
+        """Smallest element."""
+        return self.array.min().item()
+
+    def max(self) -> Any:
+        """Largest element."""
+        return self.array.max().item()
+
+    ## counting
+
+    @property
+    def frequencies(self) -> cdict:
+        """Count occurrences of each element."""
+        values, counts = np.unique(self.array, return_counts=True)
+        return cdict(zip(values.tolist(), counts.tolist()))
+
+    def count_by(self, key: Callable[[T], Any] = cytoolz.functoolz.identity) -> cdict:
+        """Count occurrences of each key."""
+        if _is_identity(key):
+            return self.frequencies
+        keys = self._try_vectorized(key)
+        if keys is None:
+            return cdict(cytoolz.countby(key, self))
+        values, counts = np.unique(keys, return_counts=True)
+        return cdict(zip(values.tolist(), counts.tolist()))
+
+    def groupby(self, key: Callable[[T], Any]) -> cdict:
+        """Group elements by a key function into carrays."""
+        keys = self._try_vectorized(key)
+        if keys is None:
+            return cdict(cytoolz.groupby(key, self)).valmap(carray)
+        values, inverse = np.unique(keys, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(values)))[:-1]
+        groups = np.split(self.array[order], bounds)
+        return cdict(zip(values.tolist(), map(_from_array, groups)))
+
+    def reduce_by(self, key: Callable[[T], Any], op: Callable) -> cdict:
+        """Group elements by key and reduce each group with a binary operator."""
+        return self.groupby(key).valmap(lambda group: group.reduce(op))
+
+    def unique(self, key: Callable[[T], Any] = cytoolz.functoolz.identity) -> 'carray':
+        """Return only unique elements, in order of first occurrence."""
+        keys = self.array if _is_identity(key) else self._try_vectorized(key)
+        if keys is None:
+            return carray(cytoolz.unique(self, key))
+        _, first = np.unique(keys, return_index=True)
+        return _from_array(self.array[np.sort(first)])
+
+    @property
+    def is_distinct(self) -> bool:
+        """Check if all elements are unique."""
+        return len(np.unique(self.array)) == len(self.array)
+
+    ## selection
+
+    def top_k(self, k: int, key: Callable[[T], Any] = cytoolz.functoolz.identity) -> 'carray':
+        """Return the k largest elements, largest first."""
+        if not _is_identity(key):
+            return carray(cytoolz.topk(k, self, key))
+        n = len(self.array)
+        k = max(0, min(k, n))
+        if k == 0:
+            return _from_array(self.array[:0])
+        top = self.array[np.argpartition(self.array, n - k)[n - k:]]
+        return _from_array(np.sort(top)[::-1])
+
+    def take(self, n: int) -> 'carray':
+        """Take the first n elements."""
+        return _from_array(self.array[:max(n, 0)])
+
+    def drop(self, n: int) -> 'carray':
+        """Drop the first n elements."""
+        return _from_array(self.array[max(n, 0):])
+
+    def tail(self, n: int) -> 'carray':
+        """Take the last n elements."""
+        return _from_array(self.array[len(self.array) - min(n, len(self.array)):])
+
+    def stride_by(self, n: int) -> 'carray':
+        """Take every nth element (a strided view)."""
+        return _from_array(self.array[::n])
+
+    def first(self) -> T:
+        """Return the first element."""
+        return self.array[0].item()
+
+    def last(self) -> T:
+        """Return the last element."""
+        return self.array[-1].item()
+
+    def nth(self, n: int) -> T:
+        """Return the nth element."""
+        return self.array[n].item()
+
+    ## windows and partitions
+
+    def sliding_window(self, n: int) -> cgenerator:
+        """Create a sliding window of elements - each window is a view, nothing is copied."""
+        windows = np.lib.stride_tricks.sliding_window_view(self.array, n)
+        return cgenerator(map(_from_array, windows))
+
+    def partition(self, n: int) -> clist:
+        """Partition into carrays of length n, dropping an incomplete tail."""
+        full = len(self.array) - len(self.array) % n
+        return clist(_from_array(self.array[i:i + n]) for i in range(0, full, n))
+
+    def partition_all(self, n: int) -> clist:
+        """Partition into carrays of length n, the last one possibly shorter."""
+        return clist(_from_array(self.array[i:i + n]) for i in range(0, len(self.array), n))
+
+    ## conversion
+
+    def sort(self, key: Optional[Callable[[T], Any]] = None, reverse: bool = False) -> 'carray':
+        """Sort and return a new carray."""
+        if key is not None:
+            return carray(sorted(self, key=key, reverse=reverse))
+        result = np.sort(self.array, kind='stable')
+        return _from_array(result[::-1] if reverse else result)
+
+    def reverse(self) -> 'carray':
+        """Reverse (a view)."""
+        return _from_array(self.array[::-1])
+
+    def to_numpy(self) -> 'np.ndarray':
+        """The underlying array."""
+        return self.array
+
+    def to_list(self) -> clist:
+        """Convert to a clist of Python scalars."""
+        return clist(self.array.tolist())
+
+    def to_generator(self) -> cgenerator:
+        """Convert to generator."""
+        return cgenerator(self)
+
+    def to_set(self) -> cset:
+        """Convert to set."""
+        return cset(self.array.tolist())
+
+
+def carange(*args: Any) -> carray:
+    """numpy.arange as a carray."""
+    _require_numpy()
+    return _from_array(np.arange(*args))
@@ -0,0 +1,370 @@
+'''
+
+casync.py
+
+Chainable async iterables for asyncio pipelines.
+
+casync mirrors cgenerator's method set over an async iterable (or a plain iterable, which is
+wrapped). Plain functions go through map / filter / ..., coroutine functions through
+amap / afilter / amapcat, which keep at most `concurrency` calls running at once and emit
+results in source order (ordered=True) or as they complete.
+
+Terminals are coroutines - await g.to_list(), await g.reduce(f), await g.frequencies.
+
+Every stage closes its upstream when it is closed, so stopping early (take, first, find, ...)
+cancels any calls still outstanding further up the chain.
+
+'''
+
+import asyncio
+import collections
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    Union,
+)
+
+import cytoolz
+
+from .chaincollections import T, cdict, clist, cset
+
+DEFAULT_CONCURRENCY = 16
+
+
+## --------------------------------------------------------------------------------
+## STAGES
+## --------------------------------------------------------------------------------
+
+async def _from_iterable(iterable: Iterable[T]) -> AsyncIterator[T]:
+    for item in iterable:
+        yield item
+
+
+async def _aclose(it: Any) -> None:
+    """Close an async generator we stopped reading early, running its cleanup."""
+    aclose = getattr(it, 'aclose', None)
+    if aclose is not None:
+        await aclose()
+
+
+async def _map(it: AsyncIterator, f: Callable) -> AsyncIterator:
+    async for item in it:
+        yield f(item)
+
+
+async def _filter(it: AsyncIterator, predicate: Callable) -> AsyncIterator:
+    async for item in it:
+        if predicate(item):
+            yield item
+
+
+async def _enumerate(it: AsyncIterator, start: int) -> AsyncIterator:
+    i = start
+    async for item in it:
+        yield i, item
+        i += 1
+
+
+async def _unique(it: AsyncIterator, key: Callable) -> AsyncIterator:
+    seen = set()
+    async for item in it:
+        k = key(item)
+        if k not in seen:
+            seen.add(k)
+            yield item
+
+
+async def _concat(it: AsyncIterator) -> AsyncIterator:
+    async for inner in it:
+        if hasattr(inner, '__aiter__'):
+            async for item in inner:
+                yield item
+        else:
+            for item in inner:
+                yield item
+
+
+async def _partition_all(it: AsyncIterator, n: int) -> AsyncIterator:
+    chunk = []
+    async for item in it:
+        chunk.append(item)
+        if len(chunk) == n:
+            yield clist(chunk)
+            chunk = []
+    if chunk:
+        yield clist(chunk)
+
+
+async def _take(it: AsyncIterator, n: int) -> AsyncIterator:
+    if n <= 0:
+        return
+    i = 0
+    async for item in it:
+        yield item
+        i += 1
+        if i >= n:
+            return
+
+
+async def _take_while(it: AsyncIterator, predicate: Callable) -> AsyncIterator:
+    async for item in it:
+        if not predicate(item):
+            return
+        yield item
+
+
+async def _drop(it: AsyncIterator, n: int) -> AsyncIterator:
+    i = 0
+    async for item in it:
+        if i >= n:
+            yield item
+        i += 1
+
+
+async def _drop_while(it: AsyncIterator, predicate: Callable) -> AsyncIterator:
+    dropping = True
+    async for item in it:
+        if dropping and not predicate(item):
+            dropping = False
+        if not dropping:
+            yield item
+
+
+async def _concurrent(
+    it: AsyncIterator, f: Callable[[T], Awaitable], concurrency: int, ordered: bool
+) -> AsyncIterator:
+    """Yield await f(x) for each x, with at most `concurrency` calls outstanding."""
+    if concurrency < 1:
+        raise ValueError('concurrency must be positive')
+    pending = collections.deque() if ordered else set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    item = await it.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                task = asyncio.ensure_future(f(item))
+                if ordered:
+                    pending.append(task)
+                else:
+                    pending.add(task)
+            if not pending:
+                return
+            if ordered:
+                yield await pending.popleft()
+            else:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+## --------------------------------------------------------------------------------
+## CLASS
+## --------------------------------------------------------------------------------
+
+class casync:
+    """Functional async iterable class with chainable methods."""
+
+    def __init__(self, iterable: Union[AsyncIterable[T], Iterable[T]]):
+        """Initialize from an async iterable, or wrap a plain iterable."""
+        if not hasattr(iterable, '__aiter__'):
+            iterable = _from_iterable(iterable)
+        self.aiterable = iterable
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        """Return async iterator over the iterable."""
+        return self.aiterable.__aiter__()
+
+    def _stage(self, stage: Callable, *args: Any) -> 'casync':
+        """Chain an async generator stage, closing the upstream whenever the stage closes."""
+        async def _run():
+            it = self.__aiter__()
+            inner = stage(it, *args)
+            try:
+                async for item in inner:
+                    yield item
+            finally:
+                await inner.aclose()
+                await _aclose(it)
+        return casync(_run())
+
+    ## element-wise, plain functions
+
+    def map(self, f: Callable[[T], Any]) -> 'casync':
+        """Map a function over the elements."""
+        return self._stage(_map, f)
+
+    def filter(self, predicate: Callable[[T], bool]) -> 'casync':
+        """Filter elements based on a predicate."""
+        return self._stage(_filter, bool if predicate is None else predicate)
+
+    def remove(self, predicate: Callable[[T], bool]) -> 'casync':
+        """Remove elements that satisfy the predicate."""
+        return self._stage(_filter, lambda item: not predicate(item))
+
+    def pluck(self, ind: Any) -> 'casync':
+        """Extract the value at the given index from each element."""
+        return self._stage(_map, lambda item: item[ind])
+
+    def enumerate(self, start: int = 0) -> 'casync':
+        """Return (index, item) pairs."""
+        return self._stage(_enumerate, start)
+
+    def unique(self, key: Callable[[T], Any] = cytoolz.functoolz.identity) -> 'casync':
+        """Return only unique elements."""
+        return self._stage(_unique, key)
+
+    def concat(self) -> 'casync':
+        """Concatenate nested (plain or async) iterables."""
+        return self._stage(_concat)
+
+    def partition_all(self, n: int) -> 'casync':
+        """Partition into clists of length n, the last one possibly shorter."""
+        return self._stage(_partition_all, n)
+
+    def take(self, n: int) -> 'casync':
+        """Take the first n elements."""
+        return self._stage(_take, n)
+
+    def take_while(self, predicate: Callable[[T], bool]) -> 'casync':
+        """Take elements while predicate is true."""
+        return self._stage(_take_while, predicate)
+
+    def drop(self, n: int) -> 'casync':
+        """Drop the first n elements."""
+        return self._stage(_drop, n)
+
+    def drop_while(self, predicate: Callable[[T], bool]) -> 'casync':
+        """Drop elements while predicate is true."""
+        return self._stage(_drop_while, predicate)
+
+    ## element-wise, coroutine functions
+
+    def amap(
+        self,
+        f: Callable[[T], Awaitable],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+    ) -> 'casync':
+        """Map a coroutine function over the elements, at most `concurrency` at once."""
+        return self._stage(_concurrent, f, concurrency, ordered)
+
+    def afilter(
+        self,
+        predicate: Callable[[T], Awaitable[bool]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+    ) -> 'casync':
+        """Filter with a coroutine predicate, at most `concurrency` at once."""
+        async def _check(item):
+            return (await predicate(item)), item
+        return self.amap(_check, concurrency, ordered).filter(lambda r: r[0]).pluck(1)
+
+    def amapcat(
+        self,
+        f: Callable[[T], Awaitable[Iterable]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        ordered: bool = True,
+    ) -> 'casync':
+        """Map a coroutine function returning an iterable and concatenate the results."""
+        return self.amap(f, concurrency, ordered).concat()
+
+    ## terminals
+
+    async def to_list(self) -> clist:
+        """Collect into a clist."""
+        return clist([item async for item in self])
+
+    async def to_set(self) -> cset:
+        """Collect into a cset."""
+        return cset([item async for item in self])
+
+    async def reduce(self, f: Callable[[T, T], T], initializer: Optional[T] = None) -> T:
+        """Reduce the elements using a function."""
+        it = self.__aiter__()
+        acc = initializer
+        if acc is None:
+            try:
+                acc = await it.__anext__()
+            except StopAsyncIteration:
+                raise TypeError('reduce() of empty sequence with no initial value')
+        async for item in it:
+            acc = f(acc, item)
+        return acc
+
+    async def find(self, predicate: Callable[[T], bool]) -> Optional[T]:
+        """Find first element that satisfies predicate, or None if not found."""
+        it = self.__aiter__()
+        try:
+            async for item in it:
+                if predicate(item):
+                    return item
+        finally:
+            await _aclose(it)
+        return None
+
+    async def first(self) -> T:
+        """Return the first element."""
+        sentinel = object()
+        item = await self._first(sentinel)
+        if item is sentinel:
+            raise ValueError('first() of an empty casync')
+        return item
+
+    async def _first(self, default: Any) -> Any:
+        it = self.__aiter__()
+        try:
+            async for item in it:
+                return item
+        finally:
+            await _aclose(it)
+        return default
+
+    async def any_match(self, predicate: Callable[[T], bool]) -> bool:
+        """Return True if any element satisfies the predicate."""
+        sentinel = object()
+        return await self.filter(predicate)._first(sentinel) is not sentinel
+
+    async def all_match(self, predicate: Callable[[T], bool]) -> bool:
+        """Return True if all elements satisfy the predicate."""
+        return not await self.any_match(lambda item: not predicate(item))
+
+    @property
+    async def frequencies(self) -> cdict:
+        """Count occurrences of each element."""
+        return await self.count_by()
+
+    async def count_by(self, key: Callable[[T], Any] = cytoolz.functoolz.identity) -> cdict:
+        """Count occurrences of each key."""
+        counts = cdict()
+        async for item in self:
+            k = key(item)
+            counts[k] = counts.get(k, 0) + 1
+        return counts
+
+    async def groupby(self, key: Callable[[T], Any]) -> cdict:
+        """Group elements by a key function."""
+        groups = {}
+        async for item in self:
+            groups.setdefault(key(item), []).append(item)
+        return cdict(groups).valmap(clist)
+
+    async def reduce_by(self, key: Callable[[T], Any], op: Callable) -> cdict:
+        """Group elements by key and reduce each group with a binary operator."""
+        result = cdict()
+        async for item in self:
+            k = key(item)
+            result[k] = op(result[k], item) if k in result else item
+        return result
@@ -23,11 +23,14 @@ There's a cdict and cset too.
 '''
 
 import cytoolz
+from cytoolz.utils import no_default
 import itertools
 import toolz  # Added for functions not in cytoolz
 from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Tuple, TypeVar, Union, cast
 from functools import reduce
 
+from .expr import compiled
+
 # Type variables for generic functions
 T = TypeVar('T')
 S = TypeVar('S')
@@ -41,9 +44,15 @@ V = TypeVar('V')
 ## --------------------------------------------------------------------------------
 
 class CBase:
-    def map(self, f: Callable[[T], S]) -> 'CBase':
-        """Map a function over the elements."""
-        return self.__class__(map(f, self))
+    def _new(self, iterable: Iterable) -> 'CBase':
+        """Build a result collection - same type as self, except for views (see views.py)."""
+        return self.__class__(iterable)
+    
+    def map(self, f: Callable[[T], S], cache: Optional['MemoCache'] = None) -> 'CBase':
+        """Map a function over the elements (memoized through cache, if given - see memo.py)."""
+        if cache is not None:
+            f = cache.wrap(f)
+        return self._new(map(compiled(f), self))
     
     def reduce(self, f: Callable[[T, T], T], initializer: Optional[T] = None) -> T:
         """Reduce the elements using a function."""
@@ -51,19 +60,19 @@ class CBase:
     
     def concat(self) -> 'CBase':
         """Concatenate nested iterables."""
-        return self.__class__(cytoolz.concat(self))
+        return self._new(cytoolz.concat(self))
     
     def diff(self, *seqs: Iterable, **kwargs) -> 'CBase':
         """Return elements in self that are not in any of the sequences."""
-        return self.__class__(cytoolz.diff(*((self,)+seqs), **kwargs))
+        return self._new(cytoolz.diff(*((self,)+seqs), **kwargs))
     
     def drop(self, n: int) -> 'CBase':
         """Drop the first n elements."""
-        return self.__class__(cytoolz.drop(n, self))
+        return self._new(cytoolz.drop(n, self))
     
     def filter(self, predicate: Callable[[T], bool]) -> 'CBase':
         """Filter elements based on a predicate."""
-        return self.__class__(filter(predicate, self))
+        return self._new(filter(compiled(predicate), self))
     
     def first(self) -> T:
         """Return the first element."""
@@ -72,35 +81,77 @@ class CBase:
     @property
     def frequencies(self) -> Dict:
         """Count occurrences of each element."""
-        if isinstance(self, clist) or isinstance(self, cgenerator) or isinstance(self, cset):
-            return cdict(cytoolz.frequencies(self))
-        else:
-            return fdict(cytoolz.frequencies(self))
-    
-    def groupby(self, key: Callable[[T], K]) -> Dict:
-        """Group elements by a key function."""
-        if isinstance(self, clist) or isinstance(self, cgenerator) or isinstance(self, cset):
-            return cdict(cytoolz.groupby(key, self)).valmap(clist)
-        else:
-            return fdict(cytoolz.groupby(key, self)).valmap(flist)
+        return cdict(cytoolz.frequencies(self))
+    
+    def groupby(
+        self,
+        key: Callable[[T], K],
+        memory_limit: Optional[int] = None,
+        tmpdir: Optional[str] = None,
+    ) -> Union[Dict, 'cgenerator']:
+        """
+        Group elements by a key function (reusing an index_by(key) index if there is one).
+
+        With memory_limit (elements), groups are spilled to temp files by key hash once the input
+        outgrows it, and a cgenerator of (key, clist) pairs is returned instead of a cdict.
+        """
+        if memory_limit is not None:
+            from .external import external_groupby
+            return cgenerator((k, clist(group)) for k, group in
+                              external_groupby(key, self, memory_limit, tmpdir))
+        from .index import cached_index
+        index = cached_index(self, 'hash', key)
+        if index is not None:
+            return index.groupby()
+        return cdict(cytoolz.groupby(compiled(key), self)).valmap(clist)
     
     def interleave(self, seq: Iterable[T], swap: bool = False) -> 'CBase':
         """Interleave elements from two sequences."""
         args = (seq, self) if swap else (self, seq)
-        return self.__class__(cytoolz.interleave(args))
+        return self._new(cytoolz.interleave(args))
     
     def interpose(self, el: T) -> 'CBase':
         """Insert an element between each item."""
-        return self.__class__(cytoolz.interpose(el, self))
+        return self._new(cytoolz.interpose(el, self))
     
     @property
     def is_distinct(self) -> bool:
         """Check if all elements are unique."""
         return cytoolz.isdistinct(self)
     
-    def join(self, rightseq: Iterable, leftkey: Callable, rightkey: Callable) -> 'CBase':
-        """Join two sequences based on matching keys."""
-        return self.__class__(cytoolz.join(leftkey, self, rightkey, rightseq))
+    def join(
+        self,
+        rightseq: Iterable,
+        leftkey: Callable,
+        rightkey: Callable,
+        left_default: Any = no_default,
+        right_default: Any = no_default,
+        memory_limit: Optional[int] = None,
+        tmpdir: Optional[str] = None,
+    ) -> 'CBase':
+        """
+        Join two sequences based on matching keys.
+        
+        rightseq may be a HashIndex (clist.index_by) - the index is probed instead of rescanning
+        rightseq, and pairs come out grouped by left element rather than in cytoolz.join order.
+
+        left_default / right_default turn on outer joins as in cytoolz.join. With memory_limit
+        (elements of this chain, the side held in memory), both sides are hash-partitioned to
+        temp files once it is exceeded and a cgenerator streams the pairs (see external.py).
+        """
+        if memory_limit is not None:
+            from .external import external_join
+            return cgenerator(external_join(leftkey, self, rightkey, rightseq, left_default,
+                                            right_default, memory_limit, tmpdir))
+        if left_default is not no_default or right_default is not no_default:
+            return self._new(cytoolz.join(leftkey, self, rightkey, rightseq,
+                                          left_default=left_default, right_default=right_default))
+        from .index import HashIndex
+        if isinstance(rightseq, HashIndex):
+            if rightkey is not None and rightkey is not rightseq.key:
+                raise ValueError('rightkey must be the key the index was built with (or None)')
+            return self._new(rightseq.probe(self, leftkey))
+        return self._new(cytoolz.join(leftkey, self, rightkey, rightseq))
     
     def last(self) -> T:
         """Return the last element."""
@@ -108,7 +159,7 @@ class CBase:
 
     def mapcat(self, f: Callable[[T], Iterable[S]]) -> 'CBase':
         """Map a function over elements and concatenate results."""
-        return self.__class__(self.__class__(_.map(f) for _ in self)).concat()
+        return self._new(self._new(_.map(f) for _ in self)).concat()
     
     def nth(self, n: int) -> T:
         """Return the nth element."""
@@ -116,38 +167,32 @@ class CBase:
     
     def partition(self, n: int) -> 'CBase':
         """Partition sequence into tuples of length n."""
-        return self.__class__(self.__class__(p) for p in cytoolz.partition(n, self))
+        return self._new(self._new(p) for p in cytoolz.partition(n, self))
     
     def partition_all(self, n: int) -> 'CBase':
         """Partition sequence into tuples of length n, padding with None if needed."""
-        return self.__class__(self.__class__(p) for p in cytoolz.partition_all(n, self))
+        return self._new(self._new(p) for p in cytoolz.partition_all(n, self))
     
     def peek(self) -> T:
         """Look at first element and return a new iterator."""
         first, seq = cytoolz.peek(self)
-        self = self.__class__(seq)
+        self = self._new(seq)
         return first
     
     def pluck(self, ind: Union[int, Iterable[int]]) -> 'CBase':
         """Extract values at the given indices from each element."""
         if cytoolz.isiterable(ind):
-            if isinstance(self, clist) or isinstance(self, cgenerator) or isinstance(self, cset):
-                return self.__class__(map(clist, cytoolz.pluck(ind, self)))
-            else:
-                return self.__class__(map(flist, cytoolz.pluck(ind, self)))
+            return self._new(map(clist, cytoolz.pluck(ind, self)))
         else:
-            return self.__class__(cytoolz.pluck(ind, self))
+            return self._new(cytoolz.pluck(ind, self))
     
     def reduce_by(self, key: Callable[[T], K], op: Callable[[S, T], S]) -> Dict:
         """Group elements by key and reduce each group with a binary operator."""
-        if isinstance(self, clist) or isinstance(self, cgenerator) or isinstance(self, cset):
-            return cdict(cytoolz.reduceby(key, op, self))
-        else:
-            return fdict(cytoolz.reduceby(key, op, self))
+        return cdict(cytoolz.reduceby(compiled(key), op, self))
     
     def remove(self, predicate: Callable[[T], bool]) -> 'CBase':
         """Remove elements that satisfy the predicate."""
-        return self.__class__(cytoolz.remove(predicate, self))
+        return self._new(cytoolz.remove(compiled(predicate), self))
     
     def second(self) -> T:
         """Return the second element."""
@@ -156,49 +201,56 @@ class CBase:
     def sliding_window(self, n: int) -> Iterable:
         """Create a sliding window of elements."""
         # assuming should always be a generator - otherwise - going to get huge
-        if isinstance(self, clist) or isinstance(self, cgenerator) or isinstance(self, cset):
-            return cgenerator(self.__class__(sw) for sw in cytoolz.sliding_window(n, self))
-        else:
-            return fgenerator(self.__class__(sw) for sw in cytoolz.sliding_window(n, self))
+        return cgenerator(self._new(sw) for sw in cytoolz.sliding_window(n, self))
     
     def take(self, n: int) -> 'CBase':
         """Take the first n elements."""
-        return self.__class__(cytoolz.take(n, self))
+        return self._new(cytoolz.take(n, self))
     
     def tail(self, n: int) -> 'CBase':
         """Take the last n elements."""
-        return self.__class__(cytoolz.tail(n, self))
+        return self._new(cytoolz.tail(n, self))
     
     def stride_by(self, n: int) -> 'CBase':
         """Take every nth element."""
         # is "take_nth" in cytoolz, which just isn't a good name for what it actually does
-        return self.__class__(cytoolz.take_nth(n, self)) 
+        return self._new(cytoolz.take_nth(n, self)) 
     def top_k(self, k: int, key: Callable[[T], Any] = cytoolz.functoolz.identity) -> 'CBase':
         """Return the k largest elements."""
-        return self.__class__(cytoolz.topk(k, self, key))
+        return self._new(cytoolz.topk(k, self, compiled(key)))
     
     def unique(self, key: Callable[[T], K] = cytoolz.functoolz.identity) -> 'CBase':
         """Return only unique elements."""
-        return self.__class__(cytoolz.unique(self, key))
+        return self._new(cytoolz.unique(self, compiled(key)))
     
     def count_by(self, key: Callable[[T], K] = cytoolz.functoolz.identity) -> Dict:
-        """Count occurrences of each key."""
-        if isinstance(self, clist) or isinstance(self, cgenerator) or isinstance(self, cset):
-            return cdict(cytoolz.countby(key, self))
-        else:
-            return fdict(cytoolz.countby(key, self))
+        """Count occurrences of each key (reusing an index_by(key) index if there is one)."""
+        from .index import cached_index
+        index = cached_index(self, 'hash', key)
+        if index is not None:
+            return index.count_by()
+        return cdict(cytoolz.countby(compiled(key), self))
     
     def partition_by(self, f: Callable[[T], Any]) -> 'CBase':
         """Partition a sequence based on result of a function."""
-        return self.__class__(self.__class__(p) for p in cytoolz.partitionby(f, self))
+        return self._new(self._new(p) for p in cytoolz.partitionby(f, self))
     
     def pipe(self, *fs: Callable) -> Any:
         """Apply a sequence of functions to the data."""
         return cytoolz.functoolz.pipe(self, *fs)
     
-    def pipe_map(self, *fs: Callable) -> 'CBase':
-        """Apply a sequence of functions to each element."""
-        return self.__class__(cytoolz.functoolz.pipe(_, *fs) for _ in self)
+    def pipe_map(self, *fs: Callable, cache: Optional['MemoCache'] = None) -> 'CBase':
+        """Apply a sequence of functions to each element (memoized through cache, if given)."""
+        if cache is not None:
+            return self.map(lambda x: cytoolz.functoolz.pipe(x, *fs), cache)
+        return self._new(cytoolz.functoolz.pipe(_, *fs) for _ in self)
+    
+    def memo_map(
+        self, f: Callable[[T], S], cache: Optional['MemoCache'] = None, **kwargs
+    ) -> 'CBase':
+        """Map f once per distinct element, through cache or a MemoCache(**kwargs)."""
+        from .memo import MemoCache
+        return self.map(f, cache if cache is not None else MemoCache(**kwargs))
     
     def find(self, predicate: Callable[[T], bool]) -> Optional[T]:
         """Find first element that satisfies predicate, or None if not found."""
@@ -209,7 +261,7 @@ class CBase:
     
     def zip_with(self, seq: Iterable, func: Callable[[T, Any], S]) -> 'CBase':
         """Combine two sequences using a function."""
-        return self.__class__(func(a, b) for a, b in zip(self, seq))
+        return self._new(func(a, b) for a, b in zip(self, seq))
     
     def chunk(self, n: int) -> 'CBase':
         """Alias for partition with more intuitive name."""
@@ -217,7 +269,7 @@ class CBase:
     
     def flatten(self) -> 'CBase':
         """Flatten one level of nesting."""
-        return self.__class__(item for sublist in self for item in sublist)
+        return self._new(item for sublist in self for item in sublist)
     
     def any_match(self, predicate: Callable[[T], bool]) -> bool:
         """Return True if any element satisfies the predicate."""
@@ -229,7 +281,7 @@ class CBase:
     
     def enumerate(self, start: int = 0) -> 'CBase':
         """Return (index, item) pairs."""
-        return self.__class__(enumerate(self, start))
+        return self._new(enumerate(self, start))
     
     def take_while(self, predicate: Callable[[T], bool]) -> 'CBase':
         """Take elements while predicate is true."""
@@ -239,7 +291,7 @@ class CBase:
                     yield element
                 else:
                     break
-        return self.__class__(_take_while())
+        return self._new(_take_while())
     
     def drop_while(self, predicate: Callable[[T], bool]) -> 'CBase':
         """Drop elements while predicate is true."""
@@ -250,7 +302,190 @@ class CBase:
                     dropping = False
                 if not dropping:
                     yield element
-        return self.__class__(_drop_while())
+        return self._new(_drop_while())
+
+    def map_batches(
+        self,
+        f: Callable[[Any], Optional[Iterable[S]]],
+        size: int = 256,
+        max_latency: Optional[float] = None,
+        **kwargs,
+    ) -> 'CBase':
+        """Call f on lists of up to size elements and flatten its results (see batches.py)."""
+        from .batches import map_batches
+        return self._new(map_batches(f, self, size, max_latency, **kwargs))
+    
+    def par_map(self, f: Callable[[T], S], **kwargs) -> 'CBase':
+        """Map a function over the elements in a thread/process pool (see parallel.py)."""
+        from .parallel import par_map
+        return self._new(par_map(f, self, **kwargs))
+    
+    def par_filter(self, predicate: Callable[[T], bool], **kwargs) -> 'CBase':
+        """Filter elements in a thread/process pool (see parallel.py)."""
+        from .parallel import par_filter
+        return self._new(par_filter(predicate, self, **kwargs))
+    
+    def par_mapcat(self, f: Callable[[T], Iterable[S]], **kwargs) -> 'CBase':
+        """Map f (returning an iterable) in a thread/process pool and concatenate."""
+        from .parallel import par_mapcat
+        return self._new(par_mapcat(f, self, **kwargs))
+    
+    def partitioned(self, n: Optional[int] = None, **kwargs) -> 'Partitioned':
+        """Keyed aggregations as multi-process map-reduce with combiners (see mapreduce.py)."""
+        from .mapreduce import Partitioned
+        return Partitioned(self, n, **kwargs)
+    
+    def external_sort(
+        self,
+        key: Optional[Callable[[T], Any]] = None,
+        reverse: bool = False,
+        memory_limit: int = 1000000,
+        tmpdir: Optional[str] = None,
+    ) -> 'cgenerator':
+        """Stable sort spilling sorted runs of memory_limit elements to disk (see external.py)."""
+        from .external import external_sort
+        return cgenerator(external_sort(self, key, reverse, memory_limit, tmpdir))
+    
+    def checkpoint(
+        self,
+        path: str,
+        key: Any = None,
+        inputs: Iterable[str] = (),
+        block_size: int = 32,
+        force: bool = False,
+    ) -> 'Checkpoint':
+        """
+        Store the elements in path and read them back from disk - skipped if path already
+        holds the same computation (see checkpoint.py for what the fingerprint covers).
+
+        Args:
+            path: File to write
+            key: Any value with a stable repr identifying the input (e.g. a version string)
+            inputs: Files the chain reads - their size and mtime are part of the fingerprint
+            block_size: Elements per pickled block (the unit of random access)
+            force: Rewrite even if the fingerprint matches
+        """
+        from .checkpoint import checkpoint
+        return checkpoint(self, path, key, tuple(inputs), block_size, force)
+
+    def cache_to(self, path: str, **kwargs) -> 'Checkpoint':
+        """Same as checkpoint(path, ...)."""
+        return self.checkpoint(path, **kwargs)
+
+    def write_jsonl(self, path: str, **kwargs) -> int:
+        """Write one JSON value per line in batched writes; returns the count (see files.py)."""
+        from .files import write_jsonl
+        return write_jsonl(self, path, **kwargs)
+    
+    def write_csv(self, path: str, **kwargs) -> int:
+        """Write rows (dicts or sequences) as CSV in batched writes; returns the count."""
+        from .files import write_csv
+        return write_csv(self, path, **kwargs)
+    
+    def approx_distinct_count(self, precision: int = 14) -> int:
+        """Estimated number of distinct elements, in bounded memory (HyperLogLog, sketches.py)."""
+        from .sketches import HyperLogLog
+        return HyperLogLog(precision).update(self).count()
+    
+    def approx_frequencies(self, epsilon: float = 0.001, delta: float = 0.01) -> 'CountMinSketch':
+        """Count-Min sketch of element counts - query it with sketch[x] (see sketches.py)."""
+        from .sketches import CountMinSketch
+        return CountMinSketch(epsilon, delta).update(self)
+    
+    def heavy_hitters(self, k: int, capacity: Optional[int] = None) -> 'clist':
+        """Approximate k most frequent (element, count) pairs (Space-Saving, sketches.py)."""
+        from .sketches import SpaceSaving
+        return SpaceSaving(capacity or 10 * k).update(self).top(k)
+    
+    def approx_quantiles(
+        self, qs: Union[float, Iterable[float]], k: int = 200, seed: Optional[int] = None
+    ) -> Any:
+        """Approximate quantile (or clist of quantiles) in bounded memory (KLL, sketches.py)."""
+        from .sketches import KLLSketch
+        sketch = KLLSketch(k, seed).update(self)
+        if isinstance(qs, (int, float)):
+            return sketch.quantile(qs)
+        return sketch.quantiles(list(qs))
+    
+    def sample(self, n: int, seed: Optional[int] = None) -> 'clist':
+        """Uniform random sample of n elements in one pass (reservoir sampling, sketches.py)."""
+        from .sketches import Reservoir
+        return Reservoir(n, seed).update(self).to_list()
+
+    def aggregate(self, chunk_size: int = 1024, **aggregations: Any) -> 'cdict':
+        """
+        Several aggregations in one pass - aggregate(n=len, top=('top_k', 3)).
+
+        Each value names an aggregation, is a sketch or an Aggregator, or is a sub-chain function
+        of a cgenerator (see aggregate.py). Returns a cdict of the results under the same names.
+        """
+        from .aggregate import fanout
+        return cdict(zip(aggregations, fanout(self, aggregations.values(), chunk_size)))
+
+    def fanout(self, *consumers: Any, chunk_size: int = 1024) -> 'clist':
+        """Feed every element to each consumer in one pass; their results, in order."""
+        from .aggregate import fanout
+        return clist(fanout(self, consumers, chunk_size))
+
+    def live_count_by(self, key: Callable[[T], K] = cytoolz.functoolz.identity) -> 'LiveCountBy':
+        """count_by kept up to date as elements are appended / removed (see live.py)."""
+        from .live import LiveCountBy
+        return LiveCountBy(key, self)
+
+    def live_reduce_by(
+        self,
+        key: Callable[[T], K],
+        op: Callable[[S, T], S],
+        init: Any = no_default,
+        inverse: Optional[Callable[[S, T], S]] = None,
+    ) -> 'LiveReduceBy':
+        """reduce_by kept up to date as elements are appended (removed, given inverse=)."""
+        from .live import LiveReduceBy
+        return LiveReduceBy(key, op, init, inverse, self)
+
+    def live_top_k(
+        self, k: int, key: Callable[[T], Any] = cytoolz.functoolz.identity
+    ) -> 'LiveTopK':
+        """top_k kept up to date as elements are appended / removed (see live.py)."""
+        from .live import LiveTopK
+        return LiveTopK(k, key, self)
+
+    def rolling(self, n: int, value: Optional[Callable] = None) -> 'Rolling':
+        """Incremental aggregates over every sliding window of n - .sum(), .max(), ..."""
+        from .windows import Rolling
+        return Rolling(self, n, value)
+
+    def tumbling(
+        self, size: Any, key: Optional[Callable] = None, value: Optional[Callable] = None
+    ) -> 'Windows':
+        """Fixed, non-overlapping windows of size by timestamp key(x), or of size elements."""
+        from .windows import Windows, tumbling_assigner
+        return Windows(self, tumbling_assigner(size, key), value)
+
+    def session(self, gap: Any, key: Callable, value: Optional[Callable] = None) -> 'Windows':
+        """Windows of elements whose timestamps key(x) are at most gap apart (windows.py)."""
+        from .windows import Windows, session_assigner
+        return Windows(self, session_assigner(gap, key), value)
+
+    def to_table(self) -> 'ctable':
+        """Store records (dicts) column by column for fast filter/sort/groupby (table.py)."""
+        from .table import ctable
+        return ctable(self)
+
+    def walk(self) -> 'cgenerator':
+        """Stream (path, node) through every element's nested data - paths start at its index."""
+        from .tree import walk_each
+        return cgenerator(walk_each(self))
+
+    def select(self, path: str) -> 'cgenerator':
+        """Stream the nodes a JSONPath-style selector picks out of each element (tree.py)."""
+        from .tree import select_each
+        return cgenerator(select_each(self, path))
+
+    def lazy(self) -> 'CBase':
+        """Defer the rest of the chain - stages are recorded, fused and run at a terminal."""
+        from .lazy import clazy
+        return clazy(self)
     
 ## --------------------------------------------------------------------------------
 ## CLASSES
@@ -274,16 +509,33 @@ class clist(CBase, list):
     
     def sort(self, key: Optional[Callable[[T], Any]] = None, reverse: bool = False) -> 'clist':
         """Sort the list and return a new clist."""
-        return clist(sorted(self, key=key, reverse=reverse))
+        return clist(sorted(self, key=compiled(key), reverse=reverse))
     
     def reverse(self) -> 'clist':
         """Reverse the list and return a new clist."""
         return clist(reversed(self))
     
+    def view(
+        self, start: Optional[int] = None, stop: Optional[int] = None, step: Optional[int] = None
+    ) -> 'clist_view':
+        """Zero-copy view of self[start:stop:step] (see views.py) - slicing with [] copies."""
+        from .views import clist_view
+        return clist_view(self, start, stop, step)
+    
     def to_generator(self) -> 'cgenerator':
         """Convert list to generator."""
         return cgenerator(self)
     
+    def index_by(self, key: Callable[[T], K]) -> 'HashIndex':
+        """Hash index of this list by key, cached for reuse by lookups, groupby and join."""
+        from .index import build_index
+        return build_index(self, 'hash', key)
+    
+    def sorted_index(self, key: Callable[[T], Any] = cytoolz.functoolz.identity) -> 'SortedIndex':
+        """Index of this list ordered by key, for range queries - cached for reuse."""
+        from .index import build_index
+        return build_index(self, 'sorted', key)
+    
     def to_set(self) -> 'cset':
         """Convert list to set."""
         return cset(self)
@@ -304,13 +556,29 @@ class cgenerator(CBase):
         return iter(self.iterable)
     
     def __getitem__(self, key: Union[int, slice]) -> Union[T, 'cgenerator']:
-        """Convert to list first, then get item."""
+        """Convert to list first, then get item - buffered generators read only the prefix."""
+        from .buffered import ReplayBuffer
+        if isinstance(self.iterable, ReplayBuffer):
+            result = self.iterable[key]
+            return cgenerator(result) if isinstance(key, slice) else result
         as_list = list(self)
         result = as_list[key]
         if isinstance(key, slice):
             return cgenerator(result)
         return result
     
+    def buffered(self, max_items: Optional[int] = None, overflow: str = 'error') -> 'cgenerator':
+        """
+        Cache elements as they are consumed, so the result can be iterated and indexed repeatedly
+        while the source is read only once.
+        
+        Args:
+            max_items: How many elements to keep in memory (None for no limit)
+            overflow: 'error' to raise BufferError past max_items, 'spill' to spill to a temp file
+        """
+        from .buffered import ReplayBuffer
+        return cgenerator(ReplayBuffer(self, max_items, overflow))
+    
     def to_list(self) -> clist:
         """Convert generator to list."""
         return clist(self)
@@ -326,16 +594,25 @@ class cgenerator(CBase):
 class cdict(dict):
     """Functional dictionary class with chainable methods."""
     
-    def keys(self) -> clist:
-        """Return keys as clist."""
+    def keys(self, copy: bool = True) -> Union[clist, 'cdict_keys']:
+        """Return keys as clist, or with copy=False as a live cdict_keys view (see views.py)."""
+        if not copy:
+            from .views import cdict_keys
+            return cdict_keys(self)
         return clist(super().keys())
     
-    def values(self) -> clist:
-        """Return values as clist."""
+    def values(self, copy: bool = True) -> Union[clist, 'cdict_values']:
+        """Return values as clist, or with copy=False as a live cdict_values view."""
+        if not copy:
+            from .views import cdict_values
+            return cdict_values(self)
         return clist(super().values())
     
-    def items(self) -> clist:
-        """Return items as clist."""
+    def items(self, copy: bool = True) -> Union[clist, 'cdict_items']:
+        """Return items as clist, or with copy=False as a live cdict_items view."""
+        if not copy:
+            from .views import cdict_items
+            return cdict_items(self)
         return clist(super().items())
     
     def keymap(self, f: Callable[[K], S]) -> 'cdict':
@@ -366,6 +643,16 @@ class cdict(dict):
         """Merge with other dictionaries."""
         return cdict(cytoolz.merge(*((self,) + dicts), **kwargs))
 
+    def walk(self) -> cgenerator:
+        """Stream (path, node) for the dict and everything nested in it, depth first."""
+        from .tree import walk
+        return cgenerator(walk(self))
+
+    def select(self, path: str) -> cgenerator:
+        """Stream the nodes a JSONPath-style selector picks out of the dict (tree.py)."""
+        from .tree import select
+        return cgenerator(select(self, path))
+
 class cset(CBase, set):
     """Functional set class with chainable methods."""
     
@@ -405,16 +692,21 @@ def cxrange(*args: int) -> cgenerator:
     """Range as a generator."""
     return cgenerator(range(*args))
 
-def chain(obj: Any) -> Union[clist, cdict, cset, cgenerator]:
+def chain(obj: Any, lazy: bool = False) -> Union[clist, cdict, cset, cgenerator]:
     """
     Convert any Python collection to its appropriate chaincollections type.
     
     Args:
         obj: Any Python object
+        lazy: Return a lazy chain (clazy) instead - dicts are returned as cdict regardless
         
     Returns:
-        The appropriate chaincollections type (clist, cdict, cset, or cgenerator)
+        The appropriate chaincollections type (clist, cdict, cset, cgenerator, carray or casync)
     """
+    if lazy:
+        result = chain(obj)
+        return result.lazy() if isinstance(result, CBase) else result
+
     # If it's already a chaincollections type, return it as is
     if isinstance(obj, (clist, cdict, cset, cgenerator)):
         return obj
@@ -426,9 +718,19 @@ def chain(obj: Any) -> Union[clist, cdict, cset, cgenerator]:
         return cset(obj)
     elif isinstance(obj, list):
         return clist(obj)
+    elif type(obj).__name__ == 'ndarray' and getattr(obj, 'ndim', None) == 1:
+        # 1-D numeric numpy arrays get the vectorized carray
+        from .carray import carray, is_numeric_array
+        if is_numeric_array(obj):
+            return carray(obj)
+        return cgenerator(obj)
     elif hasattr(obj, '__iter__') and not isinstance(obj, (str, bytes)):
         # Handle other iterables as generators
         return cgenerator(obj)
+    elif hasattr(obj, '__aiter__'):
+        # Async iterables get the async counterpart
+        from .casync import casync
+        return casync(obj)
     else:
         # For non-collections, wrap in a singleton list
         return clist([obj])
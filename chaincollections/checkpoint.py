@@ -0,0 +1,358 @@
+'''
+
+checkpoint.py
+
+Disk-backed checkpoints of intermediate chain results.
+
+.checkpoint(path) (or .cache_to(path)) writes the elements to path and returns a Checkpoint - a
+cgenerator reading them back through mmap, re-iterable, with len() and random access by index.
+
+File layout:
+
+    MAGIC
+    block*      u64 length + pickle of a list of up to block_size elements
+    index       pickle of {fingerprint, offsets, starts, length} - where each block begins and
+                the position of its first element, so checkpoint[i] unpickles one block
+    footer      u64 index offset + u64 index length + MAGIC
+
+The file is written to a temp name and renamed into place, so a crash never leaves a
+half-written checkpoint that looks complete.
+
+Re-running skips the work when the fingerprint stored in the file matches. The fingerprint
+covers key= (any value with a stable repr, e.g. a version string), the size and mtime of the
+files in inputs=, and, for lazy chains (.lazy()), the plan: every stage's name and the code,
+defaults and closure values of its functions, and the module-level names they read (functions
+followed the same way, other values by repr - so changing a constant invalidates it). A
+source held in memory (list, tuple, clist) is fingerprinted by content; a one-shot source
+(a generator, a file reader) only through key= / inputs=. When nothing identifies the input,
+the checkpoint is always rewritten, as it is when a closure value's or global's repr differs
+between runs (objects without a __repr__) or raises. Upstream stages of an eager chain have
+already run by the time .checkpoint() is called - use .lazy() so a match skips them too.
+
+'''
+
+import bisect
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import types
+from array import array
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Union
+
+import cytoolz
+
+from .chaincollections import cgenerator, chain
+from .expr import Expr, to_source
+
+MAGIC = b'CCKPT01\n'
+# small blocks keep checkpoint[i] cheap; sequential reads are as fast as with 256 from ~32 up
+DEFAULT_BLOCK_SIZE = 32
+
+_U64 = struct.Struct('<Q')
+_FOOTER = struct.Struct('<QQ8s')
+# how far the fingerprint follows functions into the functions they call
+_MAX_DEPTH = 4
+
+
+## --------------------------------------------------------------------------------
+## FINGERPRINTS
+## --------------------------------------------------------------------------------
+
+def _code_digest(code: types.CodeType) -> bytes:
+    h = hashlib.blake2b(code.co_code, digest_size=16)
+    for const in code.co_consts:
+        h.update(_code_digest(const) if isinstance(const, types.CodeType) else
+                 repr(const).encode())
+    h.update(repr(code.co_names).encode())
+    return h.digest()
+
+
+def _describe(f: Any, depth: int = 0, seen: Optional[set] = None) -> str:
+    """A string that changes when the behaviour of f (probably) does."""
+    seen = set() if seen is None else seen
+    if depth > _MAX_DEPTH or id(f) in seen:
+        return '...'
+    seen.add(id(f))
+    if isinstance(f, Expr):
+        return 'expr(%s)' % _describe_expr(f, depth, seen)
+    if isinstance(f, types.MethodType):
+        return 'method(%s, %s)' % (_describe(f.__func__, depth + 1, seen), _repr(f.__self__))
+    if hasattr(f, 'func') and hasattr(f, 'args') and hasattr(f, 'keywords'):  # partial
+        return 'partial(%s, %s, %s)' % (_describe(f.func, depth + 1, seen), _repr(f.args),
+                                        _repr(sorted(f.keywords.items())))
+    code = getattr(f, '__code__', None)
+    if not isinstance(code, types.CodeType):
+        return '%s.%s' % (getattr(f, '__module__', None),
+                          getattr(f, '__qualname__', None) or _repr(f))
+    parts = ['%s.%s' % (f.__module__, f.__qualname__), _code_digest(code).hex(),
+             repr(f.__defaults__), repr(f.__kwdefaults__)]
+    for cell in f.__closure__ or ():
+        try:
+            content = cell.cell_contents
+        except ValueError:  # not yet assigned
+            content = None
+        parts.append(_describe(content, depth + 1, seen) if callable(content) else
+                     _repr(content))
+    # module-level names read by the code (and code nested in it): editing a helper or
+    # changing a constant invalidates the checkpoint
+    globals_ = getattr(f, '__globals__', {})
+    for name in sorted(_global_names(code)):
+        if name not in globals_:
+            continue  # an attribute name or a builtin
+        value = globals_[name]
+        if isinstance(value, types.ModuleType):
+            continue
+        if callable(value):
+            parts.append('%s=%s' % (name, _describe(value, depth + 1, seen)))
+        else:
+            parts.append('%s=%s' % (name, _repr(value)))
+    return '(%s)' % ', '.join(parts)
+
+
+def _global_names(code: types.CodeType) -> set:
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _global_names(const)
+    return names
+
+
+class _Undescribable(Exception):
+    """A value the fingerprint can't capture - the checkpoint is then always rewritten."""
+
+
+def _repr(value: Any) -> str:
+    try:
+        return repr(value)
+    except Exception as e:
+        raise _Undescribable(type(value).__name__) from e
+
+
+def _describe_expr(expr: Expr, depth: int, seen: set) -> str:
+    source, constants = to_source(expr)
+    return ', '.join([source] + ['%s=%s' % (name, _describe(value, depth + 1, seen)
+                                            if callable(value) else _repr(value))
+                                 for name, value in constants.items()])
+
+
+def _content_digest(items: Sequence) -> Optional[str]:
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        for block in cytoolz.partition_all(1024, items):
+            h.update(pickle.dumps(block, pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return None
+    return h.hexdigest()
+
+
+def _source_digest(source: Any) -> Optional[str]:
+    """Fingerprint of a chain's source, or None if it can't be had without consuming it."""
+    from .lazy import clazy
+    if isinstance(source, Checkpoint):
+        return 'checkpoint:%s' % source.fingerprint
+    if isinstance(source, clazy):
+        inner = _source_digest(source.iterable)
+        if inner is None:
+            return None
+        return '%s | %s' % (inner, _plan_digest(source.stages))
+    if isinstance(source, (list, tuple, range)):
+        content = _content_digest(source)
+        return None if content is None else 'content:%s' % content
+    return None
+
+
+def _plan_digest(stages: Sequence) -> str:
+    parts = []
+    for stage in stages:
+        if stage[0] == 'op':
+            _, f, name, fns = stage
+            parts.append('%s[%s]' % (name, ', '.join([_describe(f)] + [_describe(g) for g in fns])))
+        else:
+            kind, arg = stage
+            parts.append('%s[%s]' % (kind, _describe(arg) if callable(arg) else _repr(arg)))
+    return ' -> '.join(parts)
+
+
+def fingerprint(
+    iterable: Iterable, key: Any = None, inputs: Sequence[str] = ()
+) -> Optional[str]:
+    """Fingerprint of the computation behind iterable, or None if nothing identifies it."""
+    from .lazy import clazy
+    parts = ['format:%s' % MAGIC.decode().strip()]
+    identified = False
+    if key is not None:
+        parts.append('key:%r' % (key,))
+        identified = True
+    for path in inputs:
+        st = os.stat(path)
+        parts.append('input:%s:%d:%d' % (os.path.abspath(path), st.st_size, st.st_mtime_ns))
+        identified = True
+    try:
+        if isinstance(iterable, clazy):
+            source = _source_digest(iterable.iterable)
+            parts.append('plan:%s' % _plan_digest(iterable.stages))
+        else:
+            source = _source_digest(iterable)
+    except _Undescribable:
+        return None
+    if source is not None:
+        parts.append('source:%s' % source)
+        identified = True
+    if not identified:
+        return None
+    return hashlib.blake2b('\n'.join(parts).encode(), digest_size=16).hexdigest()
+
+
+## --------------------------------------------------------------------------------
+## WRITING
+## --------------------------------------------------------------------------------
+
+def write_checkpoint(
+    iterable: Iterable,
+    path: str,
+    fingerprint: Optional[str] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> int:
+    """Write the elements of iterable to path in checkpoint format. Returns the element count."""
+    if block_size < 1:
+        raise ValueError('block_size must be positive')
+    offsets, starts = array('q'), array('q')
+    count = 0
+    tmp = '%s.tmp-%d' % (path, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC)
+            for block in cytoolz.partition_all(block_size, iterable):
+                data = pickle.dumps(list(block), pickle.HIGHEST_PROTOCOL)
+                offsets.append(f.tell())
+                starts.append(count)
+                f.write(_U64.pack(len(data)))
+                f.write(data)
+                count += len(block)
+            index = pickle.dumps({
+                'fingerprint': fingerprint, 'offsets': offsets, 'starts': starts, 'length': count,
+            }, pickle.HIGHEST_PROTOCOL)
+            index_offset = f.tell()
+            f.write(index)
+            f.write(_FOOTER.pack(index_offset, len(index), MAGIC))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return count
+
+
+def stored_fingerprint(path: str) -> Optional[str]:
+    """The fingerprint a checkpoint file was written with (None if missing or unreadable)."""
+    try:
+        with Checkpoint(path) as cp:
+            return cp.fingerprint
+    except (OSError, ValueError):
+        return None
+
+
+def checkpoint(
+    iterable: Iterable,
+    path: str,
+    key: Any = None,
+    inputs: Sequence[str] = (),
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    force: bool = False,
+) -> 'Checkpoint':
+    """Write iterable to path unless an identical checkpoint is there, and open it."""
+    fp = fingerprint(iterable, key, inputs)
+    if force or fp is None or stored_fingerprint(path) != fp:
+        write_checkpoint(iterable, path, fp, block_size)
+    return Checkpoint(path)
+
+
+## --------------------------------------------------------------------------------
+## READING
+## --------------------------------------------------------------------------------
+
+class Checkpoint(cgenerator):
+    """Elements stored by .checkpoint(), read back through mmap - re-iterable and indexable."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < len(MAGIC) + _FOOTER.size:
+                raise ValueError('%s is not a checkpoint file' % path)
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            index_offset, index_length, magic = _FOOTER.unpack_from(self._mm, size - _FOOTER.size)
+            if self._mm[:len(MAGIC)] != MAGIC or magic != MAGIC:
+                raise ValueError('%s is not a checkpoint file (or was not finished)' % path)
+            index = pickle.loads(self._mm[index_offset:index_offset + index_length])
+        except BaseException:
+            self.close()
+            raise
+        self.fingerprint: Optional[str] = index['fingerprint']
+        self._offsets: array = index['offsets']
+        self._starts: array = index['starts']
+        self._length: int = index['length']
+        self._cached = (-1, None)
+
+    def _new(self, iterable: Iterable) -> cgenerator:
+        return cgenerator(iterable)
+
+    def _block(self, b: int) -> List:
+        if self._cached[0] != b:
+            offset = self._offsets[b]
+            (length,) = _U64.unpack_from(self._mm, offset)
+            start = offset + _U64.size
+            self._cached = (b, pickle.loads(self._mm[start:start + length]))
+        return self._cached[1]
+
+    def __iter__(self) -> Iterator:
+        for b in range(len(self._offsets)):
+            offset = self._offsets[b]
+            (length,) = _U64.unpack_from(self._mm, offset)
+            start = offset + _U64.size
+            yield from pickle.loads(self._mm[start:start + length])
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, key: Union[int, slice]) -> Any:
+        """Element i (unpickling only its block), or a cgenerator over a slice."""
+        if isinstance(key, slice):
+            return cgenerator(self._get(i) for i in range(*key.indices(self._length)))
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError('checkpoint index out of range')
+        return self._get(key)
+
+    def _get(self, i: int) -> Any:
+        b = bisect.bisect_right(self._starts, i) - 1
+        return self._block(b)[i - self._starts[b]]
+
+    def __repr__(self) -> str:
+        return 'Checkpoint(%r, %d elements)' % (self.path, self._length)
+
+    def close(self) -> None:
+        """Release the mmap and the file."""
+        self._cached = (-1, None)
+        mm = getattr(self, '_mm', None)
+        if mm is not None:
+            mm.close()
+        self._file.close()
+
+    def __enter__(self) -> 'Checkpoint':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def read_checkpoint(path: str) -> Checkpoint:
+    """Open a file written by .checkpoint() / write_checkpoint()."""
+    return Checkpoint(path)
+
+
+chain.read_checkpoint = read_checkpoint
@@ -0,0 +1,305 @@
+'''
+
+cvector.py
+
+Persistent (immutable) vector with structural sharing.
+
+cvector is a 32-way trie with a tail buffer, the same layout as Clojure's PersistentVector.
+append, set and indexing are O(log32 N) and every new version shares all untouched nodes with
+the old one, so building a vector one append at a time is O(N log32 N) instead of the O(N^2)
+of clist.append.
+
+Slicing with step 1 is O(1) - the slice shares the whole trie and just records a window onto
+it (appending to a slice overwrites its copy of the next slot, never the original). extend()
+and + append a batch through a transient.
+
+.transient() returns a mutable builder for bulk edits - nodes it creates are edited in place
+instead of copied. Call .persistent() on it to get a cvector back.
+
+'''
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from .chaincollections import CBase, T, cdict, cgenerator, clist, cset
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+
+## --------------------------------------------------------------------------------
+## TRIE OPERATIONS
+## --------------------------------------------------------------------------------
+## `owned` is None for persistent edits (always path-copy) or a dict of the nodes a
+## transient created, which may be edited in place.
+
+def _editable(node: List, owned: Optional[Dict[int, List]]) -> List:
+    if owned is not None and id(node) in owned:
+        return node
+    node = list(node)
+    if owned is not None:
+        owned[id(node)] = node
+    return node
+
+
+def _new_path(level: int, node: List) -> List:
+    while level > 0:
+        node = [node]
+        level -= BITS
+    return node
+
+
+def _push_tail(size: int, level: int, parent: List, tail: List, owned: Optional[Dict]) -> List:
+    """Return parent with the full tail inserted as the leaf for positions size-32..size-1."""
+    subidx = ((size - 1) >> level) & MASK
+    result = _editable(parent, owned)
+    if level == BITS:
+        child = tail
+    elif subidx < len(parent):
+        child = _push_tail(size, level - BITS, parent[subidx], tail, owned)
+    else:
+        child = _new_path(level - BITS, tail)
+    if subidx < len(result):
+        result[subidx] = child
+    else:
+        result.append(child)
+    return result
+
+
+def _assoc(level: int, node: List, i: int, value: Any, owned: Optional[Dict]) -> List:
+    result = _editable(node, owned)
+    if level == 0:
+        result[i & MASK] = value
+    else:
+        subidx = (i >> level) & MASK
+        result[subidx] = _assoc(level - BITS, node[subidx], i, value, owned)
+    return result
+
+
+class _Trie:
+    """The shared state of a vector - root, shift, tail and physical size."""
+
+    __slots__ = ('root', 'shift', 'tail', 'size')
+
+    def __init__(self, root: List, shift: int, tail: List, size: int):
+        self.root = root
+        self.shift = shift
+        self.tail = tail
+        self.size = size
+
+    @property
+    def tailoff(self) -> int:
+        return self.size - len(self.tail)
+
+    def leaf(self, i: int) -> List:
+        """The 32-element node holding physical index i."""
+        if i >= self.tailoff:
+            return self.tail
+        node = self.root
+        level = self.shift
+        while level > 0:
+            node = node[(i >> level) & MASK]
+            level -= BITS
+        return node
+
+    def get(self, i: int) -> Any:
+        return self.leaf(i)[i & MASK]
+
+    def set(self, i: int, value: Any, owned: Optional[Dict]) -> '_Trie':
+        if i >= self.tailoff:
+            tail = _editable(self.tail, owned)
+            tail[i & MASK] = value
+            return _Trie(self.root, self.shift, tail, self.size)
+        root = _assoc(self.shift, self.root, i, value, owned)
+        return _Trie(root, self.shift, self.tail, self.size)
+
+    def push(self, value: Any, owned: Optional[Dict]) -> '_Trie':
+        if len(self.tail) < WIDTH:
+            tail = _editable(self.tail, owned)
+            tail.append(value)
+            return _Trie(self.root, self.shift, tail, self.size + 1)
+        root, shift = self.root, self.shift
+        if (self.size >> BITS) > (1 << shift):
+            root = [root, _new_path(shift, self.tail)]
+            if owned is not None:
+                owned[id(root)] = root
+            shift += BITS
+        else:
+            root = _push_tail(self.size, shift, root, self.tail, owned)
+        tail = [value]
+        if owned is not None:
+            owned[id(tail)] = tail
+        return _Trie(root, shift, tail, self.size + 1)
+
+
+_EMPTY = _Trie([], BITS, [], 0)
+
+
+def _append(trie: _Trie, end: int, value: Any, owned: Optional[Dict]) -> _Trie:
+    """Write value at physical index end, growing the trie only when end is past its size."""
+    if end < trie.size:
+        return trie.set(end, value, owned)
+    return trie.push(value, owned)
+
+
+## --------------------------------------------------------------------------------
+## CLASSES
+## --------------------------------------------------------------------------------
+
+class cvector(CBase):
+    """Persistent vector class with chainable methods."""
+
+    def __init__(self, iterable: Iterable[T] = ()):
+        """Build a vector from any iterable."""
+        if isinstance(iterable, cvector):
+            self._trie, self._start, self._count = iterable._trie, iterable._start, iterable._count
+            return
+        built = cvector_transient(_EMPTY, 0, 0).extend(iterable).persistent()
+        self._trie, self._start, self._count = built._trie, 0, built._count
+
+    @classmethod
+    def _make(cls, trie: _Trie, start: int, count: int) -> 'cvector':
+        result = object.__new__(cls)
+        result._trie, result._start, result._count = trie, start, count
+        return result
+
+    def _physical(self, i: int) -> int:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('cvector index out of range')
+        return self._start + i
+
+    ## sequence protocol
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[T]:
+        """Iterate leaf by leaf."""
+        trie = self._trie
+        i, end = self._start, self._start + self._count
+        while i < end:
+            leaf = trie.leaf(i)
+            lo = i & MASK
+            hi = min(WIDTH, lo + end - i)
+            yield from leaf[lo:hi]
+            i += hi - lo
+
+    def __reversed__(self) -> Iterator[T]:
+        for i in range(self._count - 1, -1, -1):
+            yield self[i]
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[T, 'cvector']:
+        """Get item at index, or a slice sharing this vector's structure."""
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._count)
+            if step == 1:
+                return cvector._make(self._trie, self._start + start, max(0, stop - start))
+            return cvector(self[i] for i in range(start, stop, step))
+        return self._trie.get(self._physical(key))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (cvector, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __add__(self, other: Iterable[T]) -> 'cvector':
+        return self.extend(other)
+
+    def __repr__(self) -> str:
+        return 'cvector(%r)' % list(self)
+
+    ## persistent updates
+
+    def append(self, item: T) -> 'cvector':
+        """Return a new cvector with item added at the end."""
+        trie = _append(self._trie, self._start + self._count, item, None)
+        return cvector._make(trie, self._start, self._count + 1)
+
+    def set(self, i: int, item: T) -> 'cvector':
+        """Return a new cvector with position i replaced."""
+        trie = self._trie.set(self._physical(i), item, None)
+        return cvector._make(trie, self._start, self._count)
+
+    def extend(self, iterable: Iterable[T]) -> 'cvector':
+        """Return a new cvector with all items of iterable added at the end."""
+        return self.transient().extend(iterable).persistent()
+
+    def transient(self) -> 'cvector_transient':
+        """Mutable builder for batch edits, sharing structure with this vector."""
+        return cvector_transient(self._trie, self._start, self._count)
+
+    ## clist-like conversions
+
+    def sort(self, key: Optional[Callable[[T], Any]] = None, reverse: bool = False) -> 'cvector':
+        """Sort and return a new cvector."""
+        return cvector(sorted(self, key=key, reverse=reverse))
+
+    def reverse(self) -> 'cvector':
+        """Reverse and return a new cvector."""
+        return cvector(reversed(self))
+
+    def to_list(self) -> clist:
+        """Convert to clist."""
+        return clist(self)
+
+    def to_generator(self) -> cgenerator:
+        """Convert to generator."""
+        return cgenerator(self)
+
+    def to_set(self) -> cset:
+        """Convert to set."""
+        return cset(self)
+
+    def to_dict(self) -> cdict:
+        """Convert vector of pairs to dict."""
+        return cdict(self)
+
+
+class cvector_transient:
+    """Mutable builder for a cvector - edits nodes it created in place."""
+
+    def __init__(self, trie: _Trie, start: int, count: int):
+        self._trie, self._start, self._count = trie, start, count
+        self._owned = {}
+
+    def _check(self) -> None:
+        if self._owned is None:
+            raise RuntimeError('transient used after persistent()')
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> Any:
+        self._check()
+        return cvector._make(self._trie, self._start, self._count)[i]
+
+    def append(self, item: T) -> 'cvector_transient':
+        """Add item at the end, in place."""
+        self._check()
+        self._trie = _append(self._trie, self._start + self._count, item, self._owned)
+        self._count += 1
+        return self
+
+    def extend(self, iterable: Iterable[T]) -> 'cvector_transient':
+        """Add all items at the end, in place."""
+        for item in iterable:
+            self.append(item)
+        return self
+
+    def set(self, i: int, item: T) -> 'cvector_transient':
+        """Replace position i, in place."""
+        self._check()
+        p = cvector._make(self._trie, self._start, self._count)._physical(i)
+        self._trie = self._trie.set(p, item, self._owned)
+        return self
+
+    def persistent(self) -> cvector:
+        """Freeze into a cvector - the transient can't be used afterwards."""
+        self._check()
+        self._owned = None
+        return cvector._make(self._trie, self._start, self._count)
@@ -0,0 +1,251 @@
+'''
+
+expr.py
+
+Placeholder expressions - X["price"] * X["qty"] > 100 for lambda r: r["price"] * r["qty"] > 100.
+
+X stands for the element. Indexing, attribute access, arithmetic, comparisons and & | ~ (and,
+or, not - as in pandas; Python's own and / or / not can't be overloaded) on it build an Expr
+tree instead of computing anything. An Expr is callable, so it goes anywhere a function does;
+the first call compiles it to one Python function (X["a"] and X.a alone become
+operator.itemgetter / attrgetter), so calls cost about what the equivalent lambda does.
+
+Because the tree is data, other parts of the library look inside it:
+
+    clazy       inlines the expression source into its fused map / filter / remove loop, so
+                the stage costs no function call at all
+    carray      runs the expression once over the whole array (& | ~ as elementwise numpy ops)
+    ctable      runs it once over the column arrays - X["price"] * X["qty"] > 100 is three
+                numpy kernels, not one Python call per row - and falls back per row whenever
+                numpy would give another result (int64 overflow, division by zero, & | ~ on
+                non-bools), so the expression always agrees with the equivalent lambda
+    checkpoint  fingerprints the expression by its text
+
+Function calls inside an expression are written apply(f, X["a"], ...). Expressions can't be
+used as bool (write & instead of and, and chains like 1 < X < 5 as (X > 1) & (X < 5)).
+
+'''
+
+import operator
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# operators: method suffix -> source symbol
+_BINARY = {
+    'add': '+', 'sub': '-', 'mul': '*', 'truediv': '/', 'floordiv': '//', 'mod': '%', 'pow': '**',
+    'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>=', 'eq': '==', 'ne': '!=',
+}
+# & | ~ - logical in element-at-a-time code, elementwise on numpy arrays
+_LOGICAL = {'and': ('and', '&'), 'or': ('or', '|')}
+_LITERALS = (bool, int, str, bytes, type(None))
+
+
+class Expr:
+    """A placeholder expression - build with X, call like a function."""
+
+    __slots__ = ('_op', '_args', '_scalar', '_vector')
+
+    def __init__(self, op: str, args: Tuple = ()):
+        self._op = op
+        self._args = args
+        self._scalar: Optional[Callable] = None
+        self._vector: Optional[Callable] = None
+
+    ## building
+
+    def __getitem__(self, key: Any) -> 'Expr':
+        return Expr('item', (self, key))
+
+    def __getattr__(self, name: str) -> 'Expr':
+        # private and dunder lookups (copy, pickle, numpy, hasattr probes) must not build Exprs
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return Expr('attr', (self, name))
+
+    def __and__(self, other: Any) -> 'Expr':
+        return Expr('and', (self, _wrap(other)))
+
+    def __rand__(self, other: Any) -> 'Expr':
+        return Expr('and', (_wrap(other), self))
+
+    def __or__(self, other: Any) -> 'Expr':
+        return Expr('or', (self, _wrap(other)))
+
+    def __ror__(self, other: Any) -> 'Expr':
+        return Expr('or', (_wrap(other), self))
+
+    def __invert__(self) -> 'Expr':
+        return Expr('not', (self,))
+
+    def __neg__(self) -> 'Expr':
+        return Expr('neg', (self,))
+
+    def __pos__(self) -> 'Expr':
+        return Expr('pos', (self,))
+
+    def __abs__(self) -> 'Expr':
+        return Expr('abs', (self,))
+
+    # X is not a sequence - without this, iter(X) would index it with 0, 1, 2, ... forever
+    __iter__ = None
+    # make numpy operands defer to Expr's reflected operators
+    __array_ufunc__ = None
+    # __eq__ builds an Expr, so hash by identity (expressions as dict keys, e.g. index caches)
+    __hash__ = object.__hash__
+
+    def __bool__(self) -> bool:
+        raise TypeError('an X expression has no truth value - use & | ~ instead of and / or / not')
+
+    ## evaluating
+
+    def __call__(self, x: Any) -> Any:
+        return (self._scalar or self._compile())(x)
+
+    def _compile(self) -> Callable:
+        if self._scalar is None:
+            self._scalar = _compile(self, vector=False)
+        return self._scalar
+
+    def _compile_vector(self) -> Callable:
+        if self._vector is None:
+            self._vector = _compile(self, vector=True)
+        return self._vector
+
+    def __reduce__(self) -> Tuple:
+        # the compiled functions live in exec'd namespaces - pickle the tree and recompile
+        return Expr, (self._op, self._args)
+
+    def __repr__(self) -> str:
+        source, constants = to_source(self, 'X', vector=True)
+        # longest names first, so _c1 doesn't clobber the start of _c10
+        for name in sorted(constants, key=len, reverse=True):
+            source = source.replace(name, repr(constants[name]))
+        return source
+
+
+def _binary(name: str) -> Tuple[Callable, Callable]:
+    def op(self: Expr, other: Any) -> Expr:
+        return Expr(name, (self, _wrap(other)))
+
+    def rop(self: Expr, other: Any) -> Expr:
+        return Expr(name, (_wrap(other), self))
+
+    op.__name__, rop.__name__ = '__%s__' % name, '__r%s__' % name
+    return op, rop
+
+
+for _name in _BINARY:
+    _op, _rop = _binary(_name)
+    setattr(Expr, '__%s__' % _name, _op)
+    if _name not in ('lt', 'le', 'gt', 'ge', 'eq', 'ne'):  # comparisons reflect to each other
+        setattr(Expr, '__r%s__' % _name, _rop)
+del _name, _op, _rop
+
+X = Expr('arg')
+
+
+def _wrap(value: Any) -> Expr:
+    return value if isinstance(value, Expr) else Expr('const', (value,))
+
+
+def apply(f: Callable, *args: Any) -> Expr:
+    """An expression calling f - apply(len, X["tags"]) > 2."""
+    return Expr('call', (f,) + tuple(map(_wrap, args)))
+
+
+def is_expr(f: Any) -> bool:
+    """Whether f is an X expression."""
+    return isinstance(f, Expr)
+
+
+## --------------------------------------------------------------------------------
+## COMPILATION
+## --------------------------------------------------------------------------------
+
+def _literal(value: Any) -> Optional[str]:
+    """Source text for value, if its repr evaluates back to it."""
+    if type(value) in _LITERALS or (type(value) is float and value == value and
+                                    value not in (float('inf'), float('-inf'))):
+        return repr(value)
+    return None
+
+
+def to_source(
+    expr: Expr, var: str = 'x', prefix: str = '_c', vector: bool = False
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Python source for expr with the element named var, and the constants it refers to.
+
+    Constants without a literal form (functions, objects, tuples used as keys) are referred to
+    by name - prefix + a number - and must be bound to the returned values when the source runs.
+    """
+    constants: Dict[str, Any] = {}
+
+    def constant(value: Any) -> str:
+        text = _literal(value)
+        if text is None:
+            text = '%s%d' % (prefix, len(constants))
+            constants[text] = value
+        return text
+
+    def walk(e: Expr) -> str:
+        op, args = e._op, e._args
+        if op == 'arg':
+            return var
+        if op == 'const':
+            return constant(args[0])
+        if op == 'item':
+            return '%s[%s]' % (walk(args[0]), constant(args[1]))
+        if op == 'attr':
+            if not args[1].isidentifier():
+                raise ValueError('%r is not an attribute name' % args[1])
+            return '%s.%s' % (walk(args[0]), args[1])
+        if op in _BINARY:
+            return '(%s %s %s)' % (walk(args[0]), _BINARY[op], walk(args[1]))
+        if op in _LOGICAL:
+            return '(%s %s %s)' % (walk(args[0]), _LOGICAL[op][vector], walk(args[1]))
+        if op == 'not':
+            return '(~%s)' % walk(args[0]) if vector else '(not %s)' % walk(args[0])
+        if op == 'neg':
+            return '(-%s)' % walk(args[0])
+        if op == 'pos':
+            return '(+%s)' % walk(args[0])
+        if op == 'abs':
+            return 'abs(%s)' % walk(args[0])
+        if op == 'call':
+            return '%s(%s)' % (constant(args[0]), ', '.join(map(walk, args[1:])))
+        raise ValueError('unknown expression node %r' % op)
+
+    return walk(expr), constants
+
+
+def _getter(expr: Expr) -> Optional[Callable]:
+    """operator.itemgetter / attrgetter for X[k] and X.a.b, None for anything else."""
+    if expr._op == 'item' and expr._args[0]._op == 'arg':
+        return operator.itemgetter(expr._args[1])
+    names: List[str] = []
+    while expr._op == 'attr':
+        names.append(expr._args[1])
+        expr = expr._args[0]
+    if names and expr._op == 'arg':
+        return operator.attrgetter('.'.join(reversed(names)))
+    return None
+
+
+def _compile(expr: Expr, vector: bool) -> Callable:
+    getter = _getter(expr)
+    if getter is not None:
+        return getter
+    source, constants = to_source(expr, vector=vector)
+    namespace = dict(constants)
+    exec('def _expr(x):\n    return %s' % source, namespace)
+    return namespace['_expr']
+
+
+def vectorized(f: Callable) -> Callable:
+    """The whole-array form of an X expression (& | ~ elementwise), or f itself."""
+    return f._compile_vector() if isinstance(f, Expr) else f
+
+
+def compiled(f: Callable) -> Callable:
+    """The plain function behind an X expression (one call per element, not two), or f itself."""
+    return f._compile() if isinstance(f, Expr) else f
@@ -0,0 +1,398 @@
+'''
+
+external.py
+
+External-memory sort, join and groupby for streams larger than RAM.
+
+external_sort reads the input in runs of at most memory_limit elements, sorts each run in
+memory, spills it to a temp file as a sequence of pickled blocks, and k-way merges the runs
+back with heapq as a streaming generator. A merge reads at most MERGE_FANIN runs at once -
+with more runs than that, groups of MERGE_FANIN are first merged into longer runs, pass after
+pass, until one final merge is left - so the number of open files stays bounded. Only one
+block per run is held in memory during a merge, and blocks are sized so that MERGE_FANIN of
+them fit in memory_limit elements. The sort is stable and key / reverse behave as in
+clist.sort. Run files are deleted once the merge is exhausted or closed.
+
+external_join and external_groupby are grace-hash variants of cytoolz.join / groupby. While
+the side held in memory (join's left side, all of groupby's input) fits in memory_limit
+elements they behave exactly like the in-memory versions. Beyond that, both inputs are
+hash-partitioned by key into FANOUT temp files each and the partitions are processed one at a
+time - a partition still over the limit is partitioned again with a different hash salt, up to
+MAX_DEPTH times (a single key with more elements than the limit can't be split further, and
+is then held in memory whole). Results stream out partition by partition, so when spilling
+they come in a different order than the in-memory versions: within a partition, join keeps
+cytoolz's order (by right element, unmatched left elements last), and groups keep their
+elements in input order.
+
+'''
+
+import heapq
+import itertools
+import os
+import pickle
+import shutil
+import tempfile
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cytoolz
+from cytoolz.utils import no_default
+
+DEFAULT_MEMORY_LIMIT = 1000000
+BLOCK_SIZE = 1024
+FANOUT = 16
+MERGE_FANIN = 64
+MAX_DEPTH = 3
+
+
+## --------------------------------------------------------------------------------
+## RUN FILES
+## --------------------------------------------------------------------------------
+
+def _write_run(items: Iterable, path: str, block_size: int) -> str:
+    """Spill a sorted run to path in blocks of pickled elements."""
+    with open(path, 'wb') as f:
+        for block in cytoolz.partition_all(block_size, items):
+            pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(f: IO[bytes]) -> Iterator:
+    """Stream a run back one block at a time."""
+    try:
+        while True:
+            try:
+                block = pickle.load(f)
+            except EOFError:
+                return
+            yield from block
+    finally:
+        f.close()
+
+
+class _Reversed:
+    """Inverts comparisons, so a min-heap merge can produce descending order stably."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __lt__(self, other: '_Reversed') -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other: Any) -> bool:
+        return self.value == other.value
+
+
+## --------------------------------------------------------------------------------
+## SORT
+## --------------------------------------------------------------------------------
+
+def external_sort(
+    iterable: Iterable,
+    key: Optional[Callable] = None,
+    reverse: bool = False,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    tmpdir: Optional[str] = None,
+) -> Iterator:
+    """
+    Stable sort of an arbitrarily large iterable, yielding elements in order.
+
+    Args:
+        iterable: Elements to sort (read once)
+        key: Sort key, as in sorted()
+        reverse: Sort descending, keeping equal elements in input order
+        memory_limit: Most elements held in memory at once while building runs
+        tmpdir: Directory for run files (default: the system temp directory)
+    """
+    if memory_limit < 1:
+        raise ValueError('memory_limit must be positive')
+    if tmpdir is not None and not os.path.isdir(tmpdir):
+        raise ValueError('tmpdir %r is not a directory' % tmpdir)
+    keyf = key if key is not None else cytoolz.functoolz.identity
+    # MERGE_FANIN runs each holding one block in memory stay within memory_limit elements
+    block_size = max(1, min(BLOCK_SIZE, memory_limit // MERGE_FANIN))
+
+    workdir = None
+    names = itertools.count()
+    runs: List[str] = []
+    try:
+        source = iter(iterable)
+        while True:
+            chunk = list(itertools.islice(source, memory_limit))
+            if not chunk:
+                break
+            chunk.sort(key=key, reverse=reverse)
+            if not runs and len(chunk) < memory_limit:
+                # everything fit in memory - no need to touch the disk
+                yield from chunk
+                return
+            if workdir is None:
+                workdir = tempfile.mkdtemp(prefix='chaincollections-sort-', dir=tmpdir)
+            runs.append(_write_run(chunk, os.path.join(workdir, str(next(names))), block_size))
+            del chunk
+
+        # merge consecutive groups into longer runs until one merge can take them all - runs
+        # stay in input order, so every pass is stable
+        while len(runs) > MERGE_FANIN:
+            merged = []
+            for group in cytoolz.partition_all(MERGE_FANIN, runs):
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                path = os.path.join(workdir, str(next(names)))
+                merged.append(_write_run(_merge(group, keyf, reverse), path, block_size))
+                for done in group:
+                    os.remove(done)
+            runs = merged
+        yield from _merge(runs, keyf, reverse)
+    finally:
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _merge(paths: Iterable[str], keyf: Callable, reverse: bool) -> Iterator:
+    """Stable k-way merge of sorted run files, given in input order."""
+    files: List[IO[bytes]] = []
+    wrap = _Reversed if reverse else cytoolz.functoolz.identity
+
+    # heap entries are (sort key, run number, position, element) - run number and position
+    # break ties in input order, which keeps the merge stable
+    def _decorate(run_no: int, f: IO[bytes]) -> Iterator:
+        for pos, item in enumerate(_read_run(f)):
+            yield wrap(keyf(item)), run_no, pos, item
+
+    try:
+        for path in paths:
+            files.append(open(path, 'rb'))
+        for entry in heapq.merge(*(_decorate(i, f) for i, f in enumerate(files))):
+            yield entry[3]
+    finally:
+        for f in files:
+            f.close()
+
+
+def _check_limits(memory_limit: int, tmpdir: Optional[str]) -> None:
+    if memory_limit < 1:
+        raise ValueError('memory_limit must be positive')
+    if tmpdir is not None and not os.path.isdir(tmpdir):
+        raise ValueError('tmpdir %r is not a directory' % tmpdir)
+
+
+## --------------------------------------------------------------------------------
+## HASH PARTITIONS
+## --------------------------------------------------------------------------------
+
+class _Partitions:
+    """(key, element) pairs hash-partitioned into temp files, BLOCK_SIZE pairs per pickle."""
+
+    def __init__(self, salt: int, tmpdir: Optional[str]):
+        self.salt = salt
+        self.tmpdir = tmpdir
+        self.files: List[Optional[IO[bytes]]] = [None] * FANOUT
+        self.buffers: List[List[Tuple]] = [[] for _ in range(FANOUT)]
+        self.counts = [0] * FANOUT
+
+    def add(self, k: Any, item: Any) -> None:
+        p = hash((self.salt, k)) % FANOUT
+        buffer = self.buffers[p]
+        buffer.append((k, item))
+        self.counts[p] += 1
+        if len(buffer) >= BLOCK_SIZE:
+            self._flush(p)
+
+    def _flush(self, p: int) -> None:
+        if self.files[p] is None:
+            self.files[p] = tempfile.TemporaryFile(dir=self.tmpdir)
+        pickle.dump(self.buffers[p], self.files[p], pickle.HIGHEST_PROTOCOL)
+        self.buffers[p] = []
+
+    def read(self, p: int) -> Iterator[Tuple]:
+        """Stream partition p back once - its file is closed (and deleted) afterwards."""
+        if self.files[p] is None:
+            buffer, self.buffers[p] = self.buffers[p], []
+            return iter(buffer)
+        if self.buffers[p]:
+            self._flush(p)
+        f, self.files[p] = self.files[p], None
+        f.seek(0)
+        return _read_run(f)
+
+    def split(self, p: int) -> '_Partitions':
+        """Partition p hash-partitioned again, with the next salt."""
+        sub = _Partitions(self.salt + 1, self.tmpdir)
+        try:
+            for k, item in self.read(p):
+                sub.add(k, item)
+        except BaseException:
+            sub.close()
+            raise
+        return sub
+
+    def close(self) -> None:
+        for f in self.files:
+            if f is not None:
+                f.close()
+        self.files = [None] * FANOUT
+        self.buffers = [[] for _ in range(FANOUT)]
+
+
+def _drain(chunk: List, rest: Iterator) -> Iterator:
+    """chunk, then rest - emptying chunk first, so it isn't held while rest is read."""
+    yield from chunk
+    chunk.clear()
+    yield from rest
+
+
+def _partition(pairs: Iterable[Tuple], tmpdir: Optional[str]) -> _Partitions:
+    parts = _Partitions(0, tmpdir)
+    try:
+        for k, item in pairs:
+            parts.add(k, item)
+    except BaseException:
+        parts.close()
+        raise
+    return parts
+
+
+## --------------------------------------------------------------------------------
+## JOIN
+## --------------------------------------------------------------------------------
+
+def _getter(key: Any) -> Callable:
+    """A key function - non-callables index into the element, as in cytoolz.join."""
+    if callable(key):
+        return key
+    if isinstance(key, list):
+        return lambda x: tuple(x[k] for k in key)
+    return lambda x: x[key]
+
+
+def _join_partition(
+    left: Iterable[Tuple], right: Iterable[Tuple], left_default: Any, right_default: Any
+) -> Iterator[Tuple]:
+    table: Dict[Any, List] = {}
+    for k, item in left:
+        table.setdefault(k, []).append(item)
+    matched = set()
+    for k, item in right:
+        matches = table.get(k)
+        if matches is not None:
+            if right_default is not no_default:
+                matched.add(k)
+            for match in matches:
+                yield match, item
+        elif left_default is not no_default:
+            yield left_default, item
+    if right_default is not no_default:
+        for k, items in table.items():
+            if k not in matched:
+                for item in items:
+                    yield item, right_default
+
+
+def _join_partitions(
+    left: _Partitions, right: _Partitions, left_default: Any, right_default: Any,
+    memory_limit: int, depth: int,
+) -> Iterator[Tuple]:
+    for p in range(FANOUT):
+        if left.counts[p] > memory_limit and depth < MAX_DEPTH:
+            sub_left = left.split(p)
+            sub_right = right.split(p)
+            try:
+                yield from _join_partitions(sub_left, sub_right, left_default, right_default,
+                                            memory_limit, depth + 1)
+            finally:
+                sub_left.close()
+                sub_right.close()
+        else:
+            yield from _join_partition(left.read(p), right.read(p), left_default, right_default)
+
+
+def external_join(
+    leftkey: Any,
+    leftseq: Iterable,
+    rightkey: Any,
+    rightseq: Iterable,
+    left_default: Any = no_default,
+    right_default: Any = no_default,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    tmpdir: Optional[str] = None,
+) -> Iterator[Tuple]:
+    """
+    cytoolz.join holding at most about memory_limit left elements in memory, yielding pairs.
+
+    Args:
+        leftkey, leftseq, rightkey, rightseq: As in cytoolz.join - leftseq is the side hashed
+        left_default: Pairs with right elements that match nothing (right / full outer join)
+        right_default: Pairs with left elements that match nothing (left / full outer join)
+        memory_limit: Most left elements held in memory at once
+        tmpdir: Directory for partition files (default: the system temp directory)
+    """
+    _check_limits(memory_limit, tmpdir)
+    leftkey, rightkey = _getter(leftkey), _getter(rightkey)
+    source = iter(leftseq)
+    chunk = list(itertools.islice(source, memory_limit))
+    if len(chunk) < memory_limit:
+        # the left side fits - exactly the in-memory join, right side streamed
+        yield from cytoolz.join(leftkey, chunk, rightkey, rightseq,
+                                left_default=left_default, right_default=right_default)
+        return
+    left = right = None
+    try:
+        left = _partition(((leftkey(x), x) for x in _drain(chunk, source)), tmpdir)
+        right = _partition(((rightkey(x), x) for x in rightseq), tmpdir)
+        yield from _join_partitions(left, right, left_default, right_default, memory_limit, 0)
+    finally:
+        for parts in (left, right):
+            if parts is not None:
+                parts.close()
+
+
+## --------------------------------------------------------------------------------
+## GROUPBY
+## --------------------------------------------------------------------------------
+
+def _group_partitions(parts: _Partitions, memory_limit: int, depth: int) -> Iterator[Tuple]:
+    for p in range(FANOUT):
+        if parts.counts[p] > memory_limit and depth < MAX_DEPTH:
+            sub = parts.split(p)
+            try:
+                yield from _group_partitions(sub, memory_limit, depth + 1)
+            finally:
+                sub.close()
+        else:
+            groups: Dict[Any, List] = {}
+            for k, item in parts.read(p):
+                groups.setdefault(k, []).append(item)
+            yield from groups.items()
+
+
+def external_groupby(
+    key: Callable,
+    iterable: Iterable,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    tmpdir: Optional[str] = None,
+) -> Iterator[Tuple[Any, List]]:
+    """
+    Group elements by key holding at most about memory_limit of them in memory, yielding
+    (key, list of elements) pairs - each key once, elements in input order.
+
+    Args:
+        key: Grouping key function
+        iterable: Elements to group (read once)
+        memory_limit: Most elements held in memory at once (one group larger than this is
+            still materialized whole)
+        tmpdir: Directory for partition files (default: the system temp directory)
+    """
+    _check_limits(memory_limit, tmpdir)
+    source = iter(iterable)
+    chunk = list(itertools.islice(source, memory_limit))
+    if len(chunk) < memory_limit:
+        yield from cytoolz.groupby(key, chunk).items()
+        return
+    parts = _partition(((key(x), x) for x in _drain(chunk, source)), tmpdir)
+    try:
+        yield from _group_partitions(parts, memory_limit, 0)
+    finally:
+        parts.close()
@@ -0,0 +1,276 @@
+'''
+
+files.py
+
+Streaming file sources and sinks.
+
+read_lines / read_jsonl / read_csv (also available as chain.read_lines etc.) return
+cgenerators that read the file in large blocks (or through mmap) and split lines in bulk,
+instead of one readline per element.
+
+byte_range=(start, end) or shard=(i, n) restricts a reader to the lines that *start* inside
+that byte range, so n readers with shard=(0, n) ... (n-1, n) together see every line exactly
+once - handy for par_map or separate processes. Sharding is line based, so a sharded read_csv
+splits quoted fields that contain newlines; read such files unsharded (read_csv then parses
+a text stream, terminators included, and use_mmap doesn't apply).
+
+.write_jsonl(path) and .write_csv(path) on any collection serialize elements in batches and
+write each batch with a single call. They return the number of elements written.
+
+'''
+
+import csv
+import io
+import itertools
+import json
+import mmap
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import cytoolz
+
+from .chaincollections import cgenerator, chain
+
+BLOCK_SIZE = 1 << 20
+BATCH_SIZE = 1000
+
+
+## --------------------------------------------------------------------------------
+## READING
+## --------------------------------------------------------------------------------
+
+def _align(f: Any, pos: int, size: int) -> int:
+    """First line start at or after pos."""
+    if pos <= 0:
+        return 0
+    if pos >= size:
+        return size
+    f.seek(pos - 1)
+    f.readline()
+    return f.tell()
+
+
+def _byte_range(
+    f: Any,
+    size: int,
+    byte_range: Optional[Tuple[int, Optional[int]]],
+    shard: Optional[Tuple[int, int]],
+) -> Tuple[int, int]:
+    """The (start, end) byte offsets of the whole lines a reader should see."""
+    if byte_range is not None and shard is not None:
+        raise ValueError('pass byte_range or shard, not both')
+    if shard is not None:
+        i, n = shard
+        if not 0 <= i < n:
+            raise ValueError('shard must be (i, n) with 0 <= i < n')
+        byte_range = (size * i // n, size * (i + 1) // n)
+    if byte_range is None:
+        return 0, size
+    start, end = byte_range
+    return _align(f, start, size), _align(f, size if end is None else end, size)
+
+
+def _blocks(f: Any, lo: int, hi: int, block_size: int, use_mmap: bool) -> Iterator[bytes]:
+    if use_mmap and hi > lo:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for pos in range(lo, hi, block_size):
+                yield mm[pos:min(pos + block_size, hi)]
+        return
+    f.seek(lo)
+    remaining = hi - lo
+    while remaining > 0:
+        block = f.read(min(block_size, remaining))
+        if not block:
+            return
+        remaining -= len(block)
+        yield block
+
+
+def _line_batches(blocks: Iterable[bytes], encoding: str) -> Iterator[List[str]]:
+    """Split blocks into lists of lines without terminators, decoding a block at a time."""
+    carry = b''
+    for block in blocks:
+        cut = block.rfind(b'\n')
+        if cut < 0:
+            carry += block
+            continue
+        text = (carry + block[:cut]).decode(encoding)
+        carry = block[cut + 1:]
+        lines = text.split('\n')
+        if '\r' in text:
+            lines = [line[:-1] if line.endswith('\r') else line for line in lines]
+        yield lines
+    if carry:
+        line = carry.decode(encoding)
+        yield [line[:-1] if line.endswith('\r') else line]
+
+
+def _read_line_batches(
+    path: str,
+    encoding: str,
+    byte_range: Optional[Tuple[int, Optional[int]]],
+    shard: Optional[Tuple[int, int]],
+    use_mmap: bool,
+    block_size: int,
+) -> Iterator[List[str]]:
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        lo, hi = _byte_range(f, size, byte_range, shard)
+        yield from _line_batches(_blocks(f, lo, hi, block_size, use_mmap), encoding)
+
+
+def read_lines(
+    path: str,
+    encoding: str = 'utf-8',
+    byte_range: Optional[Tuple[int, Optional[int]]] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    use_mmap: bool = False,
+    block_size: int = BLOCK_SIZE,
+) -> cgenerator:
+    """
+    Stream the lines of a text file, without line terminators.
+
+    Args:
+        path: File to read
+        encoding: Text encoding
+        byte_range: (start, end) - only lines starting in this byte range (end None for EOF)
+        shard: (i, n) - the i-th of n equal byte ranges
+        use_mmap: Read through mmap instead of buffered reads
+        block_size: Bytes per read
+    """
+    batches = _read_line_batches(path, encoding, byte_range, shard, use_mmap, block_size)
+    return cgenerator(itertools.chain.from_iterable(batches))
+
+
+def _read_jsonl(batches: Iterable[List[str]]) -> Iterator[Any]:
+    loads = json.loads
+    for lines in batches:
+        # str.strip drops blank lines without a Python-level call per line
+        yield from map(loads, filter(str.strip, lines))
+
+
+def read_jsonl(
+    path: str,
+    encoding: str = 'utf-8',
+    byte_range: Optional[Tuple[int, Optional[int]]] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    use_mmap: bool = False,
+    block_size: int = BLOCK_SIZE,
+) -> cgenerator:
+    """Stream one JSON value per line, skipping blank lines (options as read_lines)."""
+    batches = _read_line_batches(path, encoding, byte_range, shard, use_mmap, block_size)
+    return cgenerator(_read_jsonl(batches))
+
+
+def _read_csv(
+    path: str, header: bool, read_opts: Dict[str, Any], fmtparams: Dict[str, Any]
+) -> Iterator[Any]:
+    if read_opts.get('byte_range') is None and read_opts.get('shard') is None:
+        # whole file: csv.reader gets the line terminators, so quoted newlines survive
+        with open(path, encoding=read_opts['encoding'], newline='',
+                  buffering=read_opts.get('block_size', BLOCK_SIZE)) as f:
+            rows = csv.reader(f, **fmtparams)
+            fieldnames = next(rows, None) if header else None
+            if not header:
+                yield from rows
+            elif fieldnames is not None:
+                for row in rows:
+                    yield dict(zip(fieldnames, row))
+        return
+    rows = csv.reader(read_lines(path, **read_opts), **fmtparams)
+    if not header:
+        yield from rows
+        return
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        lo, _ = _byte_range(f, size, read_opts.get('byte_range'), read_opts.get('shard'))
+        f.seek(0)
+        first = f.readline().decode(read_opts['encoding'])
+    fieldnames = next(csv.reader([first], **fmtparams), None)
+    if fieldnames is None:
+        return
+    if lo == 0:
+        next(rows, None)
+    for row in rows:
+        yield dict(zip(fieldnames, row))
+
+
+def read_csv(path: str, header: bool = True, encoding: str = 'utf-8', **kwargs: Any) -> cgenerator:
+    """
+    Stream CSV rows - dicts keyed by the header row, or lists when header=False.
+
+    byte_range / shard / use_mmap / block_size are passed to read_lines for sharded reads;
+    anything else (delimiter, quotechar, ...) to csv.reader. Every shard gets the header's field
+    names. Unsharded reads keep quoted newlines inside fields.
+    """
+    read_opts = {k: kwargs.pop(k) for k in ('byte_range', 'shard', 'use_mmap', 'block_size')
+                 if k in kwargs}
+    read_opts['encoding'] = encoding
+    return cgenerator(_read_csv(path, header, read_opts, kwargs))
+
+
+## --------------------------------------------------------------------------------
+## WRITING
+## --------------------------------------------------------------------------------
+
+def write_jsonl(
+    iterable: Iterable,
+    path: str,
+    batch_size: int = BATCH_SIZE,
+    encoding: str = 'utf-8',
+    **dumps_kwargs: Any,
+) -> int:
+    """Write one JSON value per line, one write call per batch. Returns the element count."""
+    dumps = json.dumps
+    count = 0
+    with open(path, 'w', encoding=encoding, newline='\n') as f:
+        for batch in cytoolz.partition_all(batch_size, iterable):
+            f.write(''.join([dumps(item, **dumps_kwargs) + '\n' for item in batch]))
+            count += len(batch)
+    return count
+
+
+def write_csv(
+    iterable: Iterable,
+    path: str,
+    fieldnames: Optional[Sequence[str]] = None,
+    header: bool = True,
+    batch_size: int = BATCH_SIZE,
+    encoding: str = 'utf-8',
+    **fmtparams: Any,
+) -> int:
+    """
+    Write rows as CSV, one write call per batch. Returns the row count.
+
+    Dict rows are written by field name (fieldnames defaults to the first row's keys); any other
+    row is written as a sequence of values.
+    """
+    count = 0
+    buffer = io.StringIO()
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        writer = None
+        for batch in cytoolz.partition_all(batch_size, iterable):
+            if writer is None:
+                if isinstance(batch[0], dict):
+                    fieldnames = list(fieldnames or batch[0])
+                    writer = csv.DictWriter(buffer, fieldnames, **fmtparams)
+                    if header:
+                        writer.writeheader()
+                else:
+                    writer = csv.writer(buffer, **fmtparams)
+                    if header and fieldnames:
+                        writer.writerow(fieldnames)
+            writer.writerows(batch)
+            f.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+            count += len(batch)
+        if writer is None and header and fieldnames:
+            csv.writer(f, **fmtparams).writerow(fieldnames)
+    return count
+
+
+# constructors hang off chain(), next to the type detection
+chain.read_lines = read_lines
+chain.read_jsonl = read_jsonl
+chain.read_csv = read_csv
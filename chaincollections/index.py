@@ -0,0 +1,204 @@
+'''
+
+index.py
+
+Reusable indexes over a clist.
+
+clist.index_by(key) builds a HashIndex (key -> elements) and clist.sorted_index(key) a
+SortedIndex (elements ordered by key, bisect-backed range queries). Both are cached on the
+clist they were built from, so later calls with the same key function - and .groupby(key) on
+that clist - reuse them instead of rescanning. A HashIndex passed to .join(index, leftkey) from
+any other collection is probed instead of the clist; the pairs come out grouped by left element
+(HashIndex.probe), so a join only uses an index when given one explicitly.
+
+An index belongs to one clist object. Collections derived from it (.map, .filter, ...) are new
+objects without an index, and an index whose clist has changed length since it was built is
+rebuilt on next use. In-place edits that keep the length the same are not detected - call
+.index_by again after those.
+
+The cache lives outside the clist, so pickling or copying a clist never carries its indexes
+along, and it goes away with the clist (an index refers to its clist weakly). It keeps the
+MAX_INDEXES most recently used indexes per clist - each distinct key function (a new lambda or
+X expression on every call counts as a new one) takes a slot.
+
+'''
+
+import bisect
+import collections
+import weakref
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .chaincollections import T, cdict, clist
+
+
+class HashIndex:
+    """Hash index of a clist by a key function."""
+
+    def __init__(self, source: clist, key: Callable[[T], Any]):
+        self._source = weakref.ref(source)
+        self.key = key
+        self._size = len(source)
+        table: Dict[Any, List] = {}
+        for item in source:
+            k = key(item)
+            if k in table:
+                table[k].append(item)
+            else:
+                table[k] = [item]
+        self._table = table
+
+    @property
+    def source(self) -> Optional[clist]:
+        """The indexed clist (None once it has been garbage collected)."""
+        return self._source()
+
+    def valid_for(self, seq: Any) -> bool:
+        """True if this index still describes seq."""
+        return seq is self.source and len(seq) == self._size
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __contains__(self, k: Any) -> bool:
+        return k in self._table
+
+    def keys(self) -> clist:
+        """Distinct keys, in order of first occurrence."""
+        return clist(self._table)
+
+    def lookup(self, k: Any) -> clist:
+        """All elements with key k, in source order."""
+        return clist(self._table.get(k, ()))
+
+    def find(self, k: Any) -> Optional[T]:
+        """First element with key k, or None."""
+        matches = self._table.get(k)
+        return matches[0] if matches else None
+
+    def groupby(self) -> cdict:
+        """Same result as source.groupby(key)."""
+        return cdict(self._table).valmap(clist)
+
+    def count_by(self) -> cdict:
+        """Same result as source.count_by(key)."""
+        return cdict(self._table).valmap(len)
+
+    def probe(self, leftseq: Iterable, leftkey: Callable) -> Iterator[Tuple[Any, T]]:
+        """
+        Inner join leftseq against the indexed elements, yielding (left, right) pairs.
+
+        Pairs come out grouped by left element (cytoolz.join groups them by right element).
+        """
+        table = self._table
+        for left in leftseq:
+            matches = table.get(leftkey(left))
+            if matches:
+                for right in matches:
+                    yield left, right
+
+
+class SortedIndex:
+    """Elements of a clist ordered by a key function, for range queries."""
+
+    def __init__(self, source: clist, key: Callable[[T], Any]):
+        self._source = weakref.ref(source)
+        self.key = key
+        self._size = len(source)
+        pairs = sorted(((key(item), i) for i, item in enumerate(source)), key=lambda p: p[0])
+        self._keys = [k for k, _ in pairs]
+        self._items = [source[i] for _, i in pairs]
+
+    @property
+    def source(self) -> Optional[clist]:
+        """The indexed clist (None once it has been garbage collected)."""
+        return self._source()
+
+    def valid_for(self, seq: Any) -> bool:
+        """True if this index still describes seq."""
+        return seq is self.source and len(seq) == self._size
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lookup(self, k: Any) -> clist:
+        """All elements with key k, in source order."""
+        start = bisect.bisect_left(self._keys, k)
+        return clist(self._items[start:bisect.bisect_right(self._keys, k, start)])
+
+    def range(
+        self,
+        lo: Any = None,
+        hi: Any = None,
+        inclusive: Tuple[bool, bool] = (True, False),
+    ) -> clist:
+        """Elements with lo <= key < hi (bounds configurable, None for unbounded), by key."""
+        if lo is None:
+            start = 0
+        else:
+            start = (bisect.bisect_left if inclusive[0] else bisect.bisect_right)(self._keys, lo)
+        if hi is None:
+            stop = len(self._keys)
+        else:
+            stop = (bisect.bisect_right if inclusive[1] else bisect.bisect_left)(self._keys, hi)
+        return clist(self._items[start:stop])
+
+    def rank(self, k: Any) -> int:
+        """Number of elements with key < k."""
+        return bisect.bisect_left(self._keys, k)
+
+    def min(self) -> T:
+        """Element with the smallest key."""
+        return self._items[0]
+
+    def max(self) -> T:
+        """Element with the largest key (the last one in source order among ties)."""
+        return self._items[-1]
+
+    def to_list(self) -> clist:
+        """All elements ordered by key - same as source.sort(key=key)."""
+        return clist(self._items)
+
+
+_KINDS = {'hash': HashIndex, 'sorted': SortedIndex}
+
+
+MAX_INDEXES = 8
+
+# id(clist) -> (weak reference to the clist, {(kind, key): index} in least recently used order)
+_CACHE: Dict[int, Tuple[weakref.ref, 'collections.OrderedDict']] = {}
+
+
+def _indexes(seq: Any, create: bool = False) -> Optional['collections.OrderedDict']:
+    entry = _CACHE.get(id(seq))
+    if entry is not None and entry[0]() is seq:
+        return entry[1]
+    if not create:
+        return None
+    i = id(seq)
+    cache: 'collections.OrderedDict' = collections.OrderedDict()
+    _CACHE[i] = (weakref.ref(seq, lambda _, i=i: _CACHE.pop(i, None)), cache)
+    return cache
+
+
+def build_index(seq: clist, kind: str, key: Callable) -> Any:
+    """Return the cached index of seq for (kind, key), building it if missing or stale."""
+    cache = _indexes(seq, create=True)
+    index = cache.get((kind, key))
+    if index is None or not index.valid_for(seq):
+        index = cache[(kind, key)] = _KINDS[kind](seq, key)
+        if len(cache) > MAX_INDEXES:
+            cache.popitem(last=False)
+    cache.move_to_end((kind, key))
+    return index
+
+
+def cached_index(seq: Any, kind: str, key: Callable) -> Any:
+    """Return a still-valid cached index of seq for (kind, key), or None."""
+    cache = _indexes(seq)
+    if not cache:
+        return None
+    index = cache.get((kind, key))
+    if index is None or not index.valid_for(seq):
+        return None
+    cache.move_to_end((kind, key))
+    return index
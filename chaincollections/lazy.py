@@ -0,0 +1,338 @@
+'''
+
+lazy.py
+
+Deferred execution for chains.
+
+clazy records a chain as a query plan instead of building a new collection at every step.
+Adjacent map / filter / remove / pluck stages are fused into a single compiled loop, with X
+expressions (see expr.py) inlined into it; every other stage is applied as a streaming
+iterator, and nothing runs until a terminal such as .to_list(), .reduce() or .frequencies is
+reached.
+
+Terminals which only need a prefix (take, first, find, any_match, ...) stop pulling from the
+source as soon as they have their answer.
+
+Results are the same as the eager clist chain - nested collections (partitions, windows,
+plucked tuples) come back as clist.
+
+'''
+
+import itertools
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+
+import cytoolz
+from cytoolz.utils import no_default
+
+from .chaincollections import T, cgenerator, clist
+from .expr import Expr, to_source
+
+## --------------------------------------------------------------------------------
+## FUSION
+## --------------------------------------------------------------------------------
+
+FUSIBLE = ('map', 'filter', 'remove', 'pluck')
+
+_FUSED_CACHE = {}
+# expression sources are part of the shape - bound the cache for plans built in a loop
+_FUSED_CACHE_SIZE = 1024
+
+
+def _compile_fused(kinds: Tuple) -> Callable:
+    """
+    Build (once per shape) a generator function running a run of fusible stages in one loop.
+
+    A kind is a stage name, or (name, source, constants) for an X expression (see expr.py),
+    whose source is inlined into the loop - fi is then the tuple of its constants' values.
+    """
+    try:
+        return _FUSED_CACHE[kinds]
+    except KeyError:
+        pass
+    args = ', '.join('f%d' % i for i in range(len(kinds)))
+    lines = ['def _fused(source, %s):' % args]
+    for i, kind in enumerate(kinds):
+        if isinstance(kind, tuple) and kind[2]:
+            lines.append('    %s, = f%d' % (', '.join(kind[2]), i))
+    lines.append('    for x in source:')
+    for i, kind in enumerate(kinds):
+        if isinstance(kind, tuple):
+            kind, call = kind[0], kind[1]
+        else:
+            call = 'f%d(x)' % i
+        if kind == 'map':
+            lines.append('        x = %s' % call)
+        elif kind == 'filter':
+            lines.append('        if not %s: continue' % call)
+        elif kind == 'remove':
+            lines.append('        if %s: continue' % call)
+        elif kind == 'pluck':
+            lines.append('        x = x[f%d]' % i)
+        else:
+            raise ValueError('stage %r cannot be fused' % kind)
+    lines.append('        yield x')
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    if len(_FUSED_CACHE) >= _FUSED_CACHE_SIZE:
+        _FUSED_CACHE.clear()
+    fused = _FUSED_CACHE[kinds] = namespace['_fused']
+    return fused
+
+
+def _fusible(i: int, kind: str, arg: Any) -> Tuple[Any, Any]:
+    """The shape entry and argument of stage i of a fused run."""
+    if kind != 'pluck' and isinstance(arg, Expr):
+        source, constants = to_source(arg, 'x', '_f%d_c' % i)
+        return (kind, source, tuple(constants)), tuple(constants.values())
+    return kind, arg
+
+
+def _run(source: Iterable, stages: Tuple) -> Iterator:
+    """Execute a plan against its source, fusing consecutive element-wise stages."""
+    it = iter(source)
+    i = 0
+    while i < len(stages):
+        if stages[i][0] in FUSIBLE:
+            j = i
+            while j < len(stages) and stages[j][0] in FUSIBLE:
+                j += 1
+            kinds, args = zip(*(_fusible(n, *s) for n, s in enumerate(stages[i:j])))
+            it = _compile_fused(kinds)(it, *args)
+            i = j
+        else:
+            it = stages[i][1](it, *stages[i][3])
+            i += 1
+    return iter(it)
+
+
+## --------------------------------------------------------------------------------
+## LAZY CHAIN
+## --------------------------------------------------------------------------------
+
+class clazy(cgenerator):
+    """Lazy chain - records stages and runs them only when a terminal is reached."""
+
+    def __init__(self, iterable: Iterable[T], stages: Tuple = ()):
+        """Initialize a plan over a source iterable."""
+        self.iterable = iterable
+        self.stages = tuple(stages)
+
+    def __iter__(self):
+        """Run the plan against the source."""
+        return _run(self.iterable, self.stages)
+
+    def __repr__(self) -> str:
+        return 'clazy(%s)' % ' -> '.join(('source',) + self.plan)
+
+    @property
+    def plan(self) -> Tuple[str, ...]:
+        """Names of the recorded stages, in order."""
+        return tuple(s[0] if s[0] in FUSIBLE else s[2] for s in self.stages)
+
+    def _then(self, kind: str, arg: Any) -> 'clazy':
+        return clazy(self.iterable, self.stages + ((kind, arg),))
+
+    def _op(self, name: str, f: Callable[..., Iterable], *fns: Callable) -> 'clazy':
+        # f(iterator, *fns) builds the stage - user callables are passed separately so that
+        # instrumentation (explain) can wrap them
+        return clazy(self.iterable, self.stages + (('op', f, name, fns),))
+
+    def lazy(self) -> 'clazy':
+        """Already lazy."""
+        return self
+
+    def explain(self, memory: bool = True) -> 'Profile':
+        """
+        Run the plan to the end with every stage metered separately and return the Profile.
+
+        Stages are not fused while explaining. A one-shot source is consumed.
+        """
+        from .profiling import explain
+        return explain(self.iterable, self.stages, self.plan, memory=memory)
+
+    ## fusible stages
+
+    def map(self, f: Callable, cache: Optional['MemoCache'] = None) -> 'clazy':
+        """Map a function over the elements (memoized through cache, if given)."""
+        return self._then('map', f if cache is None else cache.wrap(f))
+
+    def filter(self, predicate: Callable) -> 'clazy':
+        """Filter elements based on a predicate."""
+        return self._then('filter', bool if predicate is None else predicate)
+
+    def remove(self, predicate: Callable) -> 'clazy':
+        """Remove elements that satisfy the predicate."""
+        return self._then('remove', predicate)
+
+    def pluck(self, ind: Union[int, Iterable[int]]) -> 'clazy':
+        """Extract values at the given indices from each element."""
+        if cytoolz.isiterable(ind):
+            ind = tuple(ind)
+            return self._then('map', lambda x: clist(x[i] for i in ind))
+        return self._then('pluck', ind)
+
+    ## streaming stages
+
+    def take(self, n: int) -> 'clazy':
+        """Take the first n elements."""
+        return self._op('take', lambda it: itertools.islice(it, n))
+
+    def drop(self, n: int) -> 'clazy':
+        """Drop the first n elements."""
+        return self._op('drop', lambda it: itertools.islice(it, n, None))
+
+    def take_while(self, predicate: Callable) -> 'clazy':
+        """Take elements while predicate is true."""
+        return self._op('take_while', lambda it, p: itertools.takewhile(p, it), predicate)
+
+    def drop_while(self, predicate: Callable) -> 'clazy':
+        """Drop elements while predicate is true."""
+        return self._op('drop_while', lambda it, p: itertools.dropwhile(p, it), predicate)
+
+    def stride_by(self, n: int) -> 'clazy':
+        """Take every nth element."""
+        return self._op('stride_by', lambda it: itertools.islice(it, None, None, n))
+
+    def unique(self, key: Callable = cytoolz.functoolz.identity) -> 'clazy':
+        """Return only unique elements."""
+        return self._op('unique', lambda it, k: cytoolz.unique(it, k), key)
+
+    def enumerate(self, start: int = 0) -> 'clazy':
+        """Return (index, item) pairs."""
+        return self._op('enumerate', lambda it: enumerate(it, start))
+
+    def concat(self) -> 'clazy':
+        """Concatenate nested iterables."""
+        return self._op('concat', cytoolz.concat)
+
+    def flatten(self) -> 'clazy':
+        """Flatten one level of nesting."""
+        return self._op('flatten', cytoolz.concat)
+
+    def mapcat(self, f: Callable) -> 'clazy':
+        """Map a function over elements and concatenate results."""
+        return self._op('mapcat', lambda it, g: cytoolz.concat(_.map(g) for _ in it), f)
+
+    def pipe_map(self, *fs: Callable, cache: Optional['MemoCache'] = None) -> 'clazy':
+        """Apply a sequence of functions to each element (memoized through cache, if given)."""
+        return self.map(lambda x: cytoolz.functoolz.pipe(x, *fs), cache)
+
+    def zip_with(self, seq: Iterable, func: Callable) -> 'clazy':
+        """Combine two sequences using a function."""
+        return self._op('zip_with', lambda it, g: map(g, it, seq), func)
+
+    def diff(self, *seqs: Iterable, **kwargs) -> 'clazy':
+        """Return elements in self that are not in any of the sequences."""
+        return self._op('diff', lambda it: cytoolz.diff(*((it,) + seqs), **kwargs))
+
+    def interleave(self, seq: Iterable, swap: bool = False) -> 'clazy':
+        """Interleave elements from two sequences."""
+        return self._op(
+            'interleave', lambda it: cytoolz.interleave((seq, it) if swap else (it, seq))
+        )
+
+    def interpose(self, el: Any) -> 'clazy':
+        """Insert an element between each item."""
+        return self._op('interpose', lambda it: cytoolz.interpose(el, it))
+
+    def join(
+        self, rightseq: Iterable, leftkey: Callable, rightkey: Callable,
+        left_default: Any = no_default, right_default: Any = no_default,
+        memory_limit: Optional[int] = None, tmpdir: Optional[str] = None,
+    ) -> 'clazy':
+        """Join two sequences based on matching keys (memory_limit spills, as in CBase.join)."""
+        if memory_limit is not None:
+            from .external import external_join
+            return self._op('join', lambda it, lk, rk: external_join(
+                lk, it, rk, rightseq, left_default, right_default, memory_limit, tmpdir,
+            ), leftkey, rightkey)
+        return self._op('join', lambda it, lk, rk: cytoolz.join(
+            lk, it, rk, rightseq, left_default=left_default, right_default=right_default,
+        ), leftkey, rightkey)
+
+    def partition(self, n: int) -> 'clazy':
+        """Partition sequence into clists of length n."""
+        return self._op('partition', lambda it: map(clist, cytoolz.partition(n, it)))
+
+    def partition_all(self, n: int) -> 'clazy':
+        """Partition sequence into clists of length n, the last one possibly shorter."""
+        return self._op('partition_all', lambda it: map(clist, cytoolz.partition_all(n, it)))
+
+    def partition_by(self, f: Callable) -> 'clazy':
+        """Partition a sequence based on result of a function."""
+        return self._op(
+            'partition_by', lambda it, g: map(clist, cytoolz.partitionby(g, it)), f
+        )
+
+    def sliding_window(self, n: int) -> 'clazy':
+        """Create a sliding window of elements."""
+        return self._op('sliding_window', lambda it: map(clist, cytoolz.sliding_window(n, it)))
+
+    def map_batches(
+        self, f: Callable, size: int = 256, max_latency: Optional[float] = None, **kwargs
+    ) -> 'clazy':
+        """Call f on lists of up to size elements and flatten its results."""
+        from .batches import map_batches
+        return self._op(
+            'map_batches', lambda it, g: map_batches(g, it, size, max_latency, **kwargs), f
+        )
+
+    def par_map(self, f: Callable, **kwargs) -> 'clazy':
+        """Map a function over the elements in a thread/process pool."""
+        from .parallel import par_map
+        return self._op('par_map', lambda it, g: par_map(g, it, **kwargs), f)
+
+    def par_filter(self, predicate: Callable, **kwargs) -> 'clazy':
+        """Filter elements in a thread/process pool."""
+        from .parallel import par_filter
+        return self._op('par_filter', lambda it, p: par_filter(p, it, **kwargs), predicate)
+
+    def par_mapcat(self, f: Callable, **kwargs) -> 'clazy':
+        """Map f (returning an iterable) in a thread/process pool and concatenate."""
+        from .parallel import par_mapcat
+        return self._op('par_mapcat', lambda it, g: par_mapcat(g, it, **kwargs), f)
+
+    ## barriers - these need to see the whole upstream before emitting anything
+
+    def tail(self, n: int) -> 'clazy':
+        """Take the last n elements."""
+        return self._op('tail', lambda it: cytoolz.tail(n, it))
+
+    def top_k(self, k: int, key: Callable = cytoolz.functoolz.identity) -> 'clazy':
+        """Return the k largest elements."""
+        return self._op('top_k', lambda it, g: cytoolz.topk(k, it, g), key)
+
+    def sort(self, key: Optional[Callable] = None, reverse: bool = False) -> 'clazy':
+        """Sort the elements."""
+        if key is None:
+            return self._op('sort', lambda it: sorted(it, reverse=reverse))
+        return self._op('sort', lambda it, k: sorted(it, key=k, reverse=reverse), key)
+
+    def reverse(self) -> 'clazy':
+        """Reverse the elements."""
+        return self._op('reverse', lambda it: reversed(list(it)))
+
+    ## terminals
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[T, 'clazy']:
+        """Get item at index or slice, consuming only the needed prefix where possible."""
+        if isinstance(key, slice):
+            if all(i is None or i >= 0 for i in (key.start, key.stop)) and (key.step or 1) > 0:
+                return self._op(
+                    'slice', lambda it: itertools.islice(it, key.start, key.stop, key.step)
+                )
+            return clazy(self.to_list()[key])
+        if key >= 0:
+            for item in itertools.islice(self, key, None):
+                return item
+            raise IndexError('clazy index out of range')
+        return self.to_list()[key]
+
+    def find(self, predicate: Callable) -> Optional[T]:
+        """Find first element that satisfies predicate, or None if not found."""
+        return next(iter(self.filter(predicate)), None)
+
+    def to_generator(self) -> cgenerator:
+        """Convert to a plain (one-shot) generator over the plan's output."""
+        return cgenerator(iter(self))
+
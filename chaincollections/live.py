@@ -0,0 +1,292 @@
+'''
+
+live.py
+
+Incrementally maintained aggregates (materialized views) over growing collections.
+
+    live_count_by(key)          cdict key -> count              O(1) per element
+    live_reduce_by(key, op)     cdict key -> reduced value      O(1) per element
+    live_top_k(k, key)          clist of the k largest          O(log n) per element
+
+A view built from a clist follows it: elements appended to that clist in place (list.append,
+list.extend, +=) are folded in the next time the view is read, so a refresh costs
+O(new elements) instead of recomputing over the whole list. As with indexes (index.py), other
+in-place edits are only noticed when they shrink the list, which rebuilds the view from
+scratch. Elements can also be fed to the view directly - view.append(x), view.extend(batch) -
+which appends them to the followed clist too, if there is one; a view built from any other
+iterable consumes it once and is then fed only this way.
+
+view.remove(x) takes an element back out - it is removed from the followed clist as well.
+count_by and top_k can always do this; reduce_by needs inverse=, with
+op(inverse(acc, x), x) == acc (e.g. operator.sub for operator.add).
+
+view.snapshot() returns the current result. Later updates never change a snapshot: the view
+copies its state on the first update after a snapshot was taken (copy-on-write), so reading
+repeatedly between updates costs nothing and a snapshot can be handed to another thread while
+the view keeps updating. Snapshots are shared, not copied - treat them as read-only. Updates
+and snapshots hold a lock, so a view can be fed and read from different threads.
+
+'''
+
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+import cytoolz
+from cytoolz.utils import no_default
+
+from .chaincollections import T, cdict, clist
+from .expr import compiled
+
+
+class LiveView:
+    """Base class of the live_* views - follows a clist, or is fed directly."""
+
+    def __init__(self, source: Optional[Iterable] = None):
+        self._lock = threading.RLock()
+        self._shared = False
+        self.source = source if isinstance(source, list) else None
+        self._seen = 0
+        self._reset()
+        if self.source is not None:
+            self.refresh()
+        elif source is not None:
+            self._add_all(source)
+
+    def __len__(self) -> int:
+        """Number of elements the view currently covers."""
+        with self._lock:
+            self.refresh()
+            return self._count
+
+    def append(self, x: T) -> 'LiveView':
+        """Add one element (to the followed clist too, if any)."""
+        return self.extend((x,))
+
+    def extend(self, xs: Iterable[T]) -> 'LiveView':
+        """Add a batch of elements (to the followed clist too, if any)."""
+        with self._lock:
+            if self.source is None:
+                self._add_all(xs)
+                return self
+            self.refresh()
+            list.extend(self.source, xs)
+            self.refresh()
+        return self
+
+    def remove(self, x: T) -> 'LiveView':
+        """Take one element x back out (from the followed clist too, if any)."""
+        with self._lock:
+            self.refresh()
+            source = self.source
+            # take x out of the clist first, and put it back if the view can't drop it, so a
+            # failed remove leaves both unchanged
+            if source is not None:
+                i = list.index(source, x)
+                list.__delitem__(source, i)
+            try:
+                self._unshare()
+                self._remove(x)
+            except BaseException:
+                if source is not None:
+                    list.insert(source, i, x)
+                raise
+            self._count -= 1
+            if source is not None:
+                self._seen -= 1
+        return self
+
+    def refresh(self) -> 'LiveView':
+        """Fold in elements appended to the followed clist since the last read."""
+        with self._lock:
+            source = self.source
+            if source is None or len(source) == self._seen:
+                return self
+            if len(source) < self._seen:
+                self._shared = False
+                self._reset()
+                self._seen = 0
+            new = list.__getitem__(source, slice(self._seen, None))
+            self._seen += len(new)
+            self._add_all(new)
+        return self
+
+    def snapshot(self) -> Any:
+        """The current result - never changed by later updates (see the module docstring)."""
+        with self._lock:
+            self.refresh()
+            self._shared = True
+            return self._result()
+
+    def _add_all(self, xs: Iterable[T]) -> None:
+        xs = xs if isinstance(xs, list) else list(xs)
+        if xs:
+            self._unshare()
+            self._add(xs)
+            self._count += len(xs)
+
+    def _unshare(self) -> None:
+        if self._shared:
+            self._copy()
+            self._shared = False
+
+    ## implemented by subclasses
+
+    def _reset(self) -> None:
+        self._count = 0
+
+    def _add(self, xs: list) -> None:
+        raise NotImplementedError
+
+    def _remove(self, x: T) -> None:
+        raise NotImplementedError
+
+    def _copy(self) -> None:
+        raise NotImplementedError
+
+    def _result(self) -> Any:
+        raise NotImplementedError
+
+
+class LiveCountBy(LiveView):
+    """Live count_by(key) - a cdict of key -> count."""
+
+    def __init__(
+        self,
+        key: Callable[[T], Any] = cytoolz.functoolz.identity,
+        source: Optional[Iterable] = None,
+    ):
+        self.key = key
+        self._key = compiled(key)
+        super().__init__(source)
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._counts = cdict()
+
+    def _add(self, xs: list) -> None:
+        counts = self._counts
+        get = counts.get
+        # one C-level pass over the batch, then one update per distinct key in it
+        for k, n in cytoolz.frequencies(map(self._key, xs)).items():
+            counts[k] = get(k, 0) + n
+
+    def _remove(self, x: T) -> None:
+        k = self._key(x)
+        n = self._counts.get(k, 0)
+        if not n:
+            raise ValueError('%r is not in the view' % (x,))
+        if n == 1:
+            del self._counts[k]
+        else:
+            self._counts[k] = n - 1
+
+    def _copy(self) -> None:
+        self._counts = cdict(self._counts)
+
+    def _result(self) -> cdict:
+        return self._counts
+
+
+class LiveReduceBy(LiveView):
+    """Live reduce_by(key, op) - a cdict of key -> op folded over the group."""
+
+    def __init__(
+        self,
+        key: Callable[[T], Any],
+        op: Callable[[Any, T], Any],
+        init: Any = no_default,
+        inverse: Optional[Callable[[Any, T], Any]] = None,
+        source: Optional[Iterable] = None,
+    ):
+        self.key = key
+        self.op = op
+        self.init = init
+        self.inverse = inverse
+        self._key = compiled(key)
+        super().__init__(source)
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._values = cdict()
+        # group sizes, so a group emptied by remove() disappears as it would from reduce_by
+        self._sizes = {}
+
+    def _add(self, xs: list) -> None:
+        values, sizes, key, op, init = self._values, self._sizes, self._key, self.op, self.init
+        for x in xs:
+            k = key(x)
+            if k in values:
+                values[k] = op(values[k], x)
+                sizes[k] += 1
+            else:
+                if init is no_default:
+                    values[k] = x
+                else:
+                    values[k] = op(init() if callable(init) else init, x)
+                sizes[k] = 1
+
+    def _remove(self, x: T) -> None:
+        if self.inverse is None:
+            raise TypeError('live_reduce_by needs inverse= to remove elements')
+        k = self._key(x)
+        if k not in self._sizes:
+            raise ValueError('%r is not in the view' % (x,))
+        if self._sizes[k] == 1:
+            del self._values[k], self._sizes[k]
+        else:
+            self._values[k] = self.inverse(self._values[k], x)
+            self._sizes[k] -= 1
+
+    def _copy(self) -> None:
+        self._values = cdict(self._values)
+
+    def _result(self) -> cdict:
+        return self._values
+
+
+class LiveTopK(LiveView):
+    """
+    Live top_k(k, key) - a clist of the k largest elements, largest first.
+
+    Among elements with equal keys the most recently added comes first, as in csortedlist.top_k
+    (top_k keeps the earliest) - the keys are the same, the tied elements may differ.
+    """
+
+    def __init__(
+        self,
+        k: int,
+        key: Callable[[T], Any] = cytoolz.functoolz.identity,
+        source: Optional[Iterable] = None,
+    ):
+        from .sortedcoll import csortedlist
+        self.k = k
+        self.key = key
+        identity = cytoolz.functoolz.identity
+        self._sorted = csortedlist(key=None if key is identity else compiled(key))
+        super().__init__(source)
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._sorted.clear()
+        self._top: Optional[clist] = None
+
+    def _add(self, xs: list) -> None:
+        self._top = None
+        if len(xs) == 1:
+            self._sorted.add(xs[0])
+        else:
+            self._sorted.update(xs)
+
+    def _remove(self, x: T) -> None:
+        self._sorted.remove(x)
+        self._top = None
+
+    def _copy(self) -> None:
+        # the sorted elements are never handed out - only _top is, and it is rebuilt on change
+        pass
+
+    def _result(self) -> clist:
+        if self._top is None:
+            own = self._sorted.key or cytoolz.functoolz.identity
+            self._top = self._sorted.top_k(self.k, own)
+        return self._top
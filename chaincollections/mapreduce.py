@@ -0,0 +1,195 @@
+'''
+
+mapreduce.py
+
+Partitioned map-reduce for the keyed aggregations: reduce_by, count_by, groupby, frequencies.
+
+.partitioned(n) splits the source into chunks and runs three stages:
+
+    map      each chunk is aggregated by key in a pool task (the combiner), so a chunk of a
+             million elements with a thousand keys ships back a thousand partial results
+    shuffle  partial results are routed to n partitions by hash(key)
+    reduce   each partition merges its partials, chunk by chunk, in a pool task
+
+and returns the same cdict the single-process method does - same values, same key order (first
+appearance in the source), same element order inside groupby lists.
+
+Skew: a key whose partials outweigh a partition's fair share (total / n) is not sent to a single
+partition - its partials are cut into contiguous runs spread over the partitions and the run
+results are merged in order at the end, so one hot key cannot serialize the reduce stage.
+
+reduce_by's op merges partial results as well as elements, so it must be associative - pass
+init= and combine= when the accumulator differs from the elements. With the default process
+executor, key, op and combine must be picklable (module-level functions, operator.itemgetter,
+... not lambdas); use executor='thread' or a concurrent.futures.Executor for anything else.
+
+'''
+
+import collections
+import functools
+import os
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import cytoolz
+
+from .chaincollections import cdict, clist
+from .parallel import _resolve_executor, par_imap_chunks
+
+DEFAULT_STREAM_CHUNKSIZE = 10000
+
+
+class _NoInit:
+    """Marker for reduce_by without init (picklable, unlike a bare object())."""
+
+    def __reduce__(self) -> str:
+        return '_NO_INIT'
+
+
+_NO_INIT = _NoInit()
+
+
+## --------------------------------------------------------------------------------
+## KERNELS (module level so process pools can pickle them)
+## --------------------------------------------------------------------------------
+
+def _combine_chunk(spec: Tuple, chunk: Tuple) -> List[Dict]:
+    """Map side: aggregate one chunk by key - {key: partial} in first-seen order."""
+    kind, key, op, init = spec
+    if kind == 'count':
+        partial = cytoolz.countby(key, chunk)
+    elif kind == 'group':
+        partial = cytoolz.groupby(key, chunk)
+    elif init is _NO_INIT:
+        partial = cytoolz.reduceby(key, op, chunk)
+    else:
+        partial = cytoolz.reduceby(key, op, chunk, init)
+    return [partial]
+
+
+def _merge(kind: str, merge: Optional[Callable], partials: List) -> Any:
+    if kind == 'count':
+        return sum(partials)
+    if kind == 'group':
+        return list(cytoolz.concat(partials))
+    return functools.reduce(merge, partials)
+
+
+def _reduce_partition(kind: str, merge: Optional[Callable], slots: List[Tuple]) -> List[Tuple]:
+    """Reduce side: merge the partials of each (slot, partials) pair of one partition."""
+    return [(slot, _merge(kind, merge, partials)) for slot, partials in slots]
+
+
+## --------------------------------------------------------------------------------
+## DRIVER
+## --------------------------------------------------------------------------------
+
+class Partitioned:
+    """Keyed aggregations run as map (combine) / shuffle / reduce over a pool."""
+
+    def __init__(
+        self,
+        source: Iterable,
+        n: Optional[int] = None,
+        executor: Union[str, Executor] = 'process',
+        workers: Optional[int] = None,
+        chunksize: Optional[int] = None,
+    ):
+        self.source = source
+        self.n = n or workers or os.cpu_count() or 1
+        if self.n < 1:
+            raise ValueError('number of partitions must be positive')
+        self.executor = executor
+        self.workers = workers or self.n
+        self.chunksize = chunksize
+
+    def _chunksize(self) -> int:
+        if self.chunksize:
+            return self.chunksize
+        try:
+            n = len(self.source)
+        except TypeError:
+            return DEFAULT_STREAM_CHUNKSIZE
+        # a few chunks per partition, so the map stage balances across workers
+        return max(1, -(-n // (4 * self.n)))
+
+    def _run(
+        self, kind: str, key: Callable, op: Optional[Callable] = None,
+        merge: Optional[Callable] = None, init: Any = _NO_INIT,
+    ) -> Tuple[List, Dict]:
+        pool, owned = _resolve_executor(self.executor, self.workers)
+        try:
+            chunks = list(par_imap_chunks(
+                _combine_chunk, (kind, key, op, init), self.source, executor=pool,
+                workers=self.workers, chunksize=self._chunksize(),
+            ))
+            order, slots, hot = self._shuffle(kind, chunks)
+            futures = [pool.submit(_reduce_partition, kind, merge, partition)
+                       for partition in slots if partition]
+            merged = dict(item for future in futures for item in future.result())
+        finally:
+            if owned:
+                pool.shutdown(wait=True)
+        for k, runs in hot.items():
+            merged[k, None] = _merge(kind, merge, [merged.pop((k, run)) for run in range(runs)])
+        return order, merged
+
+    def _shuffle(self, kind: str, chunks: List[Dict]) -> Tuple[List, List[List], Dict]:
+        """
+        Route partials to partitions - returns (key order, partitions, hot key -> runs).
+
+        Partitions hold ((key, run), partials) slots - run is None unless the key was split.
+        """
+        partials = collections.defaultdict(list)
+        for chunk in chunks:
+            for k, partial in chunk.items():
+                partials[k].append(partial)
+        # weight a key by what its reducer must touch: elements for groupby, partials otherwise
+        if kind == 'group':
+            weights = {k: sum(map(len, ps)) for k, ps in partials.items()}
+        else:
+            weights = {k: len(ps) for k, ps in partials.items()}
+        fair_share = sum(weights.values()) / self.n
+        slots = [[] for _ in range(self.n)]
+        hot = {}
+        for k, ps in partials.items():
+            home = hash(k) % self.n
+            if self.n == 1 or len(ps) == 1 or weights[k] <= fair_share:
+                slots[home].append(((k, None), ps))
+                continue
+            runs = min(self.n, len(ps))
+            size = -(-len(ps) // runs)
+            runs = -(-len(ps) // size)
+            for run in range(runs):
+                slot = (home + run) % self.n
+                slots[slot].append(((k, run), ps[run * size:(run + 1) * size]))
+            hot[k] = runs
+        return list(partials), slots, hot
+
+    def reduce_by(
+        self, key: Callable, op: Callable, init: Any = _NO_INIT, combine: Optional[Callable] = None
+    ) -> cdict:
+        """
+        Group by key and reduce each group with op(acc, x).
+
+        Partial results of different chunks are merged with combine(acc, acc) - op by default.
+        init (a value, or a callable making one) starts every partial, as in cytoolz.reduceby.
+        """
+        order, merged = self._run('reduce', key, op, combine or op, init)
+        return cdict((k, merged[k, None]) for k in order)
+
+    def count_by(self, key: Callable = cytoolz.functoolz.identity) -> cdict:
+        """Count occurrences of each key."""
+        order, merged = self._run('count', key)
+        return cdict((k, merged[k, None]) for k in order)
+
+    def groupby(self, key: Callable) -> cdict:
+        """Group elements by key - lists keep source order."""
+        order, merged = self._run('group', key)
+        return cdict((k, clist(merged[k, None])) for k in order)
+
+    @property
+    def frequencies(self) -> cdict:
+        """Count occurrences of each element."""
+        return self.count_by(cytoolz.functoolz.identity)
+
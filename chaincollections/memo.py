@@ -0,0 +1,243 @@
+'''
+
+memo.py
+
+Memoizing caches for map.
+
+.map(f, cache=c), .pipe_map(*fs, cache=c) and .memo_map(f) route each element through a
+MemoCache, so f runs once per distinct element instead of once per element. A cache holds the
+results of one function. Share it between chains (and threads) that apply the same function,
+and the second chain starts warm.
+
+Eviction policies:
+
+    'lru'  drop the least recently used entry
+    'lfu'  drop the least frequently used entry (least recently used among ties)
+    'ttl'  drop the oldest entry; with ttl=seconds, entries also expire after that long
+
+ttl= works with every policy. Entries expire lazily, when they are next looked up, or all at
+once with .purge(). Limits are max_entries and/or max_bytes, where size is measured by sizeof
+(sys.getsizeof of the result by default, which is shallow - pass a deeper measure for nested
+values).
+
+Elements are used as cache keys directly. key= maps unhashable elements (dicts, lists) to a
+hashable key. All operations take a lock, so one cache can be shared between threads. Two
+threads missing on the same key at the same time may both compute it.
+
+'''
+
+import collections
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+POLICIES = ('lru', 'lfu', 'ttl')
+
+_MISSING = object()
+
+
+class CacheStats(NamedTuple):
+    """Counters and current size of a MemoCache."""
+
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    entries: int
+    bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class MemoCache:
+    """Bounded, thread-safe cache of function results."""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        policy: str = 'lru',
+        ttl: Optional[float] = None,
+        key: Optional[Callable[[Any], Any]] = None,
+        sizeof: Callable[[Any], int] = sys.getsizeof,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            max_entries: Most entries kept (None for no limit)
+            max_bytes: Most bytes of results kept, as measured by sizeof (None for no limit)
+            policy: 'lru', 'lfu' or 'ttl' - which entry to evict when a limit is reached
+            ttl: Seconds an entry stays valid after it is stored (None for forever)
+            key: Maps an element to its cache key (default: the element itself)
+            sizeof: Size in bytes of a result, for max_bytes
+            clock: Time source for ttl
+        """
+        if policy not in POLICIES:
+            raise ValueError('policy must be one of %r' % (POLICIES,))
+        if policy == 'ttl' and ttl is None:
+            raise ValueError("policy='ttl' needs ttl=seconds")
+        for name, limit in (('max_entries', max_entries), ('max_bytes', max_bytes), ('ttl', ttl)):
+            if limit is not None and limit <= 0:
+                raise ValueError('%s must be positive' % name)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.ttl = ttl
+        self.key = key
+        self._sizeof = sizeof
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._data: 'collections.OrderedDict[Any, Any]' = collections.OrderedDict()
+        self._expires: Dict[Any, float] = {}
+        self._sizes: Dict[Any, int] = {}
+        self._bytes = 0
+        # lfu: key -> use count, and use count -> keys in least recently used order
+        self._freq: Dict[Any, int] = {}
+        self._buckets: Dict[int, 'collections.OrderedDict[Any, None]'] = {}
+        self._min_freq = 0
+        self._hits = self._misses = self._evictions = self._expirations = 0
+
+    ## bookkeeping
+
+    def _touch(self, k: Any) -> None:
+        if self.policy == 'lru':
+            self._data.move_to_end(k)
+        elif self.policy == 'lfu':
+            n = self._freq[k]
+            bucket = self._buckets[n]
+            del bucket[k]
+            if not bucket:
+                del self._buckets[n]
+                if self._min_freq == n:
+                    self._min_freq = n + 1
+            self._freq[k] = n + 1
+            self._buckets.setdefault(n + 1, collections.OrderedDict())[k] = None
+
+    def _drop(self, k: Any) -> None:
+        del self._data[k]
+        self._expires.pop(k, None)
+        self._bytes -= self._sizes.pop(k, 0)
+        n = self._freq.pop(k, None)
+        if n is not None:
+            bucket = self._buckets[n]
+            del bucket[k]
+            if not bucket:
+                del self._buckets[n]
+
+    def _victim(self, incoming: Any) -> Any:
+        """Entry to evict - the incoming key only when nothing else is left."""
+        if self.policy == 'lfu':
+            # the incoming key is not in a bucket yet
+            if not self._buckets:
+                return incoming
+            if self._min_freq not in self._buckets:
+                self._min_freq = min(self._buckets)
+            return next(iter(self._buckets[self._min_freq]))
+        return next(iter(self._data))
+
+    def _over_limit(self) -> bool:
+        return ((self.max_entries is not None and len(self._data) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes))
+
+    ## public interface
+
+    def get(self, k: Any, default: Any = None) -> Any:
+        """Cached result for key k (counted as a hit or miss), or default."""
+        with self._lock:
+            value = self._data.get(k, _MISSING)
+            expired = value is not _MISSING and self.ttl is not None \
+                and self._clock() >= self._expires[k]
+            if expired:
+                self._drop(k)
+                self._expirations += 1
+                value = _MISSING
+            if value is _MISSING:
+                self._misses += 1
+                return default
+            self._hits += 1
+            self._touch(k)
+            return value
+
+    def put(self, k: Any, value: Any) -> None:
+        """Store a result under key k, evicting entries as needed to stay within the limits."""
+        with self._lock:
+            if k in self._data:
+                self._drop(k)
+            size = 0
+            if self.max_bytes is not None:
+                size = self._sizeof(value)
+                if size > self.max_bytes:
+                    return
+                self._sizes[k] = size
+                self._bytes += size
+            self._data[k] = value
+            if self.ttl is not None:
+                self._expires[k] = self._clock() + self.ttl
+            while self._over_limit():
+                self._drop(self._victim(k))
+                self._evictions += 1
+            if self.policy == 'lfu' and k in self._data:
+                self._freq[k] = 1
+                self._buckets.setdefault(1, collections.OrderedDict())[k] = None
+                self._min_freq = 1
+
+    def wrap(self, f: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        """Memoized version of f, backed by this cache."""
+        key = self.key
+
+        def memoized(x: Any) -> Any:
+            k = x if key is None else key(x)
+            value = self.get(k, _MISSING)
+            if value is _MISSING:
+                value = f(x)
+                self.put(k, value)
+            return value
+
+        memoized.__wrapped__ = f
+        return memoized
+
+    def purge(self) -> int:
+        """Drop every expired entry now; returns how many were dropped."""
+        with self._lock:
+            if self.ttl is None:
+                return 0
+            now = self._clock()
+            expired = [k for k, deadline in self._expires.items() if now >= deadline]
+            for k in expired:
+                self._drop(k)
+            self._expirations += len(expired)
+            return len(expired)
+
+    def clear(self) -> None:
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            for k in list(self._data):
+                self._drop(k)
+            self._min_freq = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        """Hit / miss / eviction counters and the current size."""
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, self._expirations,
+                              len(self._data), self._bytes)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, k: Any) -> bool:
+        """True if k is cached (expired entries included until they are next looked up)."""
+        return k in self._data
+
+    def __repr__(self) -> str:
+        return 'MemoCache(policy=%r, entries=%d)' % (self.policy, len(self._data))
+
+
+def memoize(f: Callable[[Any], Any], cache: Optional[MemoCache] = None) -> Callable[[Any], Any]:
+    """f memoized through cache (a fresh unbounded cache if None)."""
+    return (MemoCache() if cache is None else cache).wrap(f)
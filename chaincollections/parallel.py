@@ -0,0 +1,136 @@
+'''
+
+parallel.py
+
+Chunked parallel map / filter / mapcat backed by concurrent.futures pools.
+
+executor is 'thread' (I/O-bound or GIL-releasing functions), 'process' (CPU-bound - the function
+and elements must be picklable, so no lambdas) or any concurrent.futures.Executor you own. Pools
+created here are shut down when the results are exhausted; executors passed in are left alone.
+
+The source is read one chunk at a time and at most max_in_flight chunks are outstanding, so a
+cgenerator over a huge stream is processed with bounded memory. ordered=False yields chunks as
+they complete instead of in source order.
+
+'''
+
+import collections
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+import cytoolz
+
+DEFAULT_CHUNKSIZE = 256
+
+
+## --------------------------------------------------------------------------------
+## CHUNK KERNELS (module level so process pools can pickle them)
+## --------------------------------------------------------------------------------
+
+def _map_chunk(f: Callable, chunk: Tuple) -> List:
+    return [f(x) for x in chunk]
+
+
+def _filter_chunk(predicate: Callable, chunk: Tuple) -> List:
+    return [x for x in chunk if predicate(x)]
+
+
+def _mapcat_chunk(f: Callable, chunk: Tuple) -> List:
+    return [y for x in chunk for y in f(x)]
+
+
+## --------------------------------------------------------------------------------
+## DISPATCH
+## --------------------------------------------------------------------------------
+
+def _resolve_executor(
+    executor: Union[str, Executor], workers: Optional[int]
+) -> Tuple[Executor, bool]:
+    """Return (executor, owned) - owned executors are shut down by us."""
+    if isinstance(executor, Executor):
+        return executor, False
+    if executor == 'thread':
+        return ThreadPoolExecutor(workers), True
+    if executor == 'process':
+        return ProcessPoolExecutor(workers), True
+    raise ValueError("executor must be 'thread', 'process' or a concurrent.futures.Executor")
+
+
+def _default_chunksize(iterable: Iterable, workers: int) -> int:
+    """Aim for ~4 chunks per worker on sized inputs, a fixed size for streams."""
+    try:
+        n = len(iterable)
+    except TypeError:
+        return DEFAULT_CHUNKSIZE
+    return max(1, min(DEFAULT_CHUNKSIZE * 16, n // (workers * 4) or 1))
+
+
+def par_imap_chunks(
+    kernel: Callable[[Callable, Tuple], List],
+    f: Callable,
+    iterable: Iterable,
+    executor: Union[str, Executor] = 'thread',
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    ordered: bool = True,
+    max_in_flight: Optional[int] = None,
+) -> Iterator:
+    """Run kernel(f, chunk) over chunks of iterable in a pool and yield the flattened results."""
+    n_workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or _default_chunksize(iterable, n_workers)
+    max_in_flight = max_in_flight or 2 * n_workers
+    if chunksize < 1 or max_in_flight < 1:
+        raise ValueError('chunksize and max_in_flight must be positive')
+    pool, owned = _resolve_executor(executor, workers)
+
+    pending = collections.deque() if ordered else set()
+
+    def _drain():
+        if ordered:
+            yield pending.popleft().result()
+        else:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                pending.discard(fut)
+                yield fut.result()
+
+    try:
+        for chunk in cytoolz.partition_all(chunksize, iterable):
+            future = pool.submit(kernel, f, chunk)
+            if ordered:
+                pending.append(future)
+            else:
+                pending.add(future)
+            while len(pending) >= max_in_flight:
+                for result in _drain():
+                    yield from result
+        while pending:
+            for result in _drain():
+                yield from result
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            pool.shutdown(wait=True)
+
+
+def par_map(f: Callable, iterable: Iterable, **kwargs: Any) -> Iterator:
+    """Parallel map - see par_imap_chunks for options."""
+    return par_imap_chunks(_map_chunk, f, iterable, **kwargs)
+
+
+def par_filter(predicate: Callable, iterable: Iterable, **kwargs: Any) -> Iterator:
+    """Parallel filter - see par_imap_chunks for options."""
+    return par_imap_chunks(_filter_chunk, predicate, iterable, **kwargs)
+
+
+def par_mapcat(f: Callable, iterable: Iterable, **kwargs: Any) -> Iterator:
+    """Parallel map of f (returning an iterable per element), concatenated."""
+    return par_imap_chunks(_mapcat_chunk, f, iterable, **kwargs)
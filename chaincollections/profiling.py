@@ -0,0 +1,415 @@
+'''
+
+profiling.py
+
+Per-stage instrumentation for chains.
+
+profile() is a context manager that records every chain method called inside it (map, filter,
+groupby, sort, ...) with element counts in and out, wall time, how many times the callables
+passed to it were invoked, and the net memory it allocated according to tracemalloc. Calls are
+counted by wrapping the callables, except where the method looks at the callable itself - X
+expressions, numpy ufuncs and an index's key are passed through untouched (and not counted),
+so profiling doesn't change which code path runs.
+clazy.explain() runs a lazy plan with each stage metered on its own. Fusion is switched off
+while explaining, so every stage gets its own numbers.
+
+Both produce a Profile, which renders as a table (str() / .table()) or exports with .to_dict()
+and .to_json(). Hooks registered with add_hook(fn) receive every StageStats as it is recorded,
+for forwarding to other telemetry.
+
+Nothing is instrumented outside profile() / explain(). profile() installs its wrappers on the
+collection classes when it is entered and removes them when it exits, so there is no cost at
+all while profiling is off. Because the wrappers sit on the classes, calls made by other
+threads while a profile is active are recorded too. Only the outermost chain call is recorded
+- methods called from inside another method are part of its numbers.
+
+'''
+
+import contextlib
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .chaincollections import CBase, cdict, cgenerator, clist, cset
+from .expr import Expr
+from .index import HashIndex, SortedIndex
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+_hooks: List[Callable[['StageStats'], None]] = []
+_active: List['Profile'] = []
+_originals: List[Tuple[type, str, Any]] = []
+_lock = threading.Lock()
+
+
+class _Depth(threading.local):
+    value = 0
+
+
+_depth = _Depth()
+
+
+## --------------------------------------------------------------------------------
+## RESULTS
+## --------------------------------------------------------------------------------
+
+class StageStats:
+    """Measurements for one stage of a chain."""
+
+    __slots__ = ('name', 'count_in', 'count_out', 'seconds', 'calls', 'memory')
+
+    def __init__(
+        self,
+        name: str,
+        count_in: Optional[int] = None,
+        count_out: Optional[int] = None,
+        seconds: float = 0.0,
+        calls: Optional[int] = None,
+        memory: Optional[int] = None,
+    ):
+        self.name = name
+        self.count_in = count_in
+        self.count_out = count_out
+        self.seconds = seconds
+        self.calls = calls
+        self.memory = memory
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The measurements as a plain dict (None where a value was not measured)."""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self) -> str:
+        return 'StageStats(%s)' % ', '.join('%s=%r' % kv for kv in self.to_dict().items())
+
+
+class Profile:
+    """Stage measurements, in the order the stages ran."""
+
+    def __init__(self) -> None:
+        self.stages: List[StageStats] = []
+
+    def __iter__(self) -> Iterator[StageStats]:
+        return iter(self.stages)
+
+    def __len__(self) -> int:
+        return len(self.stages)
+
+    @property
+    def total_seconds(self) -> float:
+        """Wall time summed over all stages."""
+        return sum(s.seconds for s in self.stages)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """All measurements as plain data."""
+        return {'stages': [s.to_dict() for s in self.stages], 'total_seconds': self.total_seconds}
+
+    def to_json(self, **kwargs: Any) -> str:
+        """All measurements as a JSON document (kwargs go to json.dumps)."""
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def table(self) -> str:
+        """Render the measurements as a text table."""
+        rows = [('stage', 'in', 'out', 'calls', 'seconds', 'memory')]
+        for s in self.stages:
+            rows.append((
+                s.name,
+                _cell(s.count_in),
+                _cell(s.count_out),
+                _cell(s.calls),
+                '%.6f' % s.seconds,
+                '-' if s.memory is None else '%.1f KiB' % (s.memory / 1024),
+            ))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = []
+        for row in rows:
+            cells = [row[0].ljust(widths[0])] + [c.rjust(w) for c, w in zip(row[1:], widths[1:])]
+            lines.append('  '.join(cells))
+        return '\n'.join(lines)
+
+    __str__ = table
+
+    def __repr__(self) -> str:
+        return 'Profile(%d stages, %.6fs)' % (len(self.stages), self.total_seconds)
+
+
+def _cell(value: Optional[int]) -> str:
+    return '-' if value is None else str(value)
+
+
+## --------------------------------------------------------------------------------
+## HOOKS
+## --------------------------------------------------------------------------------
+
+def add_hook(hook: Callable[[StageStats], None]) -> None:
+    """Call hook(stats) for every stage recorded by profile() or explain()."""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[StageStats], None]) -> None:
+    """Stop calling a hook registered with add_hook."""
+    _hooks.remove(hook)
+
+
+def _emit(stats: StageStats, profiles: Iterable[Profile]) -> None:
+    for p in profiles:
+        p.stages.append(stats)
+    for hook in list(_hooks):
+        hook(stats)
+
+
+## --------------------------------------------------------------------------------
+## MEASURING
+## --------------------------------------------------------------------------------
+
+class _Counted:
+    """Callable wrapper counting invocations - compares and hashes like the wrapped callable."""
+
+    __slots__ = ('f', 'calls')
+
+    def __init__(self, f: Callable):
+        self.f = f
+        self.calls = 0
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        self.calls += 1
+        return self.f(*args, **kwargs)
+
+    def __eq__(self, other: Any) -> bool:
+        other = other.f if isinstance(other, _Counted) else other
+        if isinstance(self.f, Expr) or isinstance(other, Expr):
+            return self.f is other  # == on an X expression builds another expression
+        return self.f == other
+
+    def __hash__(self) -> int:
+        return hash(self.f)
+
+
+def _countable(f: Any, keep: List[Any]) -> bool:
+    """
+    Whether f can be swapped for a _Counted - not when the method looks at what f is: X
+    expressions (inlined / vectorized), numpy ufuncs (carray fast paths) and the key of an index
+    passed along (join checks it by identity).
+    """
+    if not callable(f) or isinstance(f, Expr) or any(f is k for k in keep):
+        return False
+    return np is None or not isinstance(f, np.ufunc)
+
+
+def _traced() -> int:
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+def _size(obj: Any) -> Optional[int]:
+    """Element count of a materialized collection - None for generators and scalars."""
+    if isinstance(obj, (list, tuple, dict, set, frozenset)):
+        return len(obj)
+    return None
+
+
+@contextlib.contextmanager
+def _tracing(memory: bool) -> Iterator[None]:
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+## --------------------------------------------------------------------------------
+## EAGER CHAINS
+## --------------------------------------------------------------------------------
+
+PROFILED_CLASSES = (CBase, clist, cgenerator, cdict, cset)
+
+
+def _instrument(name: str, method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        if _depth.value:
+            return method(self, *args, **kwargs)
+        counted = []
+        keep = [a.key for a in args + tuple(kwargs.values())
+                if isinstance(a, (HashIndex, SortedIndex))]
+
+        def count(arg: Any) -> Any:
+            if _countable(arg, keep):
+                arg = _Counted(arg)
+                counted.append(arg)
+            return arg
+
+        args = tuple(count(a) for a in args)
+        kwargs = {k: count(v) for k, v in kwargs.items()}
+        count_in = _size(self)
+        memory = tracemalloc.is_tracing()
+        before = _traced()
+        _depth.value += 1
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            _depth.value -= 1
+        stats = StageStats(
+            name,
+            count_in,
+            _size(result),
+            seconds,
+            sum(c.calls for c in counted) if counted else None,
+            _traced() - before if memory else None,
+        )
+        _emit(stats, list(_active))
+        return result
+
+    return wrapper
+
+
+def _install() -> None:
+    for cls in PROFILED_CLASSES:
+        for name, attr in list(vars(cls).items()):
+            if name.startswith('_'):
+                continue
+            if isinstance(attr, property):
+                wrapped = property(_instrument(name, attr.fget), doc=attr.__doc__)
+            elif callable(attr):
+                wrapped = _instrument(name, attr)
+            else:
+                continue
+            _originals.append((cls, name, attr))
+            setattr(cls, name, wrapped)
+
+
+def _uninstall() -> None:
+    while _originals:
+        cls, name, attr = _originals.pop()
+        setattr(cls, name, attr)
+
+
+@contextlib.contextmanager
+def profile(memory: bool = True) -> Iterator[Profile]:
+    """
+    Record every chain method called inside the block.
+
+        with profile() as p:
+            clist(data).map(f).filter(g).groupby(h)
+        print(p)
+
+    Args:
+        memory: Measure allocations with tracemalloc (started for the block if it is not
+            already tracing). Tracing slows Python down - pass False for cleaner timings.
+    """
+    p = Profile()
+    with _lock:
+        if not _active:
+            _install()
+        _active.append(p)
+    try:
+        with _tracing(memory):
+            yield p
+    finally:
+        with _lock:
+            _active.remove(p)
+            if not _active:
+                _uninstall()
+
+
+## --------------------------------------------------------------------------------
+## LAZY PLANS
+## --------------------------------------------------------------------------------
+
+class _Meter:
+    """
+    Iterator wrapper accumulating element count, time and net allocations.
+
+    Pulls (next) and building the stage are kept apart: every pull a stage makes from upstream
+    happens inside one of its own pulls or while it is being built, so a stage's own cost is
+    its pulls plus its build minus its upstream's pulls.
+    """
+
+    def __init__(self, it: Iterator):
+        self.it = it
+        self.count = 0
+        self.seconds = 0.0
+        self.memory = 0
+        self.build_seconds = 0.0
+        self.build_memory = 0
+
+    def __iter__(self) -> '_Meter':
+        return self
+
+    def __next__(self) -> Any:
+        before = _traced()
+        start = time.perf_counter()
+        try:
+            item = next(self.it)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.memory += _traced() - before
+        self.count += 1
+        return item
+
+
+def _build(stage: Tuple, it: Iterator) -> Tuple[Iterator, List[_Counted]]:
+    """Build one plan stage on its own (no fusion), with its callables counted."""
+    kind = stage[0]
+    if kind == 'pluck':
+        ind = stage[1]
+        return map(lambda x: x[ind], it), []
+    if kind == 'op':
+        fns = [_Counted(f) for f in stage[3]]
+        return iter(stage[1](it, *fns)), fns
+    f = _Counted(stage[1])
+    if kind == 'map':
+        return map(f, it), [f]
+    if kind == 'filter':
+        return filter(f, it), [f]
+    if kind == 'remove':
+        return (x for x in it if not f(x)), [f]
+    raise ValueError('unknown stage %r' % kind)
+
+
+def explain(
+    source: Iterable, stages: Tuple, names: Tuple[str, ...], memory: bool = True
+) -> Profile:
+    """Run a lazy plan to the end with every stage metered, returning its Profile."""
+    p = Profile()
+    with _tracing(memory):
+        meters = [_Meter(iter(source))]
+        counted = []
+        for stage in stages:
+            before = _traced()
+            start = time.perf_counter()
+            # barriers such as sort consume their whole input while being built
+            it, fns = _build(stage, meters[-1])
+            meter = _Meter(it)
+            meter.build_seconds = time.perf_counter() - start
+            meter.build_memory = _traced() - before
+            meters.append(meter)
+            counted.append(fns)
+        for _ in meters[-1]:
+            pass
+
+    source = meters[0]
+    stats = [StageStats('source', None, source.count, source.seconds, None,
+                        source.memory if memory else None)]
+    for i, name in enumerate(names):
+        upstream, own = meters[i], meters[i + 1]
+        stats.append(StageStats(
+            name,
+            upstream.count,
+            own.count,
+            own.seconds + own.build_seconds - upstream.seconds,
+            sum(f.calls for f in counted[i]) if counted[i] else None,
+            own.memory + own.build_memory - upstream.memory if memory else None,
+        ))
+    for s in stats:
+        _emit(s, [p])
+    return p
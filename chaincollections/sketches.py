@@ -0,0 +1,443 @@
+'''
+
+sketches.py
+
+Bounded-memory approximate aggregations.
+
+    approx_distinct_count   HyperLogLog     relative error ~1.04 / sqrt(2**precision)
+    approx_frequencies      CountMinSketch  estimate - true <= epsilon * N, with prob. 1 - delta
+    heavy_hitters           SpaceSaving     count - true <= N / capacity; every element with
+                                            true count > N / capacity is reported
+    approx_quantiles        KLLSketch       rank error ~1.7 / k (about 1% for k=200)
+    sample                  Reservoir       uniform sample without replacement
+
+N is the number of elements seen. Each chain method builds a sketch and answers from it. To
+combine shards, build the sketches yourself with .update(shard) - anywhere, even in other
+processes - and combine them with .merge(other), which returns a new sketch as if a single
+sketch had seen both streams. Elements are hashed with a stable hash (blake2b over the str /
+bytes value or the repr of anything else), so sketches built in different processes agree.
+Sketches merged together need the same parameters.
+
+'''
+
+import bisect
+import hashlib
+import itertools
+import math
+import random
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .chaincollections import clist
+
+
+def stable_hash(x: Any) -> int:
+    """64-bit hash of x that is the same in every process (unlike hash() of str)."""
+    if isinstance(x, str):
+        data = b's' + x.encode('utf-8', 'surrogatepass')
+    elif isinstance(x, bytes):
+        data = b'b' + x
+    else:
+        data = b'r' + repr(x).encode('utf-8', 'surrogatepass')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def _check_same(a: Any, b: Any, *fields: str) -> None:
+    if type(a) is not type(b):
+        raise TypeError('cannot merge %s with %s' % (type(a).__name__, type(b).__name__))
+    for field in fields:
+        if getattr(a, field) != getattr(b, field):
+            raise ValueError('cannot merge sketches with different %s' % field)
+
+
+## --------------------------------------------------------------------------------
+## DISTINCT COUNT
+## --------------------------------------------------------------------------------
+
+class HyperLogLog:
+    """Distinct-count sketch - 2**precision one-byte registers."""
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError('precision must be between 4 and 18')
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def update(self, iterable: Iterable) -> 'HyperLogLog':
+        """Add every element of iterable; returns self."""
+        p = self.precision
+        shift = 64 - p
+        low = (1 << shift) - 1
+        registers = self.registers
+        for x in iterable:
+            h = stable_hash(x)
+            i = h >> shift
+            rank = shift - (h & low).bit_length() + 1
+            if rank > registers[i]:
+                registers[i] = rank
+        return self
+
+    def count(self) -> int:
+        """Estimated number of distinct elements."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # linear counting is more accurate while many registers are still empty
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self) -> float:
+        """Standard error of count() relative to the true count."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Sketch of both streams together."""
+        _check_same(self, other, 'precision')
+        merged = HyperLogLog(self.precision)
+        merged.registers = bytearray(map(max, self.registers, other.registers))
+        return merged
+
+
+## --------------------------------------------------------------------------------
+## FREQUENCIES
+## --------------------------------------------------------------------------------
+
+class CountMinSketch:
+    """Frequency sketch - depth rows of width counters; estimates never undercount."""
+
+    def __init__(self, epsilon: float = 0.001, delta: float = 0.01):
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError('epsilon and delta must be between 0 and 1')
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = int(math.ceil(math.e / epsilon))
+        self.depth = int(math.ceil(math.log(1 / delta)))
+        self.rows = [[0] * self.width for _ in range(self.depth)]
+        self.n = 0
+
+    def _cells(self, x: Any) -> List[int]:
+        h = stable_hash(x)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        w = self.width
+        return [(h1 + i * h2) % w for i in range(self.depth)]
+
+    def update(self, iterable: Iterable) -> 'CountMinSketch':
+        """Count every element of iterable; returns self."""
+        rows = self.rows
+        width, depth = self.width, self.depth
+        n = 0
+        for x in iterable:
+            h = stable_hash(x)
+            h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+            for i in range(depth):
+                rows[i][(h1 + i * h2) % width] += 1
+            n += 1
+        self.n += n
+        return self
+
+    def estimate(self, x: Any) -> int:
+        """Estimated count of x - at least the true count."""
+        return min(row[i] for row, i in zip(self.rows, self._cells(x)))
+
+    __getitem__ = estimate
+
+    @property
+    def error_bound(self) -> float:
+        """With probability 1 - delta, estimates exceed true counts by at most this much."""
+        return self.epsilon * self.n
+
+    def merge(self, other: 'CountMinSketch') -> 'CountMinSketch':
+        """Sketch of both streams together."""
+        _check_same(self, other, 'width', 'depth')
+        merged = CountMinSketch(self.epsilon, self.delta)
+        merged.rows = [list(map(int.__add__, a, b)) for a, b in zip(self.rows, other.rows)]
+        merged.n = self.n + other.n
+        return merged
+
+
+## --------------------------------------------------------------------------------
+## HEAVY HITTERS
+## --------------------------------------------------------------------------------
+
+class SpaceSaving:
+    """Top-k sketch keeping at most capacity counters (Space-Saving, O(1) per element)."""
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+        self.capacity = capacity
+        self.n = 0
+        self._counts: Dict[Any, int] = {}
+        self._errors: Dict[Any, int] = {}
+        # count -> elements with that count, so the minimum is found without a scan
+        self._buckets: Dict[int, Dict[Any, None]] = {}
+        self._min = 0
+
+    def _bucket_add(self, x: Any, count: int) -> None:
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = {}
+        bucket[x] = None
+
+    def _bucket_remove(self, x: Any, count: int) -> bool:
+        """Remove x from its bucket - True if the bucket is now gone."""
+        bucket = self._buckets[count]
+        del bucket[x]
+        if not bucket:
+            del self._buckets[count]
+            return True
+        return False
+
+    def update(self, iterable: Iterable) -> 'SpaceSaving':
+        """Count every element of iterable; returns self."""
+        counts, errors, capacity = self._counts, self._errors, self.capacity
+        n = 0
+        for x in iterable:
+            n += 1
+            c = counts.get(x)
+            if c is not None:
+                counts[x] = c + 1
+                if self._bucket_remove(x, c) and self._min == c:
+                    self._min = c + 1
+                self._bucket_add(x, c + 1)
+            elif len(counts) < capacity:
+                counts[x] = 1
+                errors[x] = 0
+                self._bucket_add(x, 1)
+                self._min = 1
+            else:
+                low = self._min
+                victim = next(iter(self._buckets[low]))
+                emptied = self._bucket_remove(victim, low)
+                del counts[victim], errors[victim]
+                counts[x] = low + 1
+                errors[x] = low
+                self._bucket_add(x, low + 1)
+                if emptied:
+                    self._min = low + 1
+        self.n += n
+        return self
+
+    def top(self, k: Optional[int] = None) -> clist:
+        """(element, count) pairs by descending count - counts may overestimate by error(x)."""
+        ranked = sorted(self._counts.items(), key=lambda kv: -kv[1])
+        return clist(ranked if k is None else ranked[:k])
+
+    def error(self, x: Any) -> int:
+        """Largest possible overestimate in x's count (0 if x is not tracked)."""
+        return self._errors.get(x, 0)
+
+    @property
+    def error_bound(self) -> float:
+        """No count overestimates its element by more than this."""
+        return self.n / self.capacity
+
+    def _floor(self) -> int:
+        """Count an untracked element may have had - the minimum, once all counters are used."""
+        return self._min if len(self._counts) >= self.capacity else 0
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """Sketch of both streams together (errors add up, as for the two streams apart)."""
+        _check_same(self, other, 'capacity')
+        floor_a, floor_b = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for x in itertools.chain(self._counts, other._counts):
+            if x in counts:
+                continue
+            counts[x] = self._counts.get(x, floor_a) + other._counts.get(x, floor_b)
+            errors[x] = self._errors.get(x, floor_a) + other._errors.get(x, floor_b)
+        kept = sorted(counts, key=lambda x: -counts[x])[:self.capacity]
+        merged = SpaceSaving(self.capacity)
+        merged.n = self.n + other.n
+        for x in kept:
+            merged._counts[x] = counts[x]
+            merged._errors[x] = errors[x]
+            merged._bucket_add(x, counts[x])
+        merged._min = min(merged._buckets) if merged._buckets else 0
+        return merged
+
+
+## --------------------------------------------------------------------------------
+## QUANTILES
+## --------------------------------------------------------------------------------
+
+class KLLSketch:
+    """Quantile sketch (Karnin-Lang-Liberty) - a stack of compactors of shrinking capacity."""
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        if k < 8:
+            raise ValueError('k must be at least 8')
+        self.k = k
+        self.n = 0
+        self.levels: List[List[Any]] = [[]]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return int(math.ceil(self.k * (2.0 / 3.0) ** depth)) + 1
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self) -> None:
+        """Compact the first full level: sort it and promote every other element."""
+        for h in range(len(self.levels)):
+            items = self.levels[h]
+            if len(items) >= self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append([])
+                items.sort()
+                keep_last = items.pop() if len(items) % 2 else None
+                self.levels[h + 1].extend(items[self._rng.random() < 0.5::2])
+                items.clear()
+                if keep_last is not None:
+                    items.append(keep_last)
+                if self._size() < self._max_size():
+                    return
+
+    def update(self, iterable: Iterable) -> 'KLLSketch':
+        """Add every element of iterable (mutually comparable values); returns self."""
+        bottom = self.levels[0]
+        limit = self._max_size() - self._size()
+        for x in iterable:
+            bottom.append(x)
+            self.n += 1
+            limit -= 1
+            if limit <= 0:
+                self._compress()
+                bottom = self.levels[0]
+                limit = self._max_size() - self._size()
+        return self
+
+    def _weighted(self) -> List[Tuple[Any, int]]:
+        pairs = [(x, 1 << h) for h, items in enumerate(self.levels) for x in items]
+        pairs.sort(key=lambda p: p[0])
+        return pairs
+
+    def quantile(self, q: float) -> Any:
+        """Value whose rank is approximately q * n (0 <= q <= 1)."""
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs: Sequence[float]) -> clist:
+        """quantile(q) for each q."""
+        if any(not 0 <= q <= 1 for q in qs):
+            raise ValueError('quantiles must be between 0 and 1')
+        pairs = self._weighted()
+        if not pairs:
+            raise ValueError('quantiles of an empty sketch')
+        total = sum(w for _, w in pairs)
+        cumulative = list(itertools.accumulate(w for _, w in pairs))
+        result = clist()
+        for q in qs:
+            i = min(bisect.bisect_left(cumulative, q * total), len(pairs) - 1)
+            list.append(result, pairs[i][0])
+        return result
+
+    def rank(self, x: Any) -> float:
+        """Approximate fraction of elements smaller than x."""
+        total = sum(len(items) << h for h, items in enumerate(self.levels))
+        below = sum((1 << h) for h, items in enumerate(self.levels) for y in items if y < x)
+        return below / total if total else 0.0
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """Sketch of both streams together."""
+        _check_same(self, other, 'k')
+        merged = KLLSketch(self.k)
+        merged._rng.setstate(self._rng.getstate())
+        merged.levels = [list(items) for items in self.levels]
+        while len(merged.levels) < len(other.levels):
+            merged.levels.append([])
+        for h, items in enumerate(other.levels):
+            merged.levels[h].extend(items)
+        merged.n = self.n + other.n
+        while merged._size() >= merged._max_size():
+            merged._compress()
+        return merged
+
+
+## --------------------------------------------------------------------------------
+## SAMPLING
+## --------------------------------------------------------------------------------
+
+class Reservoir:
+    """Uniform sample of n elements from a stream (Algorithm L - skips ahead between picks)."""
+
+    def __init__(self, n: int, seed: Optional[int] = None):
+        if n < 0:
+            raise ValueError('n must be non-negative')
+        self.n = n
+        self.items: List[Any] = []
+        self.count = 0
+        self._rng = random.Random(seed)
+        self._w: Optional[float] = None
+        self._next = 0
+
+    def _advance(self) -> None:
+        """Pick the position of the next element to take into the sample."""
+        u = 1.0 - self._rng.random()
+        self._next = self.count + int(math.log(u) / math.log(1.0 - self._w)) + 1
+
+    def update(self, iterable: Iterable) -> 'Reservoir':
+        """Sample from every element of iterable; returns self."""
+        it = iter(iterable)
+        items, n, rng = self.items, self.n, self._rng
+        while len(items) < n:
+            for x in it:
+                items.append(x)
+                self.count += 1
+                break
+            else:
+                return self
+        if n == 0:
+            self.count += sum(1 for _ in it)
+            return self
+        if self._w is None:
+            # after t elements the state of Algorithm L is the n-th smallest of t uniform keys
+            self._w = rng.betavariate(n, self.count - n + 1)
+            self._advance()
+        while True:
+            skip = self._next - self.count - 1
+            while skip > 0:
+                got = len(list(itertools.islice(it, min(skip, 65536))))
+                self.count += got
+                if got < min(skip, 65536):
+                    return self
+                skip -= got
+            for x in it:
+                break
+            else:
+                return self
+            self.count += 1
+            items[rng.randrange(n)] = x
+            self._w *= math.exp(math.log(1.0 - rng.random()) / n)
+            self._advance()
+
+    def merge(self, other: 'Reservoir') -> 'Reservoir':
+        """Uniform sample of both streams together."""
+        _check_same(self, other, 'n')
+        merged = Reservoir(self.n)
+        merged._rng.setstate(self._rng.getstate())
+        rng = merged._rng
+        a, b = self.count, other.count
+        take_a = 0
+        for _ in range(min(self.n, a + b)):
+            # how many of the sampled elements come from each stream is hypergeometric
+            if rng.random() * (a + b) < a:
+                take_a += 1
+                a -= 1
+            else:
+                b -= 1
+        take_b = min(self.n, self.count + other.count) - take_a
+        merged.items = rng.sample(self.items, take_a) + rng.sample(other.items, take_b)
+        merged.count = self.count + other.count
+        return merged
+
+    def to_list(self) -> clist:
+        """The sample as a clist."""
+        return clist(self.items)
+
@@ -0,0 +1,554 @@
+'''
+
+sortedcoll.py
+
+Sorted collections: csortedlist and csorteddict.
+
+csortedlist keeps its elements ordered (by key, if given) in a list of sorted sublists of about
+load elements each, with the largest key of every sublist and a Fenwick tree of sublist lengths
+alongside. Adding or removing an element bisects the sublist maxima, then the sublist, and
+updates the tree - O(log n) plus a memmove of at most 2 * load pointers - instead of re-sorting
+the whole list. Positional access, .rank() and .index() are O(log n) through the tree, and
+.irange(lo, hi) streams a key range as a cgenerator without copying it.
+
+add / update / discard / remove / pop change the collection in place (add and friends return
+it, so they chain). Every other CBase method works as on clist and returns an ordinary clist,
+since map & co. don't preserve the order.
+
+csorteddict is a cdict whose keys are kept in a csortedlist: iteration, keys(), values() and
+items() are in key order, and irange / bisect / rank / peekitem work on the keys.
+
+'''
+
+import bisect
+import itertools
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+
+import cytoolz
+
+from .chaincollections import CBase, T, cdict, cgenerator, clist, cset
+
+DEFAULT_LOAD = 1000
+
+
+class csortedlist(CBase):
+    """Sorted list with O(log n) add/remove/rank and lazy range queries."""
+
+    def __init__(
+        self,
+        iterable: Iterable[T] = (),
+        key: Optional[Callable[[T], Any]] = None,
+        load: int = DEFAULT_LOAD,
+    ):
+        if load < 4:
+            raise ValueError('load must be at least 4')
+        self.key = key
+        self._load = load
+        self._build(iterable)
+
+    def _build(self, iterable: Iterable[T]) -> None:
+        load = self._load
+        values = sorted(iterable, key=self.key)
+        self._lists = [values[i:i + load] for i in range(0, len(values), load)]
+        if self.key is None:
+            self._keys = self._lists
+        else:
+            self._keys = [list(map(self.key, sub)) for sub in self._lists]
+        self._maxes = [keys[-1] for keys in self._keys]
+        self._len = len(values)
+        self._rebuild_tree()
+
+    def _new(self, iterable: Iterable) -> clist:
+        return clist(iterable)
+
+    ## Fenwick tree of sublist lengths
+
+    def _rebuild_tree(self) -> None:
+        tree = [0]
+        tree.extend(map(len, self._lists))
+        m = len(self._lists)
+        for i in range(1, m + 1):
+            j = i + (i & -i)
+            if j <= m:
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, i: int, delta: int) -> None:
+        tree = self._tree
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _offset(self, i: int) -> int:
+        """Number of elements in the sublists before sublist i."""
+        tree = self._tree
+        total = 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """(sublist, position) of the element at index."""
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('csortedlist index out of range')
+        tree = self._tree
+        i = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            j = i + step
+            if j < len(tree) and tree[j] <= index:
+                i = j
+                index -= tree[j]
+            step >>= 1
+        return i, index
+
+    ## mutation
+
+    def add(self, value: T) -> 'csortedlist':
+        """Insert value in order (after equal keys) - in place."""
+        k = value if self.key is None else self.key(value)
+        if not self._lists:
+            self._lists.append([value])
+            if self.key is not None:
+                self._keys.append([k])
+            self._maxes.append(k)
+            self._len = 1
+            self._rebuild_tree()
+            return self
+        i = bisect.bisect_right(self._maxes, k)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(value)
+            if self.key is not None:
+                self._keys[i].append(k)
+            self._maxes[i] = k
+        else:
+            pos = bisect.bisect_right(self._keys[i], k)
+            if self.key is not None:
+                self._keys[i].insert(pos, k)
+            self._lists[i].insert(pos, value)
+        self._len += 1
+        if len(self._lists[i]) > 2 * self._load:
+            self._split(i)
+        else:
+            self._tree_add(i, 1)
+        return self
+
+    def _split(self, i: int) -> None:
+        half = self._load
+        sub = self._lists[i]
+        self._lists[i:i + 1] = [sub[:half], sub[half:]]
+        if self.key is not None:
+            keys = self._keys[i]
+            self._keys[i:i + 1] = [keys[:half], keys[half:]]
+        self._maxes[i:i + 1] = [self._keys[i][-1], self._keys[i + 1][-1]]
+        self._rebuild_tree()
+
+    def _delete(self, i: int, pos: int) -> T:
+        value = self._lists[i].pop(pos)
+        if self.key is not None:
+            self._keys[i].pop(pos)
+        self._len -= 1
+        if not self._lists[i]:
+            del self._lists[i]
+            if self.key is not None:
+                del self._keys[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+        else:
+            self._maxes[i] = self._keys[i][-1]
+            self._tree_add(i, -1)
+        return value
+
+    def update(self, iterable: Iterable[T]) -> 'csortedlist':
+        """Add every element of iterable - in place."""
+        values = list(iterable)
+        if len(values) * 4 >= self._len:
+            self._build(itertools.chain(self, values))
+        else:
+            for value in values:
+                self.add(value)
+        return self
+
+    def _find(self, value: T) -> Optional[Tuple[int, int]]:
+        """(sublist, position) of an element equal to value, or None."""
+        k = value if self.key is None else self.key(value)
+        i = bisect.bisect_left(self._maxes, k)
+        if i == len(self._maxes):
+            return None
+        pos = bisect.bisect_left(self._keys[i], k)
+        while i < len(self._lists):
+            keys, values = self._keys[i], self._lists[i]
+            while pos < len(keys):
+                if keys[pos] != k:
+                    return None
+                if values[pos] == value:
+                    return i, pos
+                pos += 1
+            i, pos = i + 1, 0
+        return None
+
+    def discard(self, value: T) -> 'csortedlist':
+        """Remove one element equal to value, if there is one - in place."""
+        found = self._find(value)
+        if found is not None:
+            self._delete(*found)
+        return self
+
+    def remove(self, value: T) -> 'csortedlist':
+        """Remove one element equal to value - in place; ValueError if there is none."""
+        found = self._find(value)
+        if found is None:
+            raise ValueError('%r not in csortedlist' % (value,))
+        self._delete(*found)
+        return self
+
+    def pop(self, index: int = -1) -> T:
+        """Remove and return the element at index (the largest by default)."""
+        return self._delete(*self._locate(index))
+
+    def clear(self) -> 'csortedlist':
+        """Remove everything - in place."""
+        self._build(())
+        return self
+
+    def __delitem__(self, index: int) -> None:
+        self._delete(*self._locate(index))
+
+    ## sequence protocol
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[T]:
+        return itertools.chain.from_iterable(self._lists)
+
+    def __reversed__(self) -> Iterator[T]:
+        return itertools.chain.from_iterable(map(reversed, reversed(self._lists)))
+
+    def __contains__(self, value: Any) -> bool:
+        return self._find(value) is not None
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[T, clist]:
+        """Element at index in O(log n), or a clist of a slice."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step == 1:
+                return clist(self._slice(start, stop)) if start < stop else clist()
+            return clist(map(self.__getitem__, range(start, stop, step)))
+        i, pos = self._locate(index)
+        return self._lists[i][pos]
+
+    def _slice(self, start: int, stop: int) -> Iterator[T]:
+        """Elements start..stop-1, read sublist by sublist."""
+        if start >= stop:
+            return iter(())
+        i, pos = self._locate(start)
+        return itertools.islice(
+            itertools.chain(self._lists[i][pos:],
+                            itertools.chain.from_iterable(self._lists[i + 1:])),
+            stop - start,
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (csortedlist, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return 'csortedlist(%r)' % list(self)
+
+    ## order queries
+
+    def bisect_key_left(self, k: Any) -> int:
+        """Index of the first element with key >= k."""
+        i = bisect.bisect_left(self._maxes, k)
+        if i == len(self._maxes):
+            return self._len
+        return self._offset(i) + bisect.bisect_left(self._keys[i], k)
+
+    def bisect_key_right(self, k: Any) -> int:
+        """Index of the first element with key > k."""
+        i = bisect.bisect_right(self._maxes, k)
+        if i == len(self._maxes):
+            return self._len
+        return self._offset(i) + bisect.bisect_right(self._keys[i], k)
+
+    def _key_of(self, value: Any) -> Any:
+        return value if self.key is None else self.key(value)
+
+    def bisect_left(self, value: Any) -> int:
+        """Index where value would be inserted before equal elements."""
+        return self.bisect_key_left(self._key_of(value))
+
+    def bisect_right(self, value: Any) -> int:
+        """Index where value would be inserted after equal elements."""
+        return self.bisect_key_right(self._key_of(value))
+
+    bisect = bisect_right
+
+    def rank(self, value: Any) -> int:
+        """Number of elements ordered before value."""
+        return self.bisect_left(value)
+
+    def count(self, value: Any) -> int:
+        """Number of elements equal to value."""
+        lo, hi = self.bisect_left(value), self.bisect_right(value)
+        if self.key is None:
+            return hi - lo
+        return sum(1 for x in self._slice(lo, hi) if x == value)
+
+    def index(self, value: Any) -> int:
+        """Index of the first element equal to value; ValueError if there is none."""
+        found = self._find(value)
+        if found is None:
+            raise ValueError('%r not in csortedlist' % (value,))
+        return self._offset(found[0]) + found[1]
+
+    def irange_key(
+        self,
+        lo: Any = None,
+        hi: Any = None,
+        inclusive: Tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> cgenerator:
+        """Elements with lo <= key <= hi (None for unbounded), lazily, in order."""
+        if lo is None:
+            start = 0
+        else:
+            start = (self.bisect_key_left if inclusive[0] else self.bisect_key_right)(lo)
+        if hi is None:
+            stop = self._len
+        else:
+            stop = (self.bisect_key_right if inclusive[1] else self.bisect_key_left)(hi)
+        if reverse:
+            return cgenerator(self[i] for i in range(stop - 1, start - 1, -1))
+        return cgenerator(self._slice(start, stop))
+
+    def irange(
+        self,
+        lo: Any = None,
+        hi: Any = None,
+        inclusive: Tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> cgenerator:
+        """Elements between the values lo and hi (compared by key), lazily, in order."""
+        return self.irange_key(
+            None if lo is None else self._key_of(lo),
+            None if hi is None else self._key_of(hi),
+            inclusive,
+            reverse,
+        )
+
+    ## O(k) shortcuts for CBase methods
+
+    def top_k(self, k: int, key: Callable[[T], Any] = cytoolz.functoolz.identity) -> clist:
+        """The k largest elements, largest first - O(k) when ordered by the list's own key."""
+        own = self.key or cytoolz.functoolz.identity
+        if key is own:
+            return clist(itertools.islice(reversed(self), k))
+        return CBase.top_k(self, k, key)
+
+    def tail(self, n: int) -> clist:
+        """The last n elements - O(n)."""
+        return clist(self._slice(max(self._len - n, 0), self._len))
+
+    def last(self) -> T:
+        """The largest element - O(1)."""
+        if not self._len:
+            raise IndexError('last of empty csortedlist')
+        return self._lists[-1][-1]
+
+    def min(self) -> T:
+        """The smallest element."""
+        return self[0]
+
+    def max(self) -> T:
+        """The largest element."""
+        return self.last()
+
+    ## conversion
+
+    def copy(self) -> 'csortedlist':
+        """Shallow copy."""
+        return csortedlist(self, self.key, self._load)
+
+    # copy.copy would otherwise share the sublists and tree with the original
+    __copy__ = copy
+
+    def to_list(self) -> clist:
+        """Copy into a clist."""
+        return clist(self)
+
+    def to_generator(self) -> cgenerator:
+        """Convert to generator."""
+        return cgenerator(self)
+
+    def to_set(self) -> cset:
+        """Convert to set."""
+        return cset(self)
+
+
+class csorteddict(cdict):
+    """cdict that keeps its keys sorted, with range queries over them."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._sorted = csortedlist(dict.keys(self))
+
+    ## keep the sorted keys in step with the dict
+
+    def __setitem__(self, k: Any, v: Any) -> None:
+        if k not in self:
+            self._sorted.add(k)
+        dict.__setitem__(self, k, v)
+
+    def __delitem__(self, k: Any) -> None:
+        dict.__delitem__(self, k)
+        self._sorted.remove(k)
+
+    def pop(self, k: Any, *default: Any) -> Any:
+        if k in self:
+            self._sorted.remove(k)
+        return dict.pop(self, k, *default)
+
+    def popitem(self, index: int = -1) -> Tuple[Any, Any]:
+        """Remove and return the (key, value) pair at index in key order (the last by default)."""
+        if not self:
+            raise KeyError('popitem(): dictionary is empty')
+        k = self._sorted.pop(index)
+        return k, dict.pop(self, k)
+
+    def setdefault(self, k: Any, default: Any = None) -> Any:
+        if k not in self:
+            self[k] = default
+        return dict.__getitem__(self, k)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        new = dict(*args, **kwargs)
+        missing = [k for k in new if k not in self]
+        dict.update(self, new)
+        if missing:
+            self._sorted.update(missing)
+
+    def clear(self) -> None:
+        dict.clear(self)
+        self._sorted.clear()
+
+    def copy(self) -> 'csorteddict':
+        return csorteddict(self)
+
+    def __or__(self, other: Any) -> 'csorteddict':
+        if not isinstance(other, dict):
+            return NotImplemented
+        result = self.copy()
+        result.update(other)
+        return result
+
+    def __ror__(self, other: Any) -> 'csorteddict':
+        if not isinstance(other, dict):
+            return NotImplemented
+        result = csorteddict(other)
+        result.update(self)
+        return result
+
+    def __ior__(self, other: Any) -> 'csorteddict':
+        self.update(other)
+        return self
+
+    def __reduce__(self) -> Tuple:
+        return csorteddict, (dict(self),)
+
+    def __repr__(self) -> str:
+        return 'csorteddict({%s})' % ', '.join('%r: %r' % kv for kv in self.items())
+
+    ## key order
+
+    def __iter__(self) -> Iterator:
+        return iter(self._sorted)
+
+    def __reversed__(self) -> Iterator:
+        return reversed(self._sorted)
+
+    def keys(self, copy: bool = True) -> Union[clist, 'cdict_keys']:
+        """Keys in order as a clist (copy=False: a live view, in insertion order)."""
+        if not copy:
+            return cdict.keys(self, copy=False)
+        return clist(self._sorted)
+
+    def values(self, copy: bool = True) -> Union[clist, 'cdict_values']:
+        """Values in key order as a clist (copy=False: a live view, in insertion order)."""
+        if not copy:
+            return cdict.values(self, copy=False)
+        return clist(map(self.__getitem__, self._sorted))
+
+    def items(self, copy: bool = True) -> Union[clist, 'cdict_items']:
+        """(key, value) pairs in key order as a clist (copy=False: a live view)."""
+        if not copy:
+            return cdict.items(self, copy=False)
+        return clist((k, self[k]) for k in self._sorted)
+
+    def valmap(self, f: Callable) -> 'csorteddict':
+        """Map function over values."""
+        return csorteddict(cytoolz.valmap(f, self))
+
+    def keyfilter(self, predicate: Callable) -> 'csorteddict':
+        """Filter keys by predicate."""
+        return csorteddict(cytoolz.keyfilter(predicate, self))
+
+    def valfilter(self, predicate: Callable) -> 'csorteddict':
+        """Filter values by predicate."""
+        return csorteddict(cytoolz.valfilter(predicate, self))
+
+    def itemfilter(self, predicate: Callable) -> 'csorteddict':
+        """Filter items by predicate."""
+        return csorteddict(cytoolz.itemfilter(predicate, self))
+
+    def peekitem(self, index: int = -1) -> Tuple[Any, Any]:
+        """(key, value) pair at index in key order."""
+        k = self._sorted[index]
+        return k, self[k]
+
+    def bisect_left(self, k: Any) -> int:
+        """Index of the first key >= k."""
+        return self._sorted.bisect_left(k)
+
+    def bisect_right(self, k: Any) -> int:
+        """Index of the first key > k."""
+        return self._sorted.bisect_right(k)
+
+    bisect = bisect_right
+
+    def rank(self, k: Any) -> int:
+        """Number of keys < k."""
+        return self._sorted.rank(k)
+
+    def index(self, k: Any) -> int:
+        """Position of key k in key order."""
+        return self._sorted.index(k)
+
+    def irange(
+        self,
+        lo: Any = None,
+        hi: Any = None,
+        inclusive: Tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> cgenerator:
+        """Keys between lo and hi, lazily, in order."""
+        return self._sorted.irange(lo, hi, inclusive, reverse)
+
+    def irange_items(
+        self,
+        lo: Any = None,
+        hi: Any = None,
+        inclusive: Tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> cgenerator:
+        """(key, value) pairs with keys between lo and hi, lazily, in order."""
+        return cgenerator((k, self[k]) for k in self.irange(lo, hi, inclusive, reverse))
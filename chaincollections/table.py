@@ -0,0 +1,501 @@
+'''
+
+table.py
+
+Columnar storage for lists of records (dicts).
+
+ctable(records) stores one column per field instead of one dict per row. Columns whose values
+are all ints (or all floats) are kept in typed array.array('q') / array('d') buffers - 8 bytes
+per value instead of a Python object plus a dict slot - and other columns in plain lists. A
+field missing from some rows is None there.
+
+Column operations never touch rows: .select() projects columns (shared, not copied),
+.filter(price=lambda p: p > 10) builds one mask from column predicates, .sort('a', 'b') orders
+row numbers column by column, .groupby('k').agg(total=('qty', 'sum')) aggregates per group.
+With numpy installed, column predicates are first tried on the whole column at once (as
+carray does) and fall back to one call per value. Unlike carray, the result is always what the
+per-value calls would give: a whole-column run that overflows int64, converts an int beyond
+2**53 to float, divides by zero or overflows a float falls back, so Python's big ints and
+exceptions are kept (the cost is an extra float64 pass per int64 arithmetic step). A row
+predicate or with_column() function written as an X expression (see expr.py) -
+filter(X["price"] * X["qty"] > 100) - runs on whole numeric columns too, instead of once per
+row dict.
+
+Iterating a ctable yields row dicts built on the fly, so every CBase method still works - map,
+reduce, take, ... see rows and return ordinary clists. .to_list() materializes clist of dicts.
+
+A ctable is immutable: .with_column(), .filter(), .sort() etc. return new tables.
+
+'''
+
+import collections
+import itertools
+import math
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple, Union
+
+from .chaincollections import CBase, cdict, cgenerator, clist, cset
+from .expr import Expr, vectorized
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+_INT64 = (-2 ** 63, 2 ** 63 - 1)
+
+Column = Union[array, List]
+
+
+def _column(values: Iterable) -> Column:
+    """Typed array for all-int or all-float values, list otherwise."""
+    values = values if isinstance(values, list) else list(values)
+    types = set(map(type, values))
+    if types == {int} and values and _INT64[0] <= min(values) and max(values) <= _INT64[1]:
+        return array('q', values)
+    if types == {float}:
+        return array('d', values)
+    return values
+
+
+def _numpy_view(column: Column) -> Any:
+    """Zero-copy ndarray over a typed column, or None."""
+    if np is None or not isinstance(column, array):
+        return None
+    return np.frombuffer(column, dtype=np.int64 if column.typecode == 'q' else np.float64)
+
+
+def _from_numpy(typecode: str, values: Any) -> array:
+    result = array(typecode)
+    result.frombytes(values.tobytes())
+    return result
+
+
+def _take(column: Column, rows: Any) -> Column:
+    """Column values at the row numbers in rows (a list, or an ndarray of positions)."""
+    view = _numpy_view(column)
+    if view is not None:
+        return _from_numpy(column.typecode, view[rows])
+    if np is not None and isinstance(rows, np.ndarray):
+        rows = rows.tolist()
+    values = list(map(column.__getitem__, rows))
+    return array(column.typecode, values) if isinstance(column, array) else values
+
+
+def _compress(column: Column, mask: Any) -> Column:
+    """Column values where mask (a list of bools, or a bool ndarray) is true."""
+    view = _numpy_view(column)
+    if view is not None:
+        return _from_numpy(column.typecode, view[np.asarray(mask, dtype=bool)])
+    if np is not None and isinstance(mask, np.ndarray):
+        mask = mask.tolist()
+    values = list(itertools.compress(column, mask))
+    return array(column.typecode, values) if isinstance(column, array) else values
+
+
+def _argsort(keys: Any, reverse: bool) -> Any:
+    """Stable ascending (or stable descending) order of an ndarray."""
+    if not reverse:
+        return np.argsort(keys, kind='stable')
+    # sorting the reversed keys and reversing back keeps ties in their original order
+    return len(keys) - 1 - np.argsort(keys[::-1], kind='stable')[::-1]
+
+
+if np is not None:
+    class _Exact(np.ndarray):
+        """
+        Column view whose elementwise arithmetic raises instead of differing from Python's.
+
+        int64 results that overflow (checked against a float64 estimate), ints too large to
+        convert to float exactly and division by zero / float overflow (numpy's error flags,
+        raised inside _exact) all raise, so the caller falls back to one call per value.
+        """
+
+        def __array_ufunc__(self, ufunc: Any, method: str, *inputs: Any, **kwargs: Any) -> Any:
+            if 'out' in kwargs:
+                return NotImplemented
+            args = [x.view(np.ndarray) if isinstance(x, np.ndarray) else x for x in inputs]
+            result = getattr(ufunc, method)(*args, **kwargs)
+            if method == '__call__' and isinstance(result, np.ndarray):
+                _check(ufunc, args, result)
+            return result.view(type(self)) if isinstance(result, np.ndarray) else result
+
+    def _check(ufunc: Any, args: List, result: Any) -> None:
+        arrays = [np.asarray(x) for x in args]
+        ints = [x for x in arrays if x.dtype.kind in 'iu']
+        if not ints:
+            return
+        if result.dtype.kind in 'iu':
+            estimate = ufunc(*(x.astype(np.float64) for x in arrays))
+            if np.any(np.abs(estimate) >= 2.0 ** 63):
+                raise OverflowError('int64 overflow in %s' % ufunc.__name__)
+        elif any(x.dtype.kind == 'f' for x in arrays) or result.dtype.kind == 'f':
+            # Python converts ints to float exactly or not at all - numpy rounds silently
+            if any(x.size and np.abs(x).max() > 2 ** 53 for x in ints):
+                raise OverflowError('int too large to convert to float exactly')
+
+    class _ExactExpr(_Exact):
+        """_Exact for X expressions, whose & | ~ mean and / or / not - so only on bools."""
+
+        def __array_ufunc__(self, ufunc: Any, method: str, *inputs: Any, **kwargs: Any) -> Any:
+            if ufunc in _LOGICAL_UFUNCS and any(
+                    np.asarray(x).dtype != bool for x in inputs if isinstance(x, np.ndarray)):
+                raise TypeError('& | ~ on non-bool values differ from and / or / not')
+            return super().__array_ufunc__(ufunc, method, *inputs, **kwargs)
+
+    _LOGICAL_UFUNCS = (np.bitwise_and, np.bitwise_or, np.invert)
+
+
+def _exact(f: Callable, arg: Any) -> Any:
+    """
+    The whole-array form of f run on arg - an ndarray, or a dict of them - with numpy's error
+    flags raising and the arrays viewed as _Exact (_ExactExpr if f is an X expression).
+    """
+    cls = _ExactExpr if isinstance(f, Expr) else _Exact
+    if isinstance(arg, dict):
+        arg = {name: view.view(cls) for name, view in arg.items()}
+    else:
+        arg = arg.view(cls)
+    with np.errstate(divide='raise', over='raise', invalid='raise'):
+        result = vectorized(f)(arg)
+    return result.view(np.ndarray) if isinstance(result, np.ndarray) else result
+
+
+def _column_mask(column: Column, predicate: Callable[[Any], bool]) -> Any:
+    view = _numpy_view(column)
+    if view is not None:
+        try:
+            result = _exact(predicate, view)
+        except Exception:
+            result = None
+        if isinstance(result, np.ndarray) and result.shape == view.shape:
+            return result.astype(bool)
+    return [bool(predicate(x)) for x in column]
+
+
+def _columnar(expr: Expr, columns: Dict[str, Column], length: int) -> Any:
+    """expr run once over the numeric columns as ndarrays, or None if it needs other columns."""
+    views = {}
+    for name, column in columns.items():
+        view = _numpy_view(column)
+        if view is not None:
+            views[name] = view
+    try:
+        result = _exact(expr, views)
+    except Exception:
+        return None
+    if isinstance(result, np.ndarray) and result.shape == (length,):
+        return result
+    return None
+
+
+def _and(mask: Any, other: Any) -> Any:
+    if np is not None:
+        return np.logical_and(mask, other)
+    return list(map(bool.__and__, mask, other))
+
+
+def _mean(values: List) -> float:
+    return math.fsum(values) / len(values)
+
+
+AGGREGATES = {
+    'sum': sum,
+    'mean': _mean,
+    'min': min,
+    'max': max,
+    'count': len,
+    'first': lambda values: values[0],
+    'last': lambda values: values[-1],
+    'list': clist,
+    'nunique': lambda values: len(set(values)),
+}
+
+
+## --------------------------------------------------------------------------------
+## TABLE
+## --------------------------------------------------------------------------------
+
+class ctable(CBase):
+    """Column-oriented table of records with chainable methods."""
+
+    def __init__(self, data: Union[Iterable[Mapping], Mapping[str, Iterable]] = ()):
+        """Build from an iterable of dicts, or from a mapping of column name -> values."""
+        if isinstance(data, ctable):
+            self._columns, self._length = data._columns, data._length
+            return
+        if isinstance(data, Mapping):
+            columns = {name: _column(values) for name, values in data.items()}
+        else:
+            records = data if isinstance(data, list) else list(data)
+            names = list(dict.fromkeys(k for record in records for k in record))
+            if all(len(record) == len(names) for record in records):
+                columns = {k: _column([record[k] for record in records]) for k in names}
+            else:
+                columns = {k: _column([record.get(k) for record in records]) for k in names}
+        lengths = set(map(len, columns.values()))
+        if len(lengths) > 1:
+            raise ValueError('columns must all have the same length')
+        self._columns = columns
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def _make(cls, columns: Dict[str, Column], length: int) -> 'ctable':
+        """Wrap ready-made columns without copying or re-typing them."""
+        result = object.__new__(cls)
+        result._columns = columns
+        result._length = length
+        return result
+
+    def _new(self, iterable: Iterable) -> clist:
+        return clist(iterable)
+
+    ## container protocol
+
+    @property
+    def columns(self) -> clist:
+        """Column names, in order."""
+        return clist(self._columns)
+
+    @property
+    def schema(self) -> cdict:
+        """Column name -> storage ('int64', 'float64' or 'object')."""
+        kinds = {'q': 'int64', 'd': 'float64'}
+        return cdict((name, kinds[col.typecode] if isinstance(col, array) else 'object')
+                     for name, col in self._columns.items())
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Yield one new dict per row."""
+        names = list(self._columns)
+        return (dict(zip(names, values)) for values in zip(*self._columns.values()))
+
+    def __getitem__(self, key: Union[str, int, slice, Sequence[str]]) -> Any:
+        """Column by name, row dict by position, ctable for a slice or a list of names."""
+        if isinstance(key, str):
+            return self.column(key)
+        if isinstance(key, slice):
+            rows = range(self._length)[key]
+            return ctable._make({name: col[key] for name, col in self._columns.items()},
+                                len(rows))
+        if isinstance(key, int):
+            return {name: col[key] for name, col in self._columns.items()}
+        return self.select(*key)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ctable):
+            return list(self._columns) == list(other._columns) and all(
+                list(col) == list(other._columns[name]) for name, col in self._columns.items()
+            )
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return 'ctable(%d rows: %s)' % (self._length, ', '.join(self._columns))
+
+    ## columns
+
+    def column(self, name: str) -> CBase:
+        """One column - a carray for typed columns when numpy is installed, else a clist."""
+        col = self._columns[name]
+        view = _numpy_view(col)
+        if view is not None:
+            from .carray import carray
+            return carray(view)
+        return clist(col)
+
+    def pluck(self, ind: Any) -> clist:
+        """Values of a column (or of several, as clists) without building rows."""
+        if isinstance(ind, str):
+            return clist(self._columns[ind])
+        if isinstance(ind, (list, tuple)) and all(isinstance(i, str) for i in ind):
+            return clist(map(clist, zip(*(self._columns[i] for i in ind))))
+        return CBase.pluck(self, ind)
+
+    def select(self, *names: str) -> 'ctable':
+        """Project onto the given columns - the columns are shared, not copied."""
+        return ctable._make({name: self._columns[name] for name in names}, self._length)
+
+    def drop_columns(self, *names: str) -> 'ctable':
+        """All columns except names."""
+        return ctable._make(
+            {k: col for k, col in self._columns.items() if k not in names}, self._length
+        )
+
+    def with_column(self, name: str, values: Union[Callable[[Dict], Any], Iterable]) -> 'ctable':
+        """Add or replace a column - values, or a function of each row dict."""
+        if np is not None and isinstance(values, Expr):
+            result = _columnar(values, self._columns, self._length)
+            if result is not None:
+                values = result.tolist()
+        values = list(map(values, self) if callable(values) else values)
+        if len(values) != self._length:
+            raise ValueError('column length %d != table length %d' % (len(values), self._length))
+        return ctable._make(dict(self._columns, **{name: _column(values)}), self._length)
+
+    def rename(self, **names: str) -> 'ctable':
+        """Rename columns, new=old."""
+        old_to_new = {old: new for new, old in names.items()}
+        return ctable._make(
+            {old_to_new.get(k, k): col for k, col in self._columns.items()}, self._length
+        )
+
+    ## row selection and order
+
+    def _where(self, mask: Any) -> 'ctable':
+        return ctable._make(
+            {name: _compress(col, mask) for name, col in self._columns.items()},
+            int(np.count_nonzero(mask)) if np is not None else sum(mask),
+        )
+
+    def _mask(self, predicate: Callable[[Dict], bool], columns: Dict[str, Callable]) -> Any:
+        mask = None
+        for name, column_predicate in columns.items():
+            column_mask = _column_mask(self._columns[name], column_predicate)
+            mask = column_mask if mask is None else _and(mask, column_mask)
+        if predicate is not None:
+            row_mask = None
+            if np is not None and isinstance(predicate, Expr):
+                row_mask = _columnar(predicate, self._columns, self._length)
+            if row_mask is None:
+                row_mask = [bool(predicate(row)) for row in self]
+            else:
+                row_mask = row_mask.astype(bool)
+            mask = row_mask if mask is None else _and(mask, row_mask)
+        return mask
+
+    def filter(self, predicate: Callable[[Dict], bool] = None, **columns: Callable) -> 'ctable':
+        """
+        Keep rows where every column predicate holds - filter(price=lambda p: p > 10).
+
+        A positional predicate is called with each row dict, for conditions that span columns.
+        """
+        mask = self._mask(predicate, columns)
+        return self if mask is None else self._where(mask)
+
+    def remove(self, predicate: Callable[[Dict], bool] = None, **columns: Callable) -> 'ctable':
+        """Drop the rows filter() would keep."""
+        mask = self._mask(predicate, columns)
+        if mask is None:
+            return self
+        return self._where(np.logical_not(mask) if np is not None else [not m for m in mask])
+
+    def _order(self, by: Sequence[str], reverse: bool) -> Any:
+        """Row numbers in sorted order - an ndarray when numpy is installed, else a list."""
+        order = None
+        # stable sorts from the last key to the first give a lexicographic order
+        for name in reversed(by):
+            col = self._columns[name]
+            view = _numpy_view(col)
+            if view is not None:
+                step = _argsort(view if order is None else view[order], reverse)
+                order = step if order is None else order[step]
+                continue
+            rows = range(self._length) if order is None else order
+            if np is not None and isinstance(rows, np.ndarray):
+                rows = rows.tolist()
+            order = sorted(rows, key=col.__getitem__, reverse=reverse)
+            if np is not None:
+                order = np.asarray(order, dtype=np.intp)
+        return order
+
+    def sort(self, *by: str, reverse: bool = False) -> 'ctable':
+        """Sort rows by one or more columns."""
+        if not by:
+            raise TypeError('sort needs at least one column name')
+        order = self._order(by, reverse)
+        return ctable._make(
+            {name: _take(col, order) for name, col in self._columns.items()}, self._length
+        )
+
+    def take(self, n: int) -> 'ctable':
+        """First n rows."""
+        return self[:n]
+
+    def tail(self, n: int) -> 'ctable':
+        """Last n rows."""
+        return self[max(self._length - n, 0):]
+
+    def groupby(self, *keys: str) -> 'GroupBy':
+        """Group rows by the values of one or more columns - finish with .agg(...)."""
+        if not keys:
+            raise TypeError('groupby needs at least one column name')
+        return GroupBy(self, keys)
+
+    ## conversion
+
+    def rows(self) -> cgenerator:
+        """Lazily build one row dict at a time."""
+        return cgenerator(iter(self))
+
+    def to_list(self) -> clist:
+        """Materialize a clist of row dicts."""
+        return clist(self)
+
+    def to_generator(self) -> cgenerator:
+        """Convert to generator of row dicts."""
+        return self.rows()
+
+    def to_set(self) -> cset:
+        """Set of rows, as tuples of values in column order."""
+        return cset(zip(*self._columns.values()))
+
+    def to_dict(self) -> cdict:
+        """Column name -> clist of values."""
+        return cdict((name, clist(col)) for name, col in self._columns.items())
+
+
+## --------------------------------------------------------------------------------
+## GROUPING
+## --------------------------------------------------------------------------------
+
+class GroupBy:
+    """Rows of a ctable grouped by key columns, in first-seen key order."""
+
+    def __init__(self, table: ctable, keys: Sequence[str]):
+        self.table = table
+        self.keys = tuple(keys)
+        groups = collections.defaultdict(list)
+        key_columns = [table._columns[k] for k in self.keys]
+        keyed = key_columns[0] if len(key_columns) == 1 else zip(*key_columns)
+        for i, key in enumerate(keyed):
+            groups[key].append(i)
+        self.groups = groups
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def agg(self, **aggregates: Union[str, Tuple[str, Union[str, Callable]]]) -> ctable:
+        """
+        One row per group: the key columns, then name=(column, how) for each aggregate.
+
+        how is a callable on the clist of the group's values, or one of 'sum', 'mean', 'min',
+        'max', 'count', 'first', 'last', 'list', 'nunique'. name='how' aggregates column name.
+        """
+        columns = self.table._columns
+        specs = []
+        for name, spec in aggregates.items():
+            source, how = (name, spec) if isinstance(spec, str) else spec
+            f = AGGREGATES[how] if isinstance(how, str) else how
+            specs.append((name, columns[source], f, isinstance(how, str)))
+        out = {}
+        keys = list(self.groups)
+        if len(self.keys) == 1:
+            out[self.keys[0]] = _column(keys)
+        else:
+            for name, values in zip(self.keys, zip(*keys)):
+                out[name] = _column(list(values))
+        for name, col, f, builtin in specs:
+            if builtin:
+                values = (f(list(map(col.__getitem__, rows))) for rows in self.groups.values())
+            else:
+                values = (f(clist(map(col.__getitem__, rows))) for rows in self.groups.values())
+            out[name] = _column(list(values))
+        return ctable._make(out, len(keys))
+
+    def count(self) -> ctable:
+        """Number of rows per group, as a 'count' column."""
+        return self.agg(count=(self.keys[0], 'count'))
@@ -0,0 +1,532 @@
+'''
+
+tree.py
+
+Walking and querying nested JSON-like data (dicts, lists and tuples of them).
+
+walk(root) yields (path, node) for every node, parents before children, with an explicit stack
+instead of recursion - no recursion limit, whatever the depth. path is the tuple of keys and
+list indices leading from root to node.
+
+select(root, path) evaluates a JSONPath-style selector lazily:
+
+    $                   the root (optional)
+    .name  ['name']     child by key            name at the start needs no dot
+    [0]  [-1]  [1:5]    list index / slice      ['a','b']  [0,2]  unions
+    *  [*]              every child (dict values, list items)
+    ..                  the node and all its descendants - ..name, ..*, ..[?...]
+    [?expr]             children for which expr holds:
+                            type == 'file'      @.size > 1000      @['a'].b != null
+                            name                (the field exists)
+                            (a < 1 || b) && !c  with and / or / not as word forms too
+
+Fields in expr are relative to the child tested (@ is the child itself). Comparisons against a
+missing field, or between values that can't be ordered, are false.
+
+Selectors are parsed once and cached by their text, so using the same selector across millions
+of documents costs one parse. A selector becomes a chain of generator steps (..name and ..[?expr]
+fused into single passes) and each filter expression one generated Python lambda. Results
+stream: nothing is collected beyond the traversal stack.
+
+'''
+
+import functools
+import operator
+import re
+from typing import Any, Callable, Iterable, Iterator, List, Sequence, Tuple
+
+# concrete types rather than the Mapping / Sequence ABCs, whose isinstance checks dominate
+_CONTAINERS = (dict, list, tuple)
+
+_MISSING = object()
+
+
+## --------------------------------------------------------------------------------
+## WALKING
+## --------------------------------------------------------------------------------
+
+def _children(node: Any) -> Iterator[Tuple[Any, Any]]:
+    if isinstance(node, dict):
+        return iter(node.items())
+    return enumerate(node)
+
+
+def _is_container(node: Any) -> bool:
+    return isinstance(node, _CONTAINERS)
+
+
+def walk(root: Any, path: Tuple = ()) -> Iterator[Tuple[Tuple, Any]]:
+    """Yield (path, node) for root and everything below it, depth first, iteratively."""
+    yield path, root
+    if not _is_container(root):
+        return
+    # one shared key list instead of a path per stack frame, which is quadratic in depth
+    keys = list(path)
+    stack = [_children(root)]
+    while stack:
+        for k, child in stack[-1]:
+            keys.append(k)
+            yield tuple(keys), child
+            if _is_container(child) and child:
+                stack.append(_children(child))
+                break
+            keys.pop()
+        else:
+            stack.pop()
+            if len(keys) > len(path):
+                keys.pop()
+
+
+def _containers(node: Any) -> Iterator:
+    """node and every dict / list below it, depth first, without building paths."""
+    if not _is_container(node):
+        return
+    yield node
+    stack = [_values(node)]
+    while stack:
+        for child in stack[-1]:
+            if _is_container(child):
+                yield child
+                if child:
+                    stack.append(_values(child))
+                    break
+        else:
+            stack.pop()
+
+
+def _values(node: Any) -> Iterator:
+    return iter(node.values()) if isinstance(node, dict) else iter(node)
+
+
+## --------------------------------------------------------------------------------
+## SELECTOR STEPS - each maps an iterator of nodes to an iterator of nodes
+## --------------------------------------------------------------------------------
+
+def _child(names: Sequence) -> Callable[[Iterable], Iterator]:
+    def step(nodes: Iterable) -> Iterator:
+        for node in nodes:
+            if isinstance(node, dict):
+                for name in names:
+                    value = node.get(name, _MISSING)
+                    if value is not _MISSING:
+                        yield value
+    return step
+
+
+def _index(indices: Sequence[int]) -> Callable[[Iterable], Iterator]:
+    def step(nodes: Iterable) -> Iterator:
+        for node in nodes:
+            if isinstance(node, (list, tuple)):
+                n = len(node)
+                for i in indices:
+                    if -n <= i < n:
+                        yield node[i]
+    return step
+
+
+def _slice(s: slice) -> Callable[[Iterable], Iterator]:
+    def step(nodes: Iterable) -> Iterator:
+        for node in nodes:
+            if isinstance(node, (list, tuple)):
+                yield from node[s]
+    return step
+
+
+def _wildcard(nodes: Iterable) -> Iterator:
+    for node in nodes:
+        if _is_container(node):
+            yield from _values(node)
+
+
+def _descend(nodes: Iterable) -> Iterator:
+    # every step that can follow .. only looks inside containers, so scalars are skipped here
+    for node in nodes:
+        yield from _containers(node)
+
+
+def _filter(predicate: Callable[[Any], bool]) -> Callable[[Iterable], Iterator]:
+    scalars = _tests_scalars(predicate)
+
+    def step(nodes: Iterable) -> Iterator:
+        for node in nodes:
+            if _is_container(node):
+                for child in _values(node):
+                    if (scalars or isinstance(child, _CONTAINERS)) and predicate(child):
+                        yield child
+    return step
+
+
+def _tests_scalars(predicate: Callable[[Any], bool]) -> bool:
+    """False if predicate is known to reject every scalar, so scalars needn't be tested."""
+    if getattr(predicate, 'reads_self', True):
+        return True
+    # it only reads fields below the node - all missing for a scalar, so one answer for all
+    return bool(predicate(None))
+
+
+## ..name and ..[?expr] as single passes over the containers, rather than .. then a step
+
+def _descend_child(names: Sequence) -> Callable[[Iterable], Iterator]:
+    def step(nodes: Iterable) -> Iterator:
+        for node in nodes:
+            stack = [node]
+            while stack:
+                node = stack.pop()
+                if isinstance(node, dict):
+                    for name in names:
+                        value = node.get(name, _MISSING)
+                        if value is not _MISSING:
+                            yield value
+                    children = node.values()
+                elif isinstance(node, (list, tuple)):
+                    children = node
+                else:
+                    continue
+                # reversed onto the stack so containers are visited in document order
+                stack.extend([c for c in children if isinstance(c, _CONTAINERS)][::-1])
+    return step
+
+
+def _descend_filter(predicate: Callable[[Any], bool]) -> Callable[[Iterable], Iterator]:
+    scalars = _tests_scalars(predicate)
+
+    def step(nodes: Iterable) -> Iterator:
+        for node in nodes:
+            stack = [node] if _is_container(node) else []
+            while stack:
+                node = stack.pop()
+                containers = []
+                for child in node.values() if isinstance(node, dict) else node:
+                    if isinstance(child, _CONTAINERS):
+                        containers.append(child)
+                        if predicate(child):
+                            yield child
+                    elif scalars and predicate(child):
+                        yield child
+                stack.extend(containers[::-1])
+    return step
+
+
+## --------------------------------------------------------------------------------
+## FILTER EXPRESSIONS
+## --------------------------------------------------------------------------------
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+      | (?P<op>==|!=|<=|>=|&&|\|\||[<>!()@.\[\]])
+      | (?P<name>[A-Za-z_][\w-]*)
+    )''', re.VERBOSE)
+
+_ORDERINGS = {'<': '_lt', '<=': '_le', '>': '_gt', '>=': '_ge'}
+_EQUALITIES = {'==': '_eq', '!=': '_ne'}
+_LITERALS = {'true': True, 'false': False, 'null': None}
+
+
+def _unquote(token: str) -> str:
+    return re.sub(r'\\(.)', r'\1', token[1:-1])
+
+
+def _tokens(text: str) -> List[Tuple[str, str]]:
+    tokens, pos = [], 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise ValueError('unexpected %r in filter expression %r' % (text[pos:], text))
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+def _get_path(node: Any, keys: Tuple) -> Any:
+    for k in keys:
+        if isinstance(node, dict):
+            node = node.get(k, _MISSING)
+            if node is _MISSING:
+                return _MISSING
+        elif isinstance(node, (list, tuple)) and isinstance(k, int) and -len(node) <= k < len(node):
+            node = node[k]
+        else:
+            return _MISSING
+    return node
+
+
+def _ordered(compare: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def ordered(a: Any, b: Any) -> bool:
+        if a is _MISSING or b is _MISSING:
+            return False
+        try:
+            return bool(compare(a, b))
+        except TypeError:
+            return False
+
+    return ordered
+
+
+def _present(compare: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    def present(a: Any, b: Any) -> Any:
+        return a is not _MISSING and b is not _MISSING and compare(a, b)
+
+    return present
+
+
+# all a compiled predicate can see - no builtins, so the generated source can only do this
+_NAMESPACE = {
+    '__builtins__': {}, 'bool': bool, 'isinstance': isinstance, 'dict': dict, '_M': _MISSING,
+    '_get_path': _get_path, '_lt': _ordered(operator.lt), '_le': _ordered(operator.le),
+    '_gt': _ordered(operator.gt), '_ge': _ordered(operator.ge),
+    '_eq': _present(operator.eq), '_ne': _present(operator.ne),
+}
+
+
+class _ExprParser:
+    """
+    Recursive descent over filter tokens into the source of a Python predicate.
+
+    The expression is compiled to a single lambda, so a test costs one call rather than one per
+    operator. Only repr()'d literals and keys reach the source, never raw selector text.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokens(text)
+        self.i = 0
+        self.reads_self = False
+
+    def peek(self) -> Tuple[str, str]:
+        return self.tokens[self.i] if self.i < len(self.tokens) else ('end', '')
+
+    def take(self, value: str = None) -> Tuple[str, str]:
+        token = self.peek()
+        if token[0] == 'end' or (value is not None and token[1] != value):
+            raise ValueError('expected %r in filter expression %r' % (value or 'more', self.text))
+        self.i += 1
+        return token
+
+    def parse(self) -> Callable[[Any], bool]:
+        source = self.disjunction()
+        if self.peek()[0] != 'end':
+            raise ValueError('unexpected %r in filter expression %r' % (self.peek()[1], self.text))
+        predicate = eval('lambda node: bool(%s)' % source, dict(_NAMESPACE))
+        predicate.reads_self = self.reads_self
+        return predicate
+
+    def disjunction(self) -> str:
+        terms = [self.conjunction()]
+        while self.peek()[1] in ('||', 'or'):
+            self.take()
+            terms.append(self.conjunction())
+        return '(%s)' % ' or '.join(terms)
+
+    def conjunction(self) -> str:
+        terms = [self.negation()]
+        while self.peek()[1] in ('&&', 'and'):
+            self.take()
+            terms.append(self.negation())
+        return '(%s)' % ' and '.join(terms)
+
+    def negation(self) -> str:
+        if self.peek()[1] in ('!', 'not'):
+            self.take()
+            return '(not %s)' % self.negation()
+        if self.peek()[1] == '(':
+            self.take('(')
+            inner = self.disjunction()
+            self.take(')')
+            return inner
+        return self.comparison()
+
+    def comparison(self) -> str:
+        left, left_literal = self.operand()
+        op = self.peek()[1]
+        if op not in ('==', '!=') and op not in _ORDERINGS:
+            return '(%s is not _M)' % left
+        self.take()
+        right, right_literal = self.operand()
+        if op in _ORDERINGS:
+            return '%s(%s, %s)' % (_ORDERINGS[op], left, right)
+        if op == '==' and (left_literal or right_literal):
+            # the missing marker equals no literal, so field == 'value' needs no guard
+            return '(%s == %s)' % (left, right)
+        # a missing field equals nothing and differs from nothing
+        return '%s(%s, %s)' % (_EQUALITIES[op], left, right)
+
+    def operand(self) -> Tuple[str, bool]:
+        """(source, is a literal) of a literal or field."""
+        kind, value = self.peek()
+        if kind == 'string':
+            self.take()
+            return repr(_unquote(value)), True
+        if kind == 'number':
+            self.take()
+            return repr(float(value) if any(c in value for c in '.eE') else int(value)), True
+        if kind == 'name' and value in _LITERALS:
+            self.take()
+            return repr(_LITERALS[value]), True
+        return self.field(), False
+
+    def field(self) -> str:
+        """@, @.a.b, @['a'][0] or a bare a.b - a path below the node being tested."""
+        keys = []
+        kind, value = self.peek()
+        if value == '@':
+            self.take()
+        elif kind == 'name':
+            self.take()
+            keys.append(value)
+        else:
+            raise ValueError('expected a field in filter expression %r' % self.text)
+        while self.peek()[1] in ('.', '['):
+            if self.take()[1] == '.':
+                kind, value = self.take()
+                if kind != 'name':
+                    raise ValueError('expected a name after . in %r' % self.text)
+                keys.append(value)
+            else:
+                kind, value = self.take()
+                if kind not in ('string', 'number') or '.' in value:
+                    raise ValueError('expected a key or index in [] in %r' % self.text)
+                keys.append(_unquote(value) if kind == 'string' else int(value))
+                self.take(']')
+        if not keys:
+            self.reads_self = True
+            return 'node'
+        if len(keys) == 1 and isinstance(keys[0], str):
+            return '(node.get(%r, _M) if isinstance(node, dict) else _M)' % keys[0]
+        return '_get_path(node, %r)' % (tuple(keys),)
+
+
+## --------------------------------------------------------------------------------
+## SELECTOR PARSER
+## --------------------------------------------------------------------------------
+
+_NAME = re.compile(r'[A-Za-z_][\w-]*')
+
+
+def _bracket_end(text: str, start: int) -> int:
+    """Index of the ] closing the [ at start, skipping quoted strings and nested brackets."""
+    depth, i, quote = 0, start, None
+    while i < len(text):
+        c = text[i]
+        if quote:
+            if c == '\\':
+                i += 1
+            elif c == quote:
+                quote = None
+        elif c in '\'"':
+            quote = c
+        elif c == '[':
+            depth += 1
+        elif c == ']':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError('unclosed [ in selector %r' % text)
+
+
+def _bracket_step(inner: str, text: str) -> Tuple[str, Any]:
+    inner = inner.strip()
+    if inner == '*':
+        return 'wildcard', None
+    if inner.startswith('?'):
+        return 'filter', _ExprParser(inner[1:]).parse()
+    if ':' in inner:
+        parts = [p.strip() for p in inner.split(':')]
+        if len(parts) > 3:
+            raise ValueError('bad slice [%s] in selector %r' % (inner, text))
+        try:
+            return 'slice', slice(*(int(p) if p else None for p in parts))
+        except ValueError:
+            raise ValueError('bad slice [%s] in selector %r' % (inner, text)) from None
+    items = [p.strip() for p in re.findall(r'''('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|[^,]+)''',
+                                              inner)]
+    if items and all(p[:1] in '\'"' for p in items):
+        return 'child', [_unquote(p) for p in items]
+    try:
+        return 'index', [int(p) for p in items]
+    except ValueError:
+        raise ValueError('bad selector segment [%s] in %r' % (inner, text)) from None
+
+
+def _parse_selector(text: str) -> List[Tuple[str, Any]]:
+    """The selector as (kind, argument) steps."""
+    steps = []
+    i = 1 if text.startswith('$') else 0
+    while i < len(text):
+        c = text[i]
+        if text.startswith('..', i):
+            steps.append(('descend', None))
+            i += 2
+            if i < len(text) and text[i] == '[':
+                continue
+        elif c == '.':
+            i += 1
+        elif c == '[':
+            end = _bracket_end(text, i)
+            steps.append(_bracket_step(text[i + 1:end], text))
+            i = end + 1
+            continue
+        elif c.isspace():
+            i += 1
+            continue
+        elif steps:
+            raise ValueError('expected . or [ at %d in selector %r' % (i, text))
+        # a name or * after ., .. or at the start
+        if i < len(text) and text[i] == '*':
+            steps.append(('wildcard', None))
+            i += 1
+            continue
+        match = _NAME.match(text, i)
+        if match is None:
+            raise ValueError('expected a name at %d in selector %r' % (i, text))
+        steps.append(('child', [match.group()]))
+        i = match.end()
+    return steps
+
+
+_STEPS = {
+    'child': _child, 'index': _index, 'slice': _slice, 'filter': _filter,
+    'wildcard': lambda _: _wildcard, 'descend': lambda _: _descend,
+}
+_DESCENDING = {'child': _descend_child, 'filter': _descend_filter}
+
+
+@functools.lru_cache(maxsize=256)
+def compile_selector(text: str) -> Tuple[Callable[[Iterable], Iterator], ...]:
+    """Parse a selector into its steps (cached by text)."""
+    steps = []
+    parsed = _parse_selector(text)
+    i = 0
+    while i < len(parsed):
+        kind, arg = parsed[i]
+        following = parsed[i + 1][0] if i + 1 < len(parsed) else None
+        if kind == 'descend' and following in _DESCENDING:
+            steps.append(_DESCENDING[following](parsed[i + 1][1]))
+            i += 2
+            continue
+        steps.append(_STEPS[kind](arg))
+        i += 1
+    return tuple(steps)
+
+
+def select_each(documents: Iterable, path: str) -> Iterator:
+    """Lazily yield the nodes path selects in each of documents, document by document."""
+    nodes = iter(documents)
+    for step in compile_selector(path):
+        nodes = step(nodes)
+    return nodes
+
+
+def select(root: Any, path: str) -> Iterator:
+    """Lazily yield the nodes under root that path selects."""
+    return select_each((root,), path)
+
+
+def walk_each(documents: Iterable) -> Iterator[Tuple[Tuple, Any]]:
+    """walk() every document - paths start with the document's position."""
+    for i, document in enumerate(documents):
+        yield from walk(document, (i,))
@@ -0,0 +1,226 @@
+'''
+
+views.py
+
+Zero-copy views over clist and cdict.
+
+clist.view(start, stop, step) returns a clist_view - a window onto the list that indexes and
+iterates the original storage instead of copying it. Slicing a view returns another view of
+the same list. cdict.keys(copy=False), .values(copy=False) and .items(copy=False) return
+cdict_keys / cdict_values / cdict_items views backed by the dict itself.
+
+Views are full chains: .map, .filter, .groupby, ... read through the view and return ordinary
+clist / cdict results. A view is materialized only by .to_list() or, for clist_view, by writing
+to it - the first assignment or deletion copies the window into a private list, after which
+the view no longer follows the original.
+
+Views are live: they see later changes to the underlying list or dict. A clist_view keeps the
+index range it was created with, so it raises IndexError if the list shrinks below it. Use the
+copying forms (clist[a:b], cdict.keys()) where a snapshot is needed.
+
+'''
+
+import itertools
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from .chaincollections import CBase, T, cdict, cgenerator, clist, cset
+
+
+def _same_elements(a: Iterable, b: Iterable) -> bool:
+    sentinel = object()
+    return all(x == y for x, y in itertools.zip_longest(a, b, fillvalue=sentinel))
+
+
+class clist_view(CBase):
+    """Window onto a list, with chainable methods, that does not copy the list."""
+
+    def __init__(
+        self,
+        base: List[T],
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        step: Optional[int] = None,
+    ):
+        """View base[start:stop:step] - the bounds are resolved against base's current length."""
+        if isinstance(base, clist_view):
+            self._base = base._base
+            self._range = base._range[start:stop:step]
+        else:
+            self._base = base
+            self._range = range(len(base))[start:stop:step]
+
+    def _new(self, iterable: Iterable) -> clist:
+        return clist(iterable)
+
+    ## sequence protocol
+
+    def __len__(self) -> int:
+        return len(self._range)
+
+    def __iter__(self) -> Iterator[T]:
+        r = self._range
+        if r.step > 0 and len(r) and r[-1] >= len(self._base):
+            raise IndexError('clist_view range outside the list')
+        if r.step == 1 and isinstance(self._base, list):
+            # a list iterator positioned at start in O(1), rather than walking up to it
+            it = list.__iter__(self._base)
+            it.__setstate__(r.start)
+            return itertools.islice(it, len(r))
+        return map(self._base.__getitem__, r)
+
+    def __reversed__(self) -> Iterator[T]:
+        return map(self._base.__getitem__, reversed(self._range))
+
+    def __contains__(self, item: Any) -> bool:
+        return any(x == item for x in self)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[T, 'clist_view']:
+        """Get item at index, or a view of a slice of this view."""
+        if isinstance(key, slice):
+            return clist_view(self, key.start, key.stop, key.step)
+        return self._base[self._range[key]]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (clist_view, list, tuple)):
+            return len(self) == len(other) and _same_elements(self, other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return 'clist_view(%r)' % list(self)
+
+    ## copy on write
+
+    def _detach(self) -> None:
+        if not (self._range.start == 0 and self._range.step == 1
+                and isinstance(self._base, _Owned)):
+            self._base = _Owned(self)
+            self._range = range(len(self._base))
+
+    def __setitem__(self, key: Union[int, slice], value: Any) -> None:
+        """Assign through a private copy of the window - the original list is not changed."""
+        self._detach()
+        self._base[key] = value
+        self._range = range(len(self._base))
+
+    def __delitem__(self, key: Union[int, slice]) -> None:
+        """Delete from a private copy of the window - the original list is not changed."""
+        self._detach()
+        del self._base[key]
+        self._range = range(len(self._base))
+
+    ## clist-like methods
+
+    def append(self, item: T) -> clist:
+        """Return a new clist with item added at the end."""
+        result = clist(self)
+        list.append(result, item)
+        return result
+
+    def sort(self, key: Any = None, reverse: bool = False) -> clist:
+        """Sort and return a new clist."""
+        return clist(sorted(self, key=key, reverse=reverse))
+
+    def reverse(self) -> clist:
+        """Reverse and return a new clist."""
+        return clist(reversed(self))
+
+    def to_list(self) -> clist:
+        """Copy the window into a clist."""
+        return clist(self)
+
+    def to_generator(self) -> cgenerator:
+        """Convert to generator."""
+        return cgenerator(self)
+
+    def to_set(self) -> cset:
+        """Convert to set."""
+        return cset(self)
+
+    def to_dict(self) -> cdict:
+        """Convert a view of pairs to dict."""
+        return cdict(self)
+
+
+class _Owned(list):
+    """Private storage a clist_view copied its window into."""
+
+
+class _DictView(CBase):
+    """Live view of a dict's keys, values or items, with chainable methods."""
+
+    _kind = 'keys'
+
+    def __init__(self, mapping: Dict):
+        self._mapping = mapping
+        self._view = getattr(dict, self._kind)(mapping)
+
+    def _new(self, iterable: Iterable) -> clist:
+        return clist(iterable)
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._view)
+
+    def __reversed__(self) -> Iterator:
+        return reversed(list(self._view))
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self._view
+
+    def __getitem__(self, key: Union[int, slice]) -> Any:
+        """Get item at position, or a clist of a slice - O(position) like any dict walk."""
+        if isinstance(key, slice):
+            return clist(self)[key]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('%s index out of range' % type(self).__name__)
+        return next(itertools.islice(self._view, key, None))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (_DictView, list, tuple)):
+            return len(self) == len(other) and _same_elements(self, other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return '%s(%r)' % (type(self).__name__, list(self))
+
+    def to_list(self) -> clist:
+        """Copy into a clist."""
+        return clist(self)
+
+    def to_generator(self) -> cgenerator:
+        """Convert to generator."""
+        return cgenerator(self)
+
+    def to_set(self) -> cset:
+        """Convert to set."""
+        return cset(self)
+
+
+class cdict_keys(_DictView):
+    """Live view of a cdict's keys."""
+
+    _kind = 'keys'
+
+
+class cdict_values(_DictView):
+    """Live view of a cdict's values."""
+
+    _kind = 'values'
+
+
+class cdict_items(_DictView):
+    """Live view of a cdict's (key, value) pairs."""
+
+    _kind = 'items'
+
+    def to_dict(self) -> cdict:
+        """Copy into a cdict."""
+        return cdict(self)
@@ -0,0 +1,293 @@
+'''
+
+windows.py
+
+Incremental window aggregations.
+
+.rolling(n) aggregates every window of n consecutive elements - one result per full window, the
+same windows as .sliding_window(n) - without building the windows. Each step adds the new
+element to a running aggregate and removes the one leaving the window, so sum / mean / var /
+count cost O(1) per element and min / max O(1) amortized (monotonic deque), whatever n is.
+.aggregate(combine, uncombine, initial) does the same for any invertible aggregate.
+
+.tumbling(size, key) and .session(gap, key) split a stream into consecutive windows by a
+timestamp function: fixed, non-overlapping [start, start + size) intervals, or runs of elements
+at most gap apart (a wider gap starts a new session). Each yields (window start, result)
+pairs. Elements must arrive in timestamp order. Without key, tumbling windows are runs of size
+elements.
+
+value= picks the number to aggregate from each element (default: the element itself). Every
+aggregation returns a cgenerator, so windows stream over arbitrarily long inputs.
+
+'''
+
+import collections
+import itertools
+import math
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from .chaincollections import cgenerator, clist
+
+
+def _not_none(x: Any) -> bool:
+    return x is not None
+
+
+def _stream(source: Iterable, value: Optional[Callable]) -> Iterator:
+    return iter(source) if value is None else map(value, source)
+
+
+## --------------------------------------------------------------------------------
+## ROLLING (COUNT-BASED SLIDING) WINDOWS
+## --------------------------------------------------------------------------------
+
+class Rolling:
+    """Aggregations over every window of n consecutive elements."""
+
+    def __init__(self, source: Iterable, n: int, value: Optional[Callable] = None):
+        if n < 1:
+            raise ValueError('window size must be positive')
+        self.source = source
+        self.n = n
+        self.value = value
+
+    def aggregate(self, combine: Callable, uncombine: Callable, initial: Any = 0) -> cgenerator:
+        """
+        Custom aggregate: acc = combine(acc, entering), acc = uncombine(acc, leaving).
+
+        uncombine must undo combine - e.g. (operator.add, operator.sub) for a sum, or counters
+        updated with + and - for per-window frequencies.
+        """
+        n, values = self.n, _stream(self.source, self.value)
+
+        def _aggregate():
+            window = collections.deque()
+            acc = initial
+            for x in values:
+                acc = combine(acc, x)
+                window.append(x)
+                if len(window) > n:
+                    acc = uncombine(acc, window.popleft())
+                if len(window) == n:
+                    yield acc
+
+        return cgenerator(_aggregate())
+
+    def sum(self) -> cgenerator:
+        """Sum of each window."""
+        n, values = self.n, _stream(self.source, self.value)
+
+        def _sum():
+            window = collections.deque()
+            total = 0
+            evicted = 0
+            for x in values:
+                window.append(x)
+                total += x
+                if len(window) > n:
+                    total -= window.popleft()
+                    evicted += 1
+                    if evicted == n and isinstance(total, float):
+                        # re-add from scratch once per window length to stop rounding drift
+                        total = math.fsum(window)
+                        evicted = 0
+                if len(window) == n:
+                    yield total
+
+        return cgenerator(_sum())
+
+    def mean(self) -> cgenerator:
+        """Arithmetic mean of each window."""
+        n = self.n
+        return cgenerator(total / n for total in self.sum())
+
+    def var(self, ddof: int = 1) -> cgenerator:
+        """Variance of each window (ddof=1: sample variance, ddof=0: population variance)."""
+        n, values = self.n, _stream(self.source, self.value)
+        if n <= ddof:
+            raise ValueError('window size must be larger than ddof')
+
+        def _var():
+            window = collections.deque()
+            mean = 0.0
+            m2 = 0.0
+            evicted = 0
+            for x in values:
+                window.append(x)
+                if len(window) <= n:
+                    # Welford's update while the first window fills
+                    delta = x - mean
+                    mean += delta / len(window)
+                    m2 += delta * (x - mean)
+                else:
+                    old = window.popleft()
+                    new_mean = mean + (x - old) / n
+                    m2 += (x - old) * (x - new_mean + old - mean)
+                    mean = new_mean
+                    evicted += 1
+                    if evicted == n:
+                        mean = math.fsum(window) / n
+                        m2 = math.fsum((y - mean) ** 2 for y in window)
+                        evicted = 0
+                if len(window) == n:
+                    yield max(m2, 0.0) / (n - ddof)
+
+        return cgenerator(_var())
+
+    def std(self, ddof: int = 1) -> cgenerator:
+        """Standard deviation of each window."""
+        return cgenerator(map(math.sqrt, self.var(ddof)))
+
+    def _extreme(self, better: Callable[[Any, Any], bool]) -> cgenerator:
+        n, values = self.n, _stream(self.source, self.value)
+
+        def _extreme():
+            # (index, value) pairs, values monotonic from the front - the front is the answer
+            candidates = collections.deque()
+            for i, x in enumerate(values):
+                while candidates and not better(candidates[-1][1], x):
+                    candidates.pop()
+                candidates.append((i, x))
+                if candidates[0][0] <= i - n:
+                    candidates.popleft()
+                if i >= n - 1:
+                    yield candidates[0][1]
+
+        return cgenerator(_extreme())
+
+    def min(self) -> cgenerator:
+        """Minimum of each window."""
+        return self._extreme(lambda kept, new: kept < new)
+
+    def max(self) -> cgenerator:
+        """Maximum of each window."""
+        return self._extreme(lambda kept, new: kept > new)
+
+    def count(self, predicate: Callable[[Any], bool] = _not_none) -> cgenerator:
+        """Number of elements in each window satisfying predicate (default: not None)."""
+        return Rolling(map(predicate, _stream(self.source, self.value)), self.n).aggregate(
+            lambda acc, hit: acc + (1 if hit else 0), lambda acc, hit: acc - (1 if hit else 0)
+        )
+
+
+## --------------------------------------------------------------------------------
+## TUMBLING AND SESSION WINDOWS
+## --------------------------------------------------------------------------------
+
+class Windows:
+    """Aggregations over consecutive, non-overlapping windows - each yields (start, result)."""
+
+    def __init__(
+        self,
+        source: Iterable,
+        assign: Callable[[], Callable[[Any], Any]],
+        value: Optional[Callable] = None,
+    ):
+        # assign() returns a fresh (possibly stateful) element -> window start function
+        self.source = source
+        self.assign = assign
+        self.value = value
+
+    def _runs(self) -> Iterator[Tuple[Any, Iterator]]:
+        for start, run in itertools.groupby(self.source, self.assign()):
+            yield start, _stream(run, self.value)
+
+    def _each(self, f: Callable[[Iterator], Any]) -> cgenerator:
+        return cgenerator((start, f(run)) for start, run in self._runs())
+
+    def to_lists(self) -> cgenerator:
+        """(start, clist of elements) for each window."""
+        return cgenerator((start, clist(run)) for start, run in itertools.groupby(
+            self.source, self.assign()
+        ))
+
+    def aggregate(self, combine: Callable, initial: Any = 0) -> cgenerator:
+        """Fold each window with combine(acc, value), starting from initial."""
+        def fold(run: Iterator) -> Any:
+            acc = initial
+            for x in run:
+                acc = combine(acc, x)
+            return acc
+
+        return self._each(fold)
+
+    def sum(self) -> cgenerator:
+        """Sum of each window."""
+        return self._each(sum)
+
+    def count(self) -> cgenerator:
+        """Number of elements in each window."""
+        return self._each(lambda run: sum(1 for _ in run))
+
+    def mean(self) -> cgenerator:
+        """Arithmetic mean of each window."""
+        def mean(run: Iterator) -> float:
+            total, n = 0, 0
+            for x in run:
+                total += x
+                n += 1
+            return total / n
+
+        return self._each(mean)
+
+    def min(self) -> cgenerator:
+        """Minimum of each window."""
+        return self._each(min)
+
+    def max(self) -> cgenerator:
+        """Maximum of each window."""
+        return self._each(max)
+
+    def var(self, ddof: int = 1) -> cgenerator:
+        """Variance of each window (nan when a window has ddof elements or fewer)."""
+        def var(run: Iterator) -> float:
+            n, mean, m2 = 0, 0.0, 0.0
+            for x in run:
+                n += 1
+                delta = x - mean
+                mean += delta / n
+                m2 += delta * (x - mean)
+            return m2 / (n - ddof) if n > ddof else math.nan
+
+        return self._each(var)
+
+
+def tumbling_assigner(size: Any, key: Optional[Callable]) -> Callable[[], Callable[[Any], Any]]:
+    """Window start for fixed windows of size (by key(x), or by position without key)."""
+    def assign() -> Callable[[Any], Any]:
+        if key is None:
+            position = itertools.count()
+            return lambda x: next(position) // size * size
+        last = [None]
+
+        def start(x: Any) -> Any:
+            ts = key(x)
+            window = ts - ts % size
+            if last[0] is not None and window < last[0]:
+                raise ValueError('tumbling windows need elements in timestamp order')
+            last[0] = window
+            return window
+
+        return start
+
+    return assign
+
+
+def session_assigner(gap: Any, key: Callable) -> Callable[[], Callable[[Any], Any]]:
+    """Session start: a new session begins when key(x) is more than gap after the previous."""
+    def assign() -> Callable[[Any], Any]:
+        state = {'start': None, 'last': None}
+
+        def start(x: Any) -> Any:
+            ts = key(x)
+            last = state['last']
+            if last is not None and ts < last:
+                raise ValueError('session windows need elements in timestamp order')
+            if last is None or ts - last > gap:
+                state['start'] = ts
+            state['last'] = ts
+            return state['start']
+
+        return start
+
+    return assign
@@ -2,7 +2,7 @@ from setuptools import setup, find_packages
 
 setup(
   name = 'chaincollections',
-  packages = find_packages(), 
+  packages = find_packages(exclude=['tests', 'benchmarks']),
   version = '0.1',
   description = 'collections with method chaining',
   author = 'Phillip Adkins',
@@ -14,5 +14,8 @@ setup(
   install_requires=[
     'cytoolz',
   ],
+  extras_require={
+    'numpy': ['numpy'],
+  },
   python_requires='>=3.6',
 )
@@ -0,0 +1,107 @@
+"""
+Unit tests for single-pass .aggregate() / .fanout()
+"""
+import itertools
+import operator
+
+import pytest
+from chaincollections import Aggregator, HyperLogLog, X, cdict, cgenerator, clist
+from chaincollections.chaincollections import CBase
+
+DATA = [i * 7 % 100 for i in range(5000)]
+
+
+def counted(n, step=1):
+    """A one-shot cgenerator of range(n), and a counter of how many elements it produced."""
+    pulled = itertools.count()
+    return cgenerator(next(pulled) * step for _ in range(n)), pulled
+
+
+class TestAggregate:
+    def test_matches_the_chain_methods(self):
+        """Test one pass over a one-shot stream gives what each method gives on a clist"""
+        stream, pulled = counted(5000, 7)
+        result = stream.map(X % 100).aggregate(
+            n=len, total=sum, lo=min, hi='max', mean='mean', freq=CBase.frequencies,
+            top=('top_k', 5), distinct=CBase.is_distinct, first='first', last='last',
+            by3=(CBase.count_by, X % 3), groups=('groupby', X % 2), product=('reduce', max),
+            sample=('sample', 5, 1), quantile=('approx_quantiles', [0.5], 200, 1),
+            chunk_size=300,
+        )
+        data = clist(DATA)
+        assert isinstance(result, cdict) and next(pulled) == 5000
+        assert result == {
+            'n': 5000, 'total': sum(DATA), 'lo': 0, 'hi': 99, 'mean': sum(DATA) / 5000,
+            'freq': data.frequencies, 'top': data.top_k(5), 'distinct': False,
+            'first': DATA[0], 'last': DATA[-1], 'by3': data.count_by(X % 3),
+            'groups': data.groupby(X % 2), 'product': 99, 'sample': data.sample(5, 1),
+            'quantile': data.approx_quantiles([0.5], 200, 1),
+        }
+
+    def test_ties_and_keys(self):
+        """Test top_k / max keep the earliest of equal keys, as the one-shot versions do"""
+        rows = clist({'k': i % 4, 'i': i} for i in range(50))
+        result = rows.aggregate(top=('top_k', 3, X['k']), hi=('max', X['k']), chunk_size=7)
+        assert result['top'] == rows.top_k(3, X['k'])
+        assert result['hi'] == max(rows, key=X['k'])
+
+    def test_sketches_and_custom_aggregators(self):
+        """Test sketch objects are updated in place and any Aggregator can be plugged in"""
+        class Evens(Aggregator):
+            def __init__(self):
+                self.n = 0
+
+            def add(self, chunk):
+                self.n += sum(1 for x in chunk if x % 2 == 0)
+
+            def result(self):
+                return self.n
+
+        hll = HyperLogLog()
+        result = clist(DATA).aggregate(hll=hll, evens=Evens())
+        assert result['hll'] is hll and hll.count() == 100
+        assert result['evens'] == sum(1 for x in DATA if x % 2 == 0)
+
+    def test_bad_specs(self):
+        """Test unknown names, stray arguments and empty streams fail clearly"""
+        with pytest.raises(ValueError):
+            clist(DATA).aggregate(x='median')
+        with pytest.raises(TypeError):
+            clist(DATA).aggregate(x=(lambda s: s, 1))
+        with pytest.raises(TypeError):
+            clist(DATA).aggregate(x=42)
+        with pytest.raises(ValueError):
+            clist().aggregate(m='mean')
+        assert clist().aggregate(n=len, total=sum) == {'n': 0, 'total': 0}
+
+
+class TestFanout:
+    def test_sub_chains(self):
+        """Test sub-chains see every element once, alongside the built-in aggregations"""
+        stream, pulled = counted(5000, 7)
+        results = stream.map(X % 100).fanout(
+            'count',
+            lambda s: s.filter(X % 2 == 0).map(X * 2).reduce(operator.add),
+            lambda s: s.map(X // 10).frequencies,
+            chunk_size=256,
+        )
+        assert isinstance(results, clist) and next(pulled) == 5000
+        assert results == [5000, sum(x * 2 for x in DATA if x % 2 == 0),
+                           clist(DATA).map(X // 10).frequencies]
+
+    def test_stops_reading_when_every_consumer_is_done(self):
+        """Test the source is abandoned once all aggregators have their answer"""
+        stream, pulled = counted(10 ** 9)
+        assert stream.fanout(lambda s: s.take(5).to_list(), 'first', chunk_size=100) == \
+            [[0, 1, 2, 3, 4], 0]
+        assert next(pulled) < 1000
+        repeats, pulled = counted(10 ** 9)
+        assert repeats.map(X % 50).aggregate(d=CBase.is_distinct, chunk_size=10) == {'d': False}
+        assert next(pulled) < 100
+
+    def test_sub_chain_errors(self):
+        """Test errors in sub-chains reach the caller, and unconsumed results are rejected"""
+        with pytest.raises(ZeroDivisionError):
+            clist(DATA).fanout('count', lambda s: s.map(lambda x: 1 / (x - 50)).to_list())
+        with pytest.raises(TypeError, match='terminal'):
+            clist(DATA).fanout(lambda s: s.map(X + 1))
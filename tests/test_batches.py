@@ -0,0 +1,95 @@
+"""
+Unit tests for batched map
+"""
+import threading
+import time
+
+import pytest
+from chaincollections import cgenerator, clist, crange, cxrange
+from chaincollections.batches import BatchSizer, map_batches
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBatches:
+    def test_flattens_in_order(self):
+        """Test batches are lists of size elements and results keep source order"""
+        seen = []
+
+        def double(batch):
+            seen.append(list(batch))
+            return [x * 2 for x in batch]
+
+        result = crange(10).map_batches(double, size=4)
+        assert isinstance(result, clist) and result == [x * 2 for x in range(10)]
+        assert seen == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+        lazy = cxrange(10 ** 12).map_batches(lambda b: [sum(b)], size=3)
+        assert isinstance(lazy, cgenerator) and lazy.take(2).to_list() == [3, 12]
+
+    def test_results_may_differ_in_length(self):
+        """Test f may filter, expand, or return None as a sink"""
+        sink = []
+        assert crange(6).map_batches(lambda b: [x for x in b if x % 2], size=4) == [1, 3, 5]
+        assert crange(3).map_batches(lambda b: [(x, x) for x in b]).concat() == [0, 0, 1, 1, 2, 2]
+        assert crange(5).map_batches(sink.extend, size=2) == [] and sink == list(range(5))
+        assert clist().map_batches(lambda b: b) == []
+
+    def test_numpy_batches(self):
+        """Test as_array passes arrays and array results come back as Python scalars"""
+        np = pytest.importorskip('numpy')
+        result = crange(7).map_batches(lambda a: np.sqrt(a) * 0 + a * a, size=3, as_array=True)
+        assert result == [x * x for x in range(7)] and type(result[0]) is float
+
+    def test_adaptive_sizing(self):
+        """Test batch sizes grow toward max_latency for cheap f and shrink for expensive f"""
+        clock = FakeClock()
+        sizer = BatchSizer(size=10, max_latency=0.1, max_size=1000)
+
+        def work(batch):
+            clock.now += 0.001 * len(batch)
+            return batch
+
+        assert list(map_batches(work, range(5000), sizer=sizer, clock=clock)) == list(range(5000))
+        assert sizer.history[:6] == [10, 20, 40, 80, 100, 100] and sizer.size == 100
+        slow = BatchSizer(size=512, max_latency=0.1, min_size=8)
+        for _ in range(10):
+            slow.observe(slow.size, slow.size * 0.01)
+        assert slow.size == 10
+        with pytest.raises(ValueError):
+            BatchSizer(size=0)
+
+    def test_prefetch_overlaps_source(self):
+        """Test the next batch is read in a background thread, errors are re-raised"""
+        readers = set()
+
+        def slow_source():
+            for i in range(20):
+                readers.add(threading.current_thread().name)
+                time.sleep(0.001)
+                yield i
+
+        result = cgenerator(slow_source()).map_batches(lambda b: b, size=5, prefetch=True)
+        assert result.to_list() == list(range(20))
+        assert readers == {'map_batches-prefetch'}
+
+        def broken():
+            yield 1
+            raise RuntimeError('source failed')
+
+        with pytest.raises(RuntimeError):
+            cgenerator(broken()).map_batches(lambda b: b, prefetch=True).to_list()
+        early = cxrange(10 ** 12).map_batches(lambda b: b, size=10, prefetch=True)
+        assert early.take(3).to_list() == [0, 1, 2]
+
+    def test_lazy_chain(self):
+        """Test map_batches as a lazy stage"""
+        result = crange(10).lazy().map(lambda x: x + 1).map_batches(lambda b: [sum(b)], size=5)
+        assert result.to_list() == [15, 40]
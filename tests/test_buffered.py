@@ -0,0 +1,59 @@
+"""
+Unit tests for buffered cgenerators
+"""
+import pytest
+from chaincollections import cgenerator
+
+
+def counting(n, pulled):
+    for i in range(n):
+        pulled.append(i)
+        yield i
+
+
+class TestBuffered:
+    def test_buffered_reiterable(self):
+        """Test first() then to_list() no longer loses data"""
+        pulled = []
+        g = cgenerator(counting(5, pulled)).buffered()
+        assert g.first() == 0
+        assert g.to_list() == [0, 1, 2, 3, 4]
+        assert g.map(lambda x: x * 2).to_list() == [0, 2, 4, 6, 8]
+        assert pulled == [0, 1, 2, 3, 4]
+
+    def test_buffered_prefix_indexing(self):
+        """Test g[i] and g[a:b] read only the needed prefix"""
+        pulled = []
+        g = cgenerator(counting(10 ** 9, pulled)).buffered()
+        assert g[3] == 3
+        assert len(pulled) == 4
+        s = g[2:6]
+        assert isinstance(s, cgenerator)
+        assert list(s) == [2, 3, 4, 5]
+        assert len(pulled) == 6
+        assert list(zip(g.take(3), g.take(3))) == [(0, 0), (1, 1), (2, 2)]
+
+    def test_buffered_negative_index(self):
+        """Test negative indexes read the whole stream"""
+        g = cgenerator(iter(range(10))).buffered()
+        assert g[-1] == 9
+        assert list(g[-3:]) == [7, 8, 9]
+        with pytest.raises(IndexError):
+            g[10]
+
+    def test_buffered_cap_error(self):
+        """Test the error policy"""
+        g = cgenerator(iter(range(10))).buffered(max_items=3)
+        assert g[2] == 2
+        with pytest.raises(BufferError):
+            g[3]
+
+    def test_buffered_cap_spill(self):
+        """Test the spill policy keeps only max_items in memory and replays from disk"""
+        g = cgenerator(iter(range(100))).buffered(max_items=10, overflow='spill')
+        assert g.to_list() == list(range(100))
+        assert g[57] == 57
+        assert g.to_list() == list(range(100))
+        assert len(g.iterable._items) == 10
+        with pytest.raises(ValueError):
+            cgenerator([]).buffered(overflow='drop')
@@ -0,0 +1,61 @@
+"""
+Unit tests for carray
+"""
+import operator
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from chaincollections import carange, carray, cdict, cgenerator, chain, clist, crange  # noqa: E402
+
+
+class TestCarray:
+    def test_carray_matches_clist(self):
+        """Test the vectorized chain gives the same result as the clist chain"""
+        def build(c):
+            return c.map(lambda x: x * 3).filter(lambda x: x % 2 == 0).reduce(operator.add)
+
+        assert build(carange(1000)) == build(crange(1000))
+        assert isinstance(build(carange(10)), int)
+        assert carange(5).map(np.sqrt).to_list() == [float(x) ** 0.5 for x in range(5)]
+
+    def test_carray_fallback(self):
+        """Test non-vectorizable callables fall back to per-element calls"""
+        a = carray([1, -2, 3])
+        assert a.map(lambda x: x if x > 0 else 0) == [1, 0, 3]
+        assert a.filter(lambda x: x in {1, 3}) == [1, 3]
+        words = a.map(str)
+        assert isinstance(words, clist)
+        assert words == ['1', '-2', '3']
+        assert a.enumerate() == [(0, 1), (1, -2), (2, 3)]
+        assert a.reduce(lambda x, y: x * 10 + y) == 83
+
+    def test_carray_counting(self):
+        """Test frequencies / count_by / unique / groupby"""
+        a = carray([3, 1, 3, 2, 1, 3])
+        assert a.frequencies == cdict({1: 2, 2: 1, 3: 3})
+        assert a.count_by(lambda x: x % 2) == {0: 1, 1: 5}
+        assert a.unique().to_list() == [3, 1, 2]
+        assert not a.is_distinct
+        groups = a.groupby(lambda x: x % 2)
+        assert groups[1].to_list() == [3, 1, 3, 1, 3]
+        assert a.reduce_by(lambda x: x % 2, operator.add) == {0: 2, 1: 11}
+
+    def test_carray_selection(self):
+        """Test top_k / stride_by / sliding_window / partitions"""
+        a = carray([5, 1, 9, 3, 7])
+        assert a.top_k(2).to_list() == [9, 7]
+        assert a.stride_by(2).to_list() == [5, 9, 7]
+        windows = a.sliding_window(3)
+        assert isinstance(windows, cgenerator)
+        assert [w.to_list() for w in windows] == [[5, 1, 9], [1, 9, 3], [9, 3, 7]]
+        assert [p.to_list() for p in a.partition_all(2)] == [[5, 1], [9, 3], [7]]
+        assert a.take(2).to_list() == [5, 1] and a.tail(2).to_list() == [3, 7]
+        assert a.sort(reverse=True).to_list() == [9, 7, 5, 3, 1]
+
+    def test_chain_ndarray(self):
+        """Test chain() returns carray for 1-D numeric arrays only"""
+        assert isinstance(chain(np.arange(3)), carray)
+        assert isinstance(chain(np.array(['a', 'b'])), cgenerator)
+        assert isinstance(carray(['a']), clist)
@@ -0,0 +1,134 @@
+"""
+Unit tests for casync
+"""
+import asyncio
+
+import pytest
+from chaincollections import casync, cdict, chain, clist
+
+
+async def agen(n, log=None):
+    for i in range(n):
+        if log is not None:
+            log.append(i)
+        yield i
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestCasync:
+    def test_casync_basic(self):
+        """Test plain stages and terminals over an async iterable"""
+        g = chain(agen(10))
+        assert isinstance(g, casync)
+        result = run(g.map(lambda x: x * 2).filter(lambda x: x % 3 == 0).to_list())
+        assert isinstance(result, clist)
+        assert result == [0, 6, 12, 18]
+        assert run(casync([1, 2, 3]).reduce(lambda a, b: a + b)) == 6
+        assert run(casync('abca').frequencies) == cdict({'a': 2, 'b': 1, 'c': 1})
+        assert run(casync(range(6)).groupby(lambda x: x % 2)) == {0: [0, 2, 4], 1: [1, 3, 5]}
+
+    def test_amap_ordered_and_bounded(self):
+        """Test amap keeps source order and never exceeds the concurrency limit"""
+        running = [0]
+        peak = [0]
+
+        async def main():
+            gates = [asyncio.Event() for _ in range(20)]
+            waiting = []
+
+            async def work(x):
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                waiting.append(x)
+                await gates[x].wait()
+                running[0] -= 1
+                return x * 10
+
+            async def release():
+                # finish the newest call first whenever amap has filled its slots, so calls
+                # complete in a different order than they started; if the slots stay short
+                # (amap waits for the oldest result before starting more), finish the oldest
+                for _ in range(20):
+                    for _ in range(10):
+                        if len(waiting) == 4:
+                            break
+                        await asyncio.sleep(0)
+                    gates[waiting.pop() if len(waiting) == 4 else waiting.pop(0)].set()
+
+            releaser = asyncio.ensure_future(release())
+            result = await casync(range(20)).amap(work, concurrency=4).to_list()
+            await releaser
+            return result
+
+        assert run(main()) == [x * 10 for x in range(20)]
+        assert peak[0] == 4
+
+    def test_amap_unordered(self):
+        """Test unordered emission yields results as they complete"""
+        async def main():
+            gates = [asyncio.Event() for _ in range(3)]
+            results = []
+
+            async def work(x):
+                await gates[x].wait()
+                return x
+
+            # complete the calls one at a time, last first
+            gates[2].set()
+            async for x in casync(range(3)).amap(work, concurrency=3, ordered=False):
+                results.append(x)
+                if x:
+                    gates[x - 1].set()
+            return results
+
+        assert run(main()) == [2, 1, 0]
+
+    def test_afilter_amapcat(self):
+        """Test afilter and amapcat"""
+        async def is_even(x):
+            await asyncio.sleep(0)
+            return x % 2 == 0
+
+        async def repeat(x):
+            await asyncio.sleep(0)
+            return [x] * x
+
+        assert run(casync(range(10)).afilter(is_even).to_list()) == [0, 2, 4, 6, 8]
+        assert run(casync(range(4)).amapcat(repeat).to_list()) == [1, 2, 2, 3, 3, 3]
+
+    def test_take_cancels_outstanding(self):
+        """Test take stops reading the source and cancels in-flight calls"""
+        log = []
+        cancelled = []
+
+        async def main():
+            never = asyncio.Event()
+
+            async def slow(x):
+                try:
+                    if x >= 2:
+                        await never.wait()
+                except asyncio.CancelledError:
+                    cancelled.append(x)
+                    raise
+                return x
+
+            result = await casync(agen(1000, log)).amap(slow, concurrency=5).take(2).to_list()
+            await asyncio.sleep(0)
+            return result
+
+        assert run(main()) == [0, 1]
+        assert len(log) <= 7
+        assert cancelled and all(x >= 2 for x in cancelled)
+
+    def test_async_terminals(self):
+        """Test first / find / any_match / all_match"""
+        assert run(casync(agen(5)).first()) == 0
+        assert run(casync(agen(5)).find(lambda x: x > 2)) == 3
+        assert run(casync(agen(5)).any_match(lambda x: x == 4))
+        assert not run(casync(agen(5)).all_match(lambda x: x < 4))
+        with pytest.raises(ValueError):
+            run(casync([]).first())
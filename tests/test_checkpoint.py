@@ -0,0 +1,137 @@
+"""
+Unit tests for disk-backed checkpoints
+"""
+import os
+
+import pytest
+from chaincollections import Checkpoint, cgenerator, clist, crange, read_checkpoint
+from chaincollections import checkpoint as checkpoint_module
+from chaincollections.checkpoint import fingerprint, write_checkpoint
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, x):
+        self.calls += 1
+        return x * 2
+
+
+def square(x):
+    return x * x
+
+
+THRESHOLD = 5
+
+
+class Unprintable:
+    def __repr__(self):
+        raise RuntimeError('no repr')
+
+
+UNPRINTABLE = Unprintable()
+
+
+class TestCheckpoint:
+    def test_round_trip_and_random_access(self, tmp_path):
+        """Test elements come back in order, re-iterable, with len and indexing across blocks"""
+        path = str(tmp_path / 'data.ckpt')
+        records = [{'id': i, 'tags': ['a'] * (i % 3)} for i in range(1000)]
+        cp = cgenerator(iter(records)).checkpoint(path, block_size=64)
+        assert isinstance(cp, Checkpoint) and isinstance(cp, cgenerator)
+        assert len(cp) == 1000
+        assert cp.to_list() == records and cp.to_list() == records
+        assert cp[0] == records[0] and cp[-1] == records[-1] and cp[640] == records[640]
+        assert cp[10:200:7].to_list() == records[10:200:7]
+        assert cp.map(lambda r: r['id']).take(3).to_list() == [0, 1, 2]
+        with pytest.raises(IndexError):
+            cp[1000]
+        cp.close()
+        with read_checkpoint(path) as again:
+            assert again.filter(lambda r: r['id'] % 250 == 0).to_list() == records[::250]
+
+    def test_empty(self, tmp_path):
+        """Test an empty chain makes a valid, empty checkpoint"""
+        with clist().checkpoint(str(tmp_path / 'empty.ckpt')) as cp:
+            assert len(cp) == 0 and cp.to_list() == []
+
+    def test_lazy_chain_skipped_when_fingerprint_matches(self, tmp_path):
+        """Test a re-run of the same lazy chain reads the file instead of running the stages"""
+        path = str(tmp_path / 'stage.ckpt')
+        double = Counter()
+        crange(100).lazy().map(double).filter(lambda x: x % 3).checkpoint(path).close()
+        assert double.calls == 100
+        with crange(100).lazy().map(double).filter(lambda x: x % 3).checkpoint(path) as cp:
+            assert double.calls == 100
+            assert cp.to_list() == [x * 2 for x in range(100) if (x * 2) % 3]
+        # a different input, stage argument or stage function is a different computation
+        crange(101).lazy().map(double).filter(lambda x: x % 3).checkpoint(path).close()
+        assert double.calls == 201
+        crange(101).lazy().map(double).filter(lambda x: x % 3).take(5).checkpoint(path).close()
+        assert double.calls == 209    # eight elements mapped to find five passing the filter
+        with crange(101).lazy().map(square).checkpoint(path) as cp:
+            assert cp[10] == 100
+
+    def test_changed_global_invalidates(self, tmp_path, monkeypatch):
+        """Test module-level values a stage reads are part of the fingerprint"""
+        path = str(tmp_path / 'global.ckpt')
+        with clist(range(10)).lazy().filter(lambda x: x > THRESHOLD).checkpoint(path) as cp:
+            assert cp.to_list() == [6, 7, 8, 9]
+        monkeypatch.setitem(globals(), 'THRESHOLD', 2)
+        with clist(range(10)).lazy().filter(lambda x: x > THRESHOLD).checkpoint(path) as cp:
+            assert cp.to_list() == [3, 4, 5, 6, 7, 8, 9]
+        # a global without a usable repr can't be fingerprinted - always rewrite
+        assert fingerprint(clist([1]).lazy().filter(lambda x: x is not UNPRINTABLE)) is None
+
+    def test_fingerprint_of_one_shot_sources(self, tmp_path):
+        """Test generators rely on key= / inputs=, and are rewritten without them"""
+        path = str(tmp_path / 'gen.ckpt')
+        source = tmp_path / 'input.txt'
+        source.write_text('1\n2\n3\n')
+        assert fingerprint(cgenerator(iter([1, 2]))) is None
+        assert fingerprint(cgenerator(iter([1])), key='v1') == fingerprint(cgenerator([]), key='v1')
+        assert fingerprint(clist([1, 2])) != fingerprint(clist([2, 1]))
+
+        def read():
+            return cgenerator(iter(source.read_text().split()))
+
+        read().lazy().map(int).checkpoint(path, inputs=[str(source)]).close()
+        # the generator is consumed only when the checkpoint is rewritten
+        gen = read()
+        gen.lazy().map(int).checkpoint(path, inputs=[str(source)]).close()
+        assert gen.to_list() == ['1', '2', '3']
+        source.write_text('1\n2\n3\n4\n')
+        os.utime(str(source), ns=(1, 1))
+        with read().lazy().map(int).checkpoint(path, inputs=[str(source)]) as cp:
+            assert cp.to_list() == [1, 2, 3, 4]
+        with cgenerator(iter('ab')).cache_to(path) as cp:
+            assert cp.to_list() == ['a', 'b']
+        with cgenerator(iter('cd')).cache_to(path) as cp:
+            assert cp.to_list() == ['c', 'd']
+
+    def test_chained_checkpoints_and_failures(self, tmp_path):
+        """Test a checkpoint as the source of the next, and that a failed write leaves no file"""
+        first = str(tmp_path / 'first.ckpt')
+        second = str(tmp_path / 'second.ckpt')
+        with crange(50).checkpoint(first) as cp:
+            double = Counter()
+            cp.lazy().map(double).checkpoint(second).close()
+            cp.lazy().map(double).checkpoint(second).close()
+            assert double.calls == 50
+
+        def boom():
+            yield 1
+            raise RuntimeError('upstream failed')
+
+        broken = str(tmp_path / 'broken.ckpt')
+        with pytest.raises(RuntimeError):
+            write_checkpoint(boom(), broken)
+        assert not any(name.startswith('broken') for name in os.listdir(str(tmp_path)))
+        with open(broken, 'wb') as f:
+            f.write(checkpoint_module.MAGIC + b'truncated')
+        with pytest.raises(ValueError):
+            read_checkpoint(broken)
+        # an unreadable file at path is simply replaced
+        with crange(3).checkpoint(broken) as cp:
+            assert cp.to_list() == [0, 1, 2]
@@ -0,0 +1,70 @@
+"""
+Unit tests for cvector
+"""
+import random
+
+import pytest
+from chaincollections import cdict, clist, cvector
+
+
+class TestCvector:
+    def test_cvector_append_is_persistent(self):
+        """Test append returns new versions and leaves old ones untouched"""
+        versions = [cvector()]
+        for i in range(2000):
+            versions.append(versions[-1].append(i))
+        for n in (0, 1, 31, 32, 33, 1024, 1025, 1056, 2000):
+            assert list(versions[n]) == list(range(n))
+            assert len(versions[n]) == n
+        assert versions[2000][1500] == 1500
+        assert versions[2000][-1] == 1999
+
+    def test_cvector_set(self):
+        """Test set path-copies against a plain list model"""
+        rng = random.Random(0)
+        model = list(range(3000))
+        v = cvector(model)
+        for _ in range(500):
+            i, x = rng.randrange(len(model)), rng.random()
+            old = v
+            v = v.set(i, x)
+            assert old[i] == model[i]
+            model[i] = x
+        assert v == model
+        with pytest.raises(IndexError):
+            v.set(len(model), 0)
+
+    def test_cvector_slicing_shares_structure(self):
+        """Test slices are windows onto the same trie and append safely"""
+        v = cvector(range(100))
+        s = v[10:20]
+        assert s == list(range(10, 20))
+        assert s._trie is v._trie
+        t = s.append('x')
+        assert t == list(range(10, 20)) + ['x']
+        assert v[20] == 20
+        assert v[::10] == list(range(0, 100, 10))
+
+    def test_cvector_transient_and_extend(self):
+        """Test batch construction and extend"""
+        t = cvector([1, 2]).transient()
+        for i in range(100):
+            t.append(i)
+        t.set(0, 'a')
+        v = t.persistent()
+        assert v == ['a', 2] + list(range(100))
+        with pytest.raises(RuntimeError):
+            t.append(1)
+        w = v.extend(range(3))
+        assert len(w) == 105 and len(v) == 102
+        assert (cvector([1]) + [2, 3]) == [1, 2, 3]
+
+    def test_cvector_chain_api(self):
+        """Test the CBase methods keep returning cvector"""
+        v = cvector(range(10))
+        result = v.map(lambda x: x * 2).filter(lambda x: x % 3 == 0)
+        assert isinstance(result, cvector)
+        assert result == [0, 6, 12, 18]
+        assert v.groupby(lambda x: x % 2) == cdict({0: [0, 2, 4, 6, 8], 1: [1, 3, 5, 7, 9]})
+        assert isinstance(v.to_list(), clist)
+        assert v.sort(reverse=True)[0] == 9
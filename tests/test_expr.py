@@ -0,0 +1,149 @@
+"""
+Unit tests for X placeholder expressions
+"""
+import copy
+import operator
+import pickle
+
+import pytest
+from chaincollections import X, carray, chain, clist, ctable
+from chaincollections import lazy
+from chaincollections.checkpoint import fingerprint
+from chaincollections.expr import Expr, apply, compiled, to_source, vectorized
+
+np = pytest.importorskip('numpy')
+
+ROWS = [{'price': i * 1.5, 'qty': i % 4, 'name': 'n%d' % i} for i in range(20)]
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+class TestBuilding:
+    def test_evaluates_like_a_lambda(self):
+        """Test operators on X build an expression that computes what the lambda would"""
+        cases = [
+            (X['price'] * X['qty'] > 10, lambda r: r['price'] * r['qty'] > 10),
+            ((X['qty'] >= 1) & (X['qty'] < 3), lambda r: 1 <= r['qty'] < 3),
+            ((X['qty'] == 0) | ~(X['price'] < 20), lambda r: r['qty'] == 0 or r['price'] >= 20),
+            (-X['qty'] + 2 ** X['qty'] - X['price'] / 3, lambda r: -r['qty'] + 2 ** r['qty']
+             - r['price'] / 3),
+            (abs(X['qty'] - 2) // 1 % 2, lambda r: abs(r['qty'] - 2) // 1 % 2),
+            (apply(len, X['name']) + 1, lambda r: len(r['name']) + 1),
+        ]
+        for expr, f in cases:
+            assert isinstance(expr, Expr)
+            assert [expr(row) for row in ROWS] == [f(row) for row in ROWS]
+
+    def test_getters(self):
+        """Test plain item / attribute access compiles to operator.itemgetter / attrgetter"""
+        assert isinstance(compiled(X['a']), operator.itemgetter)
+        assert isinstance(compiled(X.a.b), operator.attrgetter)
+        assert X.x(Point(1, 2)) == 1
+        assert (X.x + X.y)(Point(1, 2)) == 3
+        assert X[(1, 2)]({(1, 2): 'tuple key'}) == 'tuple key'
+
+    def test_introspection(self):
+        """Test repr and to_source show the expression, with unprintable constants bound by name"""
+        assert repr(X['price'] * X['qty'] > 100) == "((X['price'] * X['qty']) > 100)"
+        assert repr((X > 1) & ~(X == 3)) == '((X > 1) & (~(X == 3)))'
+        source, constants = to_source(apply(len, X['tags']) > 2)
+        assert source == "(_c0(x['tags']) > 2)" and constants == {'_c0': len}
+        assert to_source((X > 1) & (X < 5), vector=True)[0] == '((x > 1) & (x < 5))'
+
+    def test_not_a_bool_or_sequence(self):
+        """Test expressions refuse truth testing and iteration instead of misbehaving"""
+        with pytest.raises(TypeError):
+            bool(X > 1)
+        with pytest.raises(TypeError):
+            1 < X < 5
+        with pytest.raises(TypeError):
+            iter(X)
+        assert not hasattr(X, '_private') and not hasattr(X, '__deepcopy__')
+
+    def test_pickle_and_copy(self):
+        """Test expressions survive pickling (process pools) and copying"""
+        expr = apply(len, X['name']) * X['qty'] > 2
+        for clone in (pickle.loads(pickle.dumps(expr)), copy.deepcopy(expr)):
+            assert [clone(row) for row in ROWS] == [expr(row) for row in ROWS]
+
+    def test_numpy_operands(self):
+        """Test numpy scalars on the left defer to the expression"""
+        expr = np.float64(2.0) * X
+        assert isinstance(expr, Expr) and expr(3) == 6.0
+
+
+class TestAnywhereACallableIs:
+    def test_chain_methods(self):
+        """Test expressions work as functions, predicates and keys across the chain API"""
+        rows = clist(ROWS)
+        assert rows.filter(X['qty'] == 3).map(X['name']) == ['n3', 'n7', 'n11', 'n15', 'n19']
+        assert len(rows.remove(X['qty'] > 0)) == 5
+        assert rows.sort(X['qty'] * 100 - X['price'])[0]['name'] == 'n16'
+        assert rows.count_by(X['qty']) == {0: 5, 1: 5, 2: 5, 3: 5}
+        assert len(rows.groupby(X['qty'] % 2)[1]) == 10
+        assert rows.top_k(2, X['price']).map(X['name']) == ['n19', 'n18']
+        assert len(rows.unique(X['qty'])) == 4
+        assert len(chain(ROWS).to_generator().filter(X['qty'] == 0).to_list()) == 5
+
+    def test_lazy_fusion_inlines_source(self):
+        """Test a lazy plan inlines expressions into its fused loop and binds their constants"""
+        plan = (clist(ROWS).lazy()
+                .filter(X['price'] * X['qty'] > 5)
+                .map(apply(len, X['name']) + X['qty'])
+                .remove(X == 4))
+        expected = (clist(ROWS)
+                    .filter(lambda r: r['price'] * r['qty'] > 5)
+                    .map(lambda r: len(r['name']) + r['qty'])
+                    .remove(lambda v: v == 4))
+        assert plan.to_list() == expected
+        kinds = next(k for k in lazy._FUSED_CACHE if isinstance(k[0], tuple)
+                     and k[0][1] == "((x['price'] * x['qty']) > 5)")
+        assert kinds[1] == ('map', "(_f1_c0(x['name']) + x['qty'])", ('_f1_c0',))
+        # mixes with plain callables and pluck in the same run
+        assert (clist([(1, 2), (3, 4)]).lazy().pluck(1).map(X * 10).filter(lambda v: v > 20)
+                .to_list() == [40])
+
+    def test_carray_vectorized(self):
+        """Test carray runs & | ~ elementwise over the whole array"""
+        arr = carray(range(10))
+        assert arr.filter((X > 2) & ~(X == 5)).to_list() == [3, 4, 6, 7, 8, 9]
+        assert arr.map(X * 2 + 1).to_list() == list(range(1, 21, 2))
+        assert vectorized(X > 2)(np.arange(4)).tolist() == [False, False, False, True]
+
+    def test_ctable_columnar(self):
+        """Test ctable evaluates expressions on whole columns, falling back per row"""
+        table = ctable(ROWS)
+        calls = []
+        spy = apply(lambda name: calls.append(name) or name.endswith('3'), X['name'])
+        assert table.filter(X['price'] * X['qty'] > 20).to_list() == \
+            [r for r in ROWS if r['price'] * r['qty'] > 20]
+        assert table.remove((X['qty'] == 0) | (X['price'] > 9)).to_list() == \
+            [r for r in ROWS if not (r['qty'] == 0 or r['price'] > 9)]
+        # string column - no ndarray, evaluated per row
+        assert table.filter(spy).to_list() == [ROWS[3], ROWS[13]] and len(calls) == 20
+        with_total = table.with_column('total', X['price'] * X['qty'])
+        assert with_total._columns['total'].typecode == 'd'
+        assert with_total.map(X['total']) == [r['price'] * r['qty'] for r in ROWS]
+
+    def test_ctable_columnar_matches_the_lambda(self):
+        """Test columnar runs fall back where numpy's result would differ from Python's"""
+        table = ctable([{'a': 2 ** 62, 'b': 3}, {'a': 5, 'b': 1}])
+        assert table.filter(X['a'] * 4 > 0).pluck('b') == [3, 1]
+        assert table.with_column('d', X['a'] * 4).pluck('d') == [2 ** 64, 20]
+        for expr in (X['b'] / (X['b'] - 1), X['b'] // (X['b'] - 1), X['a'] % (X['b'] - 1)):
+            with pytest.raises(ZeroDivisionError):
+                table.with_column('d', expr)
+        # & means and, not bitwise and, on ints too
+        assert table.with_column('d', X['a'] & X['b']).pluck('d') == [3, 1]
+        assert table.filter((X['b'] > 1) & ~(X['a'] == 5)).pluck('b') == [3]
+
+    def test_checkpoint_fingerprint(self):
+        """Test checkpoint fingerprints expressions by their text and constants"""
+        def fp(expr):
+            return fingerprint(clist(ROWS).lazy().filter(expr))
+
+        assert fp(X['qty'] > 1) == fp(X['qty'] > 1)
+        assert fp(X['qty'] > 1) != fp(X['qty'] > 2)
@@ -0,0 +1,141 @@
+"""
+Unit tests for external sort, join and groupby
+"""
+import collections
+import os
+import random
+
+import cytoolz
+import pytest
+from chaincollections import cgenerator, clist, crange, cxrange
+from chaincollections import external
+
+
+class TestExternalSort:
+    def test_external_sort_spills_and_matches_sort(self, tmp_path):
+        """Test sorting ten times the memory limit gives the same result as clist.sort"""
+        rng = random.Random(1)
+        data = clist(rng.randrange(1000) for _ in range(5000))
+        result = data.external_sort(memory_limit=500, tmpdir=str(tmp_path))
+        assert isinstance(result, cgenerator)
+        assert result.to_list() == data.sort()
+        assert os.listdir(str(tmp_path)) == []
+
+    def test_external_sort_stable_with_key_and_reverse(self):
+        """Test key / reverse and stability across runs"""
+        rng = random.Random(2)
+        data = clist((rng.randrange(10), i) for i in range(3000))
+        key = lambda p: p[0]  # noqa: E731
+        assert data.external_sort(key=key, memory_limit=256).to_list() == data.sort(key=key)
+        assert data.external_sort(key=key, reverse=True, memory_limit=256).to_list() == \
+            data.sort(key=key, reverse=True)
+
+    def test_external_sort_multi_pass_merge(self, tmp_path, monkeypatch):
+        """Test more runs than MERGE_FANIN are merged in bounded groups, stably and cleanly"""
+        monkeypatch.setattr(external, 'MERGE_FANIN', 3)
+        widths = []
+        merge = external._merge
+
+        def spy(paths, keyf, reverse):
+            paths = list(paths)
+            widths.append(len(paths))
+            return merge(paths, keyf, reverse)
+
+        monkeypatch.setattr(external, '_merge', spy)
+        rng = random.Random(3)
+        data = clist((rng.randrange(5), i) for i in range(1000))
+        key = lambda p: p[0]  # noqa: E731
+        for reverse in (False, True):
+            result = data.external_sort(key=key, reverse=reverse, memory_limit=40,
+                                        tmpdir=str(tmp_path))
+            assert result.to_list() == data.sort(key=key, reverse=reverse)
+        assert max(widths) == 3 and len(widths) > 2 * 9
+        assert os.listdir(str(tmp_path)) == []
+
+    def test_external_sort_streams_generators(self):
+        """Test a cgenerator source and an in-memory-sized input"""
+        assert cxrange(100, 0, -1).external_sort(memory_limit=7).take(3).to_list() == [1, 2, 3]
+        assert crange(5).external_sort(reverse=True).to_list() == [4, 3, 2, 1, 0]
+        assert clist().external_sort().to_list() == []
+        with pytest.raises(ValueError):
+            crange(5).external_sort(memory_limit=0).to_list()
+
+
+def records(n, keys, seed):
+    rng = random.Random(seed)
+    return clist((rng.randrange(keys), i) for i in range(n))
+
+
+def first(pair):
+    return pair[0]
+
+
+OUTER = [{}, {'right_default': None}, {'left_default': None},
+         {'left_default': None, 'right_default': None}]
+
+
+class TestExternalJoin:
+    def test_spilled_join_matches_in_memory(self, tmp_path):
+        """Test inner, left, right and full outer joins give cytoolz.join's pairs when spilling"""
+        left = records(3000, 400, 1)
+        right = records(2000, 500, 2)
+        for defaults in OUTER:
+            expected = list(cytoolz.join(first, left, first, right, **defaults))
+            result = left.join(right, first, first, memory_limit=100, tmpdir=str(tmp_path),
+                               **defaults)
+            assert isinstance(result, cgenerator)
+            assert collections.Counter(result) == collections.Counter(expected)
+        assert os.listdir(str(tmp_path)) == []
+
+    def test_fits_in_memory_keeps_order(self):
+        """Test a left side under the limit gives exactly today's join, order included"""
+        left, right = records(50, 10, 3), records(80, 12, 4)
+        for defaults in OUTER:
+            assert left.join(right, first, first, memory_limit=64, **defaults).to_list() == \
+                list(cytoolz.join(first, left, first, right, **defaults))
+        assert left.join(right, first, first, right_default=None) == \
+            list(cytoolz.join(first, left, first, right, right_default=None))
+        assert left.lazy().join(right, first, first, memory_limit=10).to_list().sort() == \
+            left.join(right, first, first).sort()
+
+    def test_hot_keys_and_repartitioning(self, monkeypatch):
+        """Test partitions over the limit are split again, and one huge key still joins"""
+        monkeypatch.setattr(external, 'FANOUT', 2)
+        left = records(2000, 300, 5)
+        right = records(500, 300, 6)
+        assert collections.Counter(left.join(right, first, first, memory_limit=30)) == \
+            collections.Counter(cytoolz.join(first, left, first, right))
+        hot = clist((0, i) for i in range(500))
+        assert hot.join(clist([(0, 'x'), (1, 'y')]), first, first, memory_limit=20,
+                        left_default=None).count_by(lambda pair: pair[1]) == \
+            {(0, 'x'): 500, (1, 'y'): 1}
+
+    def test_streams_and_validates(self):
+        """Test a generator left side, index keys and bad limits"""
+        gen = cgenerator((i % 7, i) for i in range(200))
+        right = clist((k, str(k)) for k in range(7))
+        pairs = gen.join(right, 0, 0, memory_limit=16).to_list()
+        assert len(pairs) == 200 and all(l[0] == r[0] for l, r in pairs)
+        with pytest.raises(ValueError):
+            crange(3).join(crange(3), abs, abs, memory_limit=0).to_list()
+
+
+class TestExternalGroupby:
+    def test_spilled_groupby_matches_in_memory(self, tmp_path):
+        """Test every group, with its elements in input order, when the input spills"""
+        data = records(5000, 700, 7)
+        expected = data.groupby(first)
+        result = data.groupby(first, memory_limit=200, tmpdir=str(tmp_path))
+        assert isinstance(result, cgenerator)
+        groups = result.to_list()
+        assert len(groups) == len(expected) and dict(groups) == expected
+        assert all(isinstance(group, clist) for _, group in groups)
+        assert os.listdir(str(tmp_path)) == []
+
+    def test_small_inputs_and_hot_keys(self, monkeypatch):
+        """Test first-seen key order under the limit, and a key larger than the limit"""
+        data = records(100, 9, 8)
+        assert data.groupby(first, memory_limit=1000).to_list() == list(data.groupby(first).items())
+        monkeypatch.setattr(external, 'FANOUT', 2)
+        hot = clist([(0, i) for i in range(300)] + [(1, 0)])
+        assert dict(hot.groupby(first, memory_limit=10).to_list()) == hot.groupby(first)
@@ -0,0 +1,90 @@
+"""
+Unit tests for hash and sorted indexes
+"""
+import copy
+import gc
+import pickle
+
+import pytest
+from chaincollections import X, clist, crange
+from chaincollections import index as index_module
+
+
+def rows():
+    return clist([{'id': i % 5, 'v': i} for i in range(20)])
+
+
+class TestIndex:
+    def test_hash_index_lookup(self):
+        """Test lookup / find / membership"""
+        ref = rows()
+        index = ref.index_by(lambda r: r['id'])
+        assert index.lookup(3).map(lambda r: r['v']) == [3, 8, 13, 18]
+        assert index.lookup(99) == []
+        assert index.find(2) == {'id': 2, 'v': 2}
+        assert 4 in index and len(index) == 5
+
+    def test_hash_index_is_reused(self):
+        """Test groupby / count_by reuse the cached index instead of calling key again"""
+        calls = []
+        key = lambda r: calls.append(r) or r['id']  # noqa: E731
+        ref = rows()
+        index = ref.index_by(key)
+        assert ref.index_by(key) is index and len(calls) == 20
+        assert ref.groupby(key)[0].map(lambda r: r['v']) == [0, 5, 10, 15]
+        assert ref.count_by(key)[0] == 4
+        assert len(calls) == 20
+
+    def test_join_order(self):
+        """Test a plain join keeps cytoolz order, cached index or not; an explicit index probes"""
+        key = lambda r: r['id']  # noqa: E731
+        left = crange(7)
+        ref = rows()
+        expected = [(x, r) for r in ref for x in left if x == key(r)]
+        assert left.join(ref, lambda x: x, key) == expected
+        index = ref.index_by(key)
+        assert left.join(ref, lambda x: x, key) == expected
+        assert left.join(index, lambda x: x, None) == \
+            [(x, r) for x in left for r in ref if x == key(r)]
+        with pytest.raises(ValueError):
+            left.join(index, lambda x: x, lambda r: r['v'])
+
+    def test_index_invalidation(self):
+        """Test derived collections have no index and length changes trigger a rebuild"""
+        calls = []
+        key = lambda r: calls.append(r) or r['id']  # noqa: E731
+        ref = rows()
+        index = ref.index_by(key)
+        assert ref.filter(bool).groupby(key)[0] and len(calls) == 40
+        list.append(ref, {'id': 0, 'v': 100})
+        assert ref.groupby(key)[0][-1] == {'id': 0, 'v': 100} and len(calls) == 61
+        assert ref.index_by(key) is not index
+
+    def test_cache_stays_out_of_the_clist(self):
+        """Test indexed clists pickle and copy without their indexes, and the cache is bounded"""
+        key = lambda r: r['id']  # noqa: E731
+        ref = rows()
+        index = ref.index_by(key)
+        assert pickle.loads(pickle.dumps(ref)) == ref
+        copied = copy.copy(ref)
+        assert index_module.cached_index(copied, 'hash', key) is None
+        for _ in range(3 * index_module.MAX_INDEXES):
+            ref.index_by(X['id'])
+        assert ref.groupby(X['v'] % 2)[0] == ref.filter(lambda r: r['v'] % 2 == 0)
+        assert len(index_module._indexes(ref)) == index_module.MAX_INDEXES
+        del ref, copied
+        gc.collect()
+        assert index.source is None
+
+    def test_sorted_index_range(self):
+        """Test range / lookup / rank on a sorted index"""
+        data = clist([5, 3, 9, 1, 7, 3])
+        index = data.sorted_index()
+        assert index.range(3, 7) == [3, 3, 5]
+        assert index.range(3, 7, inclusive=(False, True)) == [5, 7]
+        assert index.range(hi=4) == [1, 3, 3]
+        assert index.lookup(3) == [3, 3]
+        assert index.rank(6) == 4
+        assert index.to_list() == data.sort()
+        people = clist([('ann', 31), ('bob', 25), ('cy', 31)])
+        assert people.sorted_index(lambda p: p[1]).lookup(31) == [('ann', 31), ('cy', 31)]
@@ -0,0 +1,84 @@
+"""
+Unit tests for lazy chains
+"""
+from chaincollections import clist, cdict, cgenerator, crange, chain, clazy
+
+
+class TestLazy:
+    def test_lazy_matches_eager(self):
+        """Test a long lazy chain gives the same result as the eager one"""
+        def build(c):
+            return (c.map(lambda x: x * 3)
+                    .filter(lambda x: x % 2 == 0)
+                    .remove(lambda x: x % 4 == 0)
+                    .drop(2)
+                    .map(lambda x: (x, x + 1))
+                    .pluck(1)
+                    .unique()
+                    .take(10))
+
+        eager = build(crange(1000))
+        lazy = build(crange(1000).lazy())
+        assert isinstance(lazy, clazy)
+        assert lazy.to_list() == eager
+        assert isinstance(lazy.to_list(), clist)
+
+    def test_lazy_nested_results_are_clist(self):
+        """Test partitions and plucked tuples materialize as clist like the eager chain"""
+        lazy = crange(7).lazy().partition_all(3).to_list()
+        assert lazy == crange(7).partition_all(3)
+        assert all(isinstance(p, clist) for p in lazy)
+        rows = clist([(1, 2, 3), (4, 5, 6)])
+        assert rows.lazy().pluck([0, 2]).to_list() == rows.pluck([0, 2])
+
+    def test_lazy_short_circuits(self):
+        """Test take/first/find/any_match stop pulling from the source"""
+        seen = []
+
+        def source():
+            for i in range(10 ** 9):
+                seen.append(i)
+                yield i
+
+        g = chain(source(), lazy=True).map(lambda x: x + 1).filter(lambda x: x % 2 == 0)
+        assert g.take(3).to_list() == [2, 4, 6]
+        assert len(seen) == 6
+
+        plan = crange(10 ** 6).lazy().map(lambda x: x * 2)
+        assert plan.first() == 0
+        assert plan.find(lambda x: x > 10) == 12
+        assert plan.any_match(lambda x: x == 20)
+        assert plan[5] == 10
+
+    def test_lazy_is_deferred_and_reiterable(self):
+        """Test nothing runs before a terminal and a plan over a list can be rerun"""
+        calls = []
+        plan = crange(5).lazy().map(lambda x: calls.append(x) or x)
+        assert calls == []
+        assert plan.to_list() == [0, 1, 2, 3, 4]
+        assert plan.to_list() == [0, 1, 2, 3, 4]
+        assert plan.plan == ('map',)
+
+    def test_lazy_terminals(self):
+        """Test reduce, frequencies and groupby on a lazy chain"""
+        plan = crange(10).lazy().map(lambda x: x % 3)
+        assert plan.reduce(lambda a, b: a + b) == crange(10).map(lambda x: x % 3).reduce(
+            lambda a, b: a + b)
+        assert plan.frequencies == cdict({0: 4, 1: 3, 2: 3})
+        assert isinstance(plan.groupby(lambda x: x)[0], clist)
+        assert plan.sort(reverse=True).take(2).to_list() == [2, 2]
+
+    def test_lazy_barrier_as_last_stage(self):
+        """Test a plan ending in sort / tail / top_k (stages that return lists) runs"""
+        plan = crange(20).lazy().map(lambda x: x * 7 % 20)
+        eager = crange(20).map(lambda x: x * 7 % 20)
+        assert plan.sort().to_list() == eager.sort()
+        assert plan.tail(3).to_list() == list(eager.tail(3))
+        assert plan.top_k(2).to_list() == list(eager.top_k(2))
+        assert list(crange(20).lazy().sort(reverse=True))[:2] == [19, 18]
+
+    def test_chain_lazy_flag(self):
+        """Test chain(..., lazy=True)"""
+        assert isinstance(chain([1, 2, 3], lazy=True), clazy)
+        assert isinstance(chain({'a': 1}, lazy=True), cdict)
+        assert isinstance(chain([1, 2, 3], lazy=True), cgenerator)
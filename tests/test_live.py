@@ -0,0 +1,156 @@
+"""
+Unit tests for live_count_by / live_reduce_by / live_top_k materialized views
+"""
+import operator
+import random
+import threading
+
+import pytest
+from chaincollections import LiveCountBy, X, cdict, cgenerator, clist
+
+
+def events(n, seed=0):
+    rng = random.Random(seed)
+    return [{'user': rng.randrange(7), 'amount': rng.randrange(1000)} for _ in range(n)]
+
+
+def total(acc, e):
+    return acc + e['amount']
+
+
+def untotal(acc, e):
+    return acc - e['amount']
+
+
+class TestFollowingAClist:
+    def test_matches_recomputing(self):
+        """Test views equal the from-scratch result after every kind of growth"""
+        log = clist(events(200))
+        counts = log.live_count_by(X['user'])
+        sums = log.live_reduce_by(X['user'], total, 0)
+        top = log.live_top_k(5, X['amount'])
+        for batch in (events(1, 1), events(50, 2), events(0, 3)):
+            list.extend(log, batch)
+            assert counts.snapshot() == log.count_by(X['user'])
+            assert sums.snapshot() == cdict({k: sum(e['amount'] for e in g)
+                                             for k, g in log.groupby(X['user']).items()})
+            assert [e['amount'] for e in top.snapshot()] == \
+                sorted((e['amount'] for e in log), reverse=True)[:5]
+        log += events(10, 4)
+        assert len(counts) == len(log) == 261
+
+    def test_refresh_costs_only_new_elements(self):
+        """Test a refresh folds in just the appended tail, calling the key once per new element"""
+        calls = []
+
+        def key(e):
+            calls.append(e)
+            return e['user']
+
+        log = clist(events(100))
+        view = log.live_count_by(key)
+        assert len(calls) == 100
+        view.snapshot()
+        list.append(log, {'user': 99, 'amount': 1})
+        assert view.snapshot()[99] == 1 and len(calls) == 101
+        view.snapshot()
+        assert len(calls) == 101
+
+    def test_shrinking_source_rebuilds(self):
+        """Test removing from the clist behind the view's back rebuilds it"""
+        log = clist(events(100))
+        view = log.live_count_by(X['user'])
+        del log[:60]
+        assert view.snapshot() == log.count_by(X['user']) and len(view) == 40
+
+    def test_feeding_through_the_view(self):
+        """Test append / extend / remove on the view update the clist and its other views"""
+        log = clist(events(20))
+        counts = log.live_count_by(X['user'])
+        sums = log.live_reduce_by(X['user'], total, 0, inverse=untotal)
+        counts.append({'user': 50, 'amount': 7}).extend(events(5, 9))
+        assert len(log) == 26 and log[20] == {'user': 50, 'amount': 7}
+        assert sums.snapshot()[50] == 7
+        sums.remove({'user': 50, 'amount': 7})
+        assert len(log) == 25 and 50 not in sums.snapshot() and 50 not in counts.snapshot()
+        assert sums.snapshot() == cdict({k: sum(e['amount'] for e in g)
+                                         for k, g in log.groupby(X['user']).items()})
+        assert counts.snapshot() == log.count_by(X['user'])
+
+
+class TestFedDirectly:
+    def test_consumes_other_iterables_once(self):
+        """Test a view over a cgenerator consumes it, then takes elements only from the caller"""
+        view = cgenerator(range(10)).live_count_by(X % 2)
+        assert view.source is None
+        view.extend(range(3)).append(4)
+        assert view.snapshot() == {0: 8, 1: 6} and len(view) == 14
+        standalone = LiveCountBy()
+        standalone.extend('abca')
+        assert standalone.snapshot() == {'a': 2, 'b': 1, 'c': 1}
+
+    def test_remove(self):
+        """Test removal through inverses, and the errors when it can't be done"""
+        sums = clist().live_reduce_by(X['user'], total, 0, inverse=untotal)
+        sums.extend([{'user': 1, 'amount': 5}, {'user': 1, 'amount': 3}])
+        sums.remove({'user': 1, 'amount': 5})
+        assert sums.snapshot() == {1: 3}
+        with pytest.raises(TypeError):
+            clist([1, 2]).live_reduce_by(X % 2, operator.add).remove(1)
+        with pytest.raises(ValueError):
+            clist([1]).live_count_by().remove(2)
+        top = clist([5, 1, 9, 3]).live_top_k(2)
+        top.remove(9)
+        assert top.snapshot() == [5, 3]
+
+    def test_failed_remove_changes_nothing(self):
+        """Test a remove that raises leaves both the view and the followed clist as they were"""
+        data = clist([1, 2])
+        counts = data.live_count_by(lambda x: x % 2)
+        with pytest.raises(ValueError):
+            counts.remove(3)
+        assert counts.snapshot() == {1: 1, 0: 1} and len(counts) == 2 and data == [1, 2]
+        sums = data.live_reduce_by(X % 2, operator.add)
+        with pytest.raises(TypeError):
+            sums.remove(1)
+        assert data == [1, 2] and len(sums) == 2 and sums.snapshot() == {1: 1, 0: 2}
+        list.append(data, 4)
+        assert counts.snapshot() == {1: 1, 0: 2} and sums.snapshot() == {1: 1, 0: 6}
+
+    def test_reduce_by_without_init_starts_from_first_element(self):
+        """Test live_reduce_by without init folds like reduce_by"""
+        data = clist([3, 8, 1, 6, 6, 2])
+        view = data.live_reduce_by(X % 3, max)
+        assert view.snapshot() == data.reduce_by(X % 3, max)
+
+
+class TestSnapshots:
+    def test_later_updates_do_not_change_a_snapshot(self):
+        """Test snapshots are isolated from later updates, and reused until one happens"""
+        log = clist([1, 2, 2])
+        counts, top = log.live_count_by(), log.live_top_k(2)
+        before, top_before = counts.snapshot(), top.snapshot()
+        assert counts.snapshot() is before and top.snapshot() is top_before
+        counts.extend([2, 3])
+        assert before == {1: 1, 2: 2} and top_before == [2, 2]
+        assert counts.snapshot() == {1: 1, 2: 3, 3: 1} and top.snapshot() == [3, 2]
+
+    def test_concurrent_feeding_and_reading(self):
+        """Test a view fed from one thread and read from others stays consistent"""
+        view = LiveCountBy(X % 4)
+        seen = []
+
+        def read():
+            for _ in range(200):
+                snap = view.snapshot()
+                seen.append(sum(snap.values()))
+
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        for t in readers:
+            t.start()
+        for i in range(200):
+            view.extend(range(i * 10, i * 10 + 10))
+        for t in readers:
+            t.join()
+        assert view.snapshot() == {0: 500, 1: 500, 2: 500, 3: 500}
+        assert all(n % 10 == 0 for n in seen)
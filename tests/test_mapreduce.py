@@ -0,0 +1,75 @@
+"""
+Unit tests for partitioned map-reduce aggregations
+"""
+import operator
+import random
+
+import pytest
+from chaincollections import cgenerator, clist, crange
+from chaincollections.mapreduce import Partitioned
+
+
+def mod7(x):
+    return x % 7
+
+
+def skewed(n, seed=0):
+    rng = random.Random(seed)
+    # key 0 gets ~90% of the elements
+    return clist((0 if rng.random() < 0.9 else rng.randrange(1, 50), i) for i in range(n))
+
+
+first = operator.itemgetter(0)
+second = operator.itemgetter(1)
+
+
+def add_second(acc, pair):
+    return (acc[0], acc[1] + pair[1])
+
+
+class TestMapReduce:
+    def test_process_pool_matches_single_process(self):
+        """Test every aggregation equals the in-process result, values and key order"""
+        rng = random.Random(1)
+        data = clist(rng.randrange(1000) for _ in range(20000))
+        parts = data.partitioned(3, chunksize=1500)
+        assert parts.count_by(mod7) == data.count_by(mod7)
+        assert list(parts.count_by(mod7)) == list(data.count_by(mod7))
+        assert parts.frequencies == data.frequencies
+        assert list(parts.frequencies) == list(data.frequencies)
+        assert parts.reduce_by(mod7, operator.add) == data.reduce_by(mod7, operator.add)
+        grouped = parts.groupby(mod7)
+        assert grouped == data.groupby(mod7) and list(grouped) == list(data.groupby(mod7))
+        assert isinstance(grouped[0], clist)
+
+    def test_skewed_keys_are_split(self):
+        """Test a hot key is spread over partitions and merged back in order"""
+        data = skewed(5000)
+        parts = Partitioned(data, 4, executor='thread', chunksize=100)
+        order, slots, hot = parts._shuffle('group', [
+            {0: [1] * 90, 1: [2] * 10} for _ in range(8)
+        ])
+        assert hot == {0: 4} and order == [0, 1]
+        assert sum(1 for partition in slots for (k, run), _ in partition if k == 0) == 4
+        assert parts.groupby(first) == data.groupby(first)
+        assert parts.reduce_by(first, add_second) == data.reduce_by(first, add_second)
+        assert parts.count_by(first) == data.count_by(first)
+
+    def test_generators_and_executors(self):
+        """Test streams, thread pools, lambdas and a single partition"""
+        gen = cgenerator(iter(range(1000)))
+        assert gen.partitioned(2, executor='thread', chunksize=64).count_by(lambda x: x % 3) == \
+            crange(1000).count_by(lambda x: x % 3)
+        assert crange(100).partitioned(1).reduce_by(mod7, max) == crange(100).reduce_by(mod7, max)
+        assert crange(0).partitioned(2).count_by(mod7) == {}
+        with pytest.raises(ValueError):
+            crange(3).partitioned(2, executor='gpu').count_by(mod7)
+
+    def test_init_and_combine(self):
+        """Test init= starts each partial and combine= merges partials unlike the elements"""
+        words = clist(['a', 'bb', 'a', 'ccc', 'bb', 'a'] * 50)
+        result = words.partitioned(3, executor='thread', chunksize=7).reduce_by(
+            len, lambda acc, w: acc + len(w), init=0, combine=operator.add
+        )
+        assert result == {1: 150, 2: 200, 3: 150}
+        assert list(result) == [1, 2, 3]
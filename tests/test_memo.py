@@ -0,0 +1,126 @@
+"""
+Unit tests for memoized map and MemoCache
+"""
+import threading
+
+import pytest
+from chaincollections import MemoCache, clist, crange
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemo:
+    def test_map_with_cache_dedups_calls(self):
+        """Test duplicates are computed once and results match a plain map"""
+        calls = []
+
+        def slow(x):
+            calls.append(x)
+            return x * 10
+
+        data = clist([1, 2, 1, 3, 2, 1])
+        cache = MemoCache()
+        assert data.map(slow, cache=cache) == data.map(lambda x: x * 10)
+        assert sorted(calls) == [1, 2, 3]
+        stats = cache.stats
+        assert (stats.hits, stats.misses, stats.entries) == (3, 3, 3)
+        assert stats.hit_rate == 0.5
+
+    def test_cache_shared_across_chains(self):
+        """Test a second chain through the same cache starts warm"""
+        cache = MemoCache()
+        crange(10).map(str, cache=cache)
+        crange(10).lazy().pipe_map(int, str, cache=cache).to_list()
+        assert cache.stats.misses == 10 and cache.stats.hits == 10
+        assert crange(5).memo_map(lambda x: -x).to_set() == {0, -1, -2, -3, -4}
+
+    def test_lru_eviction(self):
+        """Test LRU keeps the recently used entries"""
+        cache = MemoCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        assert 'a' in cache and 'c' in cache and 'b' not in cache
+        assert cache.stats.evictions == 1
+
+    def test_lfu_eviction(self):
+        """Test LFU drops the least used entry, oldest first among ties"""
+        cache = MemoCache(max_entries=2, policy='lfu')
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.get('a')
+        cache.get('b')
+        cache.put('c', 3)
+        assert set(cache._data) == {'a', 'c'}
+        cache.put('d', 4)
+        assert set(cache._data) == {'a', 'd'}
+
+    def test_ttl_expiry(self):
+        """Test entries expire after ttl and purge() drops them eagerly"""
+        clock = Clock()
+        cache = MemoCache(policy='ttl', ttl=10, clock=clock)
+        cache.put('a', 1)
+        clock.now = 5
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        clock.now = 11
+        assert cache.get('a') is None and cache.get('b') == 2
+        clock.now = 20
+        assert cache.purge() == 1 and len(cache) == 0
+        assert cache.stats.expirations == 2
+
+    def test_byte_limit(self):
+        """Test max_bytes evicts by measured size and skips oversized results"""
+        cache = MemoCache(max_bytes=10, sizeof=len)
+        cache.put(1, 'aaaa')
+        cache.put(2, 'bbbb')
+        cache.put(3, 'cccc')
+        assert len(cache) == 2 and cache.stats.bytes == 8
+        cache.put(4, 'x' * 11)
+        assert 4 not in cache
+
+    def test_key_function_for_unhashable(self):
+        """Test key= lets dict elements be memoized"""
+        rows = clist([{'id': 1}, {'id': 2}, {'id': 1}])
+        cache = MemoCache(key=lambda r: r['id'])
+        assert rows.map(lambda r: r['id'] * 2, cache=cache) == [2, 4, 2]
+        assert cache.stats.hits == 1
+        with pytest.raises(TypeError):
+            rows.map(lambda r: r, cache=MemoCache())
+
+    def test_thread_safety(self):
+        """Test concurrent chains sharing a bounded cache stay consistent"""
+        cache = MemoCache(max_entries=50, policy='lfu')
+        errors = []
+
+        def work():
+            try:
+                for _ in range(20):
+                    assert crange(200).map(lambda x: x % 70 * 2, cache=cache) == \
+                        [x % 70 * 2 for x in range(200)]
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors and len(cache) <= 50
+
+    def test_invalid_arguments(self):
+        """Test bad policies and limits are rejected"""
+        with pytest.raises(ValueError):
+            MemoCache(policy='mru')
+        with pytest.raises(ValueError):
+            MemoCache(policy='ttl')
+        with pytest.raises(ValueError):
+            MemoCache(max_entries=0)
@@ -0,0 +1,54 @@
+"""
+Unit tests for parallel map / filter / mapcat
+"""
+import operator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from chaincollections import clist, cgenerator, crange, cxrange
+
+
+class TestParallel:
+    def test_par_map_ordered(self):
+        """Test par_map matches map and keeps the collection type"""
+        result = crange(1000).par_map(lambda x: x * 2, workers=4, chunksize=7)
+        assert isinstance(result, clist)
+        assert result == crange(1000).map(lambda x: x * 2)
+
+    def test_par_map_unordered(self):
+        """Test unordered results contain the same elements"""
+        result = crange(1000).par_map(lambda x: x + 1, workers=4, chunksize=10, ordered=False)
+        assert sorted(result) == list(range(1, 1001))
+
+    def test_par_filter_and_mapcat(self):
+        """Test par_filter and par_mapcat"""
+        assert crange(100).par_filter(lambda x: x % 3 == 0, chunksize=8) == \
+            crange(100).filter(lambda x: x % 3 == 0)
+        assert crange(4).par_mapcat(lambda x: [x] * x, chunksize=1) == [1, 2, 2, 3, 3, 3]
+
+    def test_par_map_process_pool(self):
+        """Test the process executor with a picklable function"""
+        result = crange(50).par_map(operator.neg, executor='process', workers=2, chunksize=10)
+        assert result == [-x for x in range(50)]
+
+    def test_par_map_streams_generators(self):
+        """Test a cgenerator source is read with a bounded number of chunks in flight"""
+        pulled = []
+
+        def source():
+            for i in range(10 ** 9):
+                pulled.append(i)
+                yield i
+
+        g = cgenerator(source()).par_map(lambda x: x * 10, chunksize=5, max_in_flight=2)
+        assert isinstance(g, cgenerator)
+        assert g.take(3).to_list() == [0, 10, 20]
+        assert len(pulled) <= 15
+
+    def test_par_map_external_executor(self):
+        """Test a caller-owned executor is used and left running"""
+        with ThreadPoolExecutor(2) as pool:
+            assert cxrange(10).par_map(str, executor=pool).to_list() == [str(i) for i in range(10)]
+            assert pool.submit(lambda: 1).result() == 1
+        with pytest.raises(ValueError):
+            crange(3).par_map(str, executor='gpu')
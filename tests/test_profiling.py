@@ -0,0 +1,90 @@
+"""
+Unit tests for per-stage profiling and explain()
+"""
+import json
+
+import pytest
+from chaincollections import X, clist, crange, cxrange, profile
+from chaincollections.profiling import _Counted, add_hook, remove_hook
+
+
+class TestProfiling:
+    def test_profile_records_stages(self):
+        """Test profile() records each chain call with counts and callable invocations"""
+        with profile(memory=False) as p:
+            groups = crange(100).map(lambda x: x + 1).filter(lambda x: x % 2).groupby(
+                lambda x: x % 3
+            )
+        assert sum(len(g) for g in groups.values()) == 50
+        assert [s.name for s in p] == ['map', 'filter', 'groupby']
+        assert [(s.count_in, s.count_out, s.calls) for s in p] == [
+            (100, 100, 100), (100, 50, 100), (50, 3, 50)
+        ]
+        assert all(s.seconds >= 0 and s.memory is None for s in p)
+
+    def test_profile_is_uninstalled(self):
+        """Test chain methods are left untouched outside the block"""
+        map_, frequencies = clist.map, clist.__dict__.get('frequencies')
+        with profile(memory=False):
+            assert clist.map is not map_
+        assert clist.map is map_
+        assert clist.__dict__.get('frequencies') is frequencies
+
+    def test_callables_that_are_inspected_pass_through(self):
+        """Test index keys, X expressions and ufuncs reach the method unwrapped"""
+        ref = clist({'id': i % 3, 'v': i} for i in range(9))
+        index = ref.index_by(lambda r: r['id'])
+        left = crange(3)
+        expected = left.join(index, lambda x: x, index.key)
+        with profile(memory=False) as p:
+            assert left.join(index, lambda x: x, index.key) == expected
+            assert crange(10).filter(X > 6) == [7, 8, 9]
+        assert [(s.name, s.calls) for s in p] == [('join', 3), ('filter', None)]
+        assert (_Counted(len) == X) is False and _Counted(len) == _Counted(len)
+        np = pytest.importorskip('numpy')
+        with profile(memory=False) as p:
+            crange(4).map(np.negative)
+        assert p.stages[0].calls is None
+
+    def test_nested_calls_are_not_recorded(self):
+        """Test only the outermost call is a stage"""
+        with profile(memory=False) as p:
+            clist([3, 1, 2]).to_set().to_list()
+            clist([1, 1, 2]).frequencies
+        assert [s.name for s in p] == ['to_set', 'to_list', 'frequencies']
+
+    def test_memory_and_export(self):
+        """Test tracemalloc measurements and dict / JSON / table export"""
+        with profile() as p:
+            crange(1000).map(lambda x: [x])
+        assert p.stages[0].memory > 0
+        data = json.loads(p.to_json())
+        assert data['stages'][0]['name'] == 'map' and data['total_seconds'] >= 0
+        assert str(p).splitlines()[0].split() == ['stage', 'in', 'out', 'calls', 'seconds',
+                                                  'memory']
+
+    def test_hooks(self):
+        """Test hooks receive every recorded stage"""
+        seen = []
+        add_hook(seen.append)
+        try:
+            with profile(memory=False):
+                crange(5).map(str)
+            cxrange(5).lazy().map(str).explain(memory=False)
+        finally:
+            remove_hook(seen.append)
+        assert [s.name for s in seen] == ['map', 'source', 'map']
+
+    def test_explain(self):
+        """Test explain() meters each lazy stage separately"""
+        plan = (cxrange(1000).lazy()
+                .map(lambda x: x * 2).filter(lambda x: x % 3 == 0)
+                .sort(key=lambda x: -x).take(10))
+        p = plan.explain(memory=False)
+        assert [s.name for s in p] == ['source', 'map', 'filter', 'sort', 'take']
+        assert [(s.count_in, s.count_out) for s in p] == [
+            (None, 1000), (1000, 1000), (1000, 334), (334, 10), (10, 10)
+        ]
+        assert [s.calls for s in p] == [None, 1000, 1000, 334, None]
+        assert all(s.seconds >= 0 for s in p)
+        assert plan.to_list() == list(range(1998, 1938, -6))
@@ -0,0 +1,120 @@
+"""
+Unit tests for approximate sketches and their error bounds
+"""
+import bisect
+import collections
+import random
+
+import pytest
+from chaincollections import (CountMinSketch, HyperLogLog, KLLSketch, Reservoir, SpaceSaving,
+                              clist, cxrange)
+
+
+def zipf(n, seed=0):
+    rng = random.Random(seed)
+    return [int(rng.paretovariate(1.1)) for _ in range(n)]
+
+
+class TestSketches:
+    def test_hyperloglog_error(self):
+        """Test distinct counts are within 3 standard errors, small and large"""
+        assert abs(clist(range(500)).approx_distinct_count() - 500) <= 5
+        sketch = HyperLogLog(12).update(cxrange(100000))
+        assert abs(sketch.count() - 100000) <= 3 * sketch.relative_error * 100000
+        words = clist('w%d' % (i % 20000) for i in range(100000))
+        assert abs(words.approx_distinct_count(12) - 20000) <= 3 * sketch.relative_error * 20000
+
+    def test_hyperloglog_merge(self):
+        """Test merging shard sketches estimates the union"""
+        a = HyperLogLog(12).update(range(0, 60000))
+        b = HyperLogLog(12).update(range(30000, 100000))
+        assert abs(a.merge(b).count() - 100000) <= 3 * a.relative_error * 100000
+        assert a.merge(a).count() == a.count()
+        with pytest.raises(ValueError):
+            a.merge(HyperLogLog(10))
+
+    def test_count_min_bounds(self):
+        """Test estimates never undercount and stay within epsilon * N"""
+        data = zipf(50000)
+        true = collections.Counter(data)
+        sketch = clist(data).approx_frequencies(epsilon=0.001, delta=0.01)
+        assert sketch.n == 50000
+        assert all(sketch[x] >= c for x, c in true.items())
+        within = sum(sketch[x] - c <= sketch.error_bound for x, c in true.items())
+        assert within >= 0.99 * len(true)
+
+    def test_count_min_merge(self):
+        """Test a merged sketch equals the sketch of the concatenated stream"""
+        data = zipf(20000)
+        whole = CountMinSketch().update(data)
+        merged = CountMinSketch().update(data[:7000]).merge(CountMinSketch().update(data[7000:]))
+        assert merged.rows == whole.rows and merged.n == whole.n
+
+    def test_heavy_hitters(self):
+        """Test Space-Saving reports every frequent element with bounded overestimates"""
+        data = zipf(100000, seed=1)
+        true = collections.Counter(data)
+        assert clist(data).heavy_hitters(5).map(lambda kv: kv[0]) == \
+            [x for x, _ in true.most_common(5)]
+        sketch = SpaceSaving(100).update(data)
+        tracked = dict(sketch.top())
+        assert len(tracked) <= 100
+        for x, c in true.items():
+            if c > sketch.error_bound:
+                assert x in tracked
+        for x, est in tracked.items():
+            assert true[x] <= est <= true[x] + sketch.error_bound
+            assert est - sketch.error(x) <= true[x]
+
+    def test_heavy_hitters_merge(self):
+        """Test merged Space-Saving sketches keep the combined error bound"""
+        data = zipf(60000, seed=2)
+        true = collections.Counter(data)
+        a, b = SpaceSaving(100).update(data[:20000]), SpaceSaving(100).update(data[20000:])
+        merged = a.merge(b)
+        assert merged.n == 60000
+        for x, est in merged.top():
+            assert true[x] <= est <= true[x] + a.error_bound + b.error_bound
+        assert merged.top(3).map(lambda kv: kv[0]) == [x for x, _ in true.most_common(3)]
+
+    def test_quantiles_error(self):
+        """Test KLL quantiles have rank error within a few percent for k=200"""
+        rng = random.Random(3)
+        data = [rng.gauss(0, 1) for _ in range(100000)]
+        ordered = sorted(data)
+        qs = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+        for q, value in zip(qs, clist(data).approx_quantiles(qs, seed=4)):
+            assert abs(bisect.bisect_left(ordered, value) / len(data) - q) <= 0.02
+        assert cxrange(1001).approx_quantiles(0.5, seed=1) == pytest.approx(500, abs=25)
+
+    def test_quantiles_merge(self):
+        """Test merged KLL sketches answer for the union"""
+        a = KLLSketch(seed=1).update(range(0, 50000))
+        b = KLLSketch(seed=2).update(range(50000, 100000))
+        merged = a.merge(b)
+        assert merged.n == 100000
+        for q in (0.1, 0.5, 0.9):
+            assert abs(merged.quantile(q) - q * 100000) <= 2000
+        assert merged.rank(50000) == pytest.approx(0.5, abs=0.02)
+
+    def test_sample_is_uniform(self):
+        """Test every element is equally likely to be sampled, directly and after a merge"""
+        counts = collections.Counter()
+        merged_counts = collections.Counter()
+        for seed in range(2000):
+            sample = clist(range(100)).sample(10, seed=seed)
+            assert len(sample) == 10 and len(set(sample)) == 10
+            counts.update(sample)
+            a = Reservoir(10, seed=seed).update(range(30))
+            b = Reservoir(10, seed=seed + 10 ** 6).update(range(30, 100))
+            merged_counts.update(a.merge(b).items)
+        for c in (counts, merged_counts):
+            assert len(c) == 100
+            assert all(130 <= v <= 270 for v in c.values())
+
+    def test_sample_small_and_streaming(self):
+        """Test short inputs are returned whole and long streams are read once"""
+        assert sorted(clist([1, 2, 3]).sample(10)) == [1, 2, 3]
+        r = Reservoir(5, seed=1).update(iter(range(1000000)))
+        assert r.count == 1000000 and len(r.items) == 5
+        assert r.update(range(10)).count == 1000010
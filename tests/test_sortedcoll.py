@@ -0,0 +1,136 @@
+"""
+Unit tests for csortedlist and csorteddict
+"""
+import bisect
+import copy
+import pickle
+import random
+
+import pytest
+from chaincollections import cgenerator, clist, csorteddict, csortedlist
+
+
+class TestSortedList:
+    def test_matches_sorted_list_under_churn(self):
+        """Test random adds, removes and pops against a re-sorted list, across splits"""
+        rng = random.Random(0)
+        s, ref = csortedlist(load=4), []
+        for _ in range(3000):
+            if rng.random() < 0.6 or not ref:
+                x = rng.randrange(200)
+                s.add(x)
+                bisect.insort(ref, x)
+            elif rng.random() < 0.5:
+                x = rng.randrange(200)
+                s.discard(x)
+                if x in ref:
+                    ref.remove(x)
+            else:
+                i = rng.randrange(len(ref))
+                assert s.pop(i) == ref.pop(i)
+        assert s == ref and len(s) == len(ref) and len(s._lists) > 10
+        assert all(s[i] == ref[i] for i in range(len(ref)))
+        assert s[-1] == ref[-1] and s[3:9] == ref[3:9] and s[::7] == ref[::7]
+        assert list(reversed(s)) == ref[::-1]
+
+    def test_bisect_rank_and_index(self):
+        """Test bisect/rank/count/index agree with the bisect module"""
+        data = [5, 1, 3, 3, 9, 7, 3]
+        s = csortedlist(data)
+        ref = sorted(data)
+        for x in range(11):
+            assert s.bisect_left(x) == bisect.bisect_left(ref, x)
+            assert s.bisect_right(x) == s.bisect(x) == bisect.bisect_right(ref, x)
+            assert s.rank(x) == bisect.bisect_left(ref, x) and s.count(x) == ref.count(x)
+        assert s.index(3) == 1 and 9 in s and 4 not in s
+        with pytest.raises(ValueError):
+            s.remove(4)
+        with pytest.raises(IndexError):
+            s[7]
+
+    def test_irange_is_lazy(self):
+        """Test irange bounds, direction and that it returns a cgenerator"""
+        s = csortedlist(range(0, 100, 2), load=4)
+        r = s.irange(10, 20)
+        assert isinstance(r, cgenerator)
+        assert r.to_list() == [10, 12, 14, 16, 18, 20]
+        assert s.irange(11, 19, inclusive=(False, False)).to_list() == [12, 14, 16, 18]
+        assert s.irange(hi=4).to_list() == [0, 2, 4] and s.irange(95).to_list() == [96, 98]
+        assert s.irange(10, 16, reverse=True).to_list() == [16, 14, 12, 10]
+        assert s.irange(50, 40).to_list() == []
+
+    def test_key_function(self):
+        """Test ordering by key keeps equal keys in insertion order"""
+        s = csortedlist([('b', 2), ('a', 2), ('c', 1)], key=lambda p: p[1])
+        s.add(('d', 1)).add(('e', 3))
+        assert s == [('c', 1), ('d', 1), ('b', 2), ('a', 2), ('e', 3)]
+        assert s.remove(('a', 2)).irange_key(1, 2).to_list() == [('c', 1), ('d', 1), ('b', 2)]
+        assert ('b', 2) in s and ('z', 2) not in s and s.count(('d', 1)) == 1
+        assert s.top_k(2, key=s.key) == [('e', 3), ('b', 2)]
+
+    def test_chainable_api(self):
+        """Test CBase methods work and O(k) shortcuts give the same answers"""
+        rng = random.Random(1)
+        data = [rng.randrange(1000) for _ in range(500)]
+        s = csortedlist(data, load=16)
+        assert s.top_k(5) == clist(data).top_k(5) and s.tail(3) == sorted(data)[-3:]
+        assert s.last() == max(data) and s.min() == min(data) and s.first() == min(data)
+        evens = s.filter(lambda x: x % 2 == 0)
+        assert type(evens) is clist and evens == sorted(x for x in data if x % 2 == 0)
+        assert s.map(str).take(2) == [str(x) for x in sorted(data)[:2]]
+        assert s.update([1500, -1]).first() == -1 and s.last() == 1500
+        assert s.copy() == s and s.clear() == [] and len(s) == 0
+
+    def test_copy_module(self):
+        """Test copy.copy / deepcopy give independent lists"""
+        s = csortedlist([5, 1, 4], load=4)
+        for other in (copy.copy(s), copy.deepcopy(s)):
+            other.add(3)
+            assert list(other) == [1, 3, 4, 5] and len(other) == 4
+        assert list(s) == [1, 4, 5] and len(s) == 3
+
+
+class TestSortedDict:
+    def test_sorted_iteration(self):
+        """Test keys, values and items come back in key order after mutations"""
+        d = csorteddict({'m': 1, 'c': 2}, x=3)
+        d['a'] = 4
+        d.update({'z': 5, 'c': 6})
+        del d['m']
+        assert list(d) == ['a', 'c', 'x', 'z'] and d.keys() == ['a', 'c', 'x', 'z']
+        assert d.values() == [4, 6, 3, 5] and d.items()[0] == ('a', 4)
+        assert d.pop('x') == 3 and d.pop('nope', None) is None
+        assert d.popitem() == ('z', 5) and d.popitem(0) == ('a', 4) and d == {'c': 6}
+        assert d.setdefault('b', 7) == 7 and list(d) == ['b', 'c']
+
+    def test_range_queries(self):
+        """Test irange, bisect, rank and peekitem over keys"""
+        d = csorteddict((i, i * i) for i in range(0, 20, 2))
+        assert d.irange(4, 10).to_list() == [4, 6, 8, 10]
+        assert d.irange_items(15).to_list() == [(16, 256), (18, 324)]
+        assert d.rank(5) == 3 and d.bisect(6) == 4 and d.index(8) == 4
+        assert d.peekitem() == (18, 324) and d.peekitem(0) == (0, 0)
+        assert isinstance(d.valfilter(lambda v: v > 100), csorteddict)
+        assert list(d.valmap(str)) == list(d)
+
+    def test_copy_and_pickle(self):
+        """Test copies and pickles keep the sorted keys"""
+        d = csorteddict({3: 'c', 1: 'a'})
+        for other in (d.copy(), pickle.loads(pickle.dumps(d))):
+            other[2] = 'b'
+            assert list(other) == [1, 2, 3]
+        assert list(d) == [1, 3]
+
+    def test_merge_operators(self):
+        """Test | and |= keep the sorted keys (and pickles / copies see every key)"""
+        d = csorteddict({3: 'c', 1: 'a'})
+        d |= {2: 'b'}
+        assert list(d) == [1, 2, 3] and dict(d) == {1: 'a', 2: 'b', 3: 'c'}
+        assert list(pickle.loads(pickle.dumps(d))) == [1, 2, 3]
+        assert list(copy.deepcopy(d)) == [1, 2, 3]
+        merged = d | {0: 'z', 3: 'C'}
+        assert isinstance(merged, csorteddict) and list(merged) == [0, 1, 2, 3]
+        assert merged[3] == 'C' and d[3] == 'c'
+        flipped = {3: 'C', 9: 'i'} | d
+        assert isinstance(flipped, csorteddict) and list(flipped.items()) == \
+            [(1, 'a'), (2, 'b'), (3, 'c'), (9, 'i')]
@@ -0,0 +1,114 @@
+"""
+Unit tests for the columnar ctable
+"""
+from array import array
+
+import pytest
+from chaincollections import cgenerator, clist, ctable
+from chaincollections import table as table_module
+
+ROWS = [
+    {'id': 1, 'cat': 'a', 'price': 9.5, 'qty': 3},
+    {'id': 2, 'cat': 'b', 'price': 20.0, 'qty': 1},
+    {'id': 3, 'cat': 'a', 'price': 15.0, 'qty': 2},
+    {'id': 4, 'cat': 'c', 'price': 15.0, 'qty': 7},
+    {'id': 5, 'cat': 'b', 'price': 1.25, 'qty': 4},
+]
+
+
+@pytest.fixture(params=['numpy', 'pure'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(table_module, 'np', None)
+    return request.param
+
+
+class TestTable:
+    def test_round_trip_and_storage(self):
+        """Test records round-trip and numeric columns use typed arrays"""
+        t = ctable(ROWS)
+        assert len(t) == 5 and t.columns == ['id', 'cat', 'price', 'qty']
+        assert t.schema == {'id': 'int64', 'cat': 'object', 'price': 'float64', 'qty': 'int64'}
+        assert isinstance(t._columns['price'], array)
+        assert t.to_list() == ROWS and isinstance(t.rows(), cgenerator)
+        assert t[1] == ROWS[1] and t[1:3].to_list() == ROWS[1:3]
+        assert ctable({'x': [1, 2], 'y': ['p', 'q']}).to_list() == [{'x': 1, 'y': 'p'},
+                                                                    {'x': 2, 'y': 'q'}]
+
+    def test_missing_fields_and_mixed_types(self):
+        """Test absent fields become None and mixed columns stay exact Python objects"""
+        t = ctable([{'a': 1}, {'a': 2.5, 'b': True}, {'a': 2 ** 70}])
+        assert t.schema == {'a': 'object', 'b': 'object'}
+        assert t.pluck('b') == [None, True, None] and t.pluck('a')[2] == 2 ** 70
+        with pytest.raises(ValueError):
+            ctable({'x': [1, 2], 'y': [1]})
+
+    def test_projection_shares_columns(self):
+        """Test select and [names] project without copying"""
+        t = ctable(ROWS)
+        p = t.select('id', 'qty')
+        assert p.columns == ['id', 'qty'] and p._columns['qty'] is t._columns['qty']
+        assert t[['cat']].to_list() == [{'cat': r['cat']} for r in ROWS]
+        assert t.drop_columns('price', 'qty').columns == ['id', 'cat']
+        assert t.rename(category='cat').columns == ['id', 'category', 'price', 'qty']
+
+    def test_filter_and_remove(self, backend):
+        """Test column predicates (vectorized or not) and row predicates agree with clist"""
+        t = ctable(ROWS)
+        rows = clist(ROWS)
+        assert t.filter(price=lambda p: p > 10).to_list() == \
+            rows.filter(lambda r: r['price'] > 10)
+        assert t.filter(price=lambda p: p > 10, cat=lambda c: c == 'a').pluck('id') == [3]
+        assert t.filter(lambda r: r['qty'] * r['price'] >= 30).pluck('id') == [3, 4]
+        assert t.remove(qty=lambda q: q > 2).pluck('id') == [2, 3]
+        assert t.filter() is t and len(t.filter(id=lambda i: i > 99)) == 0
+
+    def test_column_predicates_keep_python_semantics(self):
+        """Test whole-column runs that would overflow or divide by zero fall back per value"""
+        np = pytest.importorskip('numpy')
+        t = ctable([{'a': 2 ** 62, 'b': 3}, {'a': 5, 'b': 1}, {'a': 2 ** 53 + 1, 'b': 2}])
+        assert t.filter(a=lambda a: a * 4 > 0).pluck('b') == [3, 1, 2]
+        assert t.filter(a=lambda a: a > float(2 ** 53)).pluck('b') == [3, 2]
+        with pytest.raises(ZeroDivisionError):
+            t.filter(b=lambda b: 1 // (b - 1) > 0)
+        calls = []
+        assert t.filter(b=lambda b: calls.append(b) or b * 2 > 3).pluck('b') == [3, 2]
+        assert len(calls) == 1 and isinstance(calls[0], np.ndarray)
+
+    def test_sort(self, backend):
+        """Test multi-column stable sort in both directions"""
+        t = ctable(ROWS)
+        assert t.sort('price').pluck('id') == [5, 1, 3, 4, 2]
+        assert t.sort('price', reverse=True).pluck('id') == [2, 3, 4, 1, 5]
+        assert t.sort('cat', 'qty').pluck('id') == [3, 1, 2, 5, 4]
+        assert t.sort('price', 'cat', reverse=True).pluck('id') == [2, 4, 3, 1, 5]
+        assert t.sort('price').to_list() == sorted(ROWS, key=lambda r: r['price'])
+
+    def test_groupby_agg(self):
+        """Test grouped aggregates by name, callable and multiple keys"""
+        t = ctable(ROWS)
+        out = t.groupby('cat').agg(qty='sum', avg=('price', 'mean'), ids=('id', 'list'),
+                                   top=('price', lambda ps: ps.top_k(1)[0]))
+        assert out.to_list() == [
+            {'cat': 'a', 'qty': 5, 'avg': 12.25, 'ids': [1, 3], 'top': 15.0},
+            {'cat': 'b', 'qty': 5, 'avg': 10.625, 'ids': [2, 5], 'top': 20.0},
+            {'cat': 'c', 'qty': 7, 'avg': 15.0, 'ids': [4], 'top': 15.0},
+        ]
+        assert t.groupby('cat', 'price').count().pluck(['cat', 'count']) == \
+            [['a', 1], ['b', 1], ['a', 1], ['c', 1], ['b', 1]]
+        assert len(t.groupby('price')) == 4
+
+    def test_row_chains_and_columns(self):
+        """Test CBase methods see row dicts and derived columns can be added"""
+        t = ctable(ROWS)
+        assert t.map(lambda r: r['id']) == [1, 2, 3, 4, 5]
+        assert t.take(2).to_list() == ROWS[:2] and t.tail(1).to_list() == ROWS[-1:]
+        total = t.with_column('total', lambda r: r['price'] * r['qty'])
+        assert total.pluck('total') == [28.5, 20.0, 30.0, 105.0, 5.0]
+        assert total.schema['total'] == 'float64'
+        with pytest.raises(ValueError):
+            t.with_column('x', [1])
+        assert ctable(t) == t and t.to_dict()['qty'] == [3, 1, 2, 7, 4]
+        assert clist(ROWS).to_table() == t
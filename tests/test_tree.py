@@ -0,0 +1,135 @@
+"""
+Unit tests for walk() and JSONPath-style select() over nested data
+"""
+import pytest
+from chaincollections import cdict, cgenerator, chain, clist
+from chaincollections.tree import compile_selector, select, walk
+
+RESPONSE = {
+    'metadata': {'version': '1.0', 'status': 'success'},
+    'results': [
+        {'id': 'node1', 'type': 'folder', 'children': [
+            {'id': 'node2', 'type': 'file', 'permissions': ['read', 'write'], 'size': 1024},
+            {'id': 'node3', 'type': 'file', 'permissions': ['read'], 'size': 2048},
+        ]},
+        {'id': 'node4', 'type': 'folder', 'children': [
+            {'id': 'node5', 'type': 'folder', 'children': [
+                {'id': 'node6', 'type': 'file', 'permissions': ['read', 'write', 'execute'],
+                 'size': 4096},
+            ]},
+            {'id': 'node7', 'type': 'file', 'permissions': ['read'], 'size': 512},
+        ]},
+    ],
+}
+
+
+def ids(nodes):
+    return [node['id'] for node in nodes]
+
+
+def get_in(path, doc):
+    for k in path:
+        doc = doc[k]
+    return doc
+
+
+def deep_chain(depth):
+    root = node = {}
+    for i in range(depth):
+        node['next'] = {'i': i}
+        node = node['next']
+    return root
+
+
+class TestWalk:
+    def test_paths_in_document_order(self):
+        """Test walk yields every node once, parents first, keyed by its path"""
+        doc = {'a': [1, {'b': 2}], 'c': {}}
+        assert list(walk(doc)) == [
+            ((), doc), (('a',), [1, {'b': 2}]), (('a', 0), 1), (('a', 1), {'b': 2}),
+            (('a', 1, 'b'), 2), (('c',), {}),
+        ]
+        assert list(walk(5)) == [((), 5)]
+        for path, node in walk(RESPONSE):
+            assert get_in(path, RESPONSE) is node
+
+    def test_chain_methods(self):
+        """Test cdict walks itself, other chains walk each element under its index"""
+        walked = chain(RESPONSE).walk()
+        assert isinstance(walked, cgenerator)
+        assert walked.take(2).to_list() == [((), RESPONSE), (('metadata',), RESPONSE['metadata'])]
+        assert clist([[1], 2]).walk().to_list() == [((0,), [1]), ((0, 0), 1), ((1,), 2)]
+
+    def test_deeper_than_recursion_limit(self):
+        """Test walk and select handle nesting far past the interpreter's recursion limit"""
+        doc = deep_chain(5000)
+        paths = [path for path, _ in walk(doc)]
+        assert len(paths) == 10001 and paths[-1] == ('next',) * 5000 + ('i',)
+        assert chain(doc).select('..i').to_list() == list(range(5000))
+        assert chain(doc).select('..[?i >= 4998].i').to_list() == [4998, 4999]
+
+
+class TestSelect:
+    def test_readme_query(self):
+        """Test the README traversal as a selector, at any depth"""
+        files = chain(RESPONSE).select("results[*]..children[?type=='file']")
+        assert isinstance(files, cgenerator)
+        assert ids(files) == ['node2', 'node3', 'node7', 'node6']
+        assert ids(chain(RESPONSE).select("$..[?type == 'file' && permissions[2] == 'execute']")) \
+            == ['node6']
+
+    def test_child_index_slice_and_unions(self):
+        """Test names, quoted names, negative indices, slices, unions and wildcards"""
+        r = cdict(RESPONSE)
+        assert r.select('metadata.version').to_list() == ['1.0']
+        assert r.select("metadata['version', 'status']").to_list() == ['1.0', 'success']
+        assert r.select('results[-1].children[0].id').to_list() == ['node5']
+        assert r.select('results[0,1].id').to_list() == ['node1', 'node4']
+        assert r.select('results[1:].id').to_list() == ['node4']
+        assert r.select('results[*].type').to_list() == ['folder', 'folder']
+        assert r.select('metadata.*').to_list() == ['1.0', 'success']
+        assert r.select('results[5].id').to_list() == []
+        assert r.select('missing..id').to_list() == []
+        assert r.select('..id').to_list() == ['node1', 'node2', 'node3', 'node4', 'node5',
+                                              'node6', 'node7']
+
+    def test_filter_expressions(self):
+        """Test comparisons, existence, negation, boolean operators and missing fields"""
+        r = chain(RESPONSE)
+        assert ids(r.select('..[?size > 1000]')) == ['node2', 'node3', 'node6']
+        assert ids(r.select('..[?@.size <= 1024 and @.type != "folder"]')) == ['node2', 'node7']
+        assert ids(r.select('results[?children]')) == ['node1', 'node4']
+        assert ids(r.select('..[?id && !(permissions)]')) == ['node1', 'node4', 'node5']
+        assert ids(r.select("..[?type == 'folder' || size < 600]")) == \
+            ['node1', 'node4', 'node5', 'node7']
+        assert ids(r.select('..[?size > "big"]')) == []
+        assert r.select("..permissions[?@ == 'execute']").to_list() == ['execute']
+        assert chain({'xs': [3, 'a', None, 7]}).select('xs[?@ > 2]').to_list() == [3, 7]
+        assert chain({'xs': [{'a': None}, {}]}).select('xs[?a == null]').to_list() == [{'a': None}]
+        assert chain({'xs': [{'a': None}, {}]}).select('xs[?a != null]').to_list() == []
+        pairs = {'xs': [{'a': 1, 'b': 1}, {'a': 1, 'b': 2}, {'a': 1}, {}]}
+        assert chain(pairs).select('xs[?a == b]').to_list() == [{'a': 1, 'b': 1}]
+        assert chain(pairs).select('xs[?a != b]').to_list() == [{'a': 1, 'b': 2}]
+
+    def test_streams_documents(self):
+        """Test select on a chain applies to each element, lazily"""
+        seen = []
+
+        def documents():
+            for result in RESPONSE['results']:
+                seen.append(result['id'])
+                yield result
+
+        files = cgenerator(documents()).select("children[?type == 'file'].id")
+        assert seen == []
+        assert files.first() == 'node2' and seen == ['node1']
+        assert clist(RESPONSE['results']).select('children[*].id').to_list() == \
+            ['node2', 'node3', 'node5', 'node7']
+
+    def test_compiled_once_and_errors(self):
+        """Test selectors are cached by text and malformed ones raise ValueError"""
+        assert compile_selector('..children[?x]') is compile_selector('..children[?x]')
+        for bad in ['results[', 'a b', '[?type ==]', '[1:2:3:4]', '[x]', 'a..', '[?a ==',
+                    '[?(a]', '[?a == b c]', '[?a[x] == 1]']:
+            with pytest.raises(ValueError):
+                list(select(RESPONSE, bad))
@@ -0,0 +1,77 @@
+"""
+Unit tests for zero-copy clist and cdict views
+"""
+import pytest
+from chaincollections import cdict, cdict_items, cdict_keys, clist, clist_view, crange
+
+
+class TestViews:
+    def test_clist_view_reads_through(self):
+        """Test a view indexes, slices and iterates the original list"""
+        base = crange(10)
+        v = base.view(2, 8)
+        assert isinstance(v, clist_view) and len(v) == 6
+        assert v == [2, 3, 4, 5, 6, 7] and v[0] == 2 and v[-1] == 7
+        inner = v[1::2]
+        assert isinstance(inner, clist_view) and inner._base is base
+        assert inner == [3, 5, 7]
+        assert base.view(None, None, -3) == base[::-3]
+        base[3] = 'x'
+        assert v[1] == 'x' and inner[0] == 'x'
+
+    def test_clist_view_iterates_like_a_slice(self):
+        """Test iteration matches list slicing for any bounds and step, and follows appends"""
+        base = crange(30)
+        for start, stop, step in [(None, None, None), (25, None, None), (3, 17, None),
+                                  (5, None, 4), (None, None, -2), (20, 2, -3), (40, None, None)]:
+            assert list(base.view(start, stop, step)) == base[start:stop:step]
+        tail = base.view(28)
+        list.append(base, 30)
+        assert list(tail) == [28, 29] and list(base.view(28)) == [28, 29, 30]
+        assert list(tail[1:]) == [29]
+
+    def test_clist_view_is_chainable(self):
+        """Test CBase methods on a view return ordinary clists"""
+        v = crange(20).view(5, 15)
+        result = v.map(lambda x: x * 2).filter(lambda x: x % 4 == 0)
+        assert type(result) is clist and result == [12, 16, 20, 24, 28]
+        assert type(v.take(2)) is clist and v.take(2) == [5, 6]
+        assert v.partition(5) == crange(5, 15).partition(5)
+        assert v.groupby(lambda x: x % 2)[0] == [6, 8, 10, 12, 14]
+        assert type(v.to_list()) is clist and v.to_list() == list(range(5, 15))
+        assert v.sort(reverse=True)[0] == 14 and v.append(99)[-1] == 99
+
+    def test_clist_view_copy_on_write(self):
+        """Test writing to a view copies it and leaves the original alone"""
+        base = crange(6)
+        v = base.view(1, 4)
+        v[0] = 'a'
+        del v[-1]
+        assert v == ['a', 2] and base == [0, 1, 2, 3, 4, 5]
+
+    def test_clist_view_detects_shrunk_list(self):
+        """Test iterating a view past the end of a shrunk list fails loudly"""
+        base = crange(6)
+        v = base.view(2, 6)
+        del base[3:]
+        with pytest.raises(IndexError):
+            list(v)
+
+    def test_copying_slice_is_unchanged(self):
+        """Test [] slicing still returns an independent clist snapshot"""
+        base = crange(5)
+        snap = base[1:3]
+        base[1] = 'x'
+        assert type(snap) is clist and snap == [1, 2]
+
+    def test_cdict_views(self):
+        """Test keys/values/items(copy=False) are live chainable views"""
+        d = cdict({'a': 1, 'b': 2})
+        keys, values, items = d.keys(copy=False), d.values(copy=False), d.items(copy=False)
+        assert isinstance(keys, cdict_keys) and isinstance(items, cdict_items)
+        d['c'] = 3
+        assert keys == ['a', 'b', 'c'] and values.map(lambda x: x * 10) == [10, 20, 30]
+        assert 'c' in keys and ('b', 2) in items and keys[-1] == 'c' and keys[1:] == ['b', 'c']
+        assert items.filter(lambda kv: kv[1] > 1).to_dict() == {'b': 2, 'c': 3}
+        assert type(keys.to_list()) is clist and items.to_dict() == d
+        assert type(d.keys()) is clist
@@ -0,0 +1,114 @@
+"""
+Unit tests for incremental rolling, tumbling and session windows
+"""
+import collections
+import operator
+import random
+import statistics
+
+import pytest
+from chaincollections import Rolling, cgenerator, clist, crange, cxrange
+
+
+def noisy(n, seed=0):
+    rng = random.Random(seed)
+    return clist(rng.uniform(-100, 100) for _ in range(n))
+
+
+class TestRolling:
+    def test_matches_sliding_window(self):
+        """Test every rolling aggregate equals the naive per-window computation"""
+        data = noisy(500)
+        windows = data.sliding_window(7).to_list()
+        assert data.rolling(7).sum().to_list() == pytest.approx(windows.map(sum))
+        assert data.rolling(7).mean().to_list() == pytest.approx(windows.map(statistics.mean))
+        assert data.rolling(7).min().to_list() == windows.map(min)
+        assert data.rolling(7).max().to_list() == windows.map(max)
+        assert data.rolling(7).var().to_list() == pytest.approx(windows.map(statistics.variance))
+        assert data.rolling(7).var(ddof=0).to_list() == \
+            pytest.approx(windows.map(statistics.pvariance))
+        assert data.rolling(7).std().to_list() == pytest.approx(windows.map(statistics.stdev))
+
+    def test_integers_and_edges(self):
+        """Test exact integer sums, n=1, n=len and windows longer than the input"""
+        assert crange(6).rolling(3).sum().to_list() == [3, 6, 9, 12]
+        assert isinstance(crange(6).rolling(3).sum(), cgenerator)
+        assert crange(4).rolling(1).max().to_list() == [0, 1, 2, 3]
+        assert crange(4).rolling(4).min().to_list() == [0]
+        assert crange(3).rolling(5).sum().to_list() == []
+        assert clist([3, 3, 3, 1, 1]).rolling(2).max().to_list() == [3, 3, 3, 1]
+        with pytest.raises(ValueError):
+            crange(3).rolling(0)
+
+    def test_streams_once(self):
+        """Test rolling reads an unbounded stream lazily"""
+        result = cxrange(10 ** 12).rolling(1000).max().take(3).to_list()
+        assert result == [999, 1000, 1001]
+
+    def test_no_float_drift(self):
+        """Test long float streams stay close to a fresh sum"""
+        data = clist([1e8, 1.0, -1e8, 0.1] * 25000)
+        last = data.rolling(4).sum().last()
+        assert last == pytest.approx(1.1, abs=1e-9)
+
+    def test_value_count_and_custom_aggregate(self):
+        """Test value= extraction, count and an invertible custom aggregate"""
+        rows = clist({'v': v} for v in [1, None, 3, None, None, 6])
+        assert rows.rolling(3, value=lambda r: r['v']).count().to_list() == [2, 1, 1, 1]
+        letters = clist('abcab')
+        counts = Rolling(letters, 3).aggregate(
+            lambda acc, x: acc + collections.Counter(x),
+            lambda acc, x: acc - collections.Counter(x),
+            collections.Counter(),
+        ).to_list()
+        assert counts == [collections.Counter(w) for w in ['abc', 'bca', 'cab']]
+        products = crange(1, 6).rolling(2).aggregate(operator.mul, operator.truediv, 1)
+        assert products.to_list() == [2, 6, 12, 20]
+
+
+class TestWindows:
+    events = clist([
+        {'t': 0, 'ms': 10}, {'t': 4, 'ms': 30}, {'t': 5, 'ms': 20},
+        {'t': 14, 'ms': 5}, {'t': 30, 'ms': 7}, {'t': 33, 'ms': 9},
+    ])
+
+    def test_tumbling_by_timestamp(self):
+        """Test fixed time windows keyed by start, skipping empty intervals"""
+        windows = self.events.tumbling(10, key=lambda e: e['t'], value=lambda e: e['ms'])
+        assert windows.sum().to_list() == [(0, 60), (10, 5), (30, 16)]
+        assert windows.count().to_list() == [(0, 3), (10, 1), (30, 2)]
+        assert windows.max().to_list() == [(0, 30), (10, 5), (30, 9)]
+        assert windows.mean().to_list() == [(0, 20), (10, 5), (30, 8)]
+        var = dict(windows.var().to_list())
+        assert var[0] == pytest.approx(100) and var[10] != var[10]
+        lists = self.events.tumbling(10, key=lambda e: e['t']).to_lists().to_list()
+        assert [(start, len(w)) for start, w in lists] == [(0, 3), (10, 1), (30, 2)]
+        assert isinstance(lists[0][1], clist)
+
+    def test_tumbling_by_position(self):
+        """Test windows of size elements without a key"""
+        assert crange(7).tumbling(3).sum().to_list() == [(0, 3), (3, 12), (6, 6)]
+        windows = crange(7).tumbling(3)
+        assert windows.sum().to_list() == windows.sum().to_list()
+
+    def test_session_windows(self):
+        """Test sessions split on gaps wider than gap and report their first timestamp"""
+        sessions = self.events.session(5, key=lambda e: e['t'], value=lambda e: e['ms'])
+        assert sessions.count().to_list() == [(0, 3), (14, 1), (30, 2)]
+        assert sessions.aggregate(operator.add).to_list() == [(0, 60), (14, 5), (30, 16)]
+        assert self.events.session(10, key=lambda e: e['t']).count().to_list() == [(0, 4), (30, 2)]
+
+    def test_session_gap_boundary(self):
+        """Test elements exactly gap apart stay in one session, and just over gap split"""
+        data = clist([0, 5, 10, 16, 21])
+        assert data.session(5, key=lambda x: x).count().to_list() == [(0, 3), (16, 2)]
+        assert data.session(4.9, key=lambda x: x).count().to_list() == \
+            [(0, 1), (5, 1), (10, 1), (16, 1), (21, 1)]
+
+    def test_out_of_order_raises(self):
+        """Test timestamps going backwards are reported instead of silently split"""
+        data = clist([1, 12, 3])
+        with pytest.raises(ValueError):
+            data.tumbling(10, key=lambda x: x).count().to_list()
+        with pytest.raises(ValueError):
+            data.session(5, key=lambda x: x).count().to_list()